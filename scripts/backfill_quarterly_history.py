@@ -73,17 +73,20 @@ def main(argv: list[str] | None = None) -> int:
     as_of = datetime.strptime(args.as_of, "%Y-%m-%d").date()
     output_root = Path(args.output_root)
     provider = TwMarketProvider(timeout=args.timeout, cache_dir=output_root / "cache" / "market")
-    payload = provider.backfill_quarterly_history(
-        as_of=as_of,
-        themes=[item.strip() for item in str(args.themes).split(",") if item.strip()],
-        theme_mode=args.theme_mode,
-        periods=args.periods,
-        only_missing=str(args.only_missing).lower() == "true",
-        limit_symbols=args.limit_symbols,
-        batch_size=args.batch_size,
-        force_retry_days=args.force_retry_days,
-        trigger_type="manual",
-    )
+    try:
+        payload = provider.backfill_quarterly_history(
+            as_of=as_of,
+            themes=[item.strip() for item in str(args.themes).split(",") if item.strip()],
+            theme_mode=args.theme_mode,
+            periods=args.periods,
+            only_missing=str(args.only_missing).lower() == "true",
+            limit_symbols=args.limit_symbols,
+            batch_size=args.batch_size,
+            force_retry_days=args.force_retry_days,
+            trigger_type="manual",
+        )
+    finally:
+        provider.close()
     audit_dir = output_root / "audit" / as_of.strftime("%Y%m%d")
     audit_dir.mkdir(parents=True, exist_ok=True)
     json_path = write_json_report(audit_dir / f"quarterly-backfill-{as_of.strftime('%Y%m%d')}.json", payload)
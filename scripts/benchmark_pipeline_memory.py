@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from scripts import tw_sector_screener as screener
+from scripts import tw_sector_universe_top100 as top100
+from src.analysis.candles import CandleSeries
+from src.analysis.scoring import WEIGHTS, score_candidates
+
+PIPELINES = ("before", "current")
+STAGES = ("screener", "top100")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="以合成的大型 universe 比較評分→排名→輸出流程的峰值 RSS（改版前 vs 目前實際流程）")
+    parser.add_argument("--symbols", type=int, default=5000, help="合成代號數")
+    parser.add_argument("--days", type=int, default=292, help="每檔日線根數（screener 預設 1y validation 時為 292）")
+    parser.add_argument("--top-n", type=int, default=10, help="picks 筆數")
+    parser.add_argument("--stage", choices=STAGES, default="screener", help="量測 screener 或 Top100 的評分流程")
+    parser.add_argument("--pipeline", choices=[*PIPELINES, "both"], default="both", help="只跑單一流程，或各開一個子行程比較兩者")
+    parser.add_argument("--seed", type=int, default=7, help="亂數種子")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出")
+    return parser.parse_args(argv)
+
+
+def _peak_rss_bytes() -> int:
+    try:
+        import resource
+    except ImportError:
+        # Windows 沒有 resource，改讀 PeakWorkingSetSize。
+        import ctypes
+        from ctypes import wintypes
+
+        class _Counters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = _Counters()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb)
+        return int(counters.PeakWorkingSetSize)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 回報，macOS 以 bytes 回報。
+    return int(peak) if sys.platform == "darwin" else int(peak) * 1024
+
+
+def _synthetic_inputs(symbols: int, days: int, seed: int) -> list[tuple[dict[str, Any], dict[str, Any], dict[str, Any], CandleSeries]]:
+    rng = random.Random(seed)
+    start = date(2025, 1, 1)
+    industries = ["半導體業", "電子零組件業", "電腦及週邊設備業", "通信網路業", "光電業"]
+    inputs = []
+    for i in range(symbols):
+        candles = CandleSeries()
+        close = rng.uniform(20.0, 800.0)
+        for day in range(days):
+            close = max(1.0, close * (1.0 + rng.gauss(0.0, 0.02)))
+            candles.append(start + timedelta(days=day), close, close * 1.01, close * 0.99, close, rng.uniform(1e5, 1e7))
+        candidate = {
+            "symbol": f"{1000 + i}",
+            "name": f"合成{i}",
+            "market": "TWSE" if i % 3 else "TPEx",
+            "industry": industries[i % len(industries)],
+            "revenue_yoy": rng.uniform(-30.0, 60.0),
+            "revenue_mom": rng.uniform(-20.0, 20.0),
+            "revenue_yoy_prev": rng.uniform(-30.0, 60.0),
+            "revenue_mom_prev": rng.uniform(-20.0, 20.0),
+        }
+        quarter = {
+            "gross_margin_latest": rng.uniform(10.0, 60.0),
+            "gross_margin_prev": rng.uniform(10.0, 60.0),
+            "eps_latest": rng.uniform(-2.0, 15.0),
+            "eps_prev": rng.uniform(-2.0, 15.0),
+            "roe_latest": rng.uniform(-5.0, 30.0),
+            "roe_prev": rng.uniform(-5.0, 30.0),
+            "quality_data_source": "sqlite",
+            "quality_periods_used": ["2025Q2", "2025Q1"],
+            "quality_fetch_status": "complete",
+            "quality_missing_reason": None,
+            "data_quality_flags": [],
+        }
+        closes = candles.closes
+        metrics = {
+            "close": closes[-1],
+            "sma20": sum(closes[-20:]) / 20.0,
+            "sma60": sum(closes[-60:]) / 60.0,
+            "sma120": sum(closes[-120:]) / 120.0,
+            "rsi14": rng.uniform(20.0, 80.0),
+            "atr14": closes[-1] * 0.02,
+            "volatility20": rng.uniform(10.0, 90.0),
+            "momentum63": rng.uniform(-30.0, 60.0),
+            "momentum126": rng.uniform(-40.0, 90.0),
+            "ret_5d": rng.uniform(-8.0, 8.0),
+            "ret_20d": rng.uniform(-15.0, 20.0),
+            "ma_stack": "bullish",
+            "liquidity20": rng.uniform(1e6, 1e9),
+            "pe": rng.uniform(-10.0, 60.0),
+            "pb": rng.uniform(0.5, 10.0),
+            "dividend_yield": rng.uniform(0.0, 8.0),
+            "trend_score": rng.uniform(0.0, 100.0),
+            "revenue_acceleration": candidate["revenue_yoy"] - candidate["revenue_yoy_prev"],
+            "revenue_mom_acceleration": candidate["revenue_mom"] - candidate["revenue_mom_prev"],
+            "gross_margin_trend": quarter["gross_margin_latest"] - quarter["gross_margin_prev"],
+            "eps_trend": quarter["eps_latest"] - quarter["eps_prev"],
+            "roe_trend": quarter["roe_latest"] - quarter["roe_prev"],
+            "rel_to_taiex_20d": rng.uniform(-10.0, 10.0),
+            "rel_to_sector_20d": rng.uniform(-10.0, 10.0),
+            "rel_to_industry_20d": rng.uniform(-10.0, 10.0),
+        }
+        inputs.append((candidate, metrics, quarter, candles))
+    return inputs
+
+
+def _screener_before(inputs: list[Any], top_n: int) -> tuple[Any, ...]:
+    # 重現改版前的流程：日線掛在列上、評分前後各展開一次 dict、picks 再逐鍵過濾複製一份。
+    raw_rows = [{**candidate, **metrics, "_candles": candles, **quarter} for candidate, metrics, quarter, candles in inputs]
+    score_columns = screener._score_columns(raw_rows)
+    scored_input = [{**row, **dict(zip(score_columns, values))} for row, values in zip(raw_rows, zip(*score_columns.values()))]
+    ranked = score_candidates(scored_input, weights=WEIGHTS)
+    screener._annotate_ranked(ranked)
+    picks = []
+    for row in ranked[:top_n]:
+        public_row = {key: value for key, value in row.items() if key != "_candles"}
+        picks.append({**public_row, "reasons": screener._reasons(public_row), "trend": screener._trend_view(public_row)})
+    return raw_rows, ranked, picks
+
+
+def _screener_current(inputs: list[Any], top_n: int) -> tuple[Any, ...]:
+    raw_rows = [{**candidate, **metrics, **quarter} for candidate, metrics, quarter, _ in inputs]
+    row_candles = [candles for *_, candles in inputs]
+    ranked, picks = screener._rank_rows(raw_rows, WEIGHTS, top_n)
+    return raw_rows, row_candles, ranked, picks
+
+
+def _top100_before(inputs: list[Any], top_n: int) -> tuple[Any, ...]:
+    # 改版前：評分展開一次、score_candidates 再展開一次、輸出列加 rank 時又複製一次。
+    raw_rows = [{**candidate, **metrics} for candidate, metrics, _, _ in inputs]
+    score_columns = top100._score_columns(raw_rows)
+    scored_input = [{**row, **dict(zip(score_columns, values))} for row, values in zip(raw_rows, zip(*score_columns.values()))]
+    ranked = score_candidates(scored_input)
+    top_rows = [{**row, "rank": rank} for rank, row in enumerate(ranked[:top_n], start=1)]
+    return raw_rows, ranked, top_rows
+
+
+def _top100_current(inputs: list[Any], top_n: int) -> tuple[Any, ...]:
+    raw_rows = [{**candidate, **metrics} for candidate, metrics, _, _ in inputs]
+    ranked = top100._score_rows(raw_rows)
+    top_rows = ranked[:top_n]
+    top_rows.set_column("rank", range(1, len(top_rows) + 1))
+    return raw_rows, ranked, top_rows
+
+
+RUNNERS = {
+    ("screener", "before"): _screener_before,
+    ("screener", "current"): _screener_current,
+    ("top100", "before"): _top100_before,
+    ("top100", "current"): _top100_current,
+}
+
+
+def measure(stage: str, pipeline: str, symbols: int, days: int, top_n: int, seed: int) -> dict[str, Any]:
+    inputs = _synthetic_inputs(symbols, days, seed)
+    baseline = _peak_rss_bytes()
+    started = time.perf_counter()
+    result = RUNNERS[(stage, pipeline)](inputs, top_n)
+    elapsed = time.perf_counter() - started
+    peak = _peak_rss_bytes()
+    del result
+    return {
+        "stage": stage,
+        "pipeline": pipeline,
+        "symbols": symbols,
+        "days": days,
+        "input_peak_rss_mb": round(baseline / 2**20, 1),
+        "peak_rss_mb": round(peak / 2**20, 1),
+        "pipeline_rss_mb": round((peak - baseline) / 2**20, 1),
+        "elapsed_sec": round(elapsed, 3),
+    }
+
+
+def _measure_in_subprocess(pipeline: str, args: argparse.Namespace) -> dict[str, Any]:
+    # 峰值 RSS 只增不減，每個流程各開一個行程量測。
+    command = [
+        sys.executable,
+        str(Path(__file__).resolve()),
+        "--stage", args.stage,
+        "--pipeline", pipeline,
+        "--symbols", str(args.symbols),
+        "--days", str(args.days),
+        "--top-n", str(args.top_n),
+        "--seed", str(args.seed),
+        "--json",
+    ]
+    completed = subprocess.run(command, check=True, capture_output=True, text=True)
+    return json.loads(completed.stdout)[0]
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    if args.pipeline == "both":
+        results = [_measure_in_subprocess(pipeline, args) for pipeline in PIPELINES]
+    else:
+        results = [measure(args.stage, args.pipeline, args.symbols, args.days, args.top_n, args.seed)]
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return 0
+    for item in results:
+        print(
+            f"[memory] {item['stage']} {item['pipeline']:>7}: peak RSS {item['peak_rss_mb']:.1f} MB"
+            f"（輸入 {item['input_peak_rss_mb']:.1f} MB，評分流程 +{item['pipeline_rss_mb']:.1f} MB），"
+            f"{item['elapsed_sec']:.2f}s，{item['symbols']} 檔 × {item['days']} 日"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
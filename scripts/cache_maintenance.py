@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_OUTPUT_ROOT = Path.home() / "tw-sector-screener-output"
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from src.providers import http_cache
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="檢視或清理 HTTP 回應快取（cache/market/http_cache.sqlite）")
+    parser.add_argument("--output-root", default=str(DEFAULT_OUTPUT_ROOT), help="官方輸出根目錄")
+    parser.add_argument("--cache-db", default=None, help="直接指定快取資料庫路徑，覆蓋 --output-root")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    report = sub.add_parser("report", help="輸出快取大小、各端點筆數、命中率與資料年齡分布")
+    report.add_argument("--json", action="store_true", help="以 JSON 輸出")
+
+    prune = sub.add_parser("prune", help="依端點或年齡刪除快取")
+    prune.add_argument("--endpoint", default=None, help="端點（host + path，例如 www.twse.com.tw/exchangeReport/STOCK_DAY；legacy 為舊檔匯入項目）")
+    prune.add_argument("--older-than-days", type=float, default=None, help="刪除抓取時間早於 N 天前的項目")
+    prune.add_argument("--include-pinned", action="store_true", help="一併刪除已釘選的收盤月份")
+    prune.add_argument("--max-mb", type=float, default=None, help="清理後再依 LRU 收斂到指定容量（MB）")
+    prune.add_argument("--vacuum", action="store_true", help="清理後 VACUUM，把空間還給檔案系統")
+    args = parser.parse_args(argv)
+    if args.command == "prune" and args.endpoint is None and args.older_than_days is None and args.max_mb is None:
+        parser.error("prune 需要 --endpoint、--older-than-days 或 --max-mb 其中之一")
+    return args
+
+
+def _resolve_db(args: argparse.Namespace) -> Path:
+    if args.cache_db:
+        return Path(args.cache_db)
+    return Path(args.output_root) / "cache" / "market" / "http_cache.sqlite"
+
+
+def _format_bytes(value: int) -> str:
+    if value < 1024:
+        return f"{value} B"
+    size = value / 1024
+    for unit in ["KB", "MB"]:
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def _render_report(payload: dict[str, object]) -> str:
+    lines = [
+        f"[cache] db: {payload['db_path']}",
+        f"[cache] file size: {_format_bytes(int(payload['file_bytes']))}",
+        f"[cache] entries: {payload['entries']} (pinned {payload['pinned']}), payload {_format_bytes(int(payload['bytes']))}",
+        f"[cache] hit ratio: {payload['hit_ratio'] if payload['hit_ratio'] is not None else 'N/A'}",
+        f"[cache] fetches: full {payload['full_fetches']} / revalidated (304) {payload['revalidations']}",
+        "[cache] endpoints:",
+    ]
+    for item in payload.get("endpoints") or []:
+        ratio = item["hit_ratio"] if item["hit_ratio"] is not None else "N/A"
+        lines.append(
+            f"  - {item['endpoint']}: {item['entries']} entries / {_format_bytes(item['bytes'])} / "
+            f"pinned {item['pinned']} / hits {item['hits']} misses {item['misses']} (ratio {ratio}) / "
+            f"full {item['full_fetches']} revalidated {item['revalidations']}"
+        )
+    encodings = ", ".join(f"{name} {count}" for name, count in (payload.get("encodings") or {}).items())
+    lines.append(f"[cache] encodings: {encodings or 'N/A'}")
+    lines.append("[cache] age distribution:")
+    for label, count in (payload.get("age_distribution") or {}).items():
+        lines.append(f"  - {label}: {count}")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    db_path = _resolve_db(args)
+    if not db_path.exists():
+        print(f"[cache] 找不到快取資料庫：{db_path}", file=sys.stderr)
+        return 1
+    http_cache.init_db(db_path)
+    now = time.time()
+    if args.command == "report":
+        payload = http_cache.cache_report(db_path, now)
+        print(json.dumps(payload, ensure_ascii=False, indent=2) if args.json else _render_report(payload))
+        return 0
+
+    removed = 0
+    if args.endpoint is not None or args.older_than_days is not None:
+        removed = http_cache.prune(
+            db_path,
+            now,
+            endpoint=args.endpoint,
+            older_than_seconds=args.older_than_days * 86400 if args.older_than_days is not None else None,
+            include_pinned=args.include_pinned,
+        )
+    print(f"[cache] pruned: {removed}")
+    if args.max_mb is not None:
+        result = http_cache.evict_to_budget(db_path, int(args.max_mb * 1024 * 1024))
+        print(f"[cache] evicted: {result['evicted']} ({_format_bytes(result['freed_bytes'])})")
+    if args.vacuum:
+        http_cache.vacuum(db_path)
+        print(f"[cache] vacuumed: {_format_bytes(db_path.stat().st_size)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_OUTPUT_ROOT = Path.home() / "tw-sector-screener-output"
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from src.config import load_config
+from src.providers.tw_market_provider import TwMarketProvider
+from src.report.export_structured import write_json_report
+from src.themes import all_theme_symbols
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="盤前預熱跨題材共用的資料快取")
+    parser.add_argument("--as-of", default=date.today().isoformat(), help="分析截止日 (YYYY-MM-DD)")
+    parser.add_argument("--symbols", default=None, help="要預抓日線的代號，逗號分隔；預設為所有題材 strict/broad 代號聯集")
+    parser.add_argument("--lookback", type=int, default=292, help="日線回看日數（預設對齊 screener 1y validation 的需求）")
+    parser.add_argument("--valuation-days", type=int, default=5, help="預抓最近 N 個交易日的全市場估值表")
+    parser.add_argument("--timeout", type=float, default=10.0, help="HTTP 逾時秒數")
+    parser.add_argument("--fetch-workers", type=int, default=8, help="並行抓取的執行緒數")
+    parser.add_argument("--config", default=None, help="JSON / YAML config 路徑（沿用 network / cache 設定）")
+    parser.add_argument("--output-root", default=str(DEFAULT_OUTPUT_ROOT), help="官方輸出根目錄")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    as_of = datetime.strptime(args.as_of, "%Y-%m-%d").date()
+    output_root = Path(args.output_root)
+    config = load_config(args.config)
+    cache_config = dict(config.get("cache") or {})
+    cache_max_mb = cache_config.get("max_mb")
+    provider = TwMarketProvider(
+        timeout=args.timeout,
+        cache_dir=output_root / "cache" / "market",
+        max_workers=args.fetch_workers,
+        rate_limits=dict(config.get("network", {}).get("rate_limits") or {}),
+        cache_max_bytes=int(float(cache_max_mb) * 1024 * 1024) if cache_max_mb is not None else None,
+    )
+    symbols = [item.strip() for item in str(args.symbols).split(",") if item.strip()] if args.symbols else all_theme_symbols()
+    try:
+        payload = provider.prewarm_shared_cache(
+            as_of=as_of,
+            symbols=symbols,
+            lookback=args.lookback,
+            valuation_days=args.valuation_days,
+        )
+    finally:
+        provider.close()
+    audit_dir = output_root / "audit" / as_of.strftime("%Y%m%d")
+    audit_dir.mkdir(parents=True, exist_ok=True)
+    json_path = write_json_report(audit_dir / f"cache-prewarm-{as_of.strftime('%Y%m%d')}.json", payload)
+    print(
+        f"[prewarm] datasets {payload['datasets']} / valuation days {len(payload['valuation_days'])} / "
+        f"ohlcv {payload['ohlcv_loaded']}/{payload['symbols']} / full {payload['full_fetches']} "
+        f"revalidated {payload['revalidated']} / {payload['elapsed_sec']}s"
+    )
+    for failure in payload["failures"]:
+        print(f"[prewarm] failed: {failure}")
+    print(f"[prewarm] json: {json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -72,12 +72,15 @@ def main() -> int:
     output_root = Path(args.output_root)
     provider = TwMarketProvider(timeout=args.timeout, cache_dir=output_root / "cache" / "market")
     themes = [item.strip() for item in str(args.themes).split(",") if item.strip()]
-    payload = provider.refresh_quarterly_snapshots(
-        as_of=as_of,
-        themes=themes,
-        theme_mode=args.theme_mode,
-        min_monthly_revenue=args.min_monthly_revenue,
-    )
+    try:
+        payload = provider.refresh_quarterly_snapshots(
+            as_of=as_of,
+            themes=themes,
+            theme_mode=args.theme_mode,
+            min_monthly_revenue=args.min_monthly_revenue,
+        )
+    finally:
+        provider.close()
     audit_dir = output_root / "audit" / as_of.strftime("%Y%m%d")
     audit_dir.mkdir(parents=True, exist_ok=True)
     json_path = write_json_report(audit_dir / f"quarterly-snapshot-refresh-{as_of.strftime('%Y%m%d')}.json", payload)
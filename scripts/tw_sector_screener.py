@@ -15,9 +15,15 @@ if str(ROOT_DIR) not in sys.path:
 
 from src.analysis.actions import build_action_view
 from src.analysis.backtest import run_cross_sectional_backtest
-from src.analysis.factors import atr_wilder, momentum_return, percentile_rank, rsi_wilder, sma, trend_score, volatility_annualized
+from src.analysis.candles import CandleSeries
+from src.analysis.factor_kernel import compute_factor_table
+from src.analysis.factors import momentum_return, rsi_wilder, sma, trend_score
+from src.analysis.frame import FactorFrame, SymbolTable
+from src.analysis.ranking import percentile_column
 from src.analysis.scoring import score_candidates
 from src.config import load_config
+from src.providers.async_provider import BlockingAsyncProvider
+from src.providers.replay_bundle import ReplayMiss
 from src.providers.tw_market_provider import TwMarketProvider
 from src.report.export_structured import write_audit_trail, write_candidate_csv, write_json_report, write_watchlist
 from src.report.render_markdown import build_report_filename, render_report
@@ -32,6 +38,8 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--min-monthly-revenue", type=float, default=0.0, help="最低月營收門檻（元）")
     parser.add_argument("--lookback", type=int, default=252, help="歷史回看日數")
     parser.add_argument("--timeout", type=float, default=10.0, help="HTTP 逾時秒數")
+    parser.add_argument("--fetch-workers", type=int, default=8, help="日線並行抓取的執行緒數")
+    parser.add_argument("--fetch-backend", choices=["thread", "async"], default="thread", help="網路抓取後端")
     parser.add_argument("--theme-mode", choices=["strict", "broad"], default="strict", help="題材池模式")
     parser.add_argument("--benchmark", choices=["TAIEX", "sector", "custom"], default="TAIEX", help="benchmark 模式")
     parser.add_argument("--output-format", default="md,json,csv", help="輸出格式，逗號分隔：md,json,csv")
@@ -46,6 +54,15 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--quality-update-mode", choices=["auto", "skip", "force"], default="auto", help="季度資料更新檢查模式")
     parser.add_argument("--quality-update-budget-sec", type=float, default=3.0, help="前台品質更新檢查的延遲預算")
     parser.add_argument("--quality-history-depth", type=int, default=8, help="品質歷史覆蓋目標季數")
+    parser.add_argument(
+        "--indicator-state",
+        choices=["off", "incremental", "recompute"],
+        default="off",
+        help="技術指標改用落地的增量狀態（incremental）或全量重算後寫回（recompute）",
+    )
+    bundle = parser.add_mutually_exclusive_group()
+    bundle.add_argument("--record-bundle", default=None, help="把本次所有資料請求與回應錄成單一 bundle 檔")
+    bundle.add_argument("--replay-bundle", default=None, help="只從 bundle 回放資料，完全離線；未錄到的請求直接失敗")
     return parser.parse_args()
 
 
@@ -116,7 +133,7 @@ def _collect_custom_benchmark(provider: TwMarketProvider, symbols: list[str], as
     for symbol in symbols:
         market = "TPEx" if symbol.startswith("6") or symbol.startswith("8") else "TWSE"
         try:
-            closes = [float(x["close"]) for x in provider.get_ohlcv(symbol, market, as_of=as_of, lookback=lookback)]
+            closes = CandleSeries.coerce(provider.get_ohlcv(symbol, market, as_of=as_of, lookback=lookback)).closes
         except Exception:
             continue
         ret20 = _ret_pct(closes, 20)
@@ -128,6 +145,21 @@ def _collect_custom_benchmark(provider: TwMarketProvider, symbols: list[str], as
     return {"ret_20d": _avg(returns_20d), "ret_63d": _avg(returns_63d)}
 
 
+def _stale_cache_entries(provider: Any) -> list[dict[str, Any]]:
+    getter = getattr(provider, "stale_cache_entries", None)
+    return list(getter()) if callable(getter) else []
+
+
+def _stale_symbols(entries: list[dict[str, Any]], rows: list[dict[str, Any]]) -> set[str]:
+    # market / symbol 為 None 的項目（全市場資料表、加權指數）影響該市場或全部列，其餘只影響對應代號。
+    scopes = {(entry.get("market"), entry.get("symbol")) for entry in entries}
+    return {
+        str(row.get("symbol"))
+        for row in rows
+        if any(market in (None, row.get("market")) and symbol in (None, row.get("symbol")) for market, symbol in scopes)
+    }
+
+
 def _reasons(row: dict[str, Any]) -> list[str]:
     reasons: list[str] = []
     if (row.get("trend_score") or 0.0) >= 70:
@@ -294,51 +326,67 @@ def _copy_coverage_list(source: Path | None, target_dir: Path) -> Path | None:
     return target_path
 
 
-def _build_validation_snapshots(raw_rows: list[dict[str, Any]], validation_window: str, rebalance: str) -> list[dict[str, Any]]:
+# _price_signal 最多回看 126 日報酬（需 127 根）與 SMA120，更早的收盤不影響結果。
+_PRICE_SIGNAL_HISTORY = 127
+
+
+# 驗證快照的數值欄，依序對應 signal cache 內的 tuple。
+_SNAPSHOT_COLUMNS = ("close", "score", "price_factor_score", "fundamental_factor_score", "quality_factor_score")
+
+
+def _build_validation_snapshots(
+    raw_rows: list[dict[str, Any]],
+    row_candles: list[CandleSeries],
+    validation_window: str,
+    rebalance: str,
+    signal_cache: dict[tuple[int, int], tuple[float, ...]] | None = None,
+) -> list[dict[str, Any]]:
     if not raw_rows:
         return []
     step = _rebalance_step(rebalance)
     window_days = _validation_days(validation_window)
-    common_len = min(len(row.get("_candles") or []) for row in raw_rows)
+    common_len = min(len(candles) for candles in row_candles)
     if common_len < 25:
         return []
     start_index = max(20, common_len - window_days)
+    # 各檔的基本面 / 品質訊號與再平衡日無關，只算一次；價格訊號依 (列, index) 快取，1y/3y/5y 視窗共用。
+    cache = signal_cache if signal_cache is not None else {}
+    static_signals = [(_fundamental_signal(row), _quality_signal(row)) for row in raw_rows]
+    # 每個再平衡日是一個 FactorFrame，共用同一張代號表，回測比對持股時只比整數 id。
+    table = SymbolTable()
     snapshots: list[dict[str, Any]] = []
     for index in range(start_index, common_len, step):
-        rows: list[dict[str, Any]] = []
+        symbols: list[str] = []
+        values: list[tuple[float, ...]] = []
         rebalance_date: date | None = None
-        for row in raw_rows:
-            candles = row.get("_candles") or []
+        for position, (row, candles) in enumerate(zip(raw_rows, row_candles)):
             if index >= len(candles):
                 continue
-            closes = [float(item["close"]) for item in candles[: index + 1]]
-            close = float(candles[index]["close"])
-            sma20 = sma(closes, 20)
-            sma60 = sma(closes, 60)
-            sma120 = sma(closes, 120)
-            price_factor_score = _price_signal(closes, close, sma20, sma60, sma120)
-            fundamental_factor_score = _fundamental_signal(row)
-            quality_factor_score = _quality_signal(row)
-            signal_components = [price_factor_score]
-            if fundamental_factor_score != 0.0:
-                signal_components.append(fundamental_factor_score * 0.75)
-            if quality_factor_score != 0.0:
-                signal_components.append(quality_factor_score)
-            if not signal_components:
-                continue
-            rebalance_date = candles[index]["date"]
-            rows.append(
-                {
-                    "symbol": row["symbol"],
-                    "close": close,
-                    "score": _safe_avg(signal_components),
-                    "price_factor_score": price_factor_score,
-                    "fundamental_factor_score": fundamental_factor_score,
-                    "quality_factor_score": quality_factor_score,
-                }
-            )
-        if rebalance_date and rows:
-            snapshots.append({"rebalance_date": rebalance_date, "rows": rows})
+            signals = cache.get((position, index))
+            if signals is None:
+                # 只切出訊號用得到的尾段；sum 的元素與順序與整段前綴相同，結果逐位元一致。
+                closes = candles.closes[max(0, index + 1 - _PRICE_SIGNAL_HISTORY) : index + 1]
+                close = candles.closes[index]
+                sma20 = sma(closes, 20)
+                sma60 = sma(closes, 60)
+                sma120 = sma(closes, 120)
+                price_factor_score = _price_signal(closes, close, sma20, sma60, sma120)
+                fundamental_factor_score, quality_factor_score = static_signals[position]
+                signal_components = [price_factor_score]
+                if fundamental_factor_score != 0.0:
+                    signal_components.append(fundamental_factor_score * 0.75)
+                if quality_factor_score != 0.0:
+                    signal_components.append(quality_factor_score)
+                signals = (close, _safe_avg(signal_components), price_factor_score, fundamental_factor_score, quality_factor_score)
+                cache[(position, index)] = signals
+            rebalance_date = candles.date_at(index)
+            symbols.append(row["symbol"])
+            values.append(signals)
+        if rebalance_date and values:
+            frame = FactorFrame(symbols, table)
+            for name, column in zip(_SNAPSHOT_COLUMNS, zip(*values)):
+                frame.set_column(name, column)
+            snapshots.append({"rebalance_date": rebalance_date, "rows": frame})
     return snapshots
 
 
@@ -350,6 +398,7 @@ def _slice_benchmark_series(benchmark_series: list[dict[str, Any]], start_date:
 
 def _build_validation_report(
     raw_rows: list[dict[str, Any]],
+    row_candles: list[CandleSeries],
     benchmark_series: list[dict[str, Any]],
     requested_window: str,
     rebalance: str,
@@ -363,8 +412,9 @@ def _build_validation_report(
     }
     windows: dict[str, Any] = {}
     selected_metrics: dict[str, Any] = {}
+    signal_cache: dict[tuple[int, int], tuple[float, ...]] = {}
     for window in ["1y", "3y", "5y"]:
-        snapshots = _build_validation_snapshots(raw_rows, window, rebalance)
+        snapshots = _build_validation_snapshots(raw_rows, row_candles, window, rebalance, signal_cache)
         if len(snapshots) < 2:
             windows[window] = {"status": "insufficient_data"}
             continue
@@ -398,288 +448,97 @@ def _build_validation_report(
     }
 
 
-def run(
-    theme: str,
-    as_of: date,
-    top_n: int,
-    universe_limit: int,
-    min_monthly_revenue: float,
-    lookback: int,
-    timeout: float,
-    output_root: Path | None = None,
-    output_dir: Path | None = None,
-    theme_mode: str = "strict",
-    benchmark: str = "TAIEX",
-    output_formats: set[str] | None = None,
-    config_path: str | Path | None = None,
-    coverage_list_path: str | Path | None = None,
-    run_backtest: bool = False,
-    rebalance: str = "monthly",
-    cost_bps: float = 10.0,
-    validation_window: str = "1y",
-    quality_update_mode: str = "auto",
-    quality_update_budget_sec: float = 3.0,
-    quality_history_depth: int = 8,
-) -> dict[str, Path]:
-    config = load_config(config_path)
-    output_formats = output_formats or {"md", "json", "csv"}
-    warnings: list[str] = []
-    resolved_output_root = _resolve_output_root(
-        Path(output_root) if output_root is not None else None,
-        Path(output_dir) if output_dir is not None else None,
-        warnings,
-    )
-    provider = TwMarketProvider(timeout=timeout, cache_dir=resolved_output_root / "cache" / "market")
-    weights = dict(config.get("weights") or {})
-    min_revenue = max(float(config.get("filters", {}).get("min_monthly_revenue", 0.0) or 0.0), min_monthly_revenue)
-    universe = provider.load_theme_universe(theme, min_monthly_revenue=min_revenue, theme_mode=theme_mode)
-    if not universe:
-        raise RuntimeError(f"找不到主題 {theme} 的候選股")
-    update_result = provider.run_quality_update_check(
-        theme=theme,
-        universe=universe,
-        as_of=as_of,
-        mode=quality_update_mode,
-        budget_sec=quality_update_budget_sec,
-        history_depth=quality_history_depth,
-        top_n=min(3, top_n),
-        theme_mode=theme_mode,
-    )
-
-    date_tag = as_of.strftime("%Y%m%d")
-    reports_dir = resolved_output_root / "reports" / date_tag / theme
-    audit_dir = resolved_output_root / "audit" / date_tag
-    watchlists_dir = resolved_output_root / "watchlists" / theme
-    backtests_dir = resolved_output_root / "backtests" / theme
-    coverage_dir = resolved_output_root / "coverage-lists"
-    for path in [reports_dir, audit_dir, watchlists_dir, backtests_dir, coverage_dir]:
-        path.mkdir(parents=True, exist_ok=True)
-
-    copied_coverage = _copy_coverage_list(Path(coverage_list_path) if coverage_list_path else None, coverage_dir)
-    market_overview: dict[str, Any] = {}
-    custom_benchmark = {"ret_20d": None, "ret_63d": None}
-    if benchmark == "custom":
-        custom_symbols = list(config.get("benchmark", {}).get("symbols") or [])
-        if not custom_symbols:
-            raise RuntimeError("benchmark=custom 時，config.benchmark.symbols 不可為空。")
-        custom_benchmark = _collect_custom_benchmark(provider, custom_symbols, as_of, lookback)
-
-    taiex_series: list[dict[str, Any]] = []
-    try:
-        taiex_series = provider.get_taiex_series(as_of=as_of, lookback=max(lookback, _validation_days(validation_window) + 40))
-        taiex_closes = [float(x["close"]) for x in taiex_series]
-        taiex_close = taiex_closes[-1]
-        taiex_prev = taiex_closes[-2] if len(taiex_closes) >= 2 else None
-        taiex_sma20 = sma(taiex_closes, 20)
-        taiex_sma60 = sma(taiex_closes, 60)
-        taiex_sma120 = sma(taiex_closes, 120)
-        taiex_rsi14 = rsi_wilder(taiex_closes, 14)
-        market_overview = {
-            "close": taiex_close,
-            "change_points": taiex_series[-1].get("change_points"),
-            "change_pct": ((taiex_close / taiex_prev - 1.0) * 100.0) if taiex_prev else None,
-            "ret_5d": momentum_return(taiex_closes, 5),
-            "ret_20d": momentum_return(taiex_closes, 20),
-            "ret_63d": momentum_return(taiex_closes, 63),
-            "ret_126d": momentum_return(taiex_closes, 126),
-            "sma20": taiex_sma20,
-            "sma60": taiex_sma60,
-            "sma120": taiex_sma120,
-            "rsi14": taiex_rsi14,
-            "trend_score": trend_score(taiex_close, taiex_sma20, taiex_sma60, taiex_sma120, taiex_rsi14),
-            "source": "TWSE exchangeReport/FMTQIK",
-        }
-    except Exception as exc:
-        warnings.append(f"加權指數抓取失敗：{exc}")
-
-    raw_rows: list[dict[str, Any]] = []
-    for candidate in universe[:universe_limit]:
-        symbol = candidate["symbol"]
-        market = candidate["market"]
-        try:
-            candles = provider.get_ohlcv(symbol, market, as_of=as_of, lookback=max(lookback, _validation_days(validation_window) + 40))
-        except Exception as exc:
-            warnings.append(f"{symbol} 日線失敗：{exc}")
-            continue
-        closes = [float(c["close"]) for c in candles]
-        volumes = [float(c["volume"]) for c in candles]
-        close = closes[-1]
-        sma20 = sma(closes, 20)
-        sma60 = sma(closes, 60)
-        sma120 = sma(closes, 120)
-        rsi14 = rsi_wilder(closes, 14)
-        atr14 = atr_wilder(candles, 14)
-        vol20 = volatility_annualized(closes, 20)
-        mom63 = momentum_return(closes, 63)
-        mom126 = momentum_return(closes, 126)
-        ret5 = _ret_pct(closes, 5)
-        ret20 = _ret_pct(closes, 20)
-        liquidity20 = 0.0
-        if len(closes) >= 20 and len(volumes) >= 20:
-            liquidity20 = sum(closes[-20 + i] * volumes[-20 + i] for i in range(20)) / 20.0
-        valuation = provider.get_latest_valuation(symbol, market, as_of) or {}
-        quarter = provider.get_quarterly_fundamentals(symbol, market, as_of) or {}
-        raw_rows.append(
-            {
-                **candidate,
-                "close": close,
-                "sma20": sma20,
-                "sma60": sma60,
-                "sma120": sma120,
-                "rsi14": rsi14,
-                "atr14": atr14,
-                "volatility20": vol20,
-                "momentum63": mom63,
-                "momentum126": mom126,
-                "ret_5d": ret5,
-                "ret_20d": ret20,
-                "ma_stack": _ma_stack(close, sma20, sma60, sma120),
-                "liquidity20": liquidity20,
-                "pe": valuation.get("pe"),
-                "pb": valuation.get("pb"),
-                "dividend_yield": valuation.get("dividend_yield"),
-                "trend_score": trend_score(close, sma20, sma60, sma120, rsi14),
-                "revenue_yoy_prev": candidate.get("revenue_yoy_prev"),
-                "revenue_mom_prev": candidate.get("revenue_mom_prev"),
-                "revenue_acceleration": (
-                    candidate.get("revenue_yoy") - candidate.get("revenue_yoy_prev")
-                    if isinstance(candidate.get("revenue_yoy"), (int, float)) and isinstance(candidate.get("revenue_yoy_prev"), (int, float))
-                    else None
-                ),
-                "revenue_mom_acceleration": (
-                    candidate.get("revenue_mom") - candidate.get("revenue_mom_prev")
-                    if isinstance(candidate.get("revenue_mom"), (int, float)) and isinstance(candidate.get("revenue_mom_prev"), (int, float))
-                    else None
-                ),
-                "gross_margin_trend": (
-                    quarter.get("gross_margin_latest") - quarter.get("gross_margin_prev")
-                    if isinstance(quarter.get("gross_margin_latest"), (int, float))
-                    and isinstance(quarter.get("gross_margin_prev"), (int, float))
-                    else None
-                ),
-                "eps_trend": (
-                    quarter.get("eps_latest") - quarter.get("eps_prev")
-                    if isinstance(quarter.get("eps_latest"), (int, float)) and isinstance(quarter.get("eps_prev"), (int, float))
-                    else None
-                ),
-                "roe_trend": (
-                    quarter.get("roe_latest") - quarter.get("roe_prev")
-                    if isinstance(quarter.get("roe_latest"), (int, float)) and isinstance(quarter.get("roe_prev"), (int, float))
-                    else None
-                ),
-                "quality_data_source": quarter.get("quality_data_source"),
-                "quality_periods_used": quarter.get("quality_periods_used") or [],
-                "quality_fetch_status": quarter.get("quality_fetch_status"),
-                "quality_missing_reason": quarter.get("quality_missing_reason"),
-                "data_quality_flags": list(quarter.get("data_quality_flags") or []),
-                "_candles": candles,
-                **quarter,
-            }
-        )
-
-    if not raw_rows:
-        raise RuntimeError("候選股資料抓取失敗，無法評分")
-
-    theme_avg_ret20 = _avg([row.get("ret_20d") for row in raw_rows if isinstance(row.get("ret_20d"), (int, float))])
-    industry_avg_ret20: dict[str, float | None] = {}
-    for industry in sorted({str(row.get("industry") or "") for row in raw_rows}):
-        values = [row.get("ret_20d") for row in raw_rows if row.get("industry") == industry and isinstance(row.get("ret_20d"), (int, float))]
-        industry_avg_ret20[industry] = _avg(values)
-
-    for row in raw_rows:
-        row["rel_to_taiex_20d"] = (
-            row.get("ret_20d") - market_overview.get("ret_20d")
-            if isinstance(row.get("ret_20d"), (int, float)) and isinstance(market_overview.get("ret_20d"), (int, float))
-            else None
-        )
-        row["rel_to_sector_20d"] = (
-            row.get("ret_20d") - theme_avg_ret20
-            if isinstance(row.get("ret_20d"), (int, float)) and isinstance(theme_avg_ret20, (int, float))
-            else None
-        )
-        row["rel_to_industry_20d"] = (
-            row.get("ret_20d") - industry_avg_ret20.get(str(row.get("industry") or ""))
-            if isinstance(row.get("ret_20d"), (int, float))
-            and isinstance(industry_avg_ret20.get(str(row.get("industry") or "")), (int, float))
-            else None
-        )
-        if benchmark == "custom":
-            row["rel_to_custom_20d"] = (
-                row.get("ret_20d") - custom_benchmark.get("ret_20d")
-                if isinstance(row.get("ret_20d"), (int, float)) and isinstance(custom_benchmark.get("ret_20d"), (int, float))
-                else None
-            )
-
-    mom63_list = [x["momentum63"] for x in raw_rows if isinstance(x.get("momentum63"), (int, float))]
-    mom126_list = [x["momentum126"] for x in raw_rows if isinstance(x.get("momentum126"), (int, float))]
-    pe_list = [x["pe"] for x in raw_rows if isinstance(x.get("pe"), (int, float)) and x.get("pe", 0) > 0]
-    pb_list = [x["pb"] for x in raw_rows if isinstance(x.get("pb"), (int, float)) and x.get("pb", 0) > 0]
-    dy_list = [x["dividend_yield"] for x in raw_rows if isinstance(x.get("dividend_yield"), (int, float))]
-    rev_yoy_list = [x["revenue_yoy"] for x in raw_rows if isinstance(x.get("revenue_yoy"), (int, float))]
-    rev_mom_list = [x["revenue_mom"] for x in raw_rows if isinstance(x.get("revenue_mom"), (int, float))]
-    rev_acc_list = [x["revenue_acceleration"] for x in raw_rows if isinstance(x.get("revenue_acceleration"), (int, float))]
-    gm_list = [x["gross_margin_trend"] for x in raw_rows if isinstance(x.get("gross_margin_trend"), (int, float))]
-    eps_list = [x["eps_trend"] for x in raw_rows if isinstance(x.get("eps_trend"), (int, float))]
-    roe_list = [x["roe_trend"] for x in raw_rows if isinstance(x.get("roe_trend"), (int, float))]
-    vol_list = [x["volatility20"] for x in raw_rows if isinstance(x.get("volatility20"), (int, float))]
-    liq_list = [x["liquidity20"] for x in raw_rows if isinstance(x.get("liquidity20"), (int, float)) and x.get("liquidity20", 0) > 0]
-    rel_taiex_list = [x["rel_to_taiex_20d"] for x in raw_rows if isinstance(x.get("rel_to_taiex_20d"), (int, float))]
-    rel_sector_list = [x["rel_to_sector_20d"] for x in raw_rows if isinstance(x.get("rel_to_sector_20d"), (int, float))]
-    rel_industry_list = [x["rel_to_industry_20d"] for x in raw_rows if isinstance(x.get("rel_to_industry_20d"), (int, float))]
-
-    scored_input: list[dict[str, Any]] = []
+def _score_columns(raw_rows: list[dict[str, Any]]) -> dict[str, list[Any]]:
+    mom63_col = percentile_column(raw_rows, "momentum63")
+    mom126_col = percentile_column(raw_rows, "momentum126")
+    pe_col = percentile_column(raw_rows, "pe", include=lambda v: v > 0)
+    pb_col = percentile_column(raw_rows, "pb", include=lambda v: v > 0)
+    dy_col = percentile_column(raw_rows, "dividend_yield")
+    rev_yoy_col = percentile_column(raw_rows, "revenue_yoy")
+    rev_mom_col = percentile_column(raw_rows, "revenue_mom")
+    rev_acc_col = percentile_column(raw_rows, "revenue_acceleration")
+    gm_col = percentile_column(raw_rows, "gross_margin_trend")
+    eps_col = percentile_column(raw_rows, "eps_trend")
+    roe_col = percentile_column(raw_rows, "roe_trend")
+    vol_col = percentile_column(raw_rows, "volatility20")
+    liq_col = percentile_column(raw_rows, "liquidity20", include=lambda v: v > 0)
+    rel_taiex_col = percentile_column(raw_rows, "rel_to_taiex_20d")
+    rel_sector_col = percentile_column(raw_rows, "rel_to_sector_20d")
+    rel_industry_col = percentile_column(raw_rows, "rel_to_industry_20d")
+
+    score_columns: dict[str, list[Any]] = {
+        name: []
+        for name in [
+            "momentum_score",
+            "value_score",
+            "fundamental_score",
+            "quality_score",
+            "benchmark_score",
+            "risk_control_score",
+            "valuation_band",
+        ]
+    }
     for row in raw_rows:
-        momentum_score = _avg([percentile_rank(row.get("momentum63"), mom63_list), percentile_rank(row.get("momentum126"), mom126_list)])
+        momentum_score = _avg([mom63_col.rank(row.get("momentum63")), mom126_col.rank(row.get("momentum126"))])
         value_score = _avg(
             [
-                (100.0 - percentile_rank(row.get("pe"), pe_list)) if isinstance(row.get("pe"), (int, float)) and pe_list else None,
-                (100.0 - percentile_rank(row.get("pb"), pb_list)) if isinstance(row.get("pb"), (int, float)) and pb_list else None,
-                percentile_rank(row.get("dividend_yield"), dy_list),
+                (100.0 - pe_col.rank(row.get("pe"))) if isinstance(row.get("pe"), (int, float)) and pe_col else None,
+                (100.0 - pb_col.rank(row.get("pb"))) if isinstance(row.get("pb"), (int, float)) and pb_col else None,
+                dy_col.rank(row.get("dividend_yield")),
             ]
         )
         fundamental_score = _avg(
             [
-                percentile_rank(row.get("revenue_yoy"), rev_yoy_list),
-                percentile_rank(row.get("revenue_mom"), rev_mom_list),
-                percentile_rank(row.get("revenue_acceleration"), rev_acc_list),
+                rev_yoy_col.rank(row.get("revenue_yoy")),
+                rev_mom_col.rank(row.get("revenue_mom")),
+                rev_acc_col.rank(row.get("revenue_acceleration")),
             ]
         )
         quality_score = _avg(
             [
-                percentile_rank(row.get("gross_margin_trend"), gm_list),
-                percentile_rank(row.get("eps_trend"), eps_list),
-                percentile_rank(row.get("roe_trend"), roe_list),
+                gm_col.rank(row.get("gross_margin_trend")),
+                eps_col.rank(row.get("eps_trend")),
+                roe_col.rank(row.get("roe_trend")),
             ]
         )
         benchmark_score = _avg(
             [
-                percentile_rank(row.get("rel_to_taiex_20d"), rel_taiex_list),
-                percentile_rank(row.get("rel_to_sector_20d"), rel_sector_list),
-                percentile_rank(row.get("rel_to_industry_20d"), rel_industry_list),
+                rel_taiex_col.rank(row.get("rel_to_taiex_20d")),
+                rel_sector_col.rank(row.get("rel_to_sector_20d")),
+                rel_industry_col.rank(row.get("rel_to_industry_20d")),
             ]
         )
         risk_control_score = _avg(
             [
-                (100.0 - percentile_rank(row.get("volatility20"), vol_list))
-                if isinstance(row.get("volatility20"), (int, float)) and vol_list
+                (100.0 - vol_col.rank(row.get("volatility20")))
+                if isinstance(row.get("volatility20"), (int, float)) and vol_col
                 else None,
-                percentile_rank(row.get("liquidity20"), liq_list),
+                liq_col.rank(row.get("liquidity20")),
             ]
         )
-        scored_input.append(
-            {
-                **row,
-                "momentum_score": momentum_score,
-                "value_score": value_score,
-                "fundamental_score": fundamental_score,
-                "quality_score": quality_score,
-                "benchmark_score": benchmark_score,
-                "risk_control_score": risk_control_score,
-                "valuation_band": _band_from_percentile(value_score),
-            }
-        )
+        score_columns["momentum_score"].append(momentum_score)
+        score_columns["value_score"].append(value_score)
+        score_columns["fundamental_score"].append(fundamental_score)
+        score_columns["quality_score"].append(quality_score)
+        score_columns["benchmark_score"].append(benchmark_score)
+        score_columns["risk_control_score"].append(risk_control_score)
+        score_columns["valuation_band"].append(_band_from_percentile(value_score))
+    return score_columns
+
+
+def _trend_view(row: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "ret_5d": row.get("ret_5d"),
+        "ret_20d": row.get("ret_20d"),
+        "mom63": row.get("momentum63"),
+        "mom126": row.get("momentum126"),
+        "ma_stack": row.get("ma_stack"),
+        "rsi14": row.get("rsi14"),
+        "volatility20": row.get("volatility20"),
+    }
 
-    ranked = score_candidates(scored_input, weights=weights)
+
+def _annotate_ranked(ranked: list[dict[str, Any]]) -> None:
     for idx, row in enumerate(ranked, start=1):
         row["rank"] = idx
         row["action_view"] = build_action_view(
@@ -702,158 +561,433 @@ def run(
             "rel_to_industry_20d": row.get("rel_to_industry_20d"),
         }
 
-    picks: list[dict[str, Any]] = []
-    for row in ranked[:top_n]:
-        public_row = {key: value for key, value in row.items() if key != "_candles"}
-        picks.append(
-            {
-                **public_row,
-                "reasons": _reasons(public_row),
-                "trend": {
-                    "ret_5d": public_row.get("ret_5d"),
-                    "ret_20d": public_row.get("ret_20d"),
-                    "mom63": public_row.get("momentum63"),
-                    "mom126": public_row.get("momentum126"),
-                    "ma_stack": public_row.get("ma_stack"),
-                    "rsi14": public_row.get("rsi14"),
-                    "volatility20": public_row.get("volatility20"),
-                },
+
+def _rank_rows(
+    raw_rows: list[dict[str, Any]],
+    weights: dict[str, float],
+    top_n: int,
+    stale_symbols: set[str] | None = None,
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    score_columns = _score_columns(raw_rows)
+    # 分數、排名、action view 都直接寫回 raw_rows 的列，不另外複製；驗證回測只讀評分前就有的因子欄位。
+    for row, values in zip(raw_rows, zip(*score_columns.values())):
+        row.update(zip(score_columns, values))
+        if stale_symbols and row.get("symbol") in stale_symbols:
+            row["data_quality_flags"] = [*(row.get("data_quality_flags") or []), "data:stale_cache"]
+    ranked = score_candidates(raw_rows, weights=weights, in_place=True)
+    _annotate_ranked(ranked)
+    picks = ranked[:top_n]
+    for row in picks:
+        row["reasons"] = _reasons(row)
+        row["trend"] = _trend_view(row)
+    return ranked, picks
+
+
+def run(
+    theme: str,
+    as_of: date,
+    top_n: int,
+    universe_limit: int,
+    min_monthly_revenue: float,
+    lookback: int,
+    timeout: float,
+    output_root: Path | None = None,
+    output_dir: Path | None = None,
+    theme_mode: str = "strict",
+    benchmark: str = "TAIEX",
+    output_formats: set[str] | None = None,
+    config_path: str | Path | None = None,
+    coverage_list_path: str | Path | None = None,
+    run_backtest: bool = False,
+    rebalance: str = "monthly",
+    cost_bps: float = 10.0,
+    validation_window: str = "1y",
+    quality_update_mode: str = "auto",
+    quality_update_budget_sec: float = 3.0,
+    quality_history_depth: int = 8,
+    fetch_workers: int = 8,
+    fetch_backend: str = "thread",
+    record_bundle: str | Path | None = None,
+    replay_bundle: str | Path | None = None,
+    indicator_state: str = "off",
+) -> dict[str, Path]:
+    config = load_config(config_path)
+    output_formats = output_formats or {"md", "json", "csv"}
+    warnings: list[str] = []
+    resolved_output_root = _resolve_output_root(
+        Path(output_root) if output_root is not None else None,
+        Path(output_dir) if output_dir is not None else None,
+        warnings,
+    )
+    cache_config = dict(config.get("cache") or {})
+    cache_max_mb = cache_config.get("max_mb")
+    provider_cls = BlockingAsyncProvider if fetch_backend == "async" else TwMarketProvider
+    provider = provider_cls(
+        timeout=timeout,
+        cache_dir=resolved_output_root / "cache" / "market",
+        max_workers=fetch_workers,
+        rate_limits=dict(config.get("network", {}).get("rate_limits") or {}),
+        cache_max_bytes=int(float(cache_max_mb) * 1024 * 1024) if cache_max_mb is not None else None,
+        stale_while_revalidate=bool(cache_config.get("stale_while_revalidate")),
+        max_stale_seconds=float(cache_config.get("max_stale_hours", 72)) * 3600,
+        record_bundle=Path(record_bundle) if record_bundle else None,
+        replay_bundle=Path(replay_bundle) if replay_bundle else None,
+    )
+    try:
+        weights = dict(config.get("weights") or {})
+        min_revenue = max(float(config.get("filters", {}).get("min_monthly_revenue", 0.0) or 0.0), min_monthly_revenue)
+        universe = provider.load_theme_universe(theme, min_monthly_revenue=min_revenue, theme_mode=theme_mode)
+        if not universe:
+            raise RuntimeError(f"找不到主題 {theme} 的候選股")
+        update_result = provider.run_quality_update_check(
+            theme=theme,
+            universe=universe,
+            as_of=as_of,
+            mode=quality_update_mode,
+            budget_sec=quality_update_budget_sec,
+            history_depth=quality_history_depth,
+            top_n=min(3, top_n),
+            theme_mode=theme_mode,
+        )
+
+        date_tag = as_of.strftime("%Y%m%d")
+        reports_dir = resolved_output_root / "reports" / date_tag / theme
+        audit_dir = resolved_output_root / "audit" / date_tag
+        watchlists_dir = resolved_output_root / "watchlists" / theme
+        backtests_dir = resolved_output_root / "backtests" / theme
+        coverage_dir = resolved_output_root / "coverage-lists"
+        for path in [reports_dir, audit_dir, watchlists_dir, backtests_dir, coverage_dir]:
+            path.mkdir(parents=True, exist_ok=True)
+
+        copied_coverage = _copy_coverage_list(Path(coverage_list_path) if coverage_list_path else None, coverage_dir)
+        market_overview: dict[str, Any] = {}
+        custom_symbols: list[str] = []
+        if benchmark == "custom":
+            custom_symbols = list(config.get("benchmark", {}).get("symbols") or [])
+            if not custom_symbols:
+                raise RuntimeError("benchmark=custom 時，config.benchmark.symbols 不可為空。")
+
+        taiex_series: list[dict[str, Any]] = []
+        try:
+            taiex_series = provider.get_taiex_series(as_of=as_of, lookback=max(lookback, _validation_days(validation_window) + 40))
+            taiex_closes = [float(x["close"]) for x in taiex_series]
+            taiex_close = taiex_closes[-1]
+            taiex_prev = taiex_closes[-2] if len(taiex_closes) >= 2 else None
+            taiex_sma20 = sma(taiex_closes, 20)
+            taiex_sma60 = sma(taiex_closes, 60)
+            taiex_sma120 = sma(taiex_closes, 120)
+            taiex_rsi14 = rsi_wilder(taiex_closes, 14)
+            market_overview = {
+                "close": taiex_close,
+                "change_points": taiex_series[-1].get("change_points"),
+                "change_pct": ((taiex_close / taiex_prev - 1.0) * 100.0) if taiex_prev else None,
+                "ret_5d": momentum_return(taiex_closes, 5),
+                "ret_20d": momentum_return(taiex_closes, 20),
+                "ret_63d": momentum_return(taiex_closes, 63),
+                "ret_126d": momentum_return(taiex_closes, 126),
+                "sma20": taiex_sma20,
+                "sma60": taiex_sma60,
+                "sma120": taiex_sma120,
+                "rsi14": taiex_rsi14,
+                "trend_score": trend_score(taiex_close, taiex_sma20, taiex_sma60, taiex_sma120, taiex_rsi14),
+                "source": "TWSE exchangeReport/FMTQIK",
             }
+        except Exception as exc:
+            warnings.append(f"加權指數抓取失敗：{exc}")
+
+        candidates = universe[:universe_limit]
+        fetch_errors: dict[tuple[str, str], Exception] = {}
+        candle_map = provider.get_ohlcv_batch(
+            [(candidate["symbol"], candidate["market"]) for candidate in candidates],
+            as_of=as_of,
+            lookback=max(lookback, _validation_days(validation_window) + 40),
+            errors=fetch_errors,
         )
+        custom_benchmark = {"ret_20d": None, "ret_63d": None}
+        if custom_symbols:
+            # 排在批次日線之後：與候選股重疊的代號直接切用已載入的較長序列。
+            custom_benchmark = _collect_custom_benchmark(provider, custom_symbols, as_of, lookback)
+        indicator_summary: dict[str, int] | None = None
+        if indicator_state == "off":
+            factor_table = compute_factor_table(candle_map)
+        else:
+            factor_table, indicator_summary = provider.update_indicator_states(
+                candle_map, force_recompute=indicator_state == "recompute"
+            )
+        raw_rows: list[dict[str, Any]] = []
+        # 日線不放進列裡：與 raw_rows 同順序的旁表，只有驗證回測會用到。
+        row_candles: list[CandleSeries] = []
+        for candidate in candidates:
+            symbol = candidate["symbol"]
+            market = candidate["market"]
+            candles = candle_map.get((symbol, market))
+            if candles is None:
+                warnings.append(f"{symbol} 日線失敗：{fetch_errors.get((symbol, market))}")
+                continue
+            candles = CandleSeries.coerce(candles)
+            closes = candles.closes
+            volumes = candles.volumes
+            close = closes[-1]
+            factors = factor_table[(symbol, market)]
+            sma20 = factors["sma20"]
+            sma60 = factors["sma60"]
+            sma120 = factors["sma120"]
+            rsi14 = factors["rsi14"]
+            atr14 = factors["atr14"]
+            vol20 = factors["volatility20"]
+            mom63 = factors["momentum63"]
+            mom126 = factors["momentum126"]
+            ret5 = _ret_pct(closes, 5)
+            ret20 = _ret_pct(closes, 20)
+            liquidity20 = 0.0
+            if len(closes) >= 20 and len(volumes) >= 20:
+                liquidity20 = sum(closes[-20 + i] * volumes[-20 + i] for i in range(20)) / 20.0
+            valuation = provider.get_latest_valuation(symbol, market, as_of) or {}
+            quarter = provider.get_quarterly_fundamentals(symbol, market, as_of) or {}
+            raw_rows.append(
+                {
+                    **candidate,
+                    "close": close,
+                    "sma20": sma20,
+                    "sma60": sma60,
+                    "sma120": sma120,
+                    "rsi14": rsi14,
+                    "atr14": atr14,
+                    "volatility20": vol20,
+                    "momentum63": mom63,
+                    "momentum126": mom126,
+                    "ret_5d": ret5,
+                    "ret_20d": ret20,
+                    "ma_stack": _ma_stack(close, sma20, sma60, sma120),
+                    "liquidity20": liquidity20,
+                    "pe": valuation.get("pe"),
+                    "pb": valuation.get("pb"),
+                    "dividend_yield": valuation.get("dividend_yield"),
+                    "trend_score": trend_score(close, sma20, sma60, sma120, rsi14),
+                    "revenue_yoy_prev": candidate.get("revenue_yoy_prev"),
+                    "revenue_mom_prev": candidate.get("revenue_mom_prev"),
+                    "revenue_acceleration": (
+                        candidate.get("revenue_yoy") - candidate.get("revenue_yoy_prev")
+                        if isinstance(candidate.get("revenue_yoy"), (int, float)) and isinstance(candidate.get("revenue_yoy_prev"), (int, float))
+                        else None
+                    ),
+                    "revenue_mom_acceleration": (
+                        candidate.get("revenue_mom") - candidate.get("revenue_mom_prev")
+                        if isinstance(candidate.get("revenue_mom"), (int, float)) and isinstance(candidate.get("revenue_mom_prev"), (int, float))
+                        else None
+                    ),
+                    "gross_margin_trend": (
+                        quarter.get("gross_margin_latest") - quarter.get("gross_margin_prev")
+                        if isinstance(quarter.get("gross_margin_latest"), (int, float))
+                        and isinstance(quarter.get("gross_margin_prev"), (int, float))
+                        else None
+                    ),
+                    "eps_trend": (
+                        quarter.get("eps_latest") - quarter.get("eps_prev")
+                        if isinstance(quarter.get("eps_latest"), (int, float)) and isinstance(quarter.get("eps_prev"), (int, float))
+                        else None
+                    ),
+                    "roe_trend": (
+                        quarter.get("roe_latest") - quarter.get("roe_prev")
+                        if isinstance(quarter.get("roe_latest"), (int, float)) and isinstance(quarter.get("roe_prev"), (int, float))
+                        else None
+                    ),
+                    "quality_data_source": quarter.get("quality_data_source"),
+                    "quality_periods_used": quarter.get("quality_periods_used") or [],
+                    "quality_fetch_status": quarter.get("quality_fetch_status"),
+                    "quality_missing_reason": quarter.get("quality_missing_reason"),
+                    "data_quality_flags": list(quarter.get("data_quality_flags") or []),
+                    **quarter,
+                }
+            )
+            row_candles.append(candles)
 
-    top_rows = ranked[:top_n]
-    quality_coverage_summary = provider.summarize_quality_coverage(
-        ranked,
-        top_n=min(3, top_n),
-        history_depth=quality_history_depth,
-        as_of=as_of,
-    )
-    sector_overview = {
-        "universe_count": len(ranked),
-        "top_n": len(top_rows),
-        "top_avg_idea": _avg([x.get("idea_score") for x in top_rows]),
-        "top_avg_confidence": _avg([x.get("confidence_score") for x in top_rows]),
-        "avg_ret_20d": theme_avg_ret20,
-        "avg_rel_to_taiex_20d": _avg([x.get("rel_to_taiex_20d") for x in raw_rows if isinstance(x.get("rel_to_taiex_20d"), (int, float))]),
-        "weights": weights,
-        "quality_coverage_summary": quality_coverage_summary,
-        "history_depth_target": quality_history_depth,
-    }
+        if not raw_rows:
+            raise RuntimeError("候選股資料抓取失敗，無法評分")
 
-    validation_summary: dict[str, Any] = {"mode": "not-run", "window": validation_window, "rebalance": rebalance, "cost_bps": cost_bps}
-    outputs: dict[str, Path] = {}
-    if run_backtest:
-        validation_summary = _build_validation_report(raw_rows, taiex_series, validation_window, rebalance, top_n, cost_bps)
-        outputs["backtest"] = write_json_report(backtests_dir / f"validation-{theme}-{date_tag}.json", validation_summary)
-
-    top_pick = picks[0] if picks else {}
-    summary = (
-        f"Thesis：{theme} 類股目前由 `{top_pick.get('symbol', '-')}` {top_pick.get('name', '-') } 領跑，"
-        f"top {len(picks)} 平均 idea score `{(sector_overview.get('top_avg_idea') or 0.0):.1f}`。"
-        f" Evidence：相對題材 20 日超額 `{((top_pick.get('benchmark_view') or {}).get('rel_to_sector_20d') or 0.0):.2f}%`，"
-        f"confidence `{top_pick.get('confidence_score', 0.0):.1f}`。"
-        f" Risk：{'；'.join(top_pick.get('data_quality_flags') or ['主要風險在題材回檔'])}。"
-        f" Action：`{(top_pick.get('action_view') or {}).get('action', 'Neutral')}`。"
-        f" What changes my mind：若相對題材 20 日動能轉負、confidence 下滑或法說/營收驗證失敗，就降級。"
-    )
+        theme_avg_ret20 = _avg([row.get("ret_20d") for row in raw_rows if isinstance(row.get("ret_20d"), (int, float))])
+        industry_avg_ret20: dict[str, float | None] = {}
+        for industry in sorted({str(row.get("industry") or "") for row in raw_rows}):
+            values = [row.get("ret_20d") for row in raw_rows if row.get("industry") == industry and isinstance(row.get("ret_20d"), (int, float))]
+            industry_avg_ret20[industry] = _avg(values)
 
-    method = [
-        "Rank 看的是 idea score 與資料可信度的合成，不再把缺值直接補成 50 分。",
-        "Confidence 拆成 factor coverage 與 data freshness 兩段，避免把資料缺漏跟舊資料混成一團。",
-        "Benchmark 同時看相對 TAIEX、相對題材、相對產業，避免只用絕對漲幅自嗨。",
-        "Action 與 ranking 拆開：排名是研究優先序，Overweight/Neutral/Underweight 才是動作建議。",
-    ]
-    if run_backtest:
-        method.append("Validation 已升級成 factor-aware cross-sectional v2，固定輸出 1Y / 3Y / 5Y 視窗與 factor sleeves。")
-    risks = [
-        "這是研究輔助，不是保證報酬；遇到法說、月營收、AI 出貨節奏變化時，結論需要重新驗證。",
-        "若 benchmark-relative 轉負且 confidence 下滑，應優先減碼而不是凹單。",
-    ]
-    if (quality_coverage_summary.get("previous_complete_pct") or 0.0) < 80:
-        risks.append("季度品質前期覆蓋仍未達高水位，quality score 的歷史比較仍需靠 SQLite 歷史累積補厚。")
-    if (quality_coverage_summary.get("history_complete_pct") or 0.0) < 80:
-        risks.append(f"近 {quality_history_depth} 季完整覆蓋仍偏薄，長期品質比較要再靠回補批次補齊。")
-    if warnings:
-        risks.append(f"資料警示：{len(warnings)} 檔抓取失敗，結果可能有抽樣偏誤。")
-
-    audit_payload = {
-        "theme": theme,
-        "as_of": as_of.isoformat(),
-        "theme_mode": theme_mode,
-        "benchmark": benchmark,
-        "output_formats": sorted(output_formats),
-        "warnings": warnings,
-        "weights": weights,
-        "config_path": str(config_path) if config_path else None,
-        "coverage_list_path": str(coverage_list_path) if coverage_list_path else None,
-        "copied_coverage_list_path": str(copied_coverage) if copied_coverage else None,
-        "cache_dir": str(getattr(provider, "cache_dir", resolved_output_root / "cache" / "market")),
-        "quarterly_store_path": str(getattr(provider, "quarterly_store_path", resolved_output_root / "cache" / "market" / "quarterly_fundamentals.sqlite")),
-        "refresh_run_id": update_result.get("refresh_run_id"),
-        "quality_period_requirement": 2,
-        "quality_update_mode": quality_update_mode,
-        "quality_update_decision": update_result.get("decision"),
-        "quality_update_budget_sec": quality_update_budget_sec,
-        "history_depth_target": quality_history_depth,
-        "history_complete_pct": quality_coverage_summary.get("history_complete_pct"),
-        "backfill_enqueued": bool(update_result.get("backfill_enqueued")),
-        "backfill_run_id": update_result.get("backfill_run_id"),
-        "repair_refreshed_symbols": update_result.get("repair_refreshed_symbols") or [],
-        "output_root": str(resolved_output_root),
-        "provider_versions": {"market_provider": "twse_openapi+tpex_openapi", "validation_engine": "factor_aware_cross_sectional_v2"},
-        "quality_coverage_summary": quality_coverage_summary,
-        "backtest_config": {"enabled": run_backtest, "window": validation_window, "rebalance": rebalance, "cost_bps": cost_bps},
-        "universe_count": len(universe),
-        "ranked_count": len(ranked),
-    }
+        for row in raw_rows:
+            row["rel_to_taiex_20d"] = (
+                row.get("ret_20d") - market_overview.get("ret_20d")
+                if isinstance(row.get("ret_20d"), (int, float)) and isinstance(market_overview.get("ret_20d"), (int, float))
+                else None
+            )
+            row["rel_to_sector_20d"] = (
+                row.get("ret_20d") - theme_avg_ret20
+                if isinstance(row.get("ret_20d"), (int, float)) and isinstance(theme_avg_ret20, (int, float))
+                else None
+            )
+            row["rel_to_industry_20d"] = (
+                row.get("ret_20d") - industry_avg_ret20.get(str(row.get("industry") or ""))
+                if isinstance(row.get("ret_20d"), (int, float))
+                and isinstance(industry_avg_ret20.get(str(row.get("industry") or "")), (int, float))
+                else None
+            )
+            if benchmark == "custom":
+                row["rel_to_custom_20d"] = (
+                    row.get("ret_20d") - custom_benchmark.get("ret_20d")
+                    if isinstance(row.get("ret_20d"), (int, float)) and isinstance(custom_benchmark.get("ret_20d"), (int, float))
+                    else None
+                )
+
+        stale_cache = _stale_cache_entries(provider)
+        if stale_cache:
+            warnings.append(f"{len(stale_cache)} 筆快取已過期，本次沿用舊資料並在背景更新")
+        ranked, picks = _rank_rows(raw_rows, weights, top_n, stale_symbols=_stale_symbols(stale_cache, raw_rows))
+
+        top_rows = ranked[:top_n]
+        quality_coverage_summary = provider.summarize_quality_coverage(
+            ranked,
+            top_n=min(3, top_n),
+            history_depth=quality_history_depth,
+            as_of=as_of,
+        )
+        sector_overview = {
+            "universe_count": len(ranked),
+            "top_n": len(top_rows),
+            "top_avg_idea": _avg([x.get("idea_score") for x in top_rows]),
+            "top_avg_confidence": _avg([x.get("confidence_score") for x in top_rows]),
+            "avg_ret_20d": theme_avg_ret20,
+            "avg_rel_to_taiex_20d": _avg([x.get("rel_to_taiex_20d") for x in raw_rows if isinstance(x.get("rel_to_taiex_20d"), (int, float))]),
+            "weights": weights,
+            "quality_coverage_summary": quality_coverage_summary,
+            "history_depth_target": quality_history_depth,
+        }
+
+        validation_summary: dict[str, Any] = {"mode": "not-run", "window": validation_window, "rebalance": rebalance, "cost_bps": cost_bps}
+        outputs: dict[str, Path] = {}
+        if run_backtest:
+            validation_summary = _build_validation_report(raw_rows, row_candles, taiex_series, validation_window, rebalance, top_n, cost_bps)
+            outputs["backtest"] = write_json_report(backtests_dir / f"validation-{theme}-{date_tag}.json", validation_summary)
+
+        top_pick = picks[0] if picks else {}
+        summary = (
+            f"Thesis：{theme} 類股目前由 `{top_pick.get('symbol', '-')}` {top_pick.get('name', '-') } 領跑，"
+            f"top {len(picks)} 平均 idea score `{(sector_overview.get('top_avg_idea') or 0.0):.1f}`。"
+            f" Evidence：相對題材 20 日超額 `{((top_pick.get('benchmark_view') or {}).get('rel_to_sector_20d') or 0.0):.2f}%`，"
+            f"confidence `{top_pick.get('confidence_score', 0.0):.1f}`。"
+            f" Risk：{'；'.join(top_pick.get('data_quality_flags') or ['主要風險在題材回檔'])}。"
+            f" Action：`{(top_pick.get('action_view') or {}).get('action', 'Neutral')}`。"
+            f" What changes my mind：若相對題材 20 日動能轉負、confidence 下滑或法說/營收驗證失敗，就降級。"
+        )
 
-    stem = f"sector-report-{theme}-{date_tag}"
-    if "md" in output_formats:
-        md_path = reports_dir / build_report_filename(theme, as_of)
-        md_path.write_text(
-            render_report(
+        method = [
+            "Rank 看的是 idea score 與資料可信度的合成，不再把缺值直接補成 50 分。",
+            "Confidence 拆成 factor coverage 與 data freshness 兩段，避免把資料缺漏跟舊資料混成一團。",
+            "Benchmark 同時看相對 TAIEX、相對題材、相對產業，避免只用絕對漲幅自嗨。",
+            "Action 與 ranking 拆開：排名是研究優先序，Overweight/Neutral/Underweight 才是動作建議。",
+        ]
+        if run_backtest:
+            method.append("Validation 已升級成 factor-aware cross-sectional v2，固定輸出 1Y / 3Y / 5Y 視窗與 factor sleeves。")
+        risks = [
+            "這是研究輔助，不是保證報酬；遇到法說、月營收、AI 出貨節奏變化時，結論需要重新驗證。",
+            "若 benchmark-relative 轉負且 confidence 下滑，應優先減碼而不是凹單。",
+        ]
+        if (quality_coverage_summary.get("previous_complete_pct") or 0.0) < 80:
+            risks.append("季度品質前期覆蓋仍未達高水位，quality score 的歷史比較仍需靠 SQLite 歷史累積補厚。")
+        if (quality_coverage_summary.get("history_complete_pct") or 0.0) < 80:
+            risks.append(f"近 {quality_history_depth} 季完整覆蓋仍偏薄，長期品質比較要再靠回補批次補齊。")
+        if warnings:
+            risks.append(f"資料警示：{len(warnings)} 檔抓取失敗，結果可能有抽樣偏誤。")
+
+        audit_payload = {
+            "theme": theme,
+            "as_of": as_of.isoformat(),
+            "theme_mode": theme_mode,
+            "benchmark": benchmark,
+            "output_formats": sorted(output_formats),
+            "warnings": warnings,
+            "weights": weights,
+            "config_path": str(config_path) if config_path else None,
+            "coverage_list_path": str(coverage_list_path) if coverage_list_path else None,
+            "copied_coverage_list_path": str(copied_coverage) if copied_coverage else None,
+            "cache_dir": str(getattr(provider, "cache_dir", resolved_output_root / "cache" / "market")),
+            "quarterly_store_path": str(getattr(provider, "quarterly_store_path", resolved_output_root / "cache" / "market" / "quarterly_fundamentals.sqlite")),
+            "refresh_run_id": update_result.get("refresh_run_id"),
+            "quality_period_requirement": 2,
+            "quality_update_mode": quality_update_mode,
+            "quality_update_decision": update_result.get("decision"),
+            "quality_update_budget_sec": quality_update_budget_sec,
+            "history_depth_target": quality_history_depth,
+            "history_complete_pct": quality_coverage_summary.get("history_complete_pct"),
+            "backfill_enqueued": bool(update_result.get("backfill_enqueued")),
+            "backfill_run_id": update_result.get("backfill_run_id"),
+            "repair_refreshed_symbols": update_result.get("repair_refreshed_symbols") or [],
+            "output_root": str(resolved_output_root),
+            "provider_fetch_stats": getattr(provider, "fetch_stats", dict)(),
+            "stale_cache_entries": stale_cache,
+            "provider_bundle": {
+                "record": str(record_bundle) if record_bundle else None,
+                "replay": str(replay_bundle) if replay_bundle else None,
+            },
+            "indicator_state": {"mode": indicator_state, **(indicator_summary or {})},
+            "provider_versions": {"market_provider": "twse_openapi+tpex_openapi", "validation_engine": "factor_aware_cross_sectional_v2"},
+            "quality_coverage_summary": quality_coverage_summary,
+            "backtest_config": {"enabled": run_backtest, "window": validation_window, "rebalance": rebalance, "cost_bps": cost_bps},
+            "universe_count": len(universe),
+            "ranked_count": len(ranked),
+        }
+
+        stem = f"sector-report-{theme}-{date_tag}"
+        if "md" in output_formats:
+            md_path = reports_dir / build_report_filename(theme, as_of)
+            md_path.write_text(
+                render_report(
+                    {
+                        "theme": theme,
+                        "as_of": as_of,
+                        "summary": summary,
+                        "market_overview": market_overview,
+                        "sector_overview": sector_overview,
+                        "method": method,
+                        "picks": picks,
+                        "risks": risks,
+                        "audit": audit_payload,
+                        "sources": ["TWSE OpenAPI", "TWSE exchangeReport", "TPEx OpenAPI", "TPEx afterTrading API"],
+                        "validation_summary": validation_summary,
+                    }
+                ),
+                encoding="utf-8",
+            )
+            outputs["md"] = md_path
+        if "json" in output_formats:
+            outputs["json"] = write_json_report(
+                reports_dir / f"{stem}.json",
                 {
                     "theme": theme,
-                    "as_of": as_of,
+                    "as_of": as_of.isoformat(),
                     "summary": summary,
-                    "market_overview": market_overview,
-                    "sector_overview": sector_overview,
-                    "method": method,
                     "picks": picks,
-                    "risks": risks,
-                    "audit": audit_payload,
-                    "sources": ["TWSE OpenAPI", "TWSE exchangeReport", "TPEx OpenAPI", "TPEx afterTrading API"],
+                    "sector_overview": sector_overview,
+                    "market_overview": market_overview,
                     "validation_summary": validation_summary,
-                }
-            ),
-            encoding="utf-8",
-        )
-        outputs["md"] = md_path
-    if "json" in output_formats:
-        outputs["json"] = write_json_report(
-            reports_dir / f"{stem}.json",
-            {
-                "theme": theme,
-                "as_of": as_of.isoformat(),
-                "summary": summary,
-                "picks": picks,
-                "sector_overview": sector_overview,
-                "market_overview": market_overview,
-                "validation_summary": validation_summary,
-                "audit": audit_payload,
-            },
+                    "audit": audit_payload,
+                },
+            )
+        if "csv" in output_formats:
+            outputs["csv"] = write_candidate_csv(reports_dir / f"{stem}.csv", picks)
+
+        outputs["audit"] = write_audit_trail(audit_dir / f"{stem}.audit.json", audit_payload)
+        coverage_symbols = _load_coverage_symbols(Path(coverage_list_path)) if coverage_list_path else []
+        previous_watchlist = _load_previous_watchlist(watchlists_dir, theme, as_of)
+        outputs["watchlist"] = write_watchlist(
+            watchlists_dir / f"watchlist-{theme}-{date_tag}.json",
+            _build_watchlist_payload(theme, as_of, ranked, coverage_symbols, previous_watchlist),
         )
-    if "csv" in output_formats:
-        outputs["csv"] = write_candidate_csv(reports_dir / f"{stem}.csv", picks)
-
-    outputs["audit"] = write_audit_trail(audit_dir / f"{stem}.audit.json", audit_payload)
-    coverage_symbols = _load_coverage_symbols(Path(coverage_list_path)) if coverage_list_path else []
-    previous_watchlist = _load_previous_watchlist(watchlists_dir, theme, as_of)
-    outputs["watchlist"] = write_watchlist(
-        watchlists_dir / f"watchlist-{theme}-{date_tag}.json",
-        _build_watchlist_payload(theme, as_of, ranked, coverage_symbols, previous_watchlist),
-    )
-    return outputs
+        finish_recording = getattr(provider, "finish_recording", None)
+        bundle_path = finish_recording() if callable(finish_recording) else None
+        if bundle_path is not None:
+            outputs["bundle"] = bundle_path
+        return outputs
+    finally:
+        close = getattr(provider, "close", None)
+        if callable(close):
+            close()
 
 
 def main() -> int:
@@ -882,11 +1016,16 @@ def main() -> int:
             quality_update_mode=args.quality_update_mode,
             quality_update_budget_sec=args.quality_update_budget_sec,
             quality_history_depth=args.quality_history_depth,
+            fetch_workers=args.fetch_workers,
+            fetch_backend=args.fetch_backend,
+            record_bundle=args.record_bundle,
+            replay_bundle=args.replay_bundle,
+            indicator_state=args.indicator_state,
         )
         for key, path in outputs.items():
             print(f"[tw-sector-screener] {key}: {path}")
         return 0
-    except Exception as exc:
+    except (Exception, ReplayMiss) as exc:
         print(f"[tw-sector-screener] error: {exc}")
         return 1
 
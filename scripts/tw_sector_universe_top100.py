@@ -14,16 +14,13 @@ DEFAULT_OUTPUT_ROOT = Path.home() / "tw-sector-screener-output"
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
-from src.analysis.factors import (
-    atr_wilder,
-    momentum_return,
-    percentile_rank,
-    rsi_wilder,
-    sma,
-    trend_score,
-    volatility_annualized,
-)
+from src.analysis.candles import CandleSeries
+from src.analysis.factor_kernel import compute_factor_table, reference_factors
+from src.analysis.factors import trend_score
+from src.analysis.frame import FactorFrame
+from src.analysis.ranking import percentile_column
 from src.analysis.scoring import score_candidates
+from src.providers.async_provider import BlockingAsyncProvider
 from src.providers.tw_market_provider import TwMarketProvider
 from src.themes import available_themes
 
@@ -34,6 +31,8 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--top-n", type=int, default=100, help="每個類股輸出前 N 檔")
     parser.add_argument("--lookback", type=int, default=160, help="歷史回看日數（需 >= 127）")
     parser.add_argument("--timeout", type=float, default=10.0, help="HTTP 逾時秒數")
+    parser.add_argument("--fetch-workers", type=int, default=8, help="日線並行抓取的執行緒數")
+    parser.add_argument("--fetch-backend", choices=["thread", "async"], default="thread", help="網路抓取後端")
     parser.add_argument("--min-monthly-revenue", type=float, default=0.0, help="最低月營收門檻（元）")
     parser.add_argument("--industry-min-count", type=int, default=1, help="產業最少成分股數")
     parser.add_argument(
@@ -52,6 +51,12 @@ def parse_args() -> argparse.Namespace:
         default="",
         help="只輸出指定類股，格式: theme:半導體,industry:電子零組件業",
     )
+    parser.add_argument(
+        "--indicator-state",
+        choices=["off", "incremental", "recompute"],
+        default="off",
+        help="技術指標改用落地的增量狀態（incremental）或全量重算後寫回（recompute）",
+    )
     parser.add_argument("--output-dir", default=str(DEFAULT_OUTPUT_ROOT), help="輸出資料夾")
     return parser.parse_args()
 
@@ -92,6 +97,7 @@ def _build_metrics(
     as_of: date,
     lookback: int,
     warnings: list[str],
+    factors: dict[str, float | None] | None = None,
 ) -> dict[str, Any] | None:
     symbol = candidate["symbol"]
     market = candidate["market"]
@@ -101,17 +107,20 @@ def _build_metrics(
         warnings.append(f"{symbol} 日線失敗：{exc}")
         return None
 
-    closes = [float(c["close"]) for c in candles]
-    volumes = [float(c["volume"]) for c in candles]
+    candles = CandleSeries.coerce(candles)
+    closes = candles.closes
+    volumes = candles.volumes
     close = closes[-1]
-    sma20 = sma(closes, 20)
-    sma60 = sma(closes, 60)
-    sma120 = sma(closes, 120)
-    rsi14 = rsi_wilder(closes, 14)
-    atr14 = atr_wilder(candles, 14)
-    vol20 = volatility_annualized(closes, 20)
-    mom63 = momentum_return(closes, 63)
-    mom126 = momentum_return(closes, 126)
+    if factors is None:
+        factors = reference_factors(candles)
+    sma20 = factors["sma20"]
+    sma60 = factors["sma60"]
+    sma120 = factors["sma120"]
+    rsi14 = factors["rsi14"]
+    atr14 = factors["atr14"]
+    vol20 = factors["volatility20"]
+    mom63 = factors["momentum63"]
+    mom126 = factors["momentum126"]
     ret5 = _ret_pct(closes, 5)
     ret20 = _ret_pct(closes, 20)
     ma_stack = _ma_stack(close, sma20, sma60, sma120)
@@ -140,58 +149,61 @@ def _build_metrics(
     }
 
 
-def _score_rows(raw_rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
-    if not raw_rows:
-        return []
-    mom63_list = [x["momentum63"] for x in raw_rows if isinstance(x.get("momentum63"), (int, float))]
-    mom126_list = [x["momentum126"] for x in raw_rows if isinstance(x.get("momentum126"), (int, float))]
-    pe_list = [x["pe"] for x in raw_rows if isinstance(x.get("pe"), (int, float)) and x.get("pe", 0) > 0]
-    pb_list = [x["pb"] for x in raw_rows if isinstance(x.get("pb"), (int, float)) and x.get("pb", 0) > 0]
-    dy_list = [x["dividend_yield"] for x in raw_rows if isinstance(x.get("dividend_yield"), (int, float))]
-    rev_yoy_list = [x["revenue_yoy"] for x in raw_rows if isinstance(x.get("revenue_yoy"), (int, float))]
-    rev_mom_list = [x["revenue_mom"] for x in raw_rows if isinstance(x.get("revenue_mom"), (int, float))]
-    vol_list = [x["volatility20"] for x in raw_rows if isinstance(x.get("volatility20"), (int, float))]
-    liq_list = [x["liquidity20"] for x in raw_rows if isinstance(x.get("liquidity20"), (int, float)) and x.get("liquidity20", 0) > 0]
-
-    scored_input: list[dict[str, Any]] = []
+def _score_columns(raw_rows: list[dict[str, Any]]) -> dict[str, list[float]]:
+    mom63_col = percentile_column(raw_rows, "momentum63")
+    mom126_col = percentile_column(raw_rows, "momentum126")
+    pe_col = percentile_column(raw_rows, "pe", include=lambda v: v > 0)
+    pb_col = percentile_column(raw_rows, "pb", include=lambda v: v > 0)
+    dy_col = percentile_column(raw_rows, "dividend_yield")
+    rev_yoy_col = percentile_column(raw_rows, "revenue_yoy")
+    rev_mom_col = percentile_column(raw_rows, "revenue_mom")
+    vol_col = percentile_column(raw_rows, "volatility20")
+    liq_col = percentile_column(raw_rows, "liquidity20", include=lambda v: v > 0)
+
+    score_columns: dict[str, list[float]] = {"momentum_score": [], "value_score": [], "fundamental_score": [], "risk_control_score": []}
     for row in raw_rows:
         momentum_score = _avg(
             [
-                percentile_rank(row.get("momentum63"), mom63_list),
-                percentile_rank(row.get("momentum126"), mom126_list),
+                mom63_col.rank(row.get("momentum63")),
+                mom126_col.rank(row.get("momentum126")),
             ]
         )
         value_score = _avg(
             [
-                (100.0 - percentile_rank(row.get("pe"), pe_list)) if isinstance(row.get("pe"), (int, float)) and pe_list else None,
-                (100.0 - percentile_rank(row.get("pb"), pb_list)) if isinstance(row.get("pb"), (int, float)) and pb_list else None,
-                percentile_rank(row.get("dividend_yield"), dy_list),
+                (100.0 - pe_col.rank(row.get("pe"))) if isinstance(row.get("pe"), (int, float)) and pe_col else None,
+                (100.0 - pb_col.rank(row.get("pb"))) if isinstance(row.get("pb"), (int, float)) and pb_col else None,
+                dy_col.rank(row.get("dividend_yield")),
             ]
         )
         fundamental_score = _avg(
             [
-                percentile_rank(row.get("revenue_yoy"), rev_yoy_list),
-                percentile_rank(row.get("revenue_mom"), rev_mom_list),
+                rev_yoy_col.rank(row.get("revenue_yoy")),
+                rev_mom_col.rank(row.get("revenue_mom")),
             ]
         )
         risk_control_score = _avg(
             [
-                (100.0 - percentile_rank(row.get("volatility20"), vol_list))
-                if isinstance(row.get("volatility20"), (int, float)) and vol_list
+                (100.0 - vol_col.rank(row.get("volatility20")))
+                if isinstance(row.get("volatility20"), (int, float)) and vol_col
                 else None,
-                percentile_rank(row.get("liquidity20"), liq_list),
+                liq_col.rank(row.get("liquidity20")),
             ]
         )
-        scored_input.append(
-            {
-                **row,
-                "momentum_score": round(momentum_score, 2),
-                "value_score": round(value_score, 2),
-                "fundamental_score": round(fundamental_score, 2),
-                "risk_control_score": round(risk_control_score, 2),
-            }
-        )
-    return score_candidates(scored_input)
+        score_columns["momentum_score"].append(round(momentum_score, 2))
+        score_columns["value_score"].append(round(value_score, 2))
+        score_columns["fundamental_score"].append(round(fundamental_score, 2))
+        score_columns["risk_control_score"].append(round(risk_control_score, 2))
+    return score_columns
+
+
+def _score_rows(raw_rows: list[dict[str, Any]]) -> FactorFrame:
+    if not raw_rows:
+        return FactorFrame()
+    # 類股列轉成欄式 FactorFrame 後，評分、排序、輸出都讀欄，不再逐列展開或寫回 dict。
+    frame = FactorFrame.from_rows(raw_rows)
+    for name, values in _score_columns(raw_rows).items():
+        frame.set_column(name, values)
+    return score_candidates(frame)
 
 
 def _to_csv_value(value: Any) -> str:
@@ -202,7 +214,12 @@ def _to_csv_value(value: Any) -> str:
     return str(value)
 
 
-def _write_bucket_csv(path: Path, rows: list[dict[str, Any]]) -> None:
+def _csv_rows(frame: FactorFrame, headers: list[str]) -> list[dict[str, str]]:
+    columns = [[_to_csv_value(value) for value in frame.column(key)] for key in headers]
+    return [dict(zip(headers, values)) for values in zip(*columns)]
+
+
+def _write_bucket_csv(path: Path, rows: FactorFrame) -> None:
     headers = [
         "rank",
         "symbol",
@@ -238,8 +255,7 @@ def _write_bucket_csv(path: Path, rows: list[dict[str, Any]]) -> None:
     with path.open("w", encoding="utf-8-sig", newline="") as handle:
         writer = csv.DictWriter(handle, fieldnames=headers)
         writer.writeheader()
-        for row in rows:
-            writer.writerow({k: _to_csv_value(row.get(k)) for k in headers})
+        writer.writerows(_csv_rows(rows, headers))
 
 
 def _build_index_markdown(
@@ -249,6 +265,7 @@ def _build_index_markdown(
     summaries: list[dict[str, Any]],
     warning_count: int,
     output_dir: Path,
+    indicator_summary: dict[str, Any] | None = None,
 ) -> str:
     lines = [
         "# 台股全類股 Top100 快照索引",
@@ -258,6 +275,12 @@ def _build_index_markdown(
         f"- 回看日數：`{lookback}`",
         f"- 類股數：`{len(summaries)}`",
         f"- 資料警示數：`{warning_count}`",
+    ]
+    if indicator_summary is not None:
+        lines.append(
+            "- 指標狀態：`{mode}`（full {full} / incremental {incremental} / unchanged {unchanged}）".format(**indicator_summary)
+        )
+    lines += [
         "",
         "## 類股清單",
         "| 類型 | 類股名稱 | 母體檔數 | 分析檔數 | 輸出檔數 | 第一名 | 檔案 |",
@@ -289,161 +312,194 @@ def run(
     bucket_types: set[str],
     include_buckets: set[str],
     output_dir: Path,
+    fetch_workers: int = 8,
+    fetch_backend: str = "thread",
+    indicator_state: str = "off",
 ) -> tuple[Path, Path]:
-    provider = TwMarketProvider(timeout=timeout)
-    warnings: list[str] = []
-
-    buckets: list[dict[str, Any]] = []
-    if "theme" in bucket_types:
-        for theme in available_themes():
-            theme_universe = provider.load_theme_universe(theme, min_monthly_revenue=min_monthly_revenue)
-            if theme_universe:
-                buckets.append({"bucket_type": "theme", "bucket_name": theme, "universe": theme_universe})
-    if "industry" in bucket_types:
-        industry_universes = provider.load_industry_universes(
-            min_monthly_revenue=min_monthly_revenue,
-            min_count=industry_min_count,
-        )
-        for industry, sector_universe in industry_universes.items():
-            buckets.append({"bucket_type": "industry", "bucket_name": industry, "universe": sector_universe})
-
-    if not buckets:
-        raise RuntimeError("沒有可分析的類股池，請調整參數。")
+    provider_cls = BlockingAsyncProvider if fetch_backend == "async" else TwMarketProvider
+    provider = provider_cls(timeout=timeout, max_workers=fetch_workers)
+    try:
+        warnings: list[str] = []
+
+        buckets: list[dict[str, Any]] = []
+        if "theme" in bucket_types:
+            for theme in available_themes():
+                theme_universe = provider.load_theme_universe(theme, min_monthly_revenue=min_monthly_revenue)
+                if theme_universe:
+                    buckets.append({"bucket_type": "theme", "bucket_name": theme, "universe": theme_universe})
+        if "industry" in bucket_types:
+            industry_universes = provider.load_industry_universes(
+                min_monthly_revenue=min_monthly_revenue,
+                min_count=industry_min_count,
+            )
+            for industry, sector_universe in industry_universes.items():
+                buckets.append({"bucket_type": "industry", "bucket_name": industry, "universe": sector_universe})
 
-    if include_buckets:
-        buckets = [
-            bucket
-            for bucket in buckets
-            if f"{bucket['bucket_type']}:{bucket['bucket_name']}" in include_buckets
-        ]
         if not buckets:
-            raise RuntimeError("include-buckets 未命中任何類股，請檢查名稱是否正確。")
-
-    date_tag = as_of.strftime("%Y%m%d")
-    batch_dir = output_dir / f"sector-top100-{date_tag}"
-    batch_dir.mkdir(parents=True, exist_ok=True)
-    master_csv_path = output_dir / f"sector-top100-master-{date_tag}.csv"
-    index_md_path = output_dir / f"sector-top100-index-{date_tag}.md"
-
-    master_headers = [
-        "bucket_type",
-        "bucket_name",
-        "rank",
-        "symbol",
-        "name",
-        "market",
-        "industry",
-        "total_score",
-        "trend_score",
-        "momentum_score",
-        "value_score",
-        "fundamental_score",
-        "risk_control_score",
-        "close",
-        "ret_5d",
-        "ret_20d",
-        "momentum63",
-        "momentum126",
-        "ma_stack",
-        "rsi14",
-        "volatility20",
-        "monthly_revenue",
-        "revenue_yoy",
-        "revenue_mom",
-    ]
-    summaries: list[dict[str, Any]] = []
-    metrics_cache: dict[tuple[str, str], dict[str, Any] | None] = {}
-
-    with master_csv_path.open("w", encoding="utf-8-sig", newline="") as master_handle:
-        master_writer = csv.DictWriter(master_handle, fieldnames=master_headers)
-        master_writer.writeheader()
+            raise RuntimeError("沒有可分析的類股池，請調整參數。")
 
-        sorted_buckets = sorted(
-            buckets,
-            key=lambda item: (item["bucket_type"], -len(item["universe"]), str(item["bucket_name"])),
-        )
-        for idx, bucket in enumerate(sorted_buckets, start=1):
-            bucket_type = str(bucket["bucket_type"])
-            bucket_name = str(bucket["bucket_name"])
-            original_universe = list(bucket["universe"])
-            if max_symbols_per_bucket > 0:
-                candidates = original_universe[:max_symbols_per_bucket]
-            else:
-                candidates = original_universe
-
-            raw_rows: list[dict[str, Any]] = []
-            for candidate in candidates:
-                cache_key = (candidate["symbol"], candidate["market"])
-                if cache_key not in metrics_cache:
-                    metrics_cache[cache_key] = _build_metrics(
-                        provider=provider,
-                        candidate=candidate,
-                        as_of=as_of,
-                        lookback=lookback,
-                        warnings=warnings,
-                    )
-                metrics = metrics_cache[cache_key]
-                if metrics is None:
-                    continue
-                raw_rows.append({**candidate, **metrics})
-
-            ranked = _score_rows(raw_rows)
-            top_rows = [{**row, "rank": rank} for rank, row in enumerate(ranked[:top_n], start=1)]
-
-            slug = _slug(f"{bucket_type}-{bucket_name}")
-            bucket_file_path = batch_dir / f"{slug}.csv"
-            _write_bucket_csv(bucket_file_path, top_rows)
-
-            top_pick = ""
-            if top_rows:
-                top_pick = f"{top_rows[0]['symbol']} {top_rows[0]['name']}"
-
-            summaries.append(
-                {
-                    "bucket_type": bucket_type,
-                    "bucket_name": bucket_name,
-                    "universe_count": len(original_universe),
-                    "analyzed_count": len(raw_rows),
-                    "output_count": len(top_rows),
-                    "top_pick": top_pick,
-                    "file_path": bucket_file_path,
-                }
+        if include_buckets:
+            buckets = [
+                bucket
+                for bucket in buckets
+                if f"{bucket['bucket_type']}:{bucket['bucket_name']}" in include_buckets
+            ]
+            if not buckets:
+                raise RuntimeError("include-buckets 未命中任何類股，請檢查名稱是否正確。")
+
+        date_tag = as_of.strftime("%Y%m%d")
+        batch_dir = output_dir / f"sector-top100-{date_tag}"
+        batch_dir.mkdir(parents=True, exist_ok=True)
+        master_csv_path = output_dir / f"sector-top100-master-{date_tag}.csv"
+        index_md_path = output_dir / f"sector-top100-index-{date_tag}.md"
+
+        master_headers = [
+            "bucket_type",
+            "bucket_name",
+            "rank",
+            "symbol",
+            "name",
+            "market",
+            "industry",
+            "total_score",
+            "trend_score",
+            "momentum_score",
+            "value_score",
+            "fundamental_score",
+            "risk_control_score",
+            "close",
+            "ret_5d",
+            "ret_20d",
+            "momentum63",
+            "momentum126",
+            "ma_stack",
+            "rsi14",
+            "volatility20",
+            "monthly_revenue",
+            "revenue_yoy",
+            "revenue_mom",
+        ]
+        summaries: list[dict[str, Any]] = []
+        metrics_cache: dict[tuple[str, str], dict[str, Any] | None] = {}
+        factor_table: dict[tuple[str, str], dict[str, float | None]] = {}
+        indicator_summary: dict[str, Any] | None = None
+        if indicator_state != "off":
+            indicator_summary = {"mode": indicator_state, "full": 0, "incremental": 0, "unchanged": 0}
+
+        with master_csv_path.open("w", encoding="utf-8-sig", newline="") as master_handle:
+            master_writer = csv.DictWriter(master_handle, fieldnames=master_headers)
+            master_writer.writeheader()
+
+            sorted_buckets = sorted(
+                buckets,
+                key=lambda item: (item["bucket_type"], -len(item["universe"]), str(item["bucket_name"])),
             )
+            for idx, bucket in enumerate(sorted_buckets, start=1):
+                bucket_type = str(bucket["bucket_type"])
+                bucket_name = str(bucket["bucket_name"])
+                original_universe = list(bucket["universe"])
+                if max_symbols_per_bucket > 0:
+                    candidates = original_universe[:max_symbols_per_bucket]
+                else:
+                    candidates = original_universe
+
+                batch = provider.get_ohlcv_batch(
+                    [
+                        (candidate["symbol"], candidate["market"])
+                        for candidate in candidates
+                        if (candidate["symbol"], candidate["market"]) not in metrics_cache
+                    ],
+                    as_of=as_of,
+                    lookback=lookback,
+                )
+                if indicator_summary is None:
+                    factor_table.update(compute_factor_table(batch))
+                else:
+                    batch_factors, batch_summary = provider.update_indicator_states(
+                        batch, force_recompute=indicator_state == "recompute"
+                    )
+                    factor_table.update(batch_factors)
+                    for mode, count in batch_summary.items():
+                        indicator_summary[mode] += count
+                raw_rows: list[dict[str, Any]] = []
+                for candidate in candidates:
+                    cache_key = (candidate["symbol"], candidate["market"])
+                    if cache_key not in metrics_cache:
+                        metrics_cache[cache_key] = _build_metrics(
+                            provider=provider,
+                            candidate=candidate,
+                            as_of=as_of,
+                            lookback=lookback,
+                            warnings=warnings,
+                            factors=factor_table.get(cache_key),
+                        )
+                    metrics = metrics_cache[cache_key]
+                    if metrics is None:
+                        continue
+                    raw_rows.append({**candidate, **metrics})
+
+                ranked = _score_rows(raw_rows)
+                top_rows = ranked[:top_n]
+                top_rows.set_column("rank", range(1, len(top_rows) + 1))
+
+                slug = _slug(f"{bucket_type}-{bucket_name}")
+                bucket_file_path = batch_dir / f"{slug}.csv"
+                _write_bucket_csv(bucket_file_path, top_rows)
+
+                top_pick = ""
+                if len(top_rows):
+                    top_pick = f"{top_rows.value(0, 'symbol')} {top_rows.value(0, 'name')}"
+
+                summaries.append(
+                    {
+                        "bucket_type": bucket_type,
+                        "bucket_name": bucket_name,
+                        "universe_count": len(original_universe),
+                        "analyzed_count": len(raw_rows),
+                        "output_count": len(top_rows),
+                        "top_pick": top_pick,
+                        "file_path": bucket_file_path,
+                    }
+                )
 
-            for row in top_rows:
-                payload = {key: _to_csv_value(row.get(key)) for key in master_headers}
-                payload["bucket_type"] = bucket_type
-                payload["bucket_name"] = bucket_name
-                master_writer.writerow(payload)
-
-            print(
-                "[{}/{}] {}:{} universe={} analyzed={} out={}".format(
-                    idx,
-                    len(sorted_buckets),
-                    bucket_type,
-                    bucket_name,
-                    len(original_universe),
-                    len(raw_rows),
-                    len(top_rows),
+                for payload in _csv_rows(top_rows, master_headers):
+                    payload["bucket_type"] = bucket_type
+                    payload["bucket_name"] = bucket_name
+                    master_writer.writerow(payload)
+
+                print(
+                    "[{}/{}] {}:{} universe={} analyzed={} out={}".format(
+                        idx,
+                        len(sorted_buckets),
+                        bucket_type,
+                        bucket_name,
+                        len(original_universe),
+                        len(raw_rows),
+                        len(top_rows),
+                    )
+                    ,
+                    flush=True,
                 )
-                ,
-                flush=True,
-            )
 
-    index_content = _build_index_markdown(
-        as_of=as_of,
-        top_n=top_n,
-        lookback=lookback,
-        summaries=summaries,
-        warning_count=len(warnings),
-        output_dir=output_dir,
-    )
-    index_md_path.write_text(index_content, encoding="utf-8")
-    if warnings:
-        warning_path = output_dir / f"sector-top100-warnings-{date_tag}.txt"
-        warning_path.write_text("\n".join(warnings), encoding="utf-8")
+        index_content = _build_index_markdown(
+            as_of=as_of,
+            top_n=top_n,
+            lookback=lookback,
+            summaries=summaries,
+            warning_count=len(warnings),
+            output_dir=output_dir,
+            indicator_summary=indicator_summary,
+        )
+        index_md_path.write_text(index_content, encoding="utf-8")
+        if warnings:
+            warning_path = output_dir / f"sector-top100-warnings-{date_tag}.txt"
+            warning_path.write_text("\n".join(warnings), encoding="utf-8")
 
-    return index_md_path, master_csv_path
+        return index_md_path, master_csv_path
+    finally:
+        close = getattr(provider, "close", None)
+        if callable(close):
+            close()
 
 
 def main() -> int:
@@ -475,6 +531,9 @@ def main() -> int:
             bucket_types=bucket_types,
             include_buckets={x.strip() for x in str(args.include_buckets).split(",") if x.strip()},
             output_dir=Path(args.output_dir),
+            fetch_workers=args.fetch_workers,
+            fetch_backend=args.fetch_backend,
+            indicator_state=args.indicator_state,
         )
         print(f"[sector-top100] index: {index_path}")
         print(f"[sector-top100] master: {master_path}")
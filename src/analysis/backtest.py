@@ -3,6 +3,8 @@ from __future__ import annotations
 import math
 from typing import Any
 
+from src.analysis.frame import FactorFrame
+
 
 def _pct_return(start: float, end: float) -> float:
     if start == 0:
@@ -35,6 +37,54 @@ def _score_value(row: dict[str, Any], score_columns: list[str]) -> float:
     return sum(values) / len(values)
 
 
+def _frame_scores(frame: FactorFrame, score_columns: list[str]) -> list[float]:
+    # 與 _score_value 相同的算式，只是逐欄取值，不展開成 dict 列。
+    columns = [frame.column(column) for column in score_columns]
+    fallback = frame.column("score")
+    scores: list[float] = []
+    for i in range(len(frame)):
+        values = [float(column[i]) for column in columns if isinstance(column[i], (int, float))]
+        scores.append(sum(values) / len(values) if values else float(fallback[i] or 0.0))
+    return scores
+
+
+def _snapshot_views(
+    snapshots: list[dict[str, Any]],
+    score_columns: list[str],
+) -> list[tuple[list[Any], list[float], list[float]]]:
+    """每個快照轉成 (持股鍵, 分數, 收盤) 三條平行序列。
+
+    快照的 rows 可以是 dict 列或 FactorFrame；全部 frame 共用同一張 SymbolTable 時，持股鍵直接用整數 id。
+    """
+    frames = [snapshot.get("rows") for snapshot in snapshots]
+    shared_table = (
+        frames[0].table
+        if frames and all(isinstance(rows, FactorFrame) and rows.table is frames[0].table for rows in frames)
+        else None
+    )
+    views: list[tuple[list[Any], list[float], list[float]]] = []
+    for rows in frames:
+        if isinstance(rows, FactorFrame):
+            keys = list(rows.symbol_ids) if shared_table is not None else rows.symbols
+            closes = [float(close or 0.0) for close in rows.column("close")]
+            views.append((keys, _frame_scores(rows, score_columns), closes))
+            continue
+        rows = rows or []
+        views.append(
+            (
+                [row["symbol"] for row in rows],
+                [_score_value(row, score_columns) for row in rows],
+                [float(row.get("close") or 0.0) for row in rows],
+            )
+        )
+    return views
+
+
+def _ranked_positions(scores: list[float]) -> list[int]:
+    # 穩定排序：同分時維持快照內原本順序，與直接排序 dict 列的結果相同。
+    return sorted(range(len(scores)), key=scores.__getitem__, reverse=True)
+
+
 def _run_strategy_metrics(
     snapshots: list[dict[str, Any]],
     benchmark_series: list[dict[str, Any]],
@@ -64,20 +114,19 @@ def _run_strategy_metrics(
     hit_count = 0
     total_picks = 0
     turnover_total = 0.0
-    previous_holdings: set[str] = set()
+    previous_holdings: set[Any] = set()
     days_deltas: list[int] = []
 
+    views = _snapshot_views(snapshots, score_columns or ["score"])
     for idx in range(len(snapshots) - 1):
         current = snapshots[idx]
         future = snapshots[idx + 1]
-        current_rows = sorted(
-            current.get("rows") or [],
-            key=lambda row: _score_value(row, score_columns or ["score"]),
-            reverse=True,
-        )
-        future_map = {row["symbol"]: row for row in future.get("rows") or []}
-        picks = current_rows[:top_n]
-        holdings = {row["symbol"] for row in picks}
+        keys, scores, closes = views[idx]
+        future_keys, _, future_closes = views[idx + 1]
+        order = _ranked_positions(scores)
+        future_map = {key: position for position, key in enumerate(future_keys)}
+        picks = order[:top_n]
+        holdings = {keys[position] for position in picks}
         if idx == 0:
             turnover_total += 1.0 if holdings else 0.0
         else:
@@ -88,17 +137,17 @@ def _run_strategy_metrics(
 
         pick_returns: list[float] = []
         basket_returns: list[float] = []
-        for row in current_rows:
-            future_row = future_map.get(row["symbol"])
-            if not future_row:
+        for position in order:
+            future_position = future_map.get(keys[position])
+            if future_position is None:
                 continue
-            ret = _pct_return(float(row.get("close") or 0.0), float(future_row.get("close") or 0.0))
+            ret = _pct_return(closes[position], future_closes[future_position])
             basket_returns.append(ret)
-        for row in picks:
-            future_row = future_map.get(row["symbol"])
-            if not future_row:
+        for position in picks:
+            future_position = future_map.get(keys[position])
+            if future_position is None:
                 continue
-            ret = _pct_return(float(row.get("close") or 0.0), float(future_row.get("close") or 0.0))
+            ret = _pct_return(closes[position], future_closes[future_position])
             pick_returns.append(ret)
             total_picks += 1
             if ret > 0:
@@ -153,11 +202,10 @@ def run_cross_sectional_backtest(
         factor_sleeves[group_name] = _run_strategy_metrics(snapshots, benchmark_series, top_n, cost_bps, score_columns=columns)
         selected_values: list[float] = []
         universe_values: list[float] = []
-        for snapshot in snapshots[:-1]:
-            rows = sorted(snapshot.get("rows") or [], key=lambda row: _score_value(row, columns), reverse=True)
-            picks = rows[:top_n]
-            selected_values.extend(_score_value(row, columns) for row in picks)
-            universe_values.extend(_score_value(row, columns) for row in rows)
+        for _, scores, _ in _snapshot_views(snapshots[:-1], columns):
+            ranked_scores = [scores[position] for position in _ranked_positions(scores)]
+            selected_values.extend(ranked_scores[:top_n])
+            universe_values.extend(ranked_scores)
         avg_selected = sum(selected_values) / len(selected_values) if selected_values else 0.0
         avg_universe = sum(universe_values) / len(universe_values) if universe_values else 0.0
         factor_attribution[group_name] = {
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from array import array
+from datetime import date
+from typing import Any, Iterable, Iterator
+
+
+class CandleSeries:
+    """日線的欄式容器：日期存成 ordinal 整數陣列，OHLCV 各自是 float 陣列。
+
+    取單一元素得到與舊版相同的 dict（含 date 物件），切片仍是 CandleSeries；
+    因子計算直接讀 closes / volumes 等欄位，不再逐日建立 dict。
+    """
+
+    __slots__ = ("dates", "opens", "highs", "lows", "closes", "volumes")
+
+    def __init__(
+        self,
+        dates: Iterable[int] = (),
+        opens: Iterable[float] = (),
+        highs: Iterable[float] = (),
+        lows: Iterable[float] = (),
+        closes: Iterable[float] = (),
+        volumes: Iterable[float] = (),
+    ) -> None:
+        self.dates = dates if isinstance(dates, array) else array("i", dates)
+        self.opens = opens if isinstance(opens, array) else array("d", opens)
+        self.highs = highs if isinstance(highs, array) else array("d", highs)
+        self.lows = lows if isinstance(lows, array) else array("d", lows)
+        self.closes = closes if isinstance(closes, array) else array("d", closes)
+        self.volumes = volumes if isinstance(volumes, array) else array("d", volumes)
+        if not len(self.dates) == len(self.opens) == len(self.highs) == len(self.lows) == len(self.closes) == len(self.volumes):
+            raise ValueError("CandleSeries 各欄長度不一致")
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict[str, Any]]) -> CandleSeries:
+        series = cls()
+        for row in rows:
+            series.append(row["date"], row["open"], row["high"], row["low"], row["close"], row["volume"])
+        return series
+
+    @classmethod
+    def coerce(cls, candles: CandleSeries | Iterable[dict[str, Any]]) -> CandleSeries:
+        return candles if isinstance(candles, cls) else cls.from_rows(candles)
+
+    def append(self, day: date, open_: float, high: float, low: float, close: float, volume: float) -> None:
+        self.dates.append(day.toordinal())
+        self.opens.append(float(open_))
+        self.highs.append(float(high))
+        self.lows.append(float(low))
+        self.closes.append(float(close))
+        self.volumes.append(float(volume))
+
+    def date_at(self, index: int) -> date:
+        return date.fromordinal(self.dates[index])
+
+    def row(self, index: int) -> dict[str, Any]:
+        return {
+            "date": date.fromordinal(self.dates[index]),
+            "open": self.opens[index],
+            "high": self.highs[index],
+            "low": self.lows[index],
+            "close": self.closes[index],
+            "volume": self.volumes[index],
+        }
+
+    def to_rows(self) -> list[dict[str, Any]]:
+        return [self.row(i) for i in range(len(self.dates))]
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __getitem__(self, index: int | slice) -> Any:
+        if isinstance(index, slice):
+            return CandleSeries(
+                self.dates[index], self.opens[index], self.highs[index], self.lows[index], self.closes[index], self.volumes[index]
+            )
+        return self.row(index)
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        for i in range(len(self.dates)):
+            yield self.row(i)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, CandleSeries):
+            return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+        if isinstance(other, list):
+            return self.to_rows() == other
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        if not self.dates:
+            return "CandleSeries([])"
+        return f"CandleSeries({len(self)} rows, {self.date_at(0).isoformat()}..{self.date_at(-1).isoformat()})"
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import sys
+from typing import Any, Hashable
+
+from src.analysis.candles import CandleSeries
+from src.analysis.factors import atr_wilder, momentum_return, rsi_wilder, sma, volatility_annualized
+
+try:
+    import numpy as np
+except ImportError:  # numpy 為選用依賴，沒有時逐檔走 factors.py
+    np = None
+
+SMA_WINDOWS = (20, 60, 120)
+RSI_WINDOW = 14
+ATR_WINDOW = 14
+VOLATILITY_WINDOW = 20
+MOMENTUM_LOOKBACKS = (63, 126)
+_COMPENSATED_SUM = sys.version_info >= (3, 12)
+FACTOR_NAMES = (
+    *(f"sma{w}" for w in SMA_WINDOWS),
+    f"rsi{RSI_WINDOW}",
+    f"atr{ATR_WINDOW}",
+    f"volatility{VOLATILITY_WINDOW}",
+    *(f"momentum{n}" for n in MOMENTUM_LOOKBACKS),
+)
+
+
+def reference_factors(candles: CandleSeries | list[dict[str, Any]]) -> dict[str, float | None]:
+    series = CandleSeries.coerce(candles)
+    closes = series.closes
+    payload: dict[str, float | None] = {f"sma{w}": sma(closes, w) for w in SMA_WINDOWS}
+    payload[f"rsi{RSI_WINDOW}"] = rsi_wilder(closes, RSI_WINDOW)
+    payload[f"atr{ATR_WINDOW}"] = atr_wilder(series, ATR_WINDOW)
+    payload[f"volatility{VOLATILITY_WINDOW}"] = volatility_annualized(closes, VOLATILITY_WINDOW)
+    for n in MOMENTUM_LOOKBACKS:
+        payload[f"momentum{n}"] = momentum_return(closes, n)
+    return payload
+
+
+class PriceMatrix:
+    """days × symbols 的時間主序價格矩陣；各檔序列靠右對齊，最後一列是各自最新一根。
+
+    序列較短的代號前段補 0，`valid` 標示哪些格子是真實資料。
+    """
+
+    def __init__(self, series: list[CandleSeries]) -> None:
+        self.lengths = np.array([len(item) for item in series], dtype=np.int64)
+        days = int(self.lengths.max()) if len(series) else 0
+        self.start = days - self.lengths
+        shape = (days, len(series))
+        self.closes = np.zeros(shape)
+        self.highs = np.zeros(shape)
+        self.lows = np.zeros(shape)
+        for j, item in enumerate(series):
+            offset = int(self.start[j])
+            self.closes[offset:, j] = item.closes
+            self.highs[offset:, j] = item.highs
+            self.lows[offset:, j] = item.lows
+        self.valid = np.arange(days)[:, None] >= self.start[None, :]
+
+    @property
+    def days(self) -> int:
+        return self.closes.shape[0]
+
+
+def _builtin_sum(rows: Any) -> Any:
+    """沿第 0 軸逐列累加，運算順序與內建 sum() 對 float 的做法相同。
+
+    CPython 3.12 起 sum() 改用 Neumaier 補償加總，這裡照同一套步驟逐元素做。
+    """
+    total = np.zeros(rows.shape[1:])
+    if not _COMPENSATED_SUM:
+        for row in rows:
+            total = total + row
+        return total
+    comp = np.zeros_like(total)
+    with np.errstate(invalid="ignore"):
+        for row in rows:
+            step = total + row
+            comp = comp + np.where(np.abs(total) >= np.abs(row), (total - step) + row, (row - step) + total)
+            total = step
+        return np.where((comp != 0) & np.isfinite(comp), total + comp, total)
+
+
+def _sma(matrix: PriceMatrix, window: int) -> Any:
+    return _builtin_sum(matrix.closes[max(matrix.days - window, 0) :]) / window, matrix.lengths >= window
+
+
+def _wilder(matrix: PriceMatrix, values: Any, window: int) -> Any:
+    # values[t] 是第 t 日相對前一日的量；各檔第一個差分在 start + 1。
+    # 種子取前 window 個差分的 sum() / window，之後逐日 avg = (avg * (window - 1) + x) / window，與 factors.py 同序。
+    first = matrix.start + 1
+    rows = np.minimum(first[None, :] + np.arange(window)[:, None], max(matrix.days - 1, 0))
+    avg = _builtin_sum(np.take_along_axis(values, rows, axis=0)) / window
+    smooth_from = first + window
+    for t in range(int(smooth_from.min()), matrix.days):
+        avg = np.where(t >= smooth_from, (avg * (window - 1) + values[t]) / window, avg)
+    return avg
+
+
+def _rsi(matrix: PriceMatrix, window: int) -> Any:
+    diffs = np.zeros_like(matrix.closes)
+    diffs[1:] = matrix.closes[1:] - matrix.closes[:-1]
+    avg_gain = _wilder(matrix, np.maximum(diffs, 0.0), window)
+    avg_loss = _wilder(matrix, np.maximum(-diffs, 0.0), window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100.0 - (100.0 / (1.0 + avg_gain / avg_loss))
+    return np.where(avg_loss == 0, 100.0, rsi), matrix.lengths >= window + 1
+
+
+def _atr(matrix: PriceMatrix, window: int) -> Any:
+    ranges = np.zeros_like(matrix.closes)
+    high, low, prev_close = matrix.highs[1:], matrix.lows[1:], matrix.closes[:-1]
+    ranges[1:] = np.maximum(np.maximum(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+    return _wilder(matrix, ranges, window), matrix.lengths >= window + 1
+
+
+def _volatility(matrix: PriceMatrix, window: int) -> Any:
+    ok = matrix.lengths >= window + 1
+    first = max(matrix.days - window, 1)
+    prev = matrix.closes[first - 1 : -1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = (matrix.closes[first:] - prev) / prev
+    mean = _builtin_sum(returns) / window
+    deviations = (returns - mean)[:, ok]
+    # factors.py 用 `x ** 2`（libm pow），與 x * x 偶有最後一位差異；平方逐元素走 Python float。
+    squares = np.zeros_like(returns)
+    squares[:, ok] = np.array([x ** 2 for x in deviations.ravel().tolist()]).reshape(deviations.shape)
+    variance = _builtin_sum(squares) / window
+    return np.sqrt(variance) * np.sqrt(252.0) * 100.0, ok
+
+
+def _momentum(matrix: PriceMatrix, lookback: int) -> Any:
+    if matrix.days <= lookback:
+        return np.zeros(matrix.closes.shape[1]), np.zeros(matrix.closes.shape[1], dtype=bool)
+    base = matrix.closes[matrix.days - lookback - 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = (matrix.closes[-1] / base - 1.0) * 100.0
+    return values, (matrix.lengths > lookback) & (base != 0)
+
+
+def compute_factor_table(series_map: dict[Hashable, CandleSeries | list[dict[str, Any]]]) -> dict[Hashable, dict[str, float | None]]:
+    """一次算出所有代號的 SMA / RSI / ATR / 波動度 / 動能，結果與 factors.py 逐檔計算逐位元相同。
+
+    前一日收盤為 0 的代號，報酬序列會跳日，波動度改回逐檔參考實作。
+    """
+    keys = list(series_map)
+    series = [CandleSeries.coerce(series_map[key]) for key in keys]
+    if np is None or not any(len(item) for item in series):
+        return {key: reference_factors(item) for key, item in zip(keys, series)}
+
+    matrix = PriceMatrix(series)
+    columns: dict[str, tuple[Any, Any]] = {f"sma{w}": _sma(matrix, w) for w in SMA_WINDOWS}
+    columns[f"rsi{RSI_WINDOW}"] = _rsi(matrix, RSI_WINDOW)
+    columns[f"atr{ATR_WINDOW}"] = _atr(matrix, ATR_WINDOW)
+    columns[f"volatility{VOLATILITY_WINDOW}"] = _volatility(matrix, VOLATILITY_WINDOW)
+    for n in MOMENTUM_LOOKBACKS:
+        columns[f"momentum{n}"] = _momentum(matrix, n)
+
+    zero_prev = ((matrix.closes[:-1] == 0) & matrix.valid[:-1]).any(axis=0) if matrix.days > 1 else np.zeros(len(keys), dtype=bool)
+    table: dict[Hashable, dict[str, float | None]] = {key: {} for key in keys}
+    for name, (values, ok) in columns.items():
+        for key, value, flag in zip(keys, values.tolist(), ok.tolist()):
+            table[key][name] = value if flag else None
+    for j in np.flatnonzero(zero_prev).tolist():
+        table[keys[j]][f"volatility{VOLATILITY_WINDOW}"] = volatility_annualized(series[j].closes, VOLATILITY_WINDOW)
+    return table
@@ -3,6 +3,8 @@ from __future__ import annotations
 import math
 from typing import Any
 
+from src.analysis.candles import CandleSeries
+
 
 def safe_float(value: Any) -> float | None:
     if value is None:
@@ -49,14 +51,16 @@ def rsi_wilder(closes: list[float], window: int = 14) -> float | None:
     return 100.0 - (100.0 / (1.0 + rs))
 
 
-def atr_wilder(candles: list[dict[str, Any]], window: int = 14) -> float | None:
+def atr_wilder(candles: CandleSeries | list[dict[str, Any]], window: int = 14) -> float | None:
     if len(candles) < window + 1:
         return None
+    series = CandleSeries.coerce(candles)
+    highs, lows, closes = series.highs, series.lows, series.closes
     true_ranges: list[float] = []
-    for i in range(1, len(candles)):
-        high = float(candles[i]["high"])
-        low = float(candles[i]["low"])
-        prev_close = float(candles[i - 1]["close"])
+    for i in range(1, len(highs)):
+        high = highs[i]
+        low = lows[i]
+        prev_close = closes[i - 1]
         true_ranges.append(max(high - low, abs(high - prev_close), abs(low - prev_close)))
     atr_value = sum(true_ranges[:window]) / window
     for i in range(window, len(true_ranges)):
@@ -73,6 +77,10 @@ def volatility_annualized(closes: list[float], window: int = 20) -> float | None
         if prev == 0:
             continue
         returns.append((closes[i] - prev) / prev)
+    return volatility_from_returns(returns, window)
+
+
+def volatility_from_returns(returns: list[float], window: int = 20) -> float | None:
     if len(returns) < window:
         return None
     chunk = returns[-window:]
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+from array import array
+from collections.abc import Mapping
+from typing import Any, Iterable, Iterator
+
+# set_column 的輸入中標示「這一列沒有這個欄位」，與值為 None 區分（評分時缺欄位不算缺值）。
+ABSENT: Any = object()
+
+
+def _bitmap(size: int) -> bytearray:
+    return bytearray((size + 7) // 8)
+
+
+def _bit(bitmap: bytearray | None, index: int) -> bool:
+    return bitmap is not None and bool(bitmap[index >> 3] & (1 << (index & 7)))
+
+
+def _set_bit(bitmap: bytearray, index: int) -> None:
+    bitmap[index >> 3] |= 1 << (index & 7)
+
+
+class SymbolTable:
+    """代號 ↔ 整數 id 的對照；同一批回測快照共用一張表，持股比對只比整數。"""
+
+    __slots__ = ("names", "_ids")
+
+    def __init__(self) -> None:
+        self.names: list[str] = []
+        self._ids: dict[str, int] = {}
+
+    def intern(self, symbol: str) -> int:
+        symbol_id = self._ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = self._ids[symbol] = len(self.names)
+            self.names.append(symbol)
+        return symbol_id
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+class FrameRow(Mapping):
+    """FactorFrame 單列的唯讀視圖；介面與 dict 列相同，但不複製任何值。"""
+
+    __slots__ = ("_frame", "_index")
+
+    def __init__(self, frame: FactorFrame, index: int) -> None:
+        self._frame = frame
+        self._index = index
+
+    def __getitem__(self, key: str) -> Any:
+        if not self._frame.has(self._index, key):
+            raise KeyError(key)
+        return self._frame.value(self._index, key)
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self._frame.has(self._index, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return (name for name in self._frame.columns if self._frame.has(self._index, name))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"FrameRow({dict(self)!r})"
+
+
+class FactorFrame:
+    """欄式因子表：float / int 欄各是一個 typed array，缺值記在 null bitmap；代號存成整數 id。
+
+    字串、list、dict 或型別混雜的欄位放在 object 欄。from_rows / to_rows 是與 dict 列互轉的相容轉接。
+    """
+
+    __slots__ = ("table", "symbol_ids", "columns", "_data", "_nulls", "_absent")
+
+    def __init__(self, symbols: Iterable[str] = (), table: SymbolTable | None = None) -> None:
+        self.table = table if table is not None else SymbolTable()
+        self.symbol_ids = array("i", (self.table.intern(symbol) for symbol in symbols))
+        self.columns: list[str] = ["symbol"]
+        self._data: dict[str, Any] = {}
+        self._nulls: dict[str, bytearray] = {}
+        self._absent: dict[str, bytearray] = {}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Mapping[str, Any]], table: SymbolTable | None = None) -> FactorFrame:
+        rows = list(rows)
+        frame = cls((str(row["symbol"]) for row in rows), table)
+        names: dict[str, None] = {}
+        for row in rows:
+            names.update(dict.fromkeys(row))
+        for name in names:
+            if name != "symbol":
+                frame.set_column(name, (row[name] if name in row else ABSENT for row in rows))
+        return frame
+
+    def __len__(self) -> int:
+        return len(self.symbol_ids)
+
+    @property
+    def symbols(self) -> list[str]:
+        names = self.table.names
+        return [names[symbol_id] for symbol_id in self.symbol_ids]
+
+    def set_column(self, name: str, values: Iterable[Any]) -> None:
+        if name == "symbol":
+            raise ValueError("symbol 欄位由建構時的代號決定，不能覆寫")
+        size = len(self)
+        values = list(values)
+        if len(values) != size:
+            raise ValueError(f"欄位 {name} 長度 {len(values)} 與資料列數 {size} 不一致")
+        nulls = _bitmap(size)
+        absent: bytearray | None = None
+        kinds: set[type] = set()
+        for i, value in enumerate(values):
+            if value is ABSENT:
+                if absent is None:
+                    absent = _bitmap(size)
+                _set_bit(absent, i)
+                _set_bit(nulls, i)
+                values[i] = None
+            elif value is None:
+                _set_bit(nulls, i)
+            else:
+                kinds.add(type(value))
+        data: Any = values
+        if kinds == {float}:
+            data = array("d", (0.0 if value is None else value for value in values))
+        elif kinds == {int}:
+            try:
+                data = array("q", (0 if value is None else value for value in values))
+            except OverflowError:
+                # 超出 64-bit 的整數留在 object 欄，保留原值。
+                data = values
+        if name not in self._data:
+            self.columns.append(name)
+        self._data[name] = data
+        self._nulls[name] = nulls
+        if absent is None:
+            self._absent.pop(name, None)
+        else:
+            self._absent[name] = absent
+
+    def has(self, index: int, name: str) -> bool:
+        if name == "symbol":
+            return True
+        return name in self._data and not _bit(self._absent.get(name), index)
+
+    def value(self, index: int, name: str, default: Any = None) -> Any:
+        if name == "symbol":
+            return self.table.names[self.symbol_ids[index]]
+        data = self._data.get(name)
+        if data is None or _bit(self._absent.get(name), index):
+            return default
+        if _bit(self._nulls[name], index):
+            return None
+        return data[index]
+
+    def column(self, name: str) -> list[Any]:
+        """整欄取出，缺值為 None；不存在的欄位回傳全 None，與 dict 列的 row.get 相同。"""
+        if name == "symbol":
+            return self.symbols
+        data = self._data.get(name)
+        if data is None:
+            return [None] * len(self)
+        nulls = self._nulls[name]
+        absent = self._absent.get(name)
+        if not any(nulls):
+            return list(data)
+        return [None if _bit(nulls, i) or _bit(absent, i) else value for i, value in enumerate(data)]
+
+    def present(self, name: str) -> list[bool] | None:
+        """該欄在各列是否存在（對應 dict 列的 `key in row`）；整欄都存在時回傳 None。"""
+        if name not in self._data:
+            return [False] * len(self)
+        absent = self._absent.get(name)
+        if absent is None:
+            return None
+        return [not _bit(absent, i) for i in range(len(self))]
+
+    def numeric(self, name: str) -> tuple[array, bytearray]:
+        """回傳 typed array 與 null bitmap，給向量化運算直接使用；非數值欄位丟出 TypeError。"""
+        data = self._data[name]
+        if not isinstance(data, array):
+            raise TypeError(f"欄位 {name} 不是數值欄")
+        return data, self._nulls[name]
+
+    def take(self, indices: Iterable[int]) -> FactorFrame:
+        indices = list(indices)
+        frame = FactorFrame(table=self.table)
+        frame.symbol_ids = array("i", (self.symbol_ids[i] for i in indices))
+        frame.columns = list(self.columns)
+        for name, data in self._data.items():
+            picked = [data[i] for i in indices]
+            frame._data[name] = array(data.typecode, picked) if isinstance(data, array) else picked
+            for source, target in ((self._nulls, frame._nulls), (self._absent, frame._absent)):
+                bitmap = source.get(name)
+                if bitmap is None:
+                    continue
+                copied = _bitmap(len(indices))
+                if not any(bitmap):
+                    target[name] = copied
+                    continue
+                for j, i in enumerate(indices):
+                    if _bit(bitmap, i):
+                        _set_bit(copied, j)
+                target[name] = copied
+        return frame
+
+    def __getitem__(self, index: int | slice) -> Any:
+        if isinstance(index, slice):
+            return self.take(range(*index.indices(len(self))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return FrameRow(self, index)
+
+    def __iter__(self) -> Iterator[FrameRow]:
+        return (FrameRow(self, i) for i in range(len(self)))
+
+    def to_rows(self) -> list[dict[str, Any]]:
+        return [dict(row) for row in self]
+
+    def __repr__(self) -> str:
+        return f"FactorFrame({len(self)} rows, {len(self.columns)} columns)"
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import deque
+from datetime import date
+from typing import Any
+
+from src.analysis.candles import CandleSeries
+from src.analysis.factor_kernel import ATR_WINDOW, MOMENTUM_LOOKBACKS, RSI_WINDOW, SMA_WINDOWS, VOLATILITY_WINDOW
+from src.analysis.factors import sma, volatility_from_returns
+
+STATE_VERSION = 2
+_CLOSE_HISTORY = max(*SMA_WINDOWS, *(n + 1 for n in MOMENTUM_LOOKBACKS))
+
+FULL = "full"
+INCREMENTAL = "incremental"
+UNCHANGED = "unchanged"
+
+
+class IndicatorState:
+    """單一代號的指標累計狀態；每多一根日線只做 O(1) 更新。
+
+    RSI / ATR 的 Wilder 平滑從第一次處理的那根開始一路延續，不再隨回看視窗起點漂移；
+    SMA / 波動度 / 動能只保留最近的收盤與報酬，取值時直接用 factors.py 的公式重算，不累積捨入誤差。
+    """
+
+    __slots__ = (
+        "last_date",
+        "bars",
+        "prev_close",
+        "gain_seed",
+        "loss_seed",
+        "avg_gain",
+        "avg_loss",
+        "range_seed",
+        "atr",
+        "closes",
+        "returns",
+    )
+
+    def __init__(self) -> None:
+        self.last_date: int | None = None
+        self.bars = 0
+        self.prev_close = 0.0
+        self.gain_seed = 0.0
+        self.loss_seed = 0.0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.range_seed = 0.0
+        self.atr = 0.0
+        self.closes: deque[float] = deque(maxlen=_CLOSE_HISTORY)
+        self.returns: deque[float] = deque(maxlen=VOLATILITY_WINDOW)
+
+    def update(self, day: int, high: float, low: float, close: float) -> None:
+        if self.bars:
+            prev = self.prev_close
+            diff = close - prev
+            gain, loss = max(diff, 0.0), max(-diff, 0.0)
+            true_range = max(high - low, abs(high - prev), abs(low - prev))
+            k = self.bars - 1
+            if k < RSI_WINDOW:
+                self.gain_seed += gain
+                self.loss_seed += loss
+                if k == RSI_WINDOW - 1:
+                    self.avg_gain = self.gain_seed / RSI_WINDOW
+                    self.avg_loss = self.loss_seed / RSI_WINDOW
+            else:
+                self.avg_gain = (self.avg_gain * (RSI_WINDOW - 1) + gain) / RSI_WINDOW
+                self.avg_loss = (self.avg_loss * (RSI_WINDOW - 1) + loss) / RSI_WINDOW
+            if k < ATR_WINDOW:
+                self.range_seed += true_range
+                if k == ATR_WINDOW - 1:
+                    self.atr = self.range_seed / ATR_WINDOW
+            else:
+                self.atr = (self.atr * (ATR_WINDOW - 1) + true_range) / ATR_WINDOW
+            if prev != 0:
+                self.returns.append((close - prev) / prev)
+        self.closes.append(close)
+        self.prev_close = close
+        self.bars += 1
+        self.last_date = day
+
+    def factors(self) -> dict[str, float | None]:
+        closes = list(self.closes)
+        payload: dict[str, float | None] = {f"sma{w}": sma(closes, w) for w in SMA_WINDOWS}
+        rsi = None
+        if self.bars >= RSI_WINDOW + 1:
+            rsi = 100.0 if self.avg_loss == 0 else 100.0 - (100.0 / (1.0 + self.avg_gain / self.avg_loss))
+        payload[f"rsi{RSI_WINDOW}"] = rsi
+        payload[f"atr{ATR_WINDOW}"] = self.atr if self.bars >= ATR_WINDOW + 1 else None
+        payload[f"volatility{VOLATILITY_WINDOW}"] = volatility_from_returns(list(self.returns), VOLATILITY_WINDOW)
+        for n in MOMENTUM_LOOKBACKS:
+            base = self.closes[-n - 1] if len(self.closes) > n else 0.0
+            payload[f"momentum{n}"] = (self.closes[-1] / base - 1.0) * 100.0 if base != 0 else None
+        return payload
+
+    def to_payload(self) -> dict[str, Any]:
+        return {
+            "version": STATE_VERSION,
+            "last_date": self.last_date,
+            "bars": self.bars,
+            "prev_close": self.prev_close,
+            "gain_seed": self.gain_seed,
+            "loss_seed": self.loss_seed,
+            "avg_gain": self.avg_gain,
+            "avg_loss": self.avg_loss,
+            "range_seed": self.range_seed,
+            "atr": self.atr,
+            "closes": list(self.closes),
+            "returns": list(self.returns),
+        }
+
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any]) -> IndicatorState | None:
+        if payload.get("version") != STATE_VERSION:
+            return None
+        state = cls()
+        for name in ("last_date", "bars", "prev_close", "gain_seed", "loss_seed", "avg_gain", "avg_loss", "range_seed", "atr"):
+            setattr(state, name, payload[name])
+        state.closes.extend(payload["closes"])
+        state.returns.extend(payload["returns"])
+        return state
+
+
+def advance_state(
+    state: IndicatorState | None,
+    candles: CandleSeries,
+    force_recompute: bool = False,
+) -> tuple[IndicatorState, str]:
+    """把狀態推進到 candles 的最後一根。
+
+    找不到上次處理日、重疊區段的收盤與狀態不符（歷史被修正）或 force_recompute 時，改用 candles 全量重算。
+    """
+    start = None
+    if state is not None and state.last_date is not None and not force_recompute:
+        index = bisect_left(candles.dates, state.last_date)
+        if index < len(candles) and candles.dates[index] == state.last_date:
+            overlap = min(len(state.closes), index + 1)
+            if list(candles.closes[index + 1 - overlap : index + 1]) == list(state.closes)[-overlap:]:
+                start = index + 1
+    mode = INCREMENTAL
+    if start is None:
+        state, start, mode = IndicatorState(), 0, FULL
+    elif start == len(candles):
+        mode = UNCHANGED
+    for i in range(start, len(candles)):
+        state.update(candles.dates[i], candles.highs[i], candles.lows[i], candles.closes[i])
+    return state, mode
+
+
+def state_last_date(state: IndicatorState) -> date | None:
+    return date.fromordinal(state.last_date) if state.last_date is not None else None
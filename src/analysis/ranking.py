@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from typing import Any, Callable, Iterable
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float))
+
+
+class PercentileColumn:
+    """排序一次、之後以二分搜尋給分的 percentile_rank；結果與 factors.percentile_rank 相同。
+
+    NaN 仍計入母體長度，但與任何值比較都不成立，因此不計入 `x <= current` 的個數。
+    """
+
+    __slots__ = ("_sorted", "_size")
+
+    def __init__(self, values: Iterable[float]) -> None:
+        values = list(values)
+        self._size = len(values)
+        self._sorted = sorted(value for value in values if value == value)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def rank(self, current: float | None) -> float | None:
+        if current is None or not self._size:
+            return None
+        count = bisect_right(self._sorted, current) if current == current else 0
+        return (count / self._size) * 100.0
+
+
+def percentile_column(
+    rows: Iterable[dict[str, Any]],
+    key: str,
+    include: Callable[[float], bool] | None = None,
+) -> PercentileColumn:
+    # 非數值欄位即為遮罩；include 可再排除母體（例如 PE <= 0）。
+    return PercentileColumn(
+        row[key] for row in rows if _is_number(row.get(key)) and (include is None or include(row[key]))
+    )
+
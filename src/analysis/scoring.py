@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from typing import Any
 
+from src.analysis.frame import FactorFrame
 
 WEIGHTS = {
     "trend_score": 0.28,
@@ -20,78 +21,161 @@ def _safe_number(value: Any) -> float | None:
     return None
 
 
-def score_candidates(
-    rows: list[dict[str, Any]],
-    weights: dict[str, float] | None = None,
-) -> list[dict[str, Any]]:
-    active_weights = weights or WEIGHTS
-    scored: list[dict[str, Any]] = []
-    for row in rows:
-        weighted_sum = 0.0
-        covered_weight = 0.0
-        missing_flags: list[str] = []
-        factor_breakdown: dict[str, dict[str, float]] = {}
+def _score_row(row: dict[str, Any], active_weights: dict[str, float]) -> dict[str, Any]:
+    weighted_sum = 0.0
+    covered_weight = 0.0
+    missing_flags: list[str] = []
+    factor_breakdown: dict[str, dict[str, float]] = {}
+
+    for key, weight in active_weights.items():
+        if key not in row:
+            continue
+        score = _safe_number(row.get(key))
+        if score is None:
+            missing_flags.append(f"missing:{key}")
+            continue
+        weighted_sum += score * weight
+        covered_weight += weight
+        factor_breakdown[key] = {
+            "score": round(score, 2),
+            "weight": round(weight, 4),
+            "contribution": round(score * weight, 2),
+        }
+    return _finish_score(
+        weighted_sum,
+        covered_weight,
+        missing_flags,
+        factor_breakdown,
+        row.get("quality_fetch_status"),
+        row.get("quality_missing_reason"),
+        row.get("volatility20"),
+        row.get("liquidity20"),
+        row.get("data_quality_flags"),
+    )
+
+
+def _finish_score(
+    weighted_sum: float,
+    covered_weight: float,
+    missing_flags: list[str],
+    factor_breakdown: dict[str, dict[str, float]],
+    quality_fetch_status: Any,
+    quality_missing_reason: Any,
+    volatility20: Any,
+    liquidity20: Any,
+    extra_flags: Any,
+) -> dict[str, Any]:
+    missing_factor_count = len(missing_flags)
+    idea_score = round((weighted_sum / covered_weight), 2) if covered_weight > 0 else 0.0
+    factor_coverage_confidence = max(20.0, round((covered_weight * 100.0) - (missing_factor_count * 6.0), 2))
+    data_freshness_confidence = 100.0
+    data_quality_flags = list(missing_flags)
+    quality_status = str(quality_fetch_status or "").strip().lower()
+    quality_missing_reason = str(quality_missing_reason or "").strip().lower()
+    if quality_status == "partial":
+        data_freshness_confidence -= 12.0
+    elif quality_status == "unavailable":
+        data_freshness_confidence -= 22.0
+    elif quality_status == "fetch_failed":
+        data_freshness_confidence -= 35.0
+    if quality_missing_reason == "previous_period_unavailable":
+        data_freshness_confidence -= 8.0
+    if quality_missing_reason == "fetch_failed":
+        data_quality_flags.append("quality:fetch_failed")
+    if quality_missing_reason == "unavailable":
+        data_quality_flags.append("quality:unavailable")
+    if covered_weight < 0.75:
+        data_quality_flags.append("partial-factor-coverage")
+    volatility20 = _safe_number(volatility20)
+    if volatility20 is not None and volatility20 >= 80:
+        data_quality_flags.append("extreme-volatility")
+    liquidity20 = _safe_number(liquidity20)
+    if liquidity20 is not None and liquidity20 <= 0:
+        data_quality_flags.append("no-liquidity-signal")
+    extra_flags = extra_flags or []
+    if isinstance(extra_flags, list):
+        data_quality_flags.extend(str(flag) for flag in extra_flags if str(flag))
+    data_quality_flags = list(dict.fromkeys(data_quality_flags))
+    if "data:stale_cache" in data_quality_flags:
+        data_freshness_confidence -= 10.0
+    data_freshness_confidence = max(25.0, round(data_freshness_confidence, 2))
+    confidence_score = round(((factor_coverage_confidence * 0.7) + (data_freshness_confidence * 0.3)), 2)
+    rank_score = round(idea_score * (confidence_score / 100.0), 2)
+    return {
+        "idea_score": idea_score,
+        "rank_score": rank_score,
+        "total_score": rank_score,
+        "confidence_score": confidence_score,
+        "factor_coverage_confidence": factor_coverage_confidence,
+        "data_freshness_confidence": data_freshness_confidence,
+        "missing_factor_count": missing_factor_count,
+        "data_quality_flags": data_quality_flags,
+        "factor_breakdown": factor_breakdown,
+    }
 
-        for key, weight in active_weights.items():
-            if key not in row:
+
+def _score_frame(frame: FactorFrame, active_weights: dict[str, float]) -> FactorFrame:
+    # 逐因子欄累加，每列的加總順序與 dict 列相同，分數逐位元一致。
+    size = len(frame)
+    weighted_sums = [0.0] * size
+    covered_weights = [0.0] * size
+    missing_flags: list[list[str]] = [[] for _ in range(size)]
+    breakdowns: list[dict[str, dict[str, float]]] = [{} for _ in range(size)]
+    for key, weight in active_weights.items():
+        if key not in frame.columns:
+            continue
+        present = frame.present(key)
+        for i, value in enumerate(frame.column(key)):
+            if present is not None and not present[i]:
                 continue
-            score = _safe_number(row.get(key))
+            score = _safe_number(value)
             if score is None:
-                missing_flags.append(f"missing:{key}")
+                missing_flags[i].append(f"missing:{key}")
                 continue
-            weighted_sum += score * weight
-            covered_weight += weight
-            factor_breakdown[key] = {
+            weighted_sums[i] += score * weight
+            covered_weights[i] += weight
+            breakdowns[i][key] = {
                 "score": round(score, 2),
                 "weight": round(weight, 4),
                 "contribution": round(score * weight, 2),
             }
+    results = [
+        _finish_score(*args)
+        for args in zip(
+            weighted_sums,
+            covered_weights,
+            missing_flags,
+            breakdowns,
+            frame.column("quality_fetch_status"),
+            frame.column("quality_missing_reason"),
+            frame.column("volatility20"),
+            frame.column("liquidity20"),
+            frame.column("data_quality_flags"),
+        )
+    ]
+    order = sorted(range(size), key=lambda i: (results[i]["rank_score"], results[i]["idea_score"]), reverse=True)
+    ranked = frame.take(order)
+    for name in results[0] if results else ():
+        ranked.set_column(name, (results[i][name] for i in order))
+    return ranked
 
-        missing_factor_count = len(missing_flags)
-        idea_score = round((weighted_sum / covered_weight), 2) if covered_weight > 0 else 0.0
-        factor_coverage_confidence = max(20.0, round((covered_weight * 100.0) - (missing_factor_count * 6.0), 2))
-        data_freshness_confidence = 100.0
-        data_quality_flags = list(missing_flags)
-        quality_status = str(row.get("quality_fetch_status") or "").strip().lower()
-        quality_missing_reason = str(row.get("quality_missing_reason") or "").strip().lower()
-        if quality_status == "partial":
-            data_freshness_confidence -= 12.0
-        elif quality_status == "unavailable":
-            data_freshness_confidence -= 22.0
-        elif quality_status == "fetch_failed":
-            data_freshness_confidence -= 35.0
-        if quality_missing_reason == "previous_period_unavailable":
-            data_freshness_confidence -= 8.0
-        if quality_missing_reason == "fetch_failed":
-            data_quality_flags.append("quality:fetch_failed")
-        if quality_missing_reason == "unavailable":
-            data_quality_flags.append("quality:unavailable")
-        if covered_weight < 0.75:
-            data_quality_flags.append("partial-factor-coverage")
-        volatility20 = _safe_number(row.get("volatility20"))
-        if volatility20 is not None and volatility20 >= 80:
-            data_quality_flags.append("extreme-volatility")
-        liquidity20 = _safe_number(row.get("liquidity20"))
-        if liquidity20 is not None and liquidity20 <= 0:
-            data_quality_flags.append("no-liquidity-signal")
-        extra_flags = row.get("data_quality_flags") or []
-        if isinstance(extra_flags, list):
-            data_quality_flags.extend(str(flag) for flag in extra_flags if str(flag))
-        data_quality_flags = list(dict.fromkeys(data_quality_flags))
-        data_freshness_confidence = max(25.0, round(data_freshness_confidence, 2))
-        confidence_score = round(((factor_coverage_confidence * 0.7) + (data_freshness_confidence * 0.3)), 2)
-        rank_score = round(idea_score * (confidence_score / 100.0), 2)
-        enriched = {
-            **row,
-            "idea_score": idea_score,
-            "rank_score": rank_score,
-            "total_score": rank_score,
-            "confidence_score": confidence_score,
-            "factor_coverage_confidence": factor_coverage_confidence,
-            "data_freshness_confidence": data_freshness_confidence,
-            "missing_factor_count": missing_factor_count,
-            "data_quality_flags": data_quality_flags,
-            "factor_breakdown": factor_breakdown,
-        }
-        scored.append(enriched)
+
+def score_candidates(
+    rows: list[dict[str, Any]] | FactorFrame,
+    weights: dict[str, float] | None = None,
+    in_place: bool = False,
+) -> list[dict[str, Any]] | FactorFrame:
+    """傳入 FactorFrame 時逐欄評分並回傳排序後的新 frame；dict 列維持原本的輸入輸出。
+
+    in_place=True 時分數直接寫回傳入的 dict 列，回傳同一批物件排序後的 list，不另外複製整列。
+    """
+    active_weights = weights or WEIGHTS
+    if isinstance(rows, FactorFrame):
+        return _score_frame(rows, active_weights)
+    if in_place:
+        for row in rows:
+            row.update(_score_row(row, active_weights))
+        scored = list(rows)
+    else:
+        scored = [{**row, **_score_row(row, active_weights)} for row in rows]
     return sorted(scored, key=lambda x: (x["rank_score"], x["idea_score"]), reverse=True)
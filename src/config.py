@@ -17,6 +17,8 @@ DEFAULT_CONFIG: dict[str, Any] = {
     },
     "filters": {"min_monthly_revenue": 0.0},
     "theme_overrides": {},
+    "network": {"rate_limits": {}},
+    "cache": {"max_mb": 512, "stale_while_revalidate": False, "max_stale_hours": 72},
 }
 
 
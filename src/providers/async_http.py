@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import asyncio
+import ssl
+from urllib.error import HTTPError
+from urllib.parse import urljoin, urlsplit
+from urllib.request import Request
+
+from src.providers.http_pool import MAX_REDIRECTS, HttpResponse, decode_body
+
+
+REUSE_RETRY_ERRORS = (asyncio.IncompleteReadError, ConnectionResetError, BrokenPipeError, ConnectionAbortedError)
+
+_Stream = tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class AsyncHttpTransport:
+    """asyncio 版 keep-alive 連線池，介面與 PooledHttpTransport 相同。"""
+
+    def __init__(self, timeout: float = 10.0, max_idle_per_host: int = 8) -> None:
+        self.timeout = timeout
+        self.max_idle_per_host = max(1, int(max_idle_per_host))
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._idle: dict[tuple[str, str, int, bool], list[_Stream]] = {}
+        self._stats: dict[str, dict[str, int]] = {}
+
+    async def request(self, req: Request, context: ssl.SSLContext | None = None) -> HttpResponse:
+        self._bind_loop()
+        url = req.full_url
+        method = req.get_method()
+        body = bytes(req.data) if isinstance(req.data, (bytes, bytearray)) else None
+        headers = {key: value for key, value in req.header_items()}
+        for _ in range(MAX_REDIRECTS + 1):
+            response = await asyncio.wait_for(self._send(url, method, body, headers, context), self.timeout)
+            if response.status in {301, 302, 303, 307, 308} and response.headers.get("location"):
+                url = urljoin(url, response.headers["location"])
+                if response.status in {301, 302, 303} and method == "POST":
+                    method = "GET"
+                    body = None
+                    headers = {key: value for key, value in headers.items() if key.lower() != "content-type"}
+                continue
+            if response.status >= 400:
+                raise HTTPError(url, response.status, f"HTTP {response.status}", response.headers, None)
+            return response
+        raise RuntimeError(f"HTTP 重新導向次數過多：{req.full_url}")
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {host: dict(values) for host, values in sorted(self._stats.items())}
+
+    async def close(self) -> None:
+        pools = list(self._idle.values())
+        self._idle.clear()
+        for pool in pools:
+            for _, writer in pool:
+                writer.close()
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # 連線綁定在建立它的 event loop 上，換 loop 時舊的閒置連線不能再用。
+            self._idle.clear()
+            self._loop = loop
+
+    async def _send(
+        self,
+        url: str,
+        method: str,
+        body: bytes | None,
+        headers: dict[str, str],
+        context: ssl.SSLContext | None,
+    ) -> HttpResponse:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower() or "http"
+        host = parts.hostname or ""
+        port = parts.port or (443 if scheme == "https" else 80)
+        pool_key = (scheme, host, port, context is not None)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        host_header = host if parts.port is None else f"{host}:{port}"
+        payload = _encode_request(method, path, host_header, body, headers)
+
+        stream, reused = await self._checkout(pool_key, context)
+        try:
+            status, response_headers, raw, keep_alive = await _exchange(stream, payload, method)
+        except REUSE_RETRY_ERRORS:
+            stream[1].close()
+            if not reused:
+                raise
+            # 伺服器已關閉閒置連線，改開新連線重送一次。
+            stream, reused = await self._new_connection(pool_key, context), False
+            try:
+                status, response_headers, raw, keep_alive = await _exchange(stream, payload, method)
+            except BaseException:
+                stream[1].close()
+                raise
+        except BaseException:
+            stream[1].close()
+            raise
+
+        if keep_alive:
+            self._checkin(pool_key, stream)
+        else:
+            stream[1].close()
+        self._record(host, reused=reused, wire_bytes=len(raw))
+        # 解壓縮可能處理數 MB 的全市場表，移出 event loop。
+        decoded = await asyncio.to_thread(decode_body, raw, response_headers.get("content-encoding", ""))
+        return HttpResponse(url, status, response_headers, decoded)
+
+    async def _checkout(
+        self,
+        pool_key: tuple[str, str, int, bool],
+        context: ssl.SSLContext | None,
+    ) -> tuple[_Stream, bool]:
+        pool = self._idle.get(pool_key)
+        while pool:
+            stream = pool.pop()
+            if not stream[0].at_eof() and not stream[1].is_closing():
+                return stream, True
+            stream[1].close()
+        return await self._new_connection(pool_key, context), False
+
+    def _checkin(self, pool_key: tuple[str, str, int, bool], stream: _Stream) -> None:
+        pool = self._idle.setdefault(pool_key, [])
+        if len(pool) < self.max_idle_per_host:
+            pool.append(stream)
+            return
+        stream[1].close()
+
+    async def _new_connection(
+        self,
+        pool_key: tuple[str, str, int, bool],
+        context: ssl.SSLContext | None,
+    ) -> _Stream:
+        scheme, host, port, _ = pool_key
+        self._host_stats(host)["connections_opened"] += 1
+        if scheme == "https":
+            tls = context or ssl.create_default_context()
+            return await asyncio.open_connection(host, port, ssl=tls, server_hostname=host)
+        return await asyncio.open_connection(host, port)
+
+    def _record(self, host: str, reused: bool, wire_bytes: int) -> None:
+        stats = self._host_stats(host)
+        stats["requests"] += 1
+        stats["wire_bytes"] += wire_bytes
+        if reused:
+            stats["connections_reused"] += 1
+
+    def _host_stats(self, host: str) -> dict[str, int]:
+        stats = self._stats.get(host)
+        if stats is None:
+            stats = {"requests": 0, "connections_opened": 0, "connections_reused": 0, "wire_bytes": 0}
+            self._stats[host] = stats
+        return stats
+
+
+def _encode_request(method: str, path: str, host_header: str, body: bytes | None, headers: dict[str, str]) -> bytes:
+    send_headers = {key.title(): value for key, value in headers.items()}
+    send_headers.setdefault("Host", host_header)
+    send_headers.setdefault("Accept-Encoding", "gzip, deflate")
+    send_headers.setdefault("Connection", "keep-alive")
+    if body is not None:
+        send_headers["Content-Length"] = str(len(body))
+    lines = [f"{method} {path} HTTP/1.1"] + [f"{key}: {value}" for key, value in send_headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b"")
+
+
+async def _exchange(stream: _Stream, payload: bytes, method: str) -> tuple[int, dict[str, str], bytes, bool]:
+    reader, writer = stream
+    writer.write(payload)
+    await writer.drain()
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise asyncio.IncompleteReadError(b"", None)
+    version, status_text, *_ = status_line.decode("latin-1").split(" ", 2) + [""]
+    status = int(status_text)
+    headers: dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+
+    keep_alive = version.strip().upper() == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+    if method == "HEAD" or status in {204, 304} or 100 <= status < 200:
+        raw = b""
+    elif "chunked" in headers.get("transfer-encoding", "").lower():
+        raw = await _read_chunked(reader)
+    elif "content-length" in headers:
+        raw = await reader.readexactly(int(headers["content-length"]))
+    else:
+        raw = await reader.read()
+        keep_alive = False
+    return status, headers, raw, keep_alive
+
+
+async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+    chunks: list[bytes] = []
+    while True:
+        size_line = await reader.readline()
+        size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+        if size == 0:
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            return b"".join(chunks)
+        chunks.append(await reader.readexactly(size))
+        await reader.readexactly(2)
@@ -0,0 +1,803 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import ssl
+import threading
+import time
+from datetime import date, datetime, timedelta
+from itertools import zip_longest
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Hashable, Iterable, TypeVar
+from urllib.parse import urlsplit
+from urllib.request import Request
+
+from src.analysis.candles import CandleSeries
+from src.providers import market_store
+from src.providers.async_http import AsyncHttpTransport
+from src.providers.replay_bundle import REPLAY
+from src.providers.singleflight import AsyncSingleFlight
+from src.providers.tw_market_provider import (
+    DEFAULT_CACHE_MAX_BYTES,
+    DEFAULT_MAX_STALE_SECONDS,
+    TPEX_BASICS_URL,
+    TPEX_REVENUE_URL,
+    TWSE_BASICS_URL,
+    TWSE_REVENUE_URL,
+    NotModified,
+    TwMarketProvider,
+    _shift_month,
+)
+from src.providers.universe import Universe
+from src.themes import theme_rule
+
+
+T = TypeVar("T")
+
+
+class AsyncTwMarketProvider:
+    """asyncio 版資料源，與 TwMarketProvider 共用磁碟快取、market store 與季報 SQLite。
+
+    請求、快取判斷與各資料集的組裝都是 event loop 上的 coroutine，不經過同步 provider 的網路路徑；
+    解析與落地沿用同步 provider 不碰網路的 helper，SQLite 讀寫與大型 JSON 解析以 asyncio.to_thread 移出 loop。
+    """
+
+    def __init__(
+        self,
+        timeout: float = 10.0,
+        cache_dir: Path | None = None,
+        per_host_concurrency: int = 4,
+        rate_limits: dict[str, float] | None = None,
+        provider: TwMarketProvider | None = None,
+        cache_max_bytes: int | None = DEFAULT_CACHE_MAX_BYTES,
+        stale_while_revalidate: bool = False,
+        max_stale_seconds: float = DEFAULT_MAX_STALE_SECONDS,
+        record_bundle: Path | None = None,
+        replay_bundle: Path | None = None,
+    ) -> None:
+        self.sync = provider or TwMarketProvider(
+            timeout=timeout,
+            cache_dir=cache_dir,
+            rate_limits=rate_limits,
+            cache_max_bytes=cache_max_bytes,
+            stale_while_revalidate=stale_while_revalidate,
+            max_stale_seconds=max_stale_seconds,
+            record_bundle=record_bundle,
+            replay_bundle=replay_bundle,
+        )
+        self.timeout = timeout
+        self.cache_dir = self.sync.cache_dir
+        self.quarterly_store_path = self.sync.quarterly_store_path
+        self.per_host_concurrency = max(1, int(per_host_concurrency))
+        self._http = AsyncHttpTransport(timeout=timeout, max_idle_per_host=self.per_host_concurrency)
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+        self._flights = AsyncSingleFlight()
+        self._refresh_tasks: set[asyncio.Task[None]] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def get_ohlcv(self, symbol: str, market: str, as_of: date, lookback: int = 252) -> CandleSeries:
+        cached = self.sync._cached_ohlcv(symbol, market, as_of, lookback)
+        if cached is not None:
+            return cached
+        return await self._flight(
+            ("ohlcv", symbol, market, as_of.isoformat(), lookback),
+            lambda: self._load_ohlcv_once(symbol, market, as_of, lookback),
+        )
+
+    async def get_ohlcv_batch(
+        self,
+        pairs: list[tuple[str, str]],
+        as_of: date,
+        lookback: int = 252,
+        errors: dict[tuple[str, str], Exception] | None = None,
+    ) -> dict[tuple[str, str], CandleSeries]:
+        unique_pairs = list(dict.fromkeys((str(symbol), str(market)) for symbol, market in pairs))
+        try:
+            await self.ingest_daily_quotes(unique_pairs, as_of)
+        except Exception:
+            # 全市場日報失敗時退回逐檔抓取。
+            pass
+        await self._prefetch_ohlcv_months(unique_pairs, as_of, lookback)
+        outcomes = await gather_limited(
+            (self.get_ohlcv(symbol, market, as_of=as_of, lookback=lookback) for symbol, market in unique_pairs),
+            return_exceptions=True,
+        )
+        results: dict[tuple[str, str], CandleSeries] = {}
+        for pair, outcome in zip(unique_pairs, outcomes):
+            if isinstance(outcome, BaseException) and not isinstance(outcome, Exception):
+                # ReplayMiss 等非 Exception 的中止訊號不能被當成單檔失敗。
+                raise outcome
+            if isinstance(outcome, Exception):
+                if errors is not None:
+                    errors[pair] = outcome
+                continue
+            results[pair] = outcome
+        return results
+
+    async def ingest_daily_quotes(self, pairs: list[tuple[str, str]], as_of: date) -> list[dict[str, Any]]:
+        """以全市場日報補齊未收盤月份，規則同 TwMarketProvider.ingest_daily_quotes。"""
+        anchor = date(as_of.year, as_of.month, 1)
+        key = market_store.month_key(anchor)
+        unique_pairs = list(dict.fromkeys(pairs))
+        coverages = await asyncio.to_thread(self._month_coverages, unique_pairs)
+        stale: dict[str, list[date]] = {}
+        for (_, market), coverage in zip(unique_pairs, coverages):
+            month_coverage = coverage.get(key)
+            if month_coverage is None or not await self._month_needs_fetch(market, month_coverage, anchor, as_of):
+                continue
+            covered_through = month_coverage.get("covered_through")
+            stale.setdefault(market, []).append(
+                date.fromisoformat(covered_through) if covered_through else anchor - timedelta(days=1)
+            )
+        results: list[dict[str, Any]] = []
+        for market, covered in stale.items():
+            days = await self._missing_market_days(market, min(covered), as_of)
+            if not days or len(days) >= len(covered):
+                continue
+            for trade_date in days:
+                result = await self._ingest_market_day(market, trade_date)
+                if result is not None:
+                    results.append(result)
+        return results
+
+    async def update_indicator_states(
+        self,
+        candle_map: dict[tuple[str, str], CandleSeries],
+        force_recompute: bool = False,
+    ) -> tuple[dict[tuple[str, str], dict[str, float | None]], dict[str, int]]:
+        # 純本機計算與 market store 讀寫，不需要網路。
+        return await asyncio.to_thread(self.sync.update_indicator_states, candle_map, force_recompute)
+
+    async def get_latest_valuation(
+        self,
+        symbol: str,
+        market: str,
+        as_of: date,
+        max_backtrack_days: int = 20,
+    ) -> dict[str, float] | None:
+        calendar = await self.trading_days(as_of - timedelta(days=max_backtrack_days), as_of)
+        for d in self.sync._probe_order(as_of, max_backtrack_days, calendar):
+            table = await self._get_valuation_table(market, d)
+            if symbol in table:
+                return table[symbol]
+        return None
+
+    async def get_taiex_series(self, as_of: date, lookback: int = 252) -> list[dict[str, Any]]:
+        collected: dict[date, dict[str, Any]] = {}
+        cursor = date(as_of.year, as_of.month, 1)
+        months_checked = 0
+        while months_checked < 36 and len(collected) < (lookback + 10):
+            for d, close, chg_pts in self.sync._fmtqik_rows(await self._fmtqik_payload(cursor)) or []:
+                if d > as_of:
+                    continue
+                collected[d] = {"date": d, "close": close, "change_points": chg_pts}
+            cursor = _shift_month(cursor, -1)
+            months_checked += 1
+        series = sorted(collected.values(), key=lambda x: x["date"])
+        if not series:
+            raise RuntimeError("無法取得加權指數資料（TWSE FMTQIK）")
+        return series[-lookback:]
+
+    async def trading_days(self, start: date, end: date) -> list[date] | None:
+        days: list[date] = []
+        month = date(end.year, end.month, 1)
+        while month >= date(start.year, start.month, 1):
+            try:
+                rows = self.sync._fmtqik_rows(await self._fmtqik_payload(month))
+            except Exception:
+                return None
+            if rows is None:
+                if self.sync._today() >= _shift_month(month, 1):
+                    return None
+                # 當月尚無資料（月初第一個交易日收盤前）。
+                rows = []
+            days.extend(d for d, _, _ in rows if start <= d <= end)
+            month = _shift_month(month, -1)
+        return sorted(days)
+
+    async def load_theme_universe(
+        self,
+        theme: str,
+        min_monthly_revenue: float = 0.0,
+        theme_mode: str = "strict",
+    ) -> list[dict[str, Any]]:
+        rule = theme_rule(theme, theme_mode=theme_mode)
+        return (await self._universe()).theme_members(rule, min_monthly_revenue=min_monthly_revenue)
+
+    async def load_all_universe(self, min_monthly_revenue: float = 0.0) -> list[dict[str, Any]]:
+        return (await self._universe()).above(min_monthly_revenue)
+
+    async def load_industry_universes(
+        self,
+        min_monthly_revenue: float = 0.0,
+        min_count: int = 1,
+    ) -> dict[str, list[dict[str, Any]]]:
+        return (await self._universe()).industry_buckets(min_monthly_revenue=min_monthly_revenue, min_count=min_count)
+
+    async def get_quarterly_fundamentals(self, symbol: str, market: str, as_of: date) -> dict[str, float | None]:
+        await self._ensure_quarterly_history(symbol, market, as_of)
+        anchor_period = await self._latest_reported_period(market, as_of)
+        return await asyncio.to_thread(self.sync._quarterly_payload, symbol, market, as_of, anchor_period)
+
+    async def summarize_quality_coverage(
+        self,
+        rows: list[dict[str, Any]],
+        top_n: int = 3,
+        history_depth: int = 8,
+        as_of: date | None = None,
+    ) -> dict[str, Any]:
+        anchor_day = as_of or self.sync._today()
+        anchor_period = await self._latest_reported_period("TWSE", anchor_day)
+        return await asyncio.to_thread(
+            self.sync._quality_coverage_summary, rows, top_n, history_depth, anchor_day, anchor_period
+        )
+
+    async def run_quality_update_check(
+        self,
+        theme: str,
+        universe: list[dict[str, Any]],
+        as_of: date,
+        mode: str = "auto",
+        budget_sec: float = 3.0,
+        history_depth: int = 8,
+        top_n: int = 3,
+        theme_mode: str = "strict",
+    ) -> dict[str, Any]:
+        anchor_period = await self._latest_reported_period("TWSE", as_of)
+        check = await asyncio.to_thread(
+            self.sync._plan_quality_update, theme, universe, as_of, mode, history_depth, top_n, theme_mode, anchor_period
+        )
+        if check["repair"]:
+            deadline = time.monotonic() + max(budget_sec, 0.1)
+            for row in universe:
+                if time.monotonic() > deadline and check["refreshed_symbols"]:
+                    break
+                payload = await self.get_quarterly_fundamentals(str(row["symbol"]), str(row["market"]), as_of)
+                if payload.get("quality_periods_used"):
+                    check["refreshed_symbols"].append(str(row["symbol"]))
+        return await asyncio.to_thread(
+            self.sync._finish_quality_update, check, theme, as_of, mode, history_depth, top_n, theme_mode, anchor_period
+        )
+
+    async def gather_universe(
+        self,
+        universe: list[dict[str, Any]],
+        as_of: date,
+        lookback: int = 252,
+        valuation_backtrack_days: int = 20,
+    ) -> dict[tuple[str, str], dict[str, Any]]:
+        pairs = list(dict.fromkeys((str(row["symbol"]), str(row.get("market") or "TWSE")) for row in universe))
+        ohlcv_errors: dict[tuple[str, str], Exception] = {}
+        candles = await self.get_ohlcv_batch(pairs, as_of=as_of, lookback=lookback, errors=ohlcv_errors)
+        valuations = await gather_limited(
+            (self.get_latest_valuation(symbol, market, as_of, valuation_backtrack_days) for symbol, market in pairs),
+            return_exceptions=True,
+        )
+        quarters = await gather_limited(
+            (self.get_quarterly_fundamentals(symbol, market, as_of) for symbol, market in pairs),
+            return_exceptions=True,
+        )
+        output: dict[tuple[str, str], dict[str, Any]] = {}
+        for pair, valuation, quarter in zip(pairs, valuations, quarters):
+            errors: dict[str, str] = {}
+            if pair in ohlcv_errors:
+                errors["ohlcv"] = str(ohlcv_errors[pair])
+            if isinstance(valuation, Exception):
+                errors["valuation"] = str(valuation)
+                valuation = None
+            if isinstance(quarter, Exception):
+                errors["quarterly"] = str(quarter)
+                quarter = {}
+            output[pair] = {"candles": candles.get(pair), "valuation": valuation, "quarterly": quarter, "errors": errors}
+        return output
+
+    def stale_cache_entries(self) -> list[dict[str, Any]]:
+        return self.sync.stale_cache_entries()
+
+    async def finish_recording(self) -> Path | None:
+        return await asyncio.to_thread(self.sync.finish_recording)
+
+    def fetch_stats(self) -> dict[str, Any]:
+        # 同步 provider 的 single-flight 在 async 後端不會用到，改報 loop 上的去重統計。
+        return {**self.sync.fetch_stats(), "single_flight": self._flights.stats(), "async_http_pool": self._http.stats()}
+
+    async def aclose(self) -> None:
+        if self._refresh_tasks:
+            await asyncio.gather(*self._refresh_tasks, return_exceptions=True)
+        await self._http.close()
+        await asyncio.to_thread(self.sync.close)
+
+    async def _flight(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        self._bind_loop()
+        return await self._flights.do(key, fn)
+
+    async def _load_json(self, req: Request, not_before: float | None = None, pin: bool = False) -> Any:
+        # 同一請求同時只送一次、解析一次，其餘 coroutine 等待同一份結果。
+        return await self._flight(("json", self.sync._cache_key(req)), lambda: self._load_json_once(req, not_before, pin))
+
+    async def _load_json_once(self, req: Request, not_before: float | None = None, pin: bool = False) -> Any:
+        bundle = self.sync._bundle
+        if bundle is None:
+            return await self._load_json_live(req, not_before, pin)
+        key = self.sync._cache_key(req)
+        if bundle.mode == REPLAY:
+            return bundle.replay(key, req)
+        try:
+            payload = await self._load_json_live(req, not_before, pin)
+        except Exception as exc:
+            bundle.record_failure(key, req, exc)
+            raise
+        bundle.record(key, req, payload)
+        return payload
+
+    async def _load_json_live(self, req: Request, not_before: float | None = None, pin: bool = False) -> Any:
+        sync = self.sync
+        entry = await asyncio.to_thread(sync._cache_entry, req)
+        if sync._cache_hit(req, entry, not_before):
+            return entry["payload"]
+        if sync._can_serve_stale(req, entry, not_before):
+            if sync._claim_stale_refresh(req, entry):
+                task = asyncio.get_running_loop().create_task(self._background_refresh(req, entry, pin))
+                self._refresh_tasks.add(task)
+                task.add_done_callback(self._refresh_tasks.discard)
+            return entry["payload"]
+        async with self._host_limit(req):
+            try:
+                payload = await self._fetch_with_retry(sync._conditional_request(req, entry))
+            except NotModified as exc:
+                return await asyncio.to_thread(sync._revalidated, req, entry, exc, pin)
+        await asyncio.to_thread(sync._write_cache, req, payload, pin)
+        return payload
+
+    async def _background_refresh(self, req: Request, entry: dict[str, Any], pin: bool) -> None:
+        try:
+            async with self._host_limit(req):
+                payload = await self._fetch_with_retry(self.sync._conditional_request(req, entry))
+            await asyncio.to_thread(self.sync._write_cache, req, payload, pin)
+        except NotModified as exc:
+            await asyncio.to_thread(self.sync._revalidated, req, entry, exc, pin)
+        except Exception:
+            # 背景更新失敗時保留舊資料，下次執行再試。
+            pass
+        finally:
+            self.sync._release_stale_refresh(req)
+
+    async def _get_json(self, url: str, params: dict[str, Any] | None = None) -> Any:
+        return await self._load_json(self.sync._build_get_request(url, params))
+
+    async def _safe_get_json(self, url: str, default: Any) -> Any:
+        try:
+            return await self._get_json(url)
+        except Exception:
+            return default
+
+    async def _fetch_with_retry(self, req: Request) -> Any:
+        host = urlsplit(req.full_url).hostname or ""
+        limiter = self.sync.rate_limiter
+        last_exc: Exception | None = None
+        for attempt in range(3):
+            wait_seconds = limiter.reserve(host)
+            if wait_seconds > 0:
+                await asyncio.sleep(wait_seconds)
+            try:
+                payload = await self._open_json(req)
+            except NotModified:
+                limiter.record_success(host)
+                raise
+            except Exception as exc:
+                last_exc = exc
+                reason = getattr(exc, "reason", None)
+                if isinstance(exc, ssl.SSLCertVerificationError) or isinstance(reason, ssl.SSLCertVerificationError):
+                    return await self._open_json(req, context=ssl._create_unverified_context())
+                limiter.record_failure(host, exc)
+                if attempt < 2:
+                    await asyncio.sleep(self.sync._retry_delay(attempt, exc))
+                    continue
+            else:
+                limiter.record_success(host)
+                return payload
+        if last_exc is not None:
+            raise last_exc
+        raise RuntimeError("無法讀取 JSON")
+
+    async def _open_json(self, req: Request, context: ssl.SSLContext | None = None) -> Any:
+        response = await self._http.request(req, context=context)
+        if response.status == 304:
+            raise NotModified(response.headers)
+        self.sync._remember_validators(req, response.headers)
+        return await asyncio.to_thread(_parse_json_body, response.body)
+
+    async def _fmtqik_payload(self, month: date) -> Any:
+        cached = self.sync._cached_fmtqik(month)
+        if cached is not None:
+            return cached
+        payload = await self._load_json(
+            self.sync._fmtqik_request(month),
+            not_before=self.sync._month_not_before(month),
+            pin=self.sync._month_closed(month),
+        )
+        return self.sync._remember_fmtqik(month, payload)
+
+    async def _universe(self) -> Universe:
+        today = self.sync._today()
+        cached = self.sync._cached_universe(today)
+        if cached is not None:
+            return cached
+        return await self._flight(("universe", today.isoformat()), lambda: self._build_universe(today))
+
+    async def _build_universe(self, today: date) -> Universe:
+        sync = self.sync
+        cached = sync._cached_universe(today)
+        if cached is not None:
+            return cached
+        twse_basics, tpex_basics, twse_revenue, tpex_revenue = await asyncio.gather(
+            *(self._safe_get_json(url, []) for url in (TWSE_BASICS_URL, TPEX_BASICS_URL, TWSE_REVENUE_URL, TPEX_REVENUE_URL))
+        )
+        universe = await asyncio.to_thread(
+            Universe.build,
+            sync._basics_from_rows(twse_basics or [], tpex_basics or []),
+            sync._revenue_from_rows(twse_revenue or [], tpex_revenue or []),
+        )
+        return sync._remember_universe(today, universe)
+
+    async def _dataset(self, url: str) -> tuple[list[dict[str, Any]], dict[str, dict[str, Any]]]:
+        cached = self.sync._cached_dataset(url)
+        if cached is not None:
+            return cached
+        return await self._flight(("dataset", url), lambda: self._parse_dataset(url))
+
+    async def _parse_dataset(self, url: str) -> tuple[list[dict[str, Any]], dict[str, dict[str, Any]]]:
+        cached = self.sync._cached_dataset(url)
+        if cached is not None:
+            return cached
+        rows = await self._get_json(url)
+        return await asyncio.to_thread(self.sync._remember_dataset, url, rows)
+
+    async def _dataset_index(self, url: str) -> dict[str, dict[str, Any]]:
+        return (await self._dataset(url))[1]
+
+    async def _latest_reported_period(self, market: str, as_of: date) -> str:
+        cached = self.sync._cached_reported_period(market, as_of)
+        if cached is not None:
+            return cached
+        eps_url, _, _, _ = self.sync._quarterly_source_urls(market)
+        try:
+            rows = (await self._dataset(eps_url))[0]
+        except Exception:
+            rows = []
+        return self.sync._remember_reported_period(market, as_of, rows)
+
+    async def _load_current_quarter_snapshot(self, symbol: str, market: str, as_of: date) -> dict[str, Any] | None:
+        sync = self.sync
+        eps_url, income_urls, balance_urls, _ = sync._quarterly_source_urls(market)
+        eps_row = (await self._dataset_index(eps_url)).get(symbol)
+        if not eps_row:
+            return None
+        period = sync._period_from_row(eps_row, as_of)
+        for dataset_key, income_url in income_urls.items():
+            income_row = (await self._dataset_index(income_url)).get(symbol)
+            if not income_row:
+                continue
+            balance_url = balance_urls.get(dataset_key)
+            if not balance_url:
+                continue
+            balance_row = (await self._dataset_index(balance_url)).get(symbol)
+            if not balance_row:
+                continue
+            return sync._quarter_snapshot(market, dataset_key, period, income_row, balance_row, eps_row)
+        return None
+
+    async def _ensure_quarterly_history(self, symbol: str, market: str, as_of: date) -> None:
+        sync = self.sync
+        if await asyncio.to_thread(sync._has_quarterly_history, symbol, market, as_of):
+            return
+        fetched_at = datetime.now().replace(microsecond=0).isoformat()
+        target_period = await self._latest_reported_period(market, as_of)
+        try:
+            snapshot = await self._load_current_quarter_snapshot(symbol, market, as_of)
+        except Exception:
+            await asyncio.to_thread(
+                sync._store_current_quarter, symbol, market, as_of, target_period, fetched_at, None, True
+            )
+            return
+        await asyncio.to_thread(sync._store_current_quarter, symbol, market, as_of, target_period, fetched_at, snapshot)
+
+    async def _get_valuation_table(self, market: str, d: date) -> dict[str, dict[str, float]]:
+        cached = self.sync._cached_valuation_table(market, d)
+        if cached is not None:
+            return cached
+        # 多檔股票回溯到同一天時只抓、只解析一次當日全市場估值表。
+        return await self._flight(("valuation", market, d.isoformat()), lambda: self._load_valuation_table(market, d))
+
+    async def _load_valuation_table(self, market: str, d: date) -> dict[str, dict[str, float]]:
+        sync = self.sync
+        cached = sync._cached_valuation_table(market, d)
+        if cached is not None:
+            return cached
+        result = await asyncio.to_thread(market_store.load_valuation_table, sync.market_store_path, market, d)
+        if result is not None:
+            return sync._remember_valuation_table(market, d, result)
+        payload = await self._load_json(sync._valuation_request(market, d), not_before=sync._day_not_before(d))
+        return await asyncio.to_thread(
+            sync._remember_valuation_table, market, d, sync._parse_valuation_table(market, payload), True
+        )
+
+    async def _load_ohlcv_once(self, symbol: str, market: str, as_of: date, lookback: int) -> CandleSeries:
+        cached = self.sync._cached_ohlcv(symbol, market, as_of, lookback)
+        if cached is not None:
+            return cached
+        candles = await self._load_ohlcv_series(symbol, market, as_of, lookback)
+        return self.sync._remember_ohlcv(symbol, market, as_of, lookback, candles)
+
+    async def _load_ohlcv_series(self, symbol: str, market: str, as_of: date, lookback: int) -> CandleSeries:
+        sync = self.sync
+        coverage = await asyncio.to_thread(market_store.get_month_coverage, sync.market_store_path, symbol, market)
+        anchor = date(as_of.year, as_of.month, 1)
+        available = 0
+        for i in range(sync._ohlcv_max_months(lookback)):
+            month = _shift_month(anchor, -i)
+            month_coverage = coverage.get(market_store.month_key(month))
+            if await self._month_needs_fetch(market, month_coverage, month, as_of):
+                month_coverage = await self._refresh_ohlcv_month(symbol, market, month)
+            if i == 0:
+                available += await asyncio.to_thread(
+                    market_store.count_candles, sync.market_store_path, symbol, market, anchor, as_of
+                )
+            else:
+                available += month_coverage["row_count"]
+            if available >= lookback:
+                break
+        return await asyncio.to_thread(sync._stored_ohlcv, symbol, market, as_of, lookback)
+
+    async def _refresh_ohlcv_month(self, symbol: str, market: str, month: date) -> dict[str, Any]:
+        sync = self.sync
+        req = sync._ohlcv_month_request(symbol, market, month)
+        payload = await self._load_json(req, not_before=sync._month_not_before(month), pin=sync._month_closed(month))
+        return await asyncio.to_thread(sync._store_ohlcv_month, symbol, market, month, payload)
+
+    async def _prefetch_ohlcv_months(self, pairs: list[tuple[str, str]], as_of: date, lookback: int) -> None:
+        tasks = await self._ohlcv_fetch_plan(pairs, as_of, lookback)
+        # 個別月份失敗不中止，留給逐檔組裝時再重試一次，與 thread 後端的 batch 行為一致。
+        await gather_limited(
+            (self._refresh_ohlcv_month(symbol, market, month) for symbol, market, month in tasks),
+            return_exceptions=True,
+        )
+
+    async def _ohlcv_fetch_plan(
+        self,
+        pairs: list[tuple[str, str]],
+        as_of: date,
+        lookback: int,
+    ) -> list[tuple[str, str, date]]:
+        months = self.sync._ohlcv_prefetch_months(as_of, lookback)
+        pending = [
+            (symbol, market) for symbol, market in pairs if self.sync._cached_ohlcv(symbol, market, as_of, lookback) is None
+        ]
+        coverages = await asyncio.to_thread(self._month_coverages, pending)
+        by_market: dict[str, list[tuple[str, str, date]]] = {}
+        for (symbol, market), coverage in zip(pending, coverages):
+            tasks = by_market.setdefault(market, [])
+            for month in months:
+                if await self._month_needs_fetch(market, coverage.get(market_store.month_key(month)), month, as_of):
+                    tasks.append((symbol, market, month))
+        # 交錯排入不同主機的工作，先送出的請求不會全擠在同一台主機的併發上限後面。
+        return [task for group in zip_longest(*by_market.values()) for task in group if task is not None]
+
+    def _month_coverages(self, pairs: list[tuple[str, str]]) -> list[dict[str, dict[str, Any]]]:
+        return [market_store.get_month_coverage(self.sync.market_store_path, symbol, market) for symbol, market in pairs]
+
+    async def _month_needs_fetch(self, market: str, coverage: dict[str, Any] | None, month: date, as_of: date) -> bool:
+        gap = self.sync._month_gap(coverage, month, as_of)
+        if isinstance(gap, bool):
+            return gap
+        return bool(await self._missing_market_days(market, *gap))
+
+    async def _missing_market_days(self, market: str, after: date, through: date) -> list[date]:
+        span = self.sync._market_day_span(after, through)
+        if span is None:
+            return []
+        calendar = await self.trading_days(*span)
+        return await asyncio.to_thread(self.sync._uningested_days, market, *span, calendar)
+
+    async def _ingest_market_day(self, market: str, trade_date: date) -> dict[str, Any] | None:
+        sync = self.sync
+        payload = await self._load_json(
+            sync._daily_quote_request(market, trade_date), not_before=sync._day_not_before(trade_date)
+        )
+        return await asyncio.to_thread(sync._store_market_day, market, trade_date, payload)
+
+    def _host_limit(self, req: Request) -> asyncio.Semaphore:
+        host = urlsplit(req.full_url).hostname or ""
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = asyncio.Semaphore(self.per_host_concurrency)
+            self._host_limits[host] = limit
+        return limit
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._host_limits.clear()
+            self._flights.reset()
+            self._refresh_tasks.clear()
+            self._loop = loop
+
+
+def _parse_json_body(body: bytes) -> Any:
+    return json.loads(body.decode("utf-8-sig"))
+
+
+async def gather_limited(
+    coroutines: Iterable[Awaitable[T]],
+    limit: int = 256,
+    return_exceptions: bool = False,
+) -> list[T | BaseException]:
+    """asyncio.gather，但同時存活的 coroutine 數量有上限，避免整個市場一次排進 event loop。"""
+    gate = asyncio.Semaphore(max(1, int(limit)))
+
+    async def _run(coro: Awaitable[T]) -> T:
+        async with gate:
+            return await coro
+
+    return await asyncio.gather(*(_run(coro) for coro in coroutines), return_exceptions=return_exceptions)
+
+
+class BlockingAsyncProvider:
+    """在背景執行緒跑 event loop 的同步外殼，讓既有 CLI 可直接切換到 async 後端。
+
+    只轉接已移植成 coroutine 的方法；季報回補、快取預熱等尚未移植的方法直接報錯，請改用 thread 後端。
+    """
+
+    def __init__(
+        self,
+        timeout: float = 10.0,
+        cache_dir: Path | None = None,
+        max_workers: int = 8,
+        per_host_concurrency: int = 4,
+        rate_limits: dict[str, float] | None = None,
+        cache_max_bytes: int | None = DEFAULT_CACHE_MAX_BYTES,
+        stale_while_revalidate: bool = False,
+        max_stale_seconds: float = DEFAULT_MAX_STALE_SECONDS,
+        record_bundle: Path | None = None,
+        replay_bundle: Path | None = None,
+    ) -> None:
+        # max_workers 僅為與 TwMarketProvider 介面相容；async 後端的併發由 per_host_concurrency 控制。
+        self.async_provider = AsyncTwMarketProvider(
+            timeout=timeout,
+            cache_dir=cache_dir,
+            per_host_concurrency=per_host_concurrency,
+            rate_limits=rate_limits,
+            cache_max_bytes=cache_max_bytes,
+            stale_while_revalidate=stale_while_revalidate,
+            max_stale_seconds=max_stale_seconds,
+            record_bundle=record_bundle,
+            replay_bundle=replay_bundle,
+        )
+        self.cache_dir = self.async_provider.cache_dir
+        self.quarterly_store_path = self.async_provider.quarterly_store_path
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="tw-market-async", daemon=True)
+        self._thread.start()
+
+    def _call(self, coro: Awaitable[T]) -> T:
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def get_ohlcv(self, symbol: str, market: str, as_of: date, lookback: int = 252) -> CandleSeries:
+        return self._call(self.async_provider.get_ohlcv(symbol, market, as_of=as_of, lookback=lookback))
+
+    def get_ohlcv_batch(
+        self,
+        pairs: list[tuple[str, str]],
+        as_of: date,
+        lookback: int = 252,
+        errors: dict[tuple[str, str], Exception] | None = None,
+    ) -> dict[tuple[str, str], CandleSeries]:
+        return self._call(self.async_provider.get_ohlcv_batch(pairs, as_of=as_of, lookback=lookback, errors=errors))
+
+    def ingest_daily_quotes(self, pairs: list[tuple[str, str]], as_of: date) -> list[dict[str, Any]]:
+        return self._call(self.async_provider.ingest_daily_quotes(pairs, as_of))
+
+    def update_indicator_states(
+        self,
+        candle_map: dict[tuple[str, str], CandleSeries],
+        force_recompute: bool = False,
+    ) -> tuple[dict[tuple[str, str], dict[str, float | None]], dict[str, int]]:
+        return self._call(self.async_provider.update_indicator_states(candle_map, force_recompute=force_recompute))
+
+    def get_latest_valuation(
+        self,
+        symbol: str,
+        market: str,
+        as_of: date,
+        max_backtrack_days: int = 20,
+    ) -> dict[str, float] | None:
+        return self._call(
+            self.async_provider.get_latest_valuation(symbol, market, as_of=as_of, max_backtrack_days=max_backtrack_days)
+        )
+
+    def get_taiex_series(self, as_of: date, lookback: int = 252) -> list[dict[str, Any]]:
+        return self._call(self.async_provider.get_taiex_series(as_of=as_of, lookback=lookback))
+
+    def trading_days(self, start: date, end: date) -> list[date] | None:
+        return self._call(self.async_provider.trading_days(start, end))
+
+    def load_theme_universe(
+        self,
+        theme: str,
+        min_monthly_revenue: float = 0.0,
+        theme_mode: str = "strict",
+    ) -> list[dict[str, Any]]:
+        return self._call(
+            self.async_provider.load_theme_universe(theme, min_monthly_revenue=min_monthly_revenue, theme_mode=theme_mode)
+        )
+
+    def load_all_universe(self, min_monthly_revenue: float = 0.0) -> list[dict[str, Any]]:
+        return self._call(self.async_provider.load_all_universe(min_monthly_revenue=min_monthly_revenue))
+
+    def load_industry_universes(
+        self,
+        min_monthly_revenue: float = 0.0,
+        min_count: int = 1,
+    ) -> dict[str, list[dict[str, Any]]]:
+        return self._call(
+            self.async_provider.load_industry_universes(min_monthly_revenue=min_monthly_revenue, min_count=min_count)
+        )
+
+    def get_quarterly_fundamentals(self, symbol: str, market: str, as_of: date) -> dict[str, float | None]:
+        return self._call(self.async_provider.get_quarterly_fundamentals(symbol, market, as_of=as_of))
+
+    def summarize_quality_coverage(
+        self,
+        rows: list[dict[str, Any]],
+        top_n: int = 3,
+        history_depth: int = 8,
+        as_of: date | None = None,
+    ) -> dict[str, Any]:
+        return self._call(
+            self.async_provider.summarize_quality_coverage(rows, top_n=top_n, history_depth=history_depth, as_of=as_of)
+        )
+
+    def run_quality_update_check(
+        self,
+        theme: str,
+        universe: list[dict[str, Any]],
+        as_of: date,
+        mode: str = "auto",
+        budget_sec: float = 3.0,
+        history_depth: int = 8,
+        top_n: int = 3,
+        theme_mode: str = "strict",
+    ) -> dict[str, Any]:
+        return self._call(
+            self.async_provider.run_quality_update_check(
+                theme,
+                universe,
+                as_of,
+                mode=mode,
+                budget_sec=budget_sec,
+                history_depth=history_depth,
+                top_n=top_n,
+                theme_mode=theme_mode,
+            )
+        )
+
+    def stale_cache_entries(self) -> list[dict[str, Any]]:
+        return self.async_provider.stale_cache_entries()
+
+    def finish_recording(self) -> Path | None:
+        return self._call(self.async_provider.finish_recording())
+
+    def fetch_stats(self) -> dict[str, Any]:
+        return self.async_provider.fetch_stats()
+
+    def close(self) -> None:
+        if self._loop.is_closed():
+            return
+        self._call(self.async_provider.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __getattr__(self, name: str) -> Any:
+        # 沒有 coroutine 版本的方法不退回同步 provider，否則會在背景默默改走 thread 網路路徑。
+        raise AttributeError(f"async 後端不支援 {name}，請改用 --fetch-backend thread")
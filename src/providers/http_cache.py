@@ -0,0 +1,371 @@
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+import zlib
+from contextlib import closing
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlsplit
+
+
+SCHEMA_VERSION = 4
+LEGACY_ENDPOINT = "legacy"
+IDENTITY = "identity"
+ZLIB = "zlib"
+# 小於此大小的 payload 壓縮效益有限，直接存原文。
+COMPRESS_MIN_BYTES = 1024
+AGE_BUCKETS: list[tuple[str, float]] = [
+    ("<1d", 86400.0),
+    ("1-7d", 7 * 86400.0),
+    ("7-30d", 30 * 86400.0),
+    ("30-365d", 365 * 86400.0),
+    (">365d", float("inf")),
+]
+_FILE_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+# 舊版資料庫以 ALTER TABLE 補上的欄位。
+_ADDED_COLUMNS = {
+    "http_cache": {
+        "endpoint": "TEXT",
+        "size_bytes": "INTEGER NOT NULL DEFAULT 0",
+        "last_access": "REAL NOT NULL DEFAULT 0",
+        "pinned": "INTEGER NOT NULL DEFAULT 0",
+        "encoding": f"TEXT NOT NULL DEFAULT '{IDENTITY}'",
+        "etag": "TEXT",
+        "last_modified": "TEXT",
+    },
+    "endpoint_stats": {
+        "full_fetches": "INTEGER NOT NULL DEFAULT 0",
+        "revalidations": "INTEGER NOT NULL DEFAULT 0",
+    },
+}
+
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def encode_payload(payload: Any) -> tuple[bytes, str]:
+    raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    if len(raw) < COMPRESS_MIN_BYTES:
+        return raw, IDENTITY
+    compressed = zlib.compress(raw, 6)
+    if len(compressed) >= len(raw):
+        return raw, IDENTITY
+    return compressed, ZLIB
+
+
+def decode_payload(blob: bytes, encoding: str | None) -> Any:
+    raw = bytes(blob)
+    if encoding == ZLIB:
+        raw = zlib.decompress(raw)
+    elif encoding not in (None, IDENTITY):
+        raise ValueError(f"未知的快取編碼：{encoding}")
+    return json.loads(raw.decode("utf-8"))
+
+
+def endpoint_of(url: str | None) -> str:
+    if not url:
+        return LEGACY_ENDPOINT
+    parts = urlsplit(url)
+    return f"{parts.hostname or ''}{parts.path}"
+
+
+def init_db(db_path: Path) -> None:
+    with closing(_connect(db_path)) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS schema_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS http_cache (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                payload BLOB NOT NULL,
+                fetched_at REAL NOT NULL,
+                ttl_seconds INTEGER
+            ) WITHOUT ROWID;
+
+            CREATE TABLE IF NOT EXISTS endpoint_stats (
+                endpoint TEXT PRIMARY KEY,
+                hits INTEGER NOT NULL DEFAULT 0,
+                misses INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID;
+            """
+        )
+        for table, columns in _ADDED_COLUMNS.items():
+            existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+            for column, decl in columns.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+        # v1 的資料沒有大小與存取時間，補齊後 LRU 才有依據。
+        conn.execute("UPDATE http_cache SET size_bytes = length(payload) WHERE size_bytes = 0")
+        conn.execute("UPDATE http_cache SET last_access = fetched_at WHERE last_access = 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS http_cache_lru ON http_cache(pinned, last_access)")
+        conn.execute(
+            "INSERT INTO schema_meta(key, value) VALUES(?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+            ("schema_version", str(SCHEMA_VERSION)),
+        )
+        conn.commit()
+
+
+def get_entry(db_path: Path, key: str, include_payload: bool = True) -> dict[str, Any] | None:
+    columns = "url, fetched_at, ttl_seconds, pinned, encoding, etag, last_modified" + (", payload" if include_payload else "")
+    with closing(_connect(db_path)) as conn:
+        row = conn.execute(f"SELECT {columns} FROM http_cache WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        return None
+    entry: dict[str, Any] = {
+        "url": row["url"],
+        "fetched_at": float(row["fetched_at"]),
+        "ttl_seconds": row["ttl_seconds"],
+        "pinned": bool(row["pinned"]),
+        "encoding": row["encoding"],
+        "etag": row["etag"],
+        "last_modified": row["last_modified"],
+    }
+    if include_payload:
+        try:
+            entry["payload"] = decode_payload(row["payload"], row["encoding"])
+        except Exception:
+            return None
+    return entry
+
+
+def put_entry(
+    db_path: Path,
+    key: str,
+    url: str,
+    payload: Any,
+    fetched_at: float,
+    ttl_seconds: int | None,
+    pinned: bool = False,
+    etag: str | None = None,
+    last_modified: str | None = None,
+) -> None:
+    blob, encoding = encode_payload(payload)
+    with closing(_connect(db_path)) as conn:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO http_cache(key, url, payload, fetched_at, ttl_seconds, endpoint, size_bytes, "
+                "last_access, pinned, encoding, etag, last_modified) VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    url,
+                    blob,
+                    float(fetched_at),
+                    ttl_seconds,
+                    endpoint_of(url),
+                    len(blob),
+                    float(fetched_at),
+                    int(pinned),
+                    encoding,
+                    etag,
+                    last_modified,
+                ),
+            )
+
+
+def revalidate_entry(
+    db_path: Path,
+    key: str,
+    fetched_at: float,
+    pinned: bool = False,
+    etag: str | None = None,
+    last_modified: str | None = None,
+) -> None:
+    """304 回應：payload 不變，只把 fetched_at 往後推並更新 validator。"""
+    with closing(_connect(db_path)) as conn:
+        with conn:
+            conn.execute(
+                "UPDATE http_cache SET fetched_at = ?, last_access = ?, pinned = MAX(pinned, ?), "
+                "etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE key = ?",
+                (float(fetched_at), float(fetched_at), int(pinned), etag, last_modified, key),
+            )
+
+
+def record_stats(
+    db_path: Path,
+    endpoint_counts: dict[str, tuple[int, int, int, int]],
+    accessed: dict[str, tuple[float, str | None]],
+) -> None:
+    """一次寫入整輪的端點計數（hits, misses, full_fetches, revalidations）與命中項目的最後存取時間。"""
+    if not endpoint_counts and not accessed:
+        return
+    access_rows = []
+    for key, (now, url) in accessed.items():
+        endpoint = endpoint_of(url)
+        access_rows.append((float(now), url, None if endpoint == LEGACY_ENDPOINT else endpoint, key))
+    with closing(_connect(db_path)) as conn:
+        with conn:
+            # 舊檔匯入的項目沒有 URL，第一次命中時補上，報表才能歸到正確端點。
+            conn.executemany(
+                "UPDATE http_cache SET last_access = MAX(last_access, ?), url = COALESCE(url, ?), "
+                "endpoint = COALESCE(endpoint, ?) WHERE key = ?",
+                access_rows,
+            )
+            conn.executemany(
+                "INSERT INTO endpoint_stats(endpoint, hits, misses, full_fetches, revalidations) VALUES(?, ?, ?, ?, ?) "
+                "ON CONFLICT(endpoint) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses, "
+                "full_fetches = full_fetches + excluded.full_fetches, revalidations = revalidations + excluded.revalidations",
+                [(endpoint, *counts) for endpoint, counts in sorted(endpoint_counts.items())],
+            )
+
+
+def evict_to_budget(db_path: Path, max_bytes: int) -> dict[str, int]:
+    """依 last_access 由舊到新刪除未釘選項目，直到總大小不超過 max_bytes。
+
+    釘選項目（已收盤月份）計入總量但不會被淘汰。
+    """
+    with closing(_connect(db_path)) as conn:
+        with conn:
+            total = int(conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM http_cache").fetchone()[0])
+            excess = total - max(int(max_bytes), 0)
+            evicted: list[str] = []
+            freed = 0
+            if excess > 0:
+                candidates = conn.execute(
+                    "SELECT key, size_bytes FROM http_cache WHERE pinned = 0 ORDER BY last_access ASC"
+                ).fetchall()
+                for row in candidates:
+                    if freed >= excess:
+                        break
+                    evicted.append(row["key"])
+                    freed += int(row["size_bytes"])
+                conn.executemany("DELETE FROM http_cache WHERE key = ?", [(key,) for key in evicted])
+    return {"evicted": len(evicted), "freed_bytes": freed, "total_bytes": total - freed}
+
+
+def prune(
+    db_path: Path,
+    now: float,
+    endpoint: str | None = None,
+    older_than_seconds: float | None = None,
+    include_pinned: bool = False,
+) -> int:
+    clauses: list[str] = []
+    params: list[Any] = []
+    if endpoint is not None:
+        if endpoint == LEGACY_ENDPOINT:
+            clauses.append("endpoint IS NULL")
+        else:
+            clauses.append("endpoint = ?")
+            params.append(endpoint)
+    if older_than_seconds is not None:
+        clauses.append("fetched_at < ?")
+        params.append(float(now) - float(older_than_seconds))
+    if not include_pinned:
+        clauses.append("pinned = 0")
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    with closing(_connect(db_path)) as conn:
+        with conn:
+            cursor = conn.execute(f"DELETE FROM http_cache{where}", params)
+    return int(cursor.rowcount)
+
+
+def vacuum(db_path: Path) -> None:
+    with closing(_connect(db_path)) as conn:
+        conn.execute("VACUUM")
+
+
+def cache_report(db_path: Path, now: float) -> dict[str, Any]:
+    with closing(_connect(db_path)) as conn:
+        rows = conn.execute(
+            "SELECT COALESCE(endpoint, ?) AS endpoint, COUNT(*) AS entries, SUM(size_bytes) AS bytes, "
+            "SUM(pinned) AS pinned FROM http_cache GROUP BY 1 ORDER BY 3 DESC",
+            (LEGACY_ENDPOINT,),
+        ).fetchall()
+        stats = {
+            row["endpoint"]: (int(row["hits"]), int(row["misses"]), int(row["full_fetches"]), int(row["revalidations"]))
+            for row in conn.execute("SELECT endpoint, hits, misses, full_fetches, revalidations FROM endpoint_stats").fetchall()
+        }
+        fetched = [float(row[0]) for row in conn.execute("SELECT fetched_at FROM http_cache").fetchall()]
+        encodings = {
+            row["encoding"]: int(row["entries"])
+            for row in conn.execute("SELECT encoding, COUNT(*) AS entries FROM http_cache GROUP BY encoding").fetchall()
+        }
+    ages = {label: 0 for label, _ in AGE_BUCKETS}
+    for fetched_at in fetched:
+        age = max(float(now) - fetched_at, 0.0)
+        for label, upper in AGE_BUCKETS:
+            if age < upper:
+                ages[label] += 1
+                break
+    endpoints = []
+    for row in rows:
+        hits, misses, full_fetches, revalidations = stats.get(row["endpoint"], (0, 0, 0, 0))
+        lookups = hits + misses
+        endpoints.append(
+            {
+                "endpoint": row["endpoint"],
+                "entries": int(row["entries"]),
+                "bytes": int(row["bytes"] or 0),
+                "pinned": int(row["pinned"] or 0),
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": round(hits / lookups, 4) if lookups else None,
+                "full_fetches": full_fetches,
+                "revalidations": revalidations,
+            }
+        )
+    total_hits = sum(item[0] for item in stats.values())
+    total_lookups = total_hits + sum(item[1] for item in stats.values())
+    return {
+        "db_path": str(db_path),
+        "file_bytes": db_path.stat().st_size if db_path.exists() else 0,
+        "entries": sum(item["entries"] for item in endpoints),
+        "bytes": sum(item["bytes"] for item in endpoints),
+        "pinned": sum(item["pinned"] for item in endpoints),
+        "hit_ratio": round(total_hits / total_lookups, 4) if total_lookups else None,
+        "full_fetches": sum(item[2] for item in stats.values()),
+        "revalidations": sum(item[3] for item in stats.values()),
+        "endpoints": endpoints,
+        "encodings": encodings,
+        "age_distribution": ages,
+    }
+
+
+def import_file_cache(db_path: Path, cache_dir: Path) -> int:
+    """把舊版「一個 URL 一個 <sha256>.json」快取匯入資料庫，只刪除成功匯入的原檔。
+
+    舊檔沒有 URL 與 TTL，fetched_at 取檔案 mtime，TTL 留空由讀取端依 URL 推算；
+    資料庫內已有的同 key 項目較新，不覆蓋。
+    """
+    files = [path for path in cache_dir.glob("*.json") if _FILE_KEY_PATTERN.match(path.stem)]
+    if not files:
+        return 0
+    rows = []
+    imported: list[Path] = []
+    for path in files:
+        try:
+            blob, encoding = encode_payload(json.loads(path.read_bytes().decode("utf-8")))
+            fetched_at = path.stat().st_mtime
+        except Exception:
+            # 讀不到或解析失敗的檔案留在原地，不因匯入而遺失。
+            continue
+        rows.append((path.stem, None, blob, fetched_at, None, None, len(blob), fetched_at, 0, encoding))
+        imported.append(path)
+    if not rows:
+        return 0
+    with closing(_connect(db_path)) as conn:
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO http_cache(key, url, payload, fetched_at, ttl_seconds, endpoint, size_bytes, last_access, pinned, encoding) "
+                "VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+    # 交易提交後才刪檔；寫入失敗時例外直接拋出，原檔保留。
+    for path in imported:
+        try:
+            path.unlink()
+        except OSError:
+            continue
+    return len(rows)
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import gzip
+import http.client
+import ssl
+import threading
+import zlib
+from urllib.error import HTTPError
+from urllib.parse import urljoin, urlsplit
+from urllib.request import Request
+
+
+MAX_REDIRECTS = 5
+REUSE_RETRY_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionResetError, BrokenPipeError)
+
+
+class HttpResponse:
+    __slots__ = ("url", "status", "headers", "body")
+
+    def __init__(self, url: str, status: int, headers: dict[str, str], body: bytes) -> None:
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+
+def decode_body(body: bytes, encoding: str) -> bytes:
+    encoding = encoding.strip().lower()
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "deflate":
+        try:
+            return zlib.decompress(body)
+        except zlib.error:
+            return zlib.decompress(body, -zlib.MAX_WBITS)
+    return body
+
+
+class PooledHttpTransport:
+    """Keep-alive connection pool shared by every JSON request of one provider."""
+
+    def __init__(self, timeout: float = 10.0, max_idle_per_host: int = 4) -> None:
+        self.timeout = timeout
+        self.max_idle_per_host = max(1, int(max_idle_per_host))
+        self._lock = threading.Lock()
+        self._idle: dict[tuple[str, str, int, bool], list[http.client.HTTPConnection]] = {}
+        self._stats: dict[str, dict[str, int]] = {}
+
+    def request(self, req: Request, context: ssl.SSLContext | None = None) -> HttpResponse:
+        url = req.full_url
+        method = req.get_method()
+        body = req.data if isinstance(req.data, (bytes, bytearray)) else None
+        headers = {key: value for key, value in req.header_items()}
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self._send(url, method, body, headers, context)
+            if response.status in {301, 302, 303, 307, 308} and response.headers.get("location"):
+                url = urljoin(url, response.headers["location"])
+                if response.status in {301, 302, 303} and method == "POST":
+                    method = "GET"
+                    body = None
+                    headers = {key: value for key, value in headers.items() if key.lower() != "content-type"}
+                continue
+            if response.status >= 400:
+                raise HTTPError(url, response.status, f"HTTP {response.status}", response.headers, None)
+            return response
+        raise RuntimeError(f"HTTP 重新導向次數過多：{req.full_url}")
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        with self._lock:
+            return {host: dict(values) for host, values in sorted(self._stats.items())}
+
+    def close(self) -> None:
+        with self._lock:
+            pools = list(self._idle.values())
+            self._idle.clear()
+        for pool in pools:
+            for conn in pool:
+                conn.close()
+
+    def _send(
+        self,
+        url: str,
+        method: str,
+        body: bytes | None,
+        headers: dict[str, str],
+        context: ssl.SSLContext | None,
+    ) -> HttpResponse:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower() or "http"
+        host = parts.hostname or ""
+        port = parts.port or (443 if scheme == "https" else 80)
+        pool_key = (scheme, host, port, context is not None)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        send_headers = dict(headers)
+        send_headers.setdefault("Accept-Encoding", "gzip, deflate")
+        send_headers.setdefault("Connection", "keep-alive")
+
+        conn, reused = self._checkout(pool_key, context)
+        try:
+            conn.request(method, path, body=body, headers=send_headers)
+            resp = conn.getresponse()
+        except REUSE_RETRY_ERRORS:
+            conn.close()
+            if not reused:
+                raise
+            # 伺服器已關閉閒置連線，改開新連線重送一次。
+            conn, reused = self._new_connection(pool_key, context), False
+            conn.request(method, path, body=body, headers=send_headers)
+            resp = conn.getresponse()
+        except Exception:
+            conn.close()
+            raise
+
+        try:
+            raw = resp.read()
+        except Exception:
+            conn.close()
+            raise
+        response_headers = {key.lower(): value for key, value in resp.getheaders()}
+        if resp.will_close:
+            conn.close()
+        else:
+            self._checkin(pool_key, conn)
+        self._record(host, reused=reused, wire_bytes=len(raw))
+        decoded = decode_body(raw, response_headers.get("content-encoding", ""))
+        return HttpResponse(url, resp.status, response_headers, decoded)
+
+    def _checkout(
+        self,
+        pool_key: tuple[str, str, int, bool],
+        context: ssl.SSLContext | None,
+    ) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            pool = self._idle.get(pool_key)
+            if pool:
+                return pool.pop(), True
+        return self._new_connection(pool_key, context), False
+
+    def _checkin(self, pool_key: tuple[str, str, int, bool], conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            pool = self._idle.setdefault(pool_key, [])
+            if len(pool) < self.max_idle_per_host:
+                pool.append(conn)
+                return
+        conn.close()
+
+    def _new_connection(
+        self,
+        pool_key: tuple[str, str, int, bool],
+        context: ssl.SSLContext | None,
+    ) -> http.client.HTTPConnection:
+        scheme, host, port, _ = pool_key
+        with self._lock:
+            self._host_stats(host)["connections_opened"] += 1
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout, context=context)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _record(self, host: str, reused: bool, wire_bytes: int) -> None:
+        with self._lock:
+            stats = self._host_stats(host)
+            stats["requests"] += 1
+            stats["wire_bytes"] += wire_bytes
+            if reused:
+                stats["connections_reused"] += 1
+
+    def _host_stats(self, host: str) -> dict[str, int]:
+        stats = self._stats.get(host)
+        if stats is None:
+            stats = {"requests": 0, "connections_opened": 0, "connections_reused": 0, "wire_bytes": 0}
+            self._stats[host] = stats
+        return stats
@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from contextlib import closing
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+from src.analysis.candles import CandleSeries
+
+
+SCHEMA_VERSION = 4
+SQLITE_MAX_PARAMS = 999
+
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def month_key(month: date) -> str:
+    return month.strftime("%Y-%m")
+
+
+def init_db(db_path: Path) -> None:
+    with closing(_connect(db_path)) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS schema_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS daily_candles (
+                symbol TEXT NOT NULL,
+                market TEXT NOT NULL,
+                trade_date TEXT NOT NULL,
+                open REAL NOT NULL,
+                high REAL NOT NULL,
+                low REAL NOT NULL,
+                close REAL NOT NULL,
+                volume REAL NOT NULL,
+                PRIMARY KEY (symbol, market, trade_date)
+            ) WITHOUT ROWID;
+
+            CREATE TABLE IF NOT EXISTS candle_months (
+                symbol TEXT NOT NULL,
+                market TEXT NOT NULL,
+                month TEXT NOT NULL,
+                complete INTEGER NOT NULL,
+                row_count INTEGER NOT NULL,
+                covered_through TEXT,
+                fetched_on TEXT NOT NULL,
+                PRIMARY KEY (symbol, market, month)
+            ) WITHOUT ROWID;
+
+            CREATE TABLE IF NOT EXISTS market_days (
+                market TEXT NOT NULL,
+                trade_date TEXT NOT NULL,
+                status TEXT NOT NULL,
+                row_count INTEGER NOT NULL,
+                fetched_on TEXT NOT NULL,
+                PRIMARY KEY (market, trade_date)
+            ) WITHOUT ROWID;
+
+            CREATE TABLE IF NOT EXISTS valuation_days (
+                market TEXT NOT NULL,
+                trade_date TEXT NOT NULL,
+                row_count INTEGER NOT NULL,
+                fetched_on TEXT NOT NULL,
+                PRIMARY KEY (market, trade_date)
+            ) WITHOUT ROWID;
+
+            CREATE TABLE IF NOT EXISTS valuations (
+                market TEXT NOT NULL,
+                trade_date TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                pe REAL NOT NULL,
+                pb REAL NOT NULL,
+                dividend_yield REAL NOT NULL,
+                PRIMARY KEY (market, trade_date, symbol)
+            ) WITHOUT ROWID;
+
+            CREATE TABLE IF NOT EXISTS indicator_state (
+                symbol TEXT NOT NULL,
+                market TEXT NOT NULL,
+                last_date TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                updated_on TEXT NOT NULL,
+                PRIMARY KEY (symbol, market)
+            ) WITHOUT ROWID;
+            """
+        )
+        conn.execute(
+            "INSERT INTO schema_meta(key, value) VALUES(?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+            ("schema_version", str(SCHEMA_VERSION)),
+        )
+        conn.commit()
+
+
+def get_month_coverage(db_path: Path, symbol: str, market: str) -> dict[str, dict[str, Any]]:
+    with closing(_connect(db_path)) as conn:
+        rows = conn.execute(
+            "SELECT month, complete, row_count, covered_through, fetched_on FROM candle_months "
+            "WHERE symbol = ? AND market = ?",
+            (symbol, market),
+        ).fetchall()
+    return {
+        row["month"]: {
+            "complete": bool(row["complete"]),
+            "row_count": int(row["row_count"]),
+            "covered_through": row["covered_through"],
+            "fetched_on": row["fetched_on"],
+        }
+        for row in rows
+    }
+
+
+def store_month(
+    db_path: Path,
+    symbol: str,
+    market: str,
+    month: date,
+    candles: list[dict[str, Any]],
+    complete: bool,
+    fetched_on: date,
+) -> dict[str, Any]:
+    key = month_key(month)
+    rows = [
+        (symbol, market, c["date"].isoformat(), c["open"], c["high"], c["low"], c["close"], c["volume"])
+        for c in candles
+        if month_key(c["date"]) == key
+    ]
+    covered_through = max((row[2] for row in rows), default=None)
+    with closing(_connect(db_path)) as conn:
+        with conn:
+            conn.execute(
+                "DELETE FROM daily_candles WHERE symbol = ? AND market = ? AND trade_date >= ? AND trade_date < ?",
+                (symbol, market, f"{key}-01", f"{key}-32"),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO daily_candles(symbol, market, trade_date, open, high, low, close, volume) "
+                "VALUES(?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO candle_months(symbol, market, month, complete, row_count, covered_through, fetched_on) "
+                "VALUES(?, ?, ?, ?, ?, ?, ?)",
+                (symbol, market, key, int(complete), len(rows), covered_through, fetched_on.isoformat()),
+            )
+    return {
+        "complete": complete,
+        "row_count": len(rows),
+        "covered_through": covered_through,
+        "fetched_on": fetched_on.isoformat(),
+    }
+
+
+def store_market_day(
+    db_path: Path,
+    market: str,
+    trade_date: date,
+    candles: dict[str, dict[str, Any]],
+    fetched_on: date,
+) -> dict[str, Any]:
+    day = trade_date.isoformat()
+    rows = [
+        (symbol, market, day, c["open"], c["high"], c["low"], c["close"], c["volume"])
+        for symbol, c in candles.items()
+    ]
+    status = "trading" if rows else "closed"
+    with closing(_connect(db_path)) as conn:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO daily_candles(symbol, market, trade_date, open, high, low, close, volume) "
+                "VALUES(?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO market_days(market, trade_date, status, row_count, fetched_on) VALUES(?, ?, ?, ?, ?)",
+                (market, day, status, len(rows), fetched_on.isoformat()),
+            )
+    return {"market": market, "trade_date": day, "status": status, "row_count": len(rows)}
+
+
+def get_ingested_days(db_path: Path, market: str, start: date, end: date) -> dict[str, str]:
+    with closing(_connect(db_path)) as conn:
+        rows = conn.execute(
+            "SELECT trade_date, status FROM market_days WHERE market = ? AND trade_date BETWEEN ? AND ?",
+            (market, start.isoformat(), end.isoformat()),
+        ).fetchall()
+    return {row["trade_date"]: row["status"] for row in rows}
+
+
+def store_valuation_table(
+    db_path: Path,
+    market: str,
+    trade_date: date,
+    table: dict[str, dict[str, float]],
+    fetched_on: date,
+) -> None:
+    day = trade_date.isoformat()
+    rows = [
+        (market, day, symbol, values["pe"], values["pb"], values["dividend_yield"])
+        for symbol, values in table.items()
+    ]
+    with closing(_connect(db_path)) as conn:
+        with conn:
+            conn.execute("DELETE FROM valuations WHERE market = ? AND trade_date = ?", (market, day))
+            conn.executemany(
+                "INSERT INTO valuations(market, trade_date, symbol, pe, pb, dividend_yield) VALUES(?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO valuation_days(market, trade_date, row_count, fetched_on) VALUES(?, ?, ?, ?)",
+                (market, day, len(rows), fetched_on.isoformat()),
+            )
+
+
+def load_valuation_table(db_path: Path, market: str, trade_date: date) -> dict[str, dict[str, float]] | None:
+    day = trade_date.isoformat()
+    with closing(_connect(db_path)) as conn:
+        if conn.execute(
+            "SELECT 1 FROM valuation_days WHERE market = ? AND trade_date = ?", (market, day)
+        ).fetchone() is None:
+            return None
+        rows = conn.execute(
+            "SELECT symbol, pe, pb, dividend_yield FROM valuations WHERE market = ? AND trade_date = ?",
+            (market, day),
+        ).fetchall()
+    return {row["symbol"]: {"pe": row["pe"], "pb": row["pb"], "dividend_yield": row["dividend_yield"]} for row in rows}
+
+
+def count_candles(db_path: Path, symbol: str, market: str, start: date, end: date) -> int:
+    with closing(_connect(db_path)) as conn:
+        row = conn.execute(
+            "SELECT COUNT(*) FROM daily_candles WHERE symbol = ? AND market = ? AND trade_date BETWEEN ? AND ?",
+            (symbol, market, start.isoformat(), end.isoformat()),
+        ).fetchone()
+    return int(row[0])
+
+
+def load_candles(db_path: Path, symbol: str, market: str, end: date, limit: int) -> CandleSeries:
+    with closing(_connect(db_path)) as conn:
+        rows = conn.execute(
+            "SELECT trade_date, open, high, low, close, volume FROM daily_candles "
+            "WHERE symbol = ? AND market = ? AND trade_date <= ? "
+            "ORDER BY trade_date DESC LIMIT ?",
+            (symbol, market, end.isoformat(), max(int(limit), 0)),
+        ).fetchall()
+    series = CandleSeries()
+    for row in reversed(rows):
+        series.append(date.fromisoformat(row[0]), row[1], row[2], row[3], row[4], row[5])
+    return series
+
+
+def load_indicator_states(db_path: Path, pairs: list[tuple[str, str]]) -> dict[tuple[str, str], dict[str, Any]]:
+    by_market: dict[str, list[str]] = {}
+    for symbol, market in dict.fromkeys(pairs):
+        by_market.setdefault(market, []).append(symbol)
+    states: dict[tuple[str, str], dict[str, Any]] = {}
+    with closing(_connect(db_path)) as conn:
+        for market, symbols in by_market.items():
+            # SQLite 預設最多 999 個綁定參數，分批查詢。
+            for start in range(0, len(symbols), SQLITE_MAX_PARAMS - 1):
+                chunk = symbols[start : start + SQLITE_MAX_PARAMS - 1]
+                rows = conn.execute(
+                    f"SELECT symbol, payload FROM indicator_state WHERE market = ? AND symbol IN ({', '.join('?' * len(chunk))})",
+                    (market, *chunk),
+                ).fetchall()
+                for row in rows:
+                    states[(row["symbol"], market)] = json.loads(row["payload"])
+    return states
+
+
+def store_indicator_states(
+    db_path: Path,
+    states: dict[tuple[str, str], tuple[date, dict[str, Any]]],
+    updated_on: date,
+) -> None:
+    rows = [
+        (symbol, market, last_date.isoformat(), json.dumps(payload, separators=(",", ":")), updated_on.isoformat())
+        for (symbol, market), (last_date, payload) in states.items()
+    ]
+    with closing(_connect(db_path)) as conn:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO indicator_state(symbol, market, last_date, payload, updated_on) VALUES(?, ?, ?, ?, ?)",
+                rows,
+            )
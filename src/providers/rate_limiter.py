@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections import deque
+from typing import Any
+from urllib.error import HTTPError
+
+
+DEFAULT_HOST_RATES: dict[str, float] = {
+    "www.twse.com.tw": 4.0,
+    "openapi.twse.com.tw": 8.0,
+    "www.tpex.org.tw": 4.0,
+}
+DEFAULT_RATE = 8.0
+THROTTLE_STATUSES = {429, 503}
+MAX_EVENTS = 50
+
+
+class _Bucket:
+    __slots__ = ("ceiling", "rate", "capacity", "tokens", "updated_at", "throttle_events", "error_events")
+
+    def __init__(self, ceiling: float, burst: float, now: float) -> None:
+        self.ceiling = ceiling
+        self.rate = ceiling
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self.updated_at = now
+        self.throttle_events = 0
+        self.error_events = 0
+
+
+class HostRateLimiter:
+    """每台主機一個 token bucket；錯誤或被限流時速率減半，成功後線性回升（AIMD）。
+
+    reserve() 只回傳應等待的秒數，由呼叫端決定 time.sleep 或 asyncio.sleep，
+    因此同步與 async provider 可以共用同一個 limiter。
+    """
+
+    def __init__(
+        self,
+        rates: dict[str, float] | None = None,
+        default_rate: float = DEFAULT_RATE,
+        burst: float = 8.0,
+        min_rate: float = 0.25,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 8.0,
+    ) -> None:
+        self.rates = {**DEFAULT_HOST_RATES, **{host: float(rate) for host, rate in (rates or {}).items()}}
+        self.default_rate = float(default_rate)
+        self.burst = float(burst)
+        self.min_rate = float(min_rate)
+        self.backoff_base = float(backoff_base)
+        self.backoff_cap = float(backoff_cap)
+        self._lock = threading.Lock()
+        self._buckets: dict[str, _Bucket] = {}
+        self._events: deque[dict[str, Any]] = deque(maxlen=MAX_EVENTS)
+
+    def reserve(self, host: str) -> float:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(host, now)
+            bucket.tokens = min(bucket.capacity, bucket.tokens + (now - bucket.updated_at) * bucket.rate)
+            bucket.updated_at = now
+            bucket.tokens -= 1.0
+            if bucket.tokens >= 0:
+                return 0.0
+            return -bucket.tokens / bucket.rate
+
+    def record_success(self, host: str) -> None:
+        with self._lock:
+            bucket = self._bucket(host, time.monotonic())
+            if bucket.rate < bucket.ceiling:
+                bucket.rate = min(bucket.ceiling, bucket.rate + bucket.ceiling / 10.0)
+
+    def record_failure(self, host: str, exc: BaseException) -> None:
+        status = exc.code if isinstance(exc, HTTPError) else None
+        throttled = status in THROTTLE_STATUSES
+        with self._lock:
+            bucket = self._bucket(host, time.monotonic())
+            before = bucket.rate
+            bucket.rate = max(self.min_rate, bucket.rate / 2.0)
+            if throttled:
+                bucket.throttle_events += 1
+            else:
+                bucket.error_events += 1
+            self._events.append(
+                {
+                    "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "host": host,
+                    "kind": "throttled" if throttled else "error",
+                    "status": status,
+                    "error": type(exc).__name__,
+                    "rate_before": round(before, 3),
+                    "rate_after": round(bucket.rate, 3),
+                }
+            )
+
+    def backoff(self, attempt: int, exc: BaseException | None = None) -> float:
+        retry_after = _retry_after_seconds(exc)
+        if retry_after is not None:
+            return min(self.backoff_cap, retry_after)
+        ceiling = min(self.backoff_cap, self.backoff_base * (2 ** attempt))
+        return random.uniform(ceiling / 2.0, ceiling)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            hosts = {
+                host: {
+                    "rate_per_sec": round(bucket.rate, 3),
+                    "ceiling_per_sec": round(bucket.ceiling, 3),
+                    "throttle_events": bucket.throttle_events,
+                    "error_events": bucket.error_events,
+                }
+                for host, bucket in sorted(self._buckets.items())
+            }
+            return {"hosts": hosts, "events": list(self._events)}
+
+    def _bucket(self, host: str, now: float) -> _Bucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = _Bucket(self.rates.get(host, self.default_rate), self.burst, now)
+            self._buckets[host] = bucket
+        return bucket
+
+
+def _retry_after_seconds(exc: BaseException | None) -> float | None:
+    headers = getattr(exc, "headers", None) if isinstance(exc, HTTPError) else None
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import base64
+import gzip
+import json
+import sqlite3
+import tempfile
+import threading
+from contextlib import closing
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any
+from urllib.request import Request
+
+
+BUNDLE_VERSION = 1
+RECORD = "record"
+REPLAY = "replay"
+
+
+class ReplayMiss(BaseException):
+    # 繼承 BaseException，讓既有的 except Exception 分支不會把它吞掉：回放缺資料必須中止整個 run。
+    def __init__(self, request: Request) -> None:
+        super().__init__(f"回放 bundle 中沒有此請求：{request.full_url}")
+        self.request = request
+
+
+class ReplayedFetchError(RuntimeError):
+    """錄製時這個請求就失敗了；回放時以同樣的失敗重現，讓 fallback 分支走同一條路。"""
+
+
+def snapshot_sqlite(db_path: Path) -> bytes | None:
+    # 用 backup API 取得一致快照，避免直接讀到 WAL 模式下尚未 checkpoint 的檔案。
+    if not db_path.exists():
+        return None
+    with tempfile.TemporaryDirectory() as tmp:
+        target = Path(tmp) / db_path.name
+        with closing(sqlite3.connect(db_path, timeout=30.0)) as source, closing(sqlite3.connect(target)) as dest:
+            source.backup(dest)
+        return target.read_bytes()
+
+
+def _request_body(req: Request) -> str:
+    return req.data.decode("utf-8", errors="ignore") if isinstance(req.data, (bytes, bytearray)) else ""
+
+
+class ProviderBundle:
+    """單一檔案的請求/回應錄製檔（gzip JSON），供離線、可重現的 provider 執行使用。
+
+    record 模式收集每個請求 key 與回應；replay 模式只從 bundle 供應，
+    未錄到的請求一律拋 ReplayMiss。
+    """
+
+    def __init__(
+        self,
+        mode: str,
+        path: Path,
+        today: date,
+        entries: dict[str, dict[str, Any]] | None = None,
+        quarterly_store: bytes | None = None,
+    ) -> None:
+        if mode not in {RECORD, REPLAY}:
+            raise ValueError(f"未知的 bundle 模式：{mode}")
+        self.mode = mode
+        self.path = Path(path)
+        self.today = today
+        self.entries: dict[str, dict[str, Any]] = dict(entries or {})
+        self.quarterly_store = quarterly_store
+        self.replayed = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: Path) -> ProviderBundle:
+        raw = json.loads(gzip.decompress(Path(path).read_bytes()).decode("utf-8"))
+        if int(raw.get("version") or 0) != BUNDLE_VERSION:
+            raise ValueError(f"不支援的 bundle 版本：{raw.get('version')}")
+        store = raw.get("quarterly_store")
+        return cls(
+            REPLAY,
+            path,
+            today=date.fromisoformat(raw["today"]),
+            entries=raw.get("entries") or {},
+            quarterly_store=base64.b64decode(store) if store else None,
+        )
+
+    def record(self, key: str, req: Request, payload: Any) -> None:
+        with self._lock:
+            self.entries[key] = {"url": req.full_url, "body": _request_body(req), "payload": payload}
+
+    def record_failure(self, key: str, req: Request, exc: Exception) -> None:
+        with self._lock:
+            # 同一請求先失敗後成功時保留成功的回應。
+            if "payload" in self.entries.get(key, {}):
+                return
+            self.entries[key] = {"url": req.full_url, "body": _request_body(req), "error": f"{type(exc).__name__}: {exc}"}
+
+    def replay(self, key: str, req: Request) -> Any:
+        entry = self.entries.get(key)
+        if entry is None:
+            raise ReplayMiss(req)
+        with self._lock:
+            self.replayed += 1
+        if "error" in entry:
+            raise ReplayedFetchError(entry["error"])
+        return entry["payload"]
+
+    def save(self) -> Path:
+        with self._lock:
+            payload = {
+                "version": BUNDLE_VERSION,
+                "created_at": datetime.now().replace(microsecond=0).isoformat(),
+                "today": self.today.isoformat(),
+                "quarterly_store": base64.b64encode(self.quarterly_store).decode("ascii") if self.quarterly_store else None,
+                "entries": self.entries,
+            }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_bytes(gzip.compress(json.dumps(payload, ensure_ascii=False).encode("utf-8")))
+        tmp_path.replace(self.path)
+        return self.path
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"mode": self.mode, "path": str(self.path), "entries": len(self.entries), "replayed": self.replayed}
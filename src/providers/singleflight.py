@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """同一個 key 同一時間只執行一次；其他同時到達的呼叫者等待並共用同一份結果或例外。
+
+    不保存已完成的結果：跨呼叫的重用交給呼叫端既有的快取（HTTP 快取、解析結果 memo）。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self._executed = 0
+        self._shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._executed += 1
+            else:
+                self._shared += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"executed": self._executed, "shared": self._shared, "in_flight": len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """SingleFlight 的 asyncio 版：同一個 key 的 coroutine 同時只跑一次，其他等待者共用結果或例外。
+
+    只在單一 event loop 上使用；換 loop 時先 reset()，舊 loop 的 future 不能再被等待。
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, asyncio.Future[Any]] = {}
+        self._executed = 0
+        self._shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is not None:
+            self._shared += 1
+            return await asyncio.shield(call)
+        call = asyncio.get_running_loop().create_future()
+        self._calls[key] = call
+        self._executed += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except BaseException as exc:
+            call.set_exception(exc)
+            # 沒有其他等待者時避免 "exception was never retrieved" 警告。
+            call.exception()
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            self._calls.pop(key, None)
+
+    def reset(self) -> None:
+        self._calls.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {"executed": self._executed, "shared": self._shared, "in_flight": len(self._calls)}
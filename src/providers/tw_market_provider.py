@@ -3,15 +3,29 @@ from __future__ import annotations
 import hashlib
 import json
 import re
+import shutil
 import ssl
+import tempfile
+import threading
 import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import date, datetime, timedelta
+from itertools import zip_longest
 from pathlib import Path
 from typing import Any
-from urllib.parse import urlencode
-from urllib.request import Request, urlopen
+from urllib.parse import parse_qs, urlencode, urlsplit
+from urllib.request import Request
 
+from src.analysis.candles import CandleSeries
 from src.analysis.factors import safe_float
+from src.analysis.indicator_state import FULL, INCREMENTAL, UNCHANGED, IndicatorState, advance_state, state_last_date
+from src.providers import http_cache, market_store
+from src.providers.http_pool import PooledHttpTransport
+from src.providers.rate_limiter import HostRateLimiter
+from src.providers.replay_bundle import RECORD, REPLAY, ProviderBundle, snapshot_sqlite
+from src.providers.singleflight import SingleFlight
+from src.providers.universe import Universe
 from src.providers.quarterly_store import (
     claim_backfill_batch,
     create_backfill_run,
@@ -35,12 +49,14 @@ TWSE_REVENUE_URL = "https://openapi.twse.com.tw/v1/opendata/t187ap05_L"
 TWSE_STOCK_DAY_URL = "https://www.twse.com.tw/exchangeReport/STOCK_DAY"
 TWSE_BWIBBU_URL = "https://www.twse.com.tw/exchangeReport/BWIBBU_d"
 TWSE_FMTQIK_URL = "https://www.twse.com.tw/exchangeReport/FMTQIK"
+TWSE_MI_INDEX_URL = "https://www.twse.com.tw/exchangeReport/MI_INDEX"
 TWSE_EPS_URL = "https://openapi.twse.com.tw/v1/opendata/t187ap14_L"
 
 TPEX_BASICS_URL = "https://www.tpex.org.tw/openapi/v1/mopsfin_t187ap03_O"
 TPEX_REVENUE_URL = "https://www.tpex.org.tw/openapi/v1/mopsfin_t187ap05_O"
 TPEX_TRADING_STOCK_URL = "https://www.tpex.org.tw/www/zh-tw/afterTrading/tradingStock"
 TPEX_PE_QRY_DATE_URL = "https://www.tpex.org.tw/www/zh-tw/afterTrading/peQryDate"
+TPEX_DAILY_QUOTES_URL = "https://www.tpex.org.tw/www/zh-tw/afterTrading/otc"
 TPEX_EPS_URL = "https://www.tpex.org.tw/openapi/v1/mopsfin_t187ap14_O"
 
 TWSE_INCOME_URLS = {
@@ -71,6 +87,8 @@ TPEX_BALANCE_URLS = {
     "fh": "https://www.tpex.org.tw/openapi/v1/mopsfin_t187ap07_O_fh",
     "ins": "https://www.tpex.org.tw/openapi/v1/mopsfin_t187ap07_O_ins",
 }
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_STALE_SECONDS = 72 * 3600
 
 
 def _is_stock_symbol(symbol: str) -> bool:
@@ -90,6 +108,75 @@ def _shift_month(d: date, delta: int) -> date:
     return date(year, month, 1)
 
 
+def _parse_ohlcv_rows(rows: list[Any]) -> list[dict[str, Any]]:
+    candles: list[dict[str, Any]] = []
+    for row in rows:
+        if not isinstance(row, list) or len(row) < 7:
+            continue
+        o = safe_float(row[3])
+        h = safe_float(row[4])
+        l = safe_float(row[5])
+        c = safe_float(row[6])
+        v = safe_float(row[1])
+        if None in {o, h, l, c, v}:
+            continue
+        candles.append(
+            {
+                "date": _parse_roc_slash(str(row[0])),
+                "open": float(o),
+                "high": float(h),
+                "low": float(l),
+                "close": float(c),
+                "volume": float(v),
+            }
+        )
+    return candles
+
+
+def _parse_daily_quote_rows(
+    rows: list[Any],
+    fields: list[str],
+    columns: dict[str, str],
+    volume_divisor: float,
+) -> dict[str, dict[str, Any]]:
+    index = {name: fields.index(label) for name, label in columns.items() if label in fields}
+    if len(index) != len(columns):
+        return {}
+    width = max(index.values()) + 1
+    candles: dict[str, dict[str, Any]] = {}
+    for row in rows:
+        if not isinstance(row, list) or len(row) < width:
+            continue
+        symbol = str(row[index["symbol"]]).strip()
+        if not _is_stock_symbol(symbol):
+            continue
+        values = {name: safe_float(row[idx]) for name, idx in index.items() if name != "symbol"}
+        if None in values.values():
+            continue
+        candles[symbol] = {
+            "open": float(values["open"]),
+            "high": float(values["high"]),
+            "low": float(values["low"]),
+            "close": float(values["close"]),
+            "volume": float(values["volume"]) / volume_divisor,
+        }
+    return candles
+
+
+def _stat_ok(payload: Any) -> bool:
+    # TWSE 回 "OK"、TPEx 回 "ok"；沒有 stat 欄位的 OpenAPI 清單一律視為正常。
+    if not isinstance(payload, dict) or "stat" not in payload:
+        return True
+    return str(payload.get("stat") or "").strip().lower() == "ok"
+
+
+class NotModified(Exception):
+    # 條件式請求得到 304：快取內容仍有效，不應視為抓取失敗或重試。
+    def __init__(self, headers: dict[str, str] | None = None) -> None:
+        super().__init__("HTTP 304")
+        self.headers = headers or {}
+
+
 def _previous_period(period: str) -> str | None:
     match = re.fullmatch(r"(\d{3,4})Q([1-4])", period)
     if not match:
@@ -101,50 +188,328 @@ def _previous_period(period: str) -> str | None:
     return f"{year}Q{quarter - 1}"
 
 
+def _request_scope(req: Request) -> tuple[str | None, str | None]:
+    """回傳這個請求影響的 (market, symbol)；None 表示不限。"""
+    parts = urlsplit(req.full_url)
+    if req.full_url.startswith(TWSE_FMTQIK_URL):
+        # 加權指數是所有列的比較基準。
+        return None, None
+    host = parts.hostname or ""
+    market = "TPEx" if host.endswith("tpex.org.tw") else "TWSE" if host.endswith("twse.com.tw") else None
+    params = parse_qs(parts.query)
+    if isinstance(req.data, (bytes, bytearray)):
+        params.update(parse_qs(req.data.decode("utf-8", errors="ignore")))
+    symbols = params.get("stockNo") or params.get("code")
+    return market, symbols[0] if symbols else None
+
+
 class TwMarketProvider:
-    def __init__(self, timeout: float = 10.0, cache_dir: Path | None = None) -> None:
+    def __init__(
+        self,
+        timeout: float = 10.0,
+        cache_dir: Path | None = None,
+        max_workers: int = 8,
+        per_host_concurrency: int = 4,
+        rate_limits: dict[str, float] | None = None,
+        cache_max_bytes: int | None = DEFAULT_CACHE_MAX_BYTES,
+        stale_while_revalidate: bool = False,
+        max_stale_seconds: float = DEFAULT_MAX_STALE_SECONDS,
+        record_bundle: Path | None = None,
+        replay_bundle: Path | None = None,
+    ) -> None:
+        if record_bundle is not None and replay_bundle is not None:
+            raise ValueError("record_bundle 與 replay_bundle 不能同時指定")
         self.timeout = timeout
         self.cache_dir = cache_dir or (Path(__file__).resolve().parents[2] / ".cache" / "market")
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._bundle: ProviderBundle | None = None
+        if record_bundle is not None or replay_bundle is not None:
+            self._open_bundle(record_bundle, replay_bundle)
         self.quarterly_store_path = self.cache_dir / "quarterly_fundamentals.sqlite"
         init_db(self.quarterly_store_path)
+        self.market_store_path = self.cache_dir / "market_store.sqlite"
+        market_store.init_db(self.market_store_path)
+        self.http_cache_path = self.cache_dir / "http_cache.sqlite"
+        http_cache.init_db(self.http_cache_path)
+        http_cache.import_file_cache(self.http_cache_path, self.cache_dir)
+        self.cache_max_bytes = cache_max_bytes
+        self._cache_eviction: dict[str, int] | None = None
+        if cache_max_bytes is not None:
+            self._cache_eviction = http_cache.evict_to_budget(self.http_cache_path, cache_max_bytes)
+        self.max_workers = max(1, int(max_workers))
+        self.per_host_concurrency = max(1, int(per_host_concurrency))
+        self._state_lock = threading.RLock()
+        self._host_slots: dict[str, threading.BoundedSemaphore] = {}
+        self._http = PooledHttpTransport(timeout=timeout, max_idle_per_host=self.per_host_concurrency)
+        self.rate_limiter = HostRateLimiter(rates=rate_limits)
         self._twse_valuation_cache: dict[str, dict[str, dict[str, float]]] = {}
         self._tpex_valuation_cache: dict[str, dict[str, dict[str, float]]] = {}
-        self._ohlcv_cache: dict[tuple[str, str, str, int], list[dict[str, Any]]] = {}
+        # (symbol, market, as_of) -> (lookback, candles)；較短的 lookback 直接切尾端。
+        self._ohlcv_cache: dict[tuple[str, str, str], tuple[int, CandleSeries]] = {}
+        self._flights = SingleFlight()
+        self._universe_cache: tuple[date, Universe] | None = None
         self._reported_period_cache: dict[tuple[str, str], str] = {}
+        self._daily_quote_log: list[dict[str, Any]] = []
+        self._fmtqik_cache: dict[str, Any] = {}
+        self._response_validators: dict[str, dict[str, str]] = {}
+        self._fetch_counts = {"full": 0, "revalidated": 0}
+        # 端點計數（hits, misses, full_fetches, revalidations）與命中項目的存取時間先留在記憶體，close() 時一次寫回。
+        self._cache_stats: dict[str, list[int]] = {}
+        self._cache_access: dict[str, tuple[float, str]] = {}
+        self.stale_while_revalidate = bool(stale_while_revalidate)
+        self.max_stale_seconds = max(0.0, float(max_stale_seconds))
+        self._stale_served: dict[str, dict[str, Any]] = {}
+        self._refreshing: set[str] = set()
+        self._refresh_pool: ThreadPoolExecutor | None = None
+        self._dataset_indexes: dict[str, tuple[list[dict[str, Any]], dict[str, dict[str, Any]]]] = {}
+        self._legacy_snapshot_indexes: dict[tuple[str, str], list[tuple[dict[str, Any], ...]]] = {}
+
+    def _host_slot(self, req: Request) -> threading.BoundedSemaphore:
+        host = urlsplit(req.full_url).hostname or ""
+        with self._state_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.per_host_concurrency)
+                self._host_slots[host] = slot
+            return slot
+
+    def _open_bundle(self, record_bundle: Path | None, replay_bundle: Path | None) -> None:
+        # bundle 模式一律改用暫存目錄當快取與資料庫：錄製時每個請求都會真的送出而被記下，
+        # 回放時也不會讀到本機既有快取。季報 SQLite 是回補累積的狀態，錄製當下的快照一併存入 bundle。
+        source_quarterly = self.cache_dir / "quarterly_fundamentals.sqlite"
+        self.cache_dir = Path(tempfile.mkdtemp(prefix="tw-sector-bundle-"))
+        weakref.finalize(self, shutil.rmtree, self.cache_dir, ignore_errors=True)
+        if replay_bundle is not None:
+            self._bundle = ProviderBundle.load(Path(replay_bundle))
+        else:
+            self._bundle = ProviderBundle(
+                RECORD, Path(record_bundle), today=date.today(), quarterly_store=snapshot_sqlite(source_quarterly)
+            )
+        if self._bundle.quarterly_store:
+            (self.cache_dir / "quarterly_fundamentals.sqlite").write_bytes(self._bundle.quarterly_store)
 
-    def _load_json(self, req: Request) -> Any:
+    def finish_recording(self) -> Path | None:
+        if self._bundle is None or self._bundle.mode != RECORD:
+            return None
+        return self._bundle.save()
+
+    def _load_json(self, req: Request, not_before: float | None = None, pin: bool = False) -> Any:
+        # 同一請求同時只送一次、解析一次，其餘呼叫者等待同一份結果。
+        return self._flights.do(("json", self._cache_key(req)), lambda: self._load_json_once(req, not_before, pin))
+
+    def _load_json_once(self, req: Request, not_before: float | None = None, pin: bool = False) -> Any:
+        if self._bundle is None:
+            return self._load_json_live(req, not_before, pin)
+        key = self._cache_key(req)
+        if self._bundle.mode == REPLAY:
+            return self._bundle.replay(key, req)
+        try:
+            payload = self._load_json_live(req, not_before, pin)
+        except Exception as exc:
+            self._bundle.record_failure(key, req, exc)
+            raise
+        self._bundle.record(key, req, payload)
+        return payload
+
+    def _load_json_live(self, req: Request, not_before: float | None = None, pin: bool = False) -> Any:
+        entry = self._cache_entry(req)
+        if self._cache_hit(req, entry, not_before):
+            return entry["payload"]
+        if self._can_serve_stale(req, entry, not_before):
+            return self._serve_stale(req, entry, pin)
+        with self._host_slot(req):
+            try:
+                payload = self._fetch_with_retry(self._conditional_request(req, entry))
+            except NotModified as exc:
+                return self._revalidated(req, entry, exc, pinned=pin)
+        self._write_cache(req, payload, pinned=pin)
+        return payload
+
+    def _fetch_with_retry(self, req: Request) -> Any:
+        host = urlsplit(req.full_url).hostname or ""
         last_exc: Exception | None = None
-        cache_file = self._cache_path(req)
-        cached = self._read_cache(cache_file, self._cache_ttl_seconds(req))
-        if cached is not None:
-            return cached
         for attempt in range(3):
+            wait_seconds = self.rate_limiter.reserve(host)
+            if wait_seconds > 0:
+                time.sleep(wait_seconds)
             try:
-                with urlopen(req, timeout=self.timeout) as resp:
-                    payload = json.loads(resp.read().decode("utf-8-sig"))
-                    self._write_cache(cache_file, payload)
-                    return payload
+                payload = self._open_json(req)
+            except NotModified:
+                self.rate_limiter.record_success(host)
+                raise
             except Exception as exc:
                 last_exc = exc
                 reason = getattr(exc, "reason", None)
                 if isinstance(exc, ssl.SSLCertVerificationError) or isinstance(reason, ssl.SSLCertVerificationError):
-                    insecure_ctx = ssl._create_unverified_context()
-                    with urlopen(req, timeout=self.timeout, context=insecure_ctx) as resp:
-                        payload = json.loads(resp.read().decode("utf-8-sig"))
-                        self._write_cache(cache_file, payload)
-                        return payload
+                    return self._open_json(req, context=ssl._create_unverified_context())
+                self.rate_limiter.record_failure(host, exc)
                 if attempt < 2:
-                    time.sleep(0.6 * (attempt + 1))
+                    time.sleep(self._retry_delay(attempt, exc))
                     continue
+            else:
+                self.rate_limiter.record_success(host)
+                return payload
         if last_exc is not None:
             raise last_exc
         raise RuntimeError("無法讀取 JSON")
 
-    def _cache_path(self, req: Request) -> Path:
+    def _retry_delay(self, attempt: int, exc: BaseException | None = None) -> float:
+        return self.rate_limiter.backoff(attempt, exc)
+
+    def _open_json(self, req: Request, context: ssl.SSLContext | None = None) -> Any:
+        response = self._http.request(req, context=context)
+        if response.status == 304:
+            raise NotModified(response.headers)
+        self._remember_validators(req, response.headers)
+        return json.loads(response.body.decode("utf-8-sig"))
+
+    def _can_serve_stale(self, req: Request, entry: dict[str, Any] | None, not_before: float | None) -> bool:
+        # 只放寬 TTL；有 not_before 下限的請求（未收盤月份、當日表）仍必須拿到新資料。
+        if not self.stale_while_revalidate or entry is None or not_before is not None:
+            return False
+        ttl_seconds = entry["ttl_seconds"]
+        if ttl_seconds is None:
+            ttl_seconds = self._cache_ttl_seconds(req)
+        return (time.time() - entry["fetched_at"]) <= ttl_seconds + self.max_stale_seconds
+
+    def _serve_stale(self, req: Request, entry: dict[str, Any], pin: bool) -> Any:
+        if self._claim_stale_refresh(req, entry):
+            with self._state_lock:
+                if self._refresh_pool is None:
+                    self._refresh_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tw-cache-refresh")
+                pool = self._refresh_pool
+            pool.submit(self._background_refresh, req, entry, pin)
+        return entry["payload"]
+
+    def _claim_stale_refresh(self, req: Request, entry: dict[str, Any]) -> bool:
+        """記下沿用的過期項目；回傳 True 表示呼叫端要負責排一次背景更新。"""
+        key = self._cache_key(req)
+        with self._state_lock:
+            if key not in self._stale_served:
+                market, symbol = _request_scope(req)
+                self._stale_served[key] = {
+                    "url": req.full_url,
+                    "endpoint": http_cache.endpoint_of(req.full_url),
+                    "market": market,
+                    "symbol": symbol,
+                    "age_seconds": round(time.time() - entry["fetched_at"], 1),
+                }
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _release_stale_refresh(self, req: Request) -> None:
+        with self._state_lock:
+            self._refreshing.discard(self._cache_key(req))
+
+    def _background_refresh(self, req: Request, entry: dict[str, Any], pin: bool) -> None:
+        try:
+            with self._host_slot(req):
+                payload = self._fetch_with_retry(self._conditional_request(req, entry))
+            self._write_cache(req, payload, pinned=pin)
+        except NotModified as exc:
+            self._revalidated(req, entry, exc, pinned=pin)
+        except Exception:
+            # 背景更新失敗時保留舊資料，下次執行再試。
+            pass
+        finally:
+            self._release_stale_refresh(req)
+
+    def wait_for_background_refresh(self) -> None:
+        with self._state_lock:
+            pool, self._refresh_pool = self._refresh_pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def flush_cache_stats(self) -> None:
+        with self._state_lock:
+            stats, self._cache_stats = self._cache_stats, {}
+            accessed, self._cache_access = self._cache_access, {}
+        try:
+            http_cache.record_stats(
+                self.http_cache_path,
+                {endpoint: tuple(counts) for endpoint, counts in stats.items()},
+                accessed,
+            )
+        except Exception:
+            return
+
+    def close(self) -> None:
+        self.wait_for_background_refresh()
+        self.flush_cache_stats()
+        self._http.close()
+
+    def stale_cache_entries(self) -> list[dict[str, Any]]:
+        with self._state_lock:
+            return list(self._stale_served.values())
+
+    def _remember_validators(self, req: Request, headers: dict[str, str]) -> None:
+        validators = {name: headers[name] for name in ("etag", "last-modified") if headers.get(name)}
+        if validators:
+            with self._state_lock:
+                self._response_validators[self._cache_key(req)] = validators
+
+    def _conditional_request(self, req: Request, entry: dict[str, Any] | None) -> Request:
+        if entry is None or not (entry.get("etag") or entry.get("last_modified")):
+            return req
+        headers = dict(req.header_items())
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return Request(req.full_url, data=req.data, headers=headers, method=req.get_method())
+
+    def _revalidated(self, req: Request, entry: dict[str, Any] | None, exc: NotModified, pinned: bool = False) -> Any:
+        if entry is None:
+            raise RuntimeError("收到 304 但沒有可沿用的快取")
+        try:
+            http_cache.revalidate_entry(
+                self.http_cache_path,
+                self._cache_key(req),
+                fetched_at=time.time(),
+                pinned=pinned,
+                etag=exc.headers.get("etag"),
+                last_modified=exc.headers.get("last-modified"),
+            )
+        except Exception:
+            pass
+        with self._state_lock:
+            self._fetch_counts["revalidated"] += 1
+            self._endpoint_counts(req)[3] += 1
+        return entry["payload"]
+
+    def fetch_stats(self) -> dict[str, Any]:
+        with self._state_lock:
+            daily_quotes = list(self._daily_quote_log)
+            fetch_counts = dict(self._fetch_counts)
+            stale_served = list(self._stale_served.values())
+        return {
+            "http_pool": self._http.stats(),
+            "rate_limiter": self.rate_limiter.stats(),
+            "daily_quotes_ingested": daily_quotes,
+            "http_cache": {
+                "max_bytes": self.cache_max_bytes,
+                "startup_eviction": self._cache_eviction,
+                "full_fetches": fetch_counts["full"],
+                "revalidated": fetch_counts["revalidated"],
+                "stale_while_revalidate": self.stale_while_revalidate,
+                "stale_served": stale_served,
+            },
+            "bundle": self._bundle.stats() if self._bundle is not None else None,
+            "single_flight": self._flights.stats(),
+        }
+
+    def _cache_key(self, req: Request) -> str:
         body = req.data.decode("utf-8", errors="ignore") if isinstance(req.data, (bytes, bytearray)) else ""
-        digest = hashlib.sha256(f"{req.full_url}|{body}".encode("utf-8")).hexdigest()
-        return self.cache_dir / f"{digest}.json"
+        return hashlib.sha256(f"{req.full_url}|{body}".encode("utf-8")).hexdigest()
+
+    def _has_fresh_cache(self, req: Request, not_before: float | None = None) -> bool:
+        try:
+            entry = http_cache.get_entry(self.http_cache_path, self._cache_key(req), include_payload=False)
+        except Exception:
+            return False
+        return self._cache_entry_fresh(req, entry, not_before)
 
     def _cache_ttl_seconds(self, req: Request) -> int:
         url = req.full_url.lower()
@@ -152,20 +517,63 @@ class TwMarketProvider:
             return 365 * 24 * 3600
         return 12 * 3600
 
-    def _read_cache(self, cache_file: Path, ttl_seconds: int) -> Any:
-        if not cache_file.exists():
-            return None
-        age_seconds = time.time() - cache_file.stat().st_mtime
-        if age_seconds > ttl_seconds:
-            return None
+    def _cache_entry_fresh(self, req: Request, entry: dict[str, Any] | None, not_before: float | None) -> bool:
+        if entry is None:
+            return False
+        fetched_at = entry["fetched_at"]
+        if not_before is not None and fetched_at < not_before:
+            return False
+        ttl_seconds = entry["ttl_seconds"]
+        if ttl_seconds is None:
+            ttl_seconds = self._cache_ttl_seconds(req)
+        return (time.time() - fetched_at) <= ttl_seconds
+
+    def _cache_entry(self, req: Request) -> dict[str, Any] | None:
         try:
-            return json.loads(cache_file.read_text(encoding="utf-8"))
+            return http_cache.get_entry(self.http_cache_path, self._cache_key(req))
         except Exception:
             return None
 
-    def _write_cache(self, cache_file: Path, payload: Any) -> None:
+    def _cache_hit(self, req: Request, entry: dict[str, Any] | None, not_before: float | None) -> bool:
+        hit = self._cache_entry_fresh(req, entry, not_before)
+        self._note_cache_lookup(req, self._cache_key(req), hit)
+        return hit
+
+    def _endpoint_counts(self, req: Request) -> list[int]:
+        endpoint = http_cache.endpoint_of(req.full_url)
+        counts = self._cache_stats.get(endpoint)
+        if counts is None:
+            counts = [0, 0, 0, 0]
+            self._cache_stats[endpoint] = counts
+        return counts
+
+    def _note_cache_lookup(self, req: Request, key: str, hit: bool) -> None:
+        with self._state_lock:
+            self._endpoint_counts(req)[0 if hit else 1] += 1
+            if hit:
+                self._cache_access[key] = (time.time(), req.full_url)
+
+    def _write_cache(self, req: Request, payload: Any, pinned: bool = False) -> None:
+        key = self._cache_key(req)
+        with self._state_lock:
+            validators = self._response_validators.pop(key, {})
+            self._fetch_counts["full"] += 1
+            self._endpoint_counts(req)[2] += 1
+        if not _stat_ok(payload):
+            # 查無資料、限流或暫時錯誤的回應不落地，下次照常重抓。
+            return
         try:
-            cache_file.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+            http_cache.put_entry(
+                self.http_cache_path,
+                key,
+                req.full_url,
+                payload,
+                fetched_at=time.time(),
+                ttl_seconds=self._cache_ttl_seconds(req),
+                pinned=pinned,
+                etag=validators.get("etag"),
+                last_modified=validators.get("last-modified"),
+            )
         except Exception:
             return
 
@@ -177,20 +585,13 @@ class TwMarketProvider:
         path.mkdir(parents=True, exist_ok=True)
         return path
 
-    def _get_json(self, url: str, params: dict[str, Any] | None = None) -> Any:
+    def _build_get_request(self, url: str, params: dict[str, Any] | None = None) -> Request:
         query = urlencode(params) if params else ""
         full_url = f"{url}?{query}" if query else url
-        req = Request(full_url, headers={"User-Agent": "Mozilla/5.0"})
-        return self._load_json(req)
+        return Request(full_url, headers={"User-Agent": "Mozilla/5.0"})
 
-    def _safe_get_json(self, url: str, default: Any) -> Any:
-        try:
-            return self._get_json(url)
-        except Exception:
-            return default
-
-    def _post_json(self, url: str, data: dict[str, Any]) -> Any:
-        req = Request(
+    def _build_post_request(self, url: str, data: dict[str, Any]) -> Request:
+        return Request(
             url,
             data=urlencode(data).encode("utf-8"),
             headers={
@@ -198,7 +599,18 @@ class TwMarketProvider:
                 "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
             },
         )
-        return self._load_json(req)
+
+    def _get_json(self, url: str, params: dict[str, Any] | None = None) -> Any:
+        return self._load_json(self._build_get_request(url, params))
+
+    def _safe_get_json(self, url: str, default: Any) -> Any:
+        try:
+            return self._get_json(url)
+        except Exception:
+            return default
+
+    def _post_json(self, url: str, data: dict[str, Any]) -> Any:
+        return self._load_json(self._build_post_request(url, data))
 
     def load_theme_universe(
         self,
@@ -207,49 +619,44 @@ class TwMarketProvider:
         theme_mode: str = "strict",
     ) -> list[dict[str, Any]]:
         rule = theme_rule(theme, theme_mode=theme_mode)
-        output: list[dict[str, Any]] = []
-        for row in self.load_all_universe(min_monthly_revenue=min_monthly_revenue):
-            if self._theme_match(row["symbol"], row["name"], row.get("industry") or "", rule):
-                output.append(row)
-
-        output.sort(key=lambda x: x.get("monthly_revenue", 0.0), reverse=True)
-        return output
+        return self._universe().theme_members(rule, min_monthly_revenue=min_monthly_revenue)
 
     def load_all_universe(self, min_monthly_revenue: float = 0.0) -> list[dict[str, Any]]:
-        basics = self._load_basics()
-        revenue_map = self._load_latest_revenue_map()
-        output: list[dict[str, Any]] = []
-        for symbol, item in basics.items():
-            rev = revenue_map.get(symbol, {})
-            industry = str(rev.get("industry") or item.get("industry") or "").strip()
-            monthly_revenue = float(rev.get("monthly_revenue") or 0.0)
-            if monthly_revenue < min_monthly_revenue:
-                continue
-            output.append(
-                {
-                    "symbol": symbol,
-                    "name": item.get("name", ""),
-                    "market": item.get("market", "TWSE"),
-                    "industry": industry or "未分類",
-                    "monthly_revenue": monthly_revenue,
-                    "revenue_yoy": safe_float(rev.get("revenue_yoy")),
-                    "revenue_mom": safe_float(rev.get("revenue_mom")),
-                }
-            )
-        output.sort(key=lambda x: x.get("monthly_revenue", 0.0), reverse=True)
-        return output
+        return self._universe().above(min_monthly_revenue)
 
     def load_industry_universes(
         self,
         min_monthly_revenue: float = 0.0,
         min_count: int = 1,
     ) -> dict[str, list[dict[str, Any]]]:
-        buckets: dict[str, list[dict[str, Any]]] = {}
-        for row in self.load_all_universe(min_monthly_revenue=min_monthly_revenue):
-            industry = str(row.get("industry") or "未分類").strip() or "未分類"
-            buckets.setdefault(industry, []).append(row)
-        filtered = {k: v for k, v in buckets.items() if len(v) >= min_count}
-        return dict(sorted(filtered.items(), key=lambda item: (-len(item[1]), item[0])))
+        return self._universe().industry_buckets(min_monthly_revenue=min_monthly_revenue, min_count=min_count)
+
+    def _universe(self) -> Universe:
+        today = self._today()
+        cached = self._cached_universe(today)
+        if cached is not None:
+            return cached
+        return self._flights.do(("universe", today.isoformat()), lambda: self._build_universe(today))
+
+    def _build_universe(self, today: date) -> Universe:
+        cached = self._cached_universe(today)
+        if cached is not None:
+            return cached
+        return self._remember_universe(today, Universe.build(self._load_basics(), self._load_latest_revenue_map()))
+
+    def _cached_universe(self, today: date) -> Universe | None:
+        with self._state_lock:
+            cached = self._universe_cache
+        if cached is not None and cached[0] == today:
+            return cached[1]
+        return None
+
+    def _remember_universe(self, today: date, universe: Universe) -> Universe:
+        # 基本資料抓取失敗時得到空池，不記住，下次呼叫再試。
+        if len(universe):
+            with self._state_lock:
+                self._universe_cache = (today, universe)
+        return universe
 
     def get_taiex_series(self, as_of: date, lookback: int = 252) -> list[dict[str, Any]]:
         """TAIEX (發行量加權股價指數) close series up to as_of.
@@ -261,25 +668,10 @@ class TwMarketProvider:
         months_checked = 0
 
         while months_checked < 36 and len(collected) < (lookback + 10):
-            payload = self._get_json(TWSE_FMTQIK_URL, {"response": "json", "date": cursor.strftime("%Y%m%d")})
-            if isinstance(payload, dict) and payload.get("stat") == "OK":
-                fields = payload.get("fields") or []
-                rows = payload.get("data") or []
-                idx = {str(name).strip(): i for i, name in enumerate(fields)}
-                date_idx = idx.get("日期", 0)
-                close_idx = idx.get("發行量加權股價指數")
-                chg_idx = idx.get("漲跌點數")
-                for row in rows:
-                    if not isinstance(row, list) or date_idx >= len(row):
-                        continue
-                    d = _parse_roc_slash(str(row[date_idx]))
-                    if d > as_of:
-                        continue
-                    close = safe_float(row[close_idx] if close_idx is not None and close_idx < len(row) else None)
-                    chg_pts = safe_float(row[chg_idx] if chg_idx is not None and chg_idx < len(row) else None)
-                    if close is None:
-                        continue
-                    collected[d] = {"date": d, "close": float(close), "change_points": chg_pts}
+            for d, close, chg_pts in self._fmtqik_rows(self._fmtqik_payload(cursor)) or []:
+                if d > as_of:
+                    continue
+                collected[d] = {"date": d, "close": close, "change_points": chg_pts}
 
             cursor = _shift_month(cursor, -1)
             months_checked += 1
@@ -289,19 +681,64 @@ class TwMarketProvider:
             raise RuntimeError("無法取得加權指數資料（TWSE FMTQIK）")
         return series[-lookback:]
 
-    def _theme_match(self, symbol: str, name: str, industry: str, rule: dict[str, Any]) -> bool:
-        if symbol in set(rule.get("symbols") or []):
-            return True
-        if rule.get("theme_mode") != "broad":
-            return False
-        text = f"{name} {industry}".lower()
-        for kw in rule.get("name_keywords") or []:
-            if str(kw).lower() in text:
-                return True
-        for kw in rule.get("industry_keywords") or []:
-            if str(kw).lower() in industry.lower():
-                return True
-        return False
+    def trading_days(self, start: date, end: date) -> list[date] | None:
+        """TWSE/TPEx 共用的交易日曆，取自 FMTQIK；取不到時回傳 None。"""
+        days: list[date] = []
+        month = date(end.year, end.month, 1)
+        while month >= date(start.year, start.month, 1):
+            try:
+                rows = self._fmtqik_rows(self._fmtqik_payload(month))
+            except Exception:
+                return None
+            if rows is None:
+                if self._today() >= _shift_month(month, 1):
+                    return None
+                # 當月尚無資料（月初第一個交易日收盤前）。
+                rows = []
+            days.extend(d for d, _, _ in rows if start <= d <= end)
+            month = _shift_month(month, -1)
+        return sorted(days)
+
+    def _fmtqik_payload(self, month: date) -> Any:
+        cached = self._cached_fmtqik(month)
+        if cached is not None:
+            return cached
+        payload = self._load_json(
+            self._fmtqik_request(month), not_before=self._month_not_before(month), pin=self._month_closed(month)
+        )
+        return self._remember_fmtqik(month, payload)
+
+    def _fmtqik_request(self, month: date) -> Request:
+        return self._build_get_request(TWSE_FMTQIK_URL, {"response": "json", "date": month.strftime("%Y%m%d")})
+
+    def _cached_fmtqik(self, month: date) -> Any:
+        with self._state_lock:
+            return self._fmtqik_cache.get(month.isoformat())
+
+    def _remember_fmtqik(self, month: date, payload: Any) -> Any:
+        with self._state_lock:
+            self._fmtqik_cache[month.isoformat()] = payload
+        return payload
+
+    def _fmtqik_rows(self, payload: Any) -> list[tuple[date, float, float | None]] | None:
+        if not isinstance(payload, dict) or payload.get("stat") != "OK":
+            return None
+        fields = payload.get("fields") or []
+        idx = {str(name).strip(): i for i, name in enumerate(fields)}
+        date_idx = idx.get("日期", 0)
+        close_idx = idx.get("發行量加權股價指數")
+        chg_idx = idx.get("漲跌點數")
+        rows: list[tuple[date, float, float | None]] = []
+        for row in payload.get("data") or []:
+            if not isinstance(row, list) or date_idx >= len(row):
+                continue
+            d = _parse_roc_slash(str(row[date_idx]))
+            close = safe_float(row[close_idx] if close_idx is not None and close_idx < len(row) else None)
+            chg_pts = safe_float(row[chg_idx] if chg_idx is not None and chg_idx < len(row) else None)
+            if close is None:
+                continue
+            rows.append((d, float(close), chg_pts))
+        return rows
 
     def _symbol_field(self, row: dict[str, Any]) -> str:
         return str(
@@ -346,6 +783,43 @@ class TwMarketProvider:
                 return row
         return None
 
+    def _index_rows(self, rows: Any) -> dict[str, dict[str, Any]]:
+        # 與 _find_row 相同語意：同代號重複出現時保留第一筆。
+        index: dict[str, dict[str, Any]] = {}
+        if not isinstance(rows, list):
+            return index
+        for row in rows:
+            if isinstance(row, dict):
+                index.setdefault(self._symbol_field(row), row)
+        return index
+
+    def _load_dataset(self, url: str) -> tuple[list[dict[str, Any]], dict[str, dict[str, Any]]]:
+        cached = self._cached_dataset(url)
+        if cached is not None:
+            return cached
+        return self._flights.do(("dataset", url), lambda: self._parse_dataset(url))
+
+    def _parse_dataset(self, url: str) -> tuple[list[dict[str, Any]], dict[str, dict[str, Any]]]:
+        cached = self._cached_dataset(url)
+        if cached is not None:
+            return cached
+        return self._remember_dataset(url, self._get_json(url))
+
+    def _cached_dataset(self, url: str) -> tuple[list[dict[str, Any]], dict[str, dict[str, Any]]] | None:
+        with self._state_lock:
+            return self._dataset_indexes.get(url)
+
+    def _remember_dataset(self, url: str, rows: Any) -> tuple[list[dict[str, Any]], dict[str, dict[str, Any]]]:
+        rows = rows or []
+        if not isinstance(rows, list):
+            rows = []
+        entry = (rows, self._index_rows(rows))
+        with self._state_lock:
+            return self._dataset_indexes.setdefault(url, entry)
+
+    def _dataset_index(self, url: str) -> dict[str, dict[str, Any]]:
+        return self._load_dataset(url)[1]
+
     def _approx_period(self, as_of: date) -> str:
         approx_year = as_of.year - 1911
         approx_quarter = ((max(as_of.month - 1, 0)) // 3) + 1
@@ -377,11 +851,21 @@ class TwMarketProvider:
         return periods
 
     def _latest_reported_period(self, market: str, as_of: date) -> str:
-        cache_key = (market, as_of.isoformat())
-        if cache_key in self._reported_period_cache:
-            return self._reported_period_cache[cache_key]
+        cached = self._cached_reported_period(market, as_of)
+        if cached is not None:
+            return cached
         eps_url, _, _, _ = self._quarterly_source_urls(market)
-        rows = self._safe_get_json(eps_url, []) or []
+        try:
+            rows = self._load_dataset(eps_url)[0]
+        except Exception:
+            rows = []
+        return self._remember_reported_period(market, as_of, rows)
+
+    def _cached_reported_period(self, market: str, as_of: date) -> str | None:
+        with self._state_lock:
+            return self._reported_period_cache.get((market, as_of.isoformat()))
+
+    def _remember_reported_period(self, market: str, as_of: date, rows: Any) -> str:
         best_period = ""
         if isinstance(rows, list):
             for row in rows[:200]:
@@ -390,19 +874,38 @@ class TwMarketProvider:
                     best_period = period
         if not best_period:
             best_period = self._approx_period(as_of)
-        self._reported_period_cache[cache_key] = best_period
+        with self._state_lock:
+            self._reported_period_cache[(market, as_of.isoformat())] = best_period
         return best_period
 
-    def _legacy_quarterly_snapshot(self, symbol: str, market: str, period: str) -> dict[str, Any] | None:
-        snapshot_dir = self._legacy_quarterly_snapshot_dir()
-        for path in snapshot_dir.glob(f"{market.lower()}_*-{period}.json"):
+    def _legacy_snapshot_index(self, market: str, period: str) -> list[tuple[dict[str, Any], ...]]:
+        key = (market, period)
+        with self._state_lock:
+            cached = self._legacy_snapshot_indexes.get(key)
+        if cached is not None:
+            return cached
+        entries: list[tuple[dict[str, Any], ...]] = []
+        for path in self._legacy_quarterly_snapshot_dir().glob(f"{market.lower()}_*-{period}.json"):
             try:
                 payload = json.loads(path.read_text(encoding="utf-8"))
             except Exception:
                 continue
             if not isinstance(payload, dict):
                 continue
-            if self._find_row(payload.get("income") or [], symbol) and self._find_row(payload.get("balance") or [], symbol) and self._find_row(payload.get("eps") or [], symbol):
+            entries.append(
+                (
+                    payload,
+                    self._index_rows(payload.get("income") or []),
+                    self._index_rows(payload.get("balance") or []),
+                    self._index_rows(payload.get("eps") or []),
+                )
+            )
+        with self._state_lock:
+            return self._legacy_snapshot_indexes.setdefault(key, entries)
+
+    def _legacy_quarterly_snapshot(self, symbol: str, market: str, period: str) -> dict[str, Any] | None:
+        for payload, income, balance, eps in self._legacy_snapshot_index(market, period):
+            if symbol in income and symbol in balance and symbol in eps:
                 payload = dict(payload)
                 payload["source"] = str(payload.get("source") or "legacy_snapshot")
                 return payload
@@ -418,41 +921,42 @@ class TwMarketProvider:
         return None
 
     def _load_current_quarter_snapshot(self, symbol: str, market: str, as_of: date) -> dict[str, Any] | None:
-        eps_url, income_urls, balance_urls, source_label = self._quarterly_source_urls(market)
-        eps_rows = self._get_json(eps_url) or []
-        if not isinstance(eps_rows, list):
-            eps_rows = []
-        eps_row = self._find_row(eps_rows, symbol)
+        eps_url, income_urls, balance_urls, _ = self._quarterly_source_urls(market)
+        eps_row = self._dataset_index(eps_url).get(symbol)
         if not eps_row:
             return None
         period = self._period_from_row(eps_row, as_of)
         for dataset_key, income_url in income_urls.items():
-            income_rows = self._get_json(income_url) or []
-            if not isinstance(income_rows, list):
-                continue
-            income_row = self._find_row(income_rows, symbol)
+            income_row = self._dataset_index(income_url).get(symbol)
             if not income_row:
                 continue
             balance_url = balance_urls.get(dataset_key)
             if not balance_url:
                 continue
-            balance_rows = self._get_json(balance_url) or []
-            if not isinstance(balance_rows, list):
-                continue
-            balance_row = self._find_row(balance_rows, symbol)
+            balance_row = self._dataset_index(balance_url).get(symbol)
             if not balance_row:
                 continue
-            snapshot = {
-                "period": period,
-                "dataset_key": f"{market.lower()}_{dataset_key}",
-                "income": [income_row],
-                "balance": [balance_row],
-                "eps": [eps_row],
-                "source": source_label,
-            }
-            return snapshot
+            return self._quarter_snapshot(market, dataset_key, period, income_row, balance_row, eps_row)
         return None
 
+    def _quarter_snapshot(
+        self,
+        market: str,
+        dataset_key: str,
+        period: str,
+        income_row: dict[str, Any],
+        balance_row: dict[str, Any],
+        eps_row: dict[str, Any],
+    ) -> dict[str, Any]:
+        return {
+            "period": period,
+            "dataset_key": f"{market.lower()}_{dataset_key}",
+            "income": [income_row],
+            "balance": [balance_row],
+            "eps": [eps_row],
+            "source": self._quarterly_source_urls(market)[3],
+        }
+
     def _extract_quarterly_metrics(self, symbol: str, snapshot: dict[str, Any] | None) -> dict[str, float | None]:
         if not isinstance(snapshot, dict):
             return {"gross_margin": None, "eps": None, "roe": None}
@@ -530,46 +1034,39 @@ class TwMarketProvider:
         }
 
     def _ensure_quarterly_history(self, symbol: str, market: str, as_of: date) -> None:
-        existing = get_latest_periods(
-            self.quarterly_store_path,
-            symbol=symbol,
-            market=market,
-            periods=2,
-            as_of_date=as_of.isoformat(),
-        )
-        if len(existing) >= 2:
+        if self._has_quarterly_history(symbol, market, as_of):
             return
-
         fetched_at = datetime.now().replace(microsecond=0).isoformat()
         target_period = self._latest_reported_period(market, as_of)
         try:
             current_snapshot = self._load_current_quarter_snapshot(symbol, market, as_of)
         except Exception:
-            insert_fundamental_snapshot(
-                self.quarterly_store_path,
-                {
-                    "symbol": symbol,
-                    "market": market,
-                    "period": target_period,
-                    "dataset_key": f"{market.lower()}_unknown",
-                    "source": f"{market.lower()}_openapi",
-                    "fetched_at": fetched_at,
-                    "as_of_date": as_of.isoformat(),
-                    "gross_margin": None,
-                    "eps": None,
-                    "roe": None,
-                    "revenue": None,
-                    "gross_profit": None,
-                    "net_income": None,
-                    "equity": None,
-                    "fetch_status": "fetch_failed",
-                    "missing_reason": "fetch_failed",
-                    "raw_payload_json": "{}",
-                },
-            )
+            self._store_current_quarter(symbol, market, as_of, target_period, fetched_at, None, fetch_failed=True)
             return
+        self._store_current_quarter(symbol, market, as_of, target_period, fetched_at, current_snapshot)
 
-        if not current_snapshot:
+    def _has_quarterly_history(self, symbol: str, market: str, as_of: date) -> bool:
+        existing = get_latest_periods(
+            self.quarterly_store_path,
+            symbol=symbol,
+            market=market,
+            periods=2,
+            as_of_date=as_of.isoformat(),
+        )
+        return len(existing) >= 2
+
+    def _store_current_quarter(
+        self,
+        symbol: str,
+        market: str,
+        as_of: date,
+        target_period: str,
+        fetched_at: str,
+        current_snapshot: dict[str, Any] | None,
+        fetch_failed: bool = False,
+    ) -> None:
+        if fetch_failed or not current_snapshot:
+            status = "fetch_failed" if fetch_failed else "unavailable"
             insert_fundamental_snapshot(
                 self.quarterly_store_path,
                 {
@@ -587,8 +1084,8 @@ class TwMarketProvider:
                     "gross_profit": None,
                     "net_income": None,
                     "equity": None,
-                    "fetch_status": "unavailable",
-                    "missing_reason": "unavailable",
+                    "fetch_status": status,
+                    "missing_reason": status,
                     "raw_payload_json": "{}",
                 },
             )
@@ -694,9 +1191,11 @@ class TwMarketProvider:
         return {"status": "done", "reason": record["fetch_status"]}
 
     def get_quarterly_fundamentals(self, symbol: str, market: str, as_of: date) -> dict[str, float | None]:
-        flags: list[str] = []
         self._ensure_quarterly_history(symbol, market, as_of)
-        anchor_period = self._latest_reported_period(market, as_of)
+        return self._quarterly_payload(symbol, market, as_of, self._latest_reported_period(market, as_of))
+
+    def _quarterly_payload(self, symbol: str, market: str, as_of: date, anchor_period: str) -> dict[str, float | None]:
+        flags: list[str] = []
         target_periods = self._period_sequence_from(anchor_period, 2)
         periods = get_period_rows(
             self.quarterly_store_path,
@@ -757,6 +1256,18 @@ class TwMarketProvider:
         top_n: int = 3,
         history_depth: int = 8,
         as_of: date | None = None,
+    ) -> dict[str, Any]:
+        anchor_day = as_of or self._today()
+        anchor_period = self._latest_reported_period("TWSE", anchor_day)
+        return self._quality_coverage_summary(rows, top_n, history_depth, anchor_day, anchor_period)
+
+    def _quality_coverage_summary(
+        self,
+        rows: list[dict[str, Any]],
+        top_n: int,
+        history_depth: int,
+        anchor_day: date,
+        anchor_period: str,
     ) -> dict[str, Any]:
         symbols = [
             (
@@ -766,8 +1277,6 @@ class TwMarketProvider:
             for row in rows
             if str(row.get("symbol") or "").strip()
         ]
-        anchor_day = as_of or date.today()
-        anchor_period = self._latest_reported_period("TWSE", anchor_day)
         return summarize_coverage(
             self.quarterly_store_path,
             symbols,
@@ -789,6 +1298,30 @@ class TwMarketProvider:
         top_n: int = 3,
         theme_mode: str = "strict",
     ) -> dict[str, Any]:
+        anchor_period = self._latest_reported_period("TWSE", as_of)
+        check = self._plan_quality_update(theme, universe, as_of, mode, history_depth, top_n, theme_mode, anchor_period)
+        if check["repair"]:
+            deadline = time.monotonic() + max(budget_sec, 0.1)
+            for row in universe:
+                if time.monotonic() > deadline and check["refreshed_symbols"]:
+                    break
+                payload = self.get_quarterly_fundamentals(str(row["symbol"]), str(row["market"]), as_of)
+                if payload.get("quality_periods_used"):
+                    check["refreshed_symbols"].append(str(row["symbol"]))
+        return self._finish_quality_update(check, theme, as_of, mode, history_depth, top_n, theme_mode, anchor_period)
+
+    def _plan_quality_update(
+        self,
+        theme: str,
+        universe: list[dict[str, Any]],
+        as_of: date,
+        mode: str,
+        history_depth: int,
+        top_n: int,
+        theme_mode: str,
+        anchor_period: str,
+    ) -> dict[str, Any]:
+        """品質檢查的本機部分：讀覆蓋率與上次刷新紀錄，決定要不要在預算內補抓。"""
         theme_symbols = [(str(row["symbol"]), str(row["market"])) for row in universe]
         coverage = summarize_coverage(
             self.quarterly_store_path,
@@ -797,10 +1330,9 @@ class TwMarketProvider:
             as_of_date=as_of.isoformat(),
             top_n=top_n,
             history_depth=history_depth,
-            anchor_period=self._latest_reported_period("TWSE", as_of),
+            anchor_period=anchor_period,
         )
         latest_refresh = get_latest_refresh_run(self.quarterly_store_path, theme=theme, theme_mode=theme_mode)
-        refresh_run_id = (latest_refresh or {}).get("run_id")
         stale_days = 1 if as_of.month in {3, 5, 8, 11} else 7
         refresh_stale = True
         if latest_refresh and latest_refresh.get("as_of_date"):
@@ -809,19 +1341,36 @@ class TwMarketProvider:
 
         top_gap_symbols = [item.get("symbol") for item in coverage.get("top_candidate_gaps") or [] if item.get("symbol")]
         needs_sync = refresh_stale or bool(top_gap_symbols)
-        refreshed_symbols: list[str] = []
         decision = "no-op"
+        repair = False
         if mode == "skip":
             decision = "skipped"
         elif mode == "force" or (mode == "auto" and needs_sync):
             decision = "forced-sync-repair" if mode == "force" else "sync-repair"
-            deadline = time.monotonic() + max(budget_sec, 0.1)
-            for row in universe:
-                if time.monotonic() > deadline and refreshed_symbols:
-                    break
-                payload = self.get_quarterly_fundamentals(str(row["symbol"]), str(row["market"]), as_of)
-                if payload.get("quality_periods_used"):
-                    refreshed_symbols.append(str(row["symbol"]))
+            repair = True
+        return {
+            "theme_symbols": theme_symbols,
+            "coverage": coverage,
+            "refresh_run_id": (latest_refresh or {}).get("run_id"),
+            "decision": decision,
+            "repair": repair,
+            "refreshed_symbols": [],
+        }
+
+    def _finish_quality_update(
+        self,
+        check: dict[str, Any],
+        theme: str,
+        as_of: date,
+        mode: str,
+        history_depth: int,
+        top_n: int,
+        theme_mode: str,
+        anchor_period: str,
+    ) -> dict[str, Any]:
+        theme_symbols = check["theme_symbols"]
+        coverage = check["coverage"]
+        if check["repair"]:
             coverage = summarize_coverage(
                 self.quarterly_store_path,
                 theme_symbols,
@@ -829,13 +1378,12 @@ class TwMarketProvider:
                 as_of_date=as_of.isoformat(),
                 top_n=top_n,
                 history_depth=history_depth,
-                anchor_period=self._latest_reported_period("TWSE", as_of),
+                anchor_period=anchor_period,
             )
 
         backfill_enqueued = False
         backfill_run_id: str | None = None
         if coverage.get("history_complete_pct", 0.0) < 100.0 and theme_symbols:
-            anchor_period = self._latest_reported_period("TWSE", as_of)
             target_periods = self._period_sequence_from(anchor_period, history_depth)
             queued_count = enqueue_backfill_targets(
                 self.quarterly_store_path,
@@ -867,9 +1415,9 @@ class TwMarketProvider:
 
         return {
             "mode": mode,
-            "decision": decision,
-            "refresh_run_id": refresh_run_id,
-            "repair_refreshed_symbols": refreshed_symbols,
+            "decision": check["decision"],
+            "refresh_run_id": check["refresh_run_id"],
+            "repair_refreshed_symbols": check["refreshed_symbols"],
             "history_depth_target": history_depth,
             "history_complete_pct": coverage.get("history_complete_pct", 0.0),
             "backfill_enqueued": backfill_enqueued,
@@ -1068,9 +1616,70 @@ class TwMarketProvider:
             "warnings": warnings,
         }
 
+    def prewarm_shared_cache(
+        self,
+        as_of: date,
+        symbols: list[str],
+        lookback: int = 292,
+        valuation_days: int = 5,
+    ) -> dict[str, Any]:
+        """並行抓取跨題材共用的資料，讓之後各題材的執行幾乎都命中快取。"""
+        started = time.monotonic()
+        dataset_urls = [TWSE_BASICS_URL, TPEX_BASICS_URL, TWSE_REVENUE_URL, TPEX_REVENUE_URL, TWSE_EPS_URL, TPEX_EPS_URL]
+        for urls in (TWSE_INCOME_URLS, TWSE_BALANCE_URLS, TPEX_INCOME_URLS, TPEX_BALANCE_URLS):
+            dataset_urls.extend(urls.values())
+        failures: list[str] = []
+
+        def _collect(label: str, future: Any) -> None:
+            try:
+                future.result()
+            except Exception as exc:
+                failures.append(f"{label}: {exc}")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            dataset_futures = [(url, pool.submit(self._get_json, url)) for url in dataset_urls]
+            taiex_future = pool.submit(self.get_taiex_series, as_of, lookback)
+            # 估值表要先有交易日曆；日曆的 FMTQIK 月份與上面的加權指數共用同一個請求。
+            calendar = self.trading_days(as_of - timedelta(days=max(valuation_days, 1) * 3 + 10), as_of)
+            probe_days = list(reversed(calendar))[:valuation_days] if calendar is not None else []
+            if calendar is None:
+                failures.append("FMTQIK: 無法取得交易日曆，略過估值表")
+            valuation_futures = [
+                (f"valuation {market} {d.isoformat()}", pool.submit(self._get_valuation_table, market, d))
+                for d in probe_days
+                for market in ("TWSE", "TPEx")
+            ]
+            for url, future in dataset_futures:
+                _collect(url, future)
+            _collect("FMTQIK", taiex_future)
+            basics = self._load_basics()
+            pairs = [
+                (symbol, str((basics.get(symbol) or {}).get("market") or self._symbol_market_from_theme_rules(symbol)))
+                for symbol in dict.fromkeys(symbols)
+            ]
+            ohlcv_errors: dict[tuple[str, str], Exception] = {}
+            candles = self.get_ohlcv_batch(pairs, as_of=as_of, lookback=lookback, errors=ohlcv_errors)
+            for label, future in valuation_futures:
+                _collect(label, future)
+        failures.extend(f"ohlcv {symbol}: {exc}" for (symbol, _), exc in ohlcv_errors.items())
+        stats = self.fetch_stats()["http_cache"]
+        return {
+            "as_of": as_of.isoformat(),
+            "datasets": len(dataset_urls),
+            "valuation_days": [d.isoformat() for d in probe_days],
+            "symbols": len(pairs),
+            "ohlcv_loaded": len(candles),
+            "lookback": lookback,
+            "full_fetches": stats["full_fetches"],
+            "revalidated": stats["revalidated"],
+            "failures": failures,
+            "elapsed_sec": round(time.monotonic() - started, 2),
+        }
+
     def _load_basics(self) -> dict[str, dict[str, Any]]:
-        rows_twse = self._safe_get_json(TWSE_BASICS_URL, []) or []
-        rows_tpex = self._safe_get_json(TPEX_BASICS_URL, []) or []
+        return self._basics_from_rows(self._safe_get_json(TWSE_BASICS_URL, []) or [], self._safe_get_json(TPEX_BASICS_URL, []) or [])
+
+    def _basics_from_rows(self, rows_twse: list[dict[str, Any]], rows_tpex: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
         merged: dict[str, dict[str, Any]] = {}
         for row in rows_twse:
             symbol = str(row.get("公司代號", "")).strip()
@@ -1095,8 +1704,11 @@ class TwMarketProvider:
         return merged
 
     def _load_latest_revenue_map(self) -> dict[str, dict[str, Any]]:
-        rows_twse = self._safe_get_json(TWSE_REVENUE_URL, []) or []
-        rows_tpex = self._safe_get_json(TPEX_REVENUE_URL, []) or []
+        return self._revenue_from_rows(
+            self._safe_get_json(TWSE_REVENUE_URL, []) or [], self._safe_get_json(TPEX_REVENUE_URL, []) or []
+        )
+
+    def _revenue_from_rows(self, rows_twse: list[dict[str, Any]], rows_tpex: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
         mapped: dict[str, dict[str, Any]] = {}
         for row in rows_twse:
             symbol = str(row.get("公司代號", "")).strip()
@@ -1120,183 +1732,427 @@ class TwMarketProvider:
             }
         return mapped
 
-    def get_ohlcv(self, symbol: str, market: str, as_of: date, lookback: int = 252) -> list[dict[str, Any]]:
-        cache_key = (symbol, market, as_of.isoformat(), lookback)
-        if cache_key in self._ohlcv_cache:
-            return self._ohlcv_cache[cache_key]
-        if market == "TPEx":
-            candles = self._get_tpex_ohlcv(symbol, as_of, lookback)
-        else:
-            candles = self._get_twse_ohlcv(symbol, as_of, lookback)
-        self._ohlcv_cache[cache_key] = candles
+    def get_ohlcv(self, symbol: str, market: str, as_of: date, lookback: int = 252) -> CandleSeries:
+        cached = self._cached_ohlcv(symbol, market, as_of, lookback)
+        if cached is not None:
+            return cached
+        return self._flights.do(
+            ("ohlcv", symbol, market, as_of.isoformat(), lookback),
+            lambda: self._load_ohlcv_once(symbol, market, as_of, lookback),
+        )
+
+    def _cached_ohlcv(self, symbol: str, market: str, as_of: date, lookback: int) -> CandleSeries | None:
+        with self._state_lock:
+            cached = self._ohlcv_cache.get((symbol, market, as_of.isoformat()))
+        if cached is None or cached[0] < lookback:
+            return None
+        cached_lookback, candles = cached
+        if cached_lookback == lookback:
+            return candles
+        # load_candles 取 as_of 以前最後 N 根，較長序列的尾端就是較短 lookback 的結果。
+        return candles[-lookback:] if lookback > 0 else CandleSeries()
+
+    def _load_ohlcv_once(self, symbol: str, market: str, as_of: date, lookback: int) -> CandleSeries:
+        cached = self._cached_ohlcv(symbol, market, as_of, lookback)
+        if cached is not None:
+            return cached
+        return self._remember_ohlcv(symbol, market, as_of, lookback, self._load_ohlcv_series(symbol, market, as_of, lookback))
+
+    def _remember_ohlcv(self, symbol: str, market: str, as_of: date, lookback: int, candles: CandleSeries) -> CandleSeries:
+        with self._state_lock:
+            key = (symbol, market, as_of.isoformat())
+            if key not in self._ohlcv_cache or self._ohlcv_cache[key][0] < lookback:
+                self._ohlcv_cache[key] = (lookback, candles)
         return candles
 
-    def _get_twse_ohlcv(self, symbol: str, as_of: date, lookback: int) -> list[dict[str, Any]]:
-        collected: list[dict[str, Any]] = []
+    def get_ohlcv_batch(
+        self,
+        pairs: list[tuple[str, str]],
+        as_of: date,
+        lookback: int = 252,
+        errors: dict[tuple[str, str], Exception] | None = None,
+    ) -> dict[tuple[str, str], CandleSeries]:
+        unique_pairs = list(dict.fromkeys((str(symbol), str(market)) for symbol, market in pairs))
+        try:
+            self.ingest_daily_quotes(unique_pairs, as_of)
+        except Exception:
+            # 全市場日報失敗時退回逐檔抓取。
+            pass
+        self._prefetch_ohlcv_months(unique_pairs, as_of, lookback)
+        results: dict[tuple[str, str], CandleSeries] = {}
+        for symbol, market in unique_pairs:
+            try:
+                results[(symbol, market)] = self.get_ohlcv(symbol, market, as_of=as_of, lookback=lookback)
+            except Exception as exc:
+                if errors is not None:
+                    errors[(symbol, market)] = exc
+        return results
+
+    def update_indicator_states(
+        self,
+        candle_map: dict[tuple[str, str], CandleSeries],
+        force_recompute: bool = False,
+    ) -> tuple[dict[tuple[str, str], dict[str, float | None]], dict[str, int]]:
+        """以落地的指標狀態增量更新 SMA / RSI / ATR / 波動度 / 動能，並寫回 market store。
+
+        只處理上次處理日之後的新日線；找不到銜接點或歷史被修正時改為全量重算。
+        """
+        loaded = market_store.load_indicator_states(self.market_store_path, list(candle_map))
+        factors: dict[tuple[str, str], dict[str, float | None]] = {}
+        changed: dict[tuple[str, str], tuple[date, dict[str, Any]]] = {}
+        summary = {FULL: 0, INCREMENTAL: 0, UNCHANGED: 0}
+        for key, candles in candle_map.items():
+            series = CandleSeries.coerce(candles)
+            payload = loaded.get(key)
+            state, mode = advance_state(IndicatorState.from_payload(payload) if payload else None, series, force_recompute)
+            summary[mode] += 1
+            factors[key] = state.factors()
+            last_date = state_last_date(state)
+            if mode != UNCHANGED and last_date is not None:
+                changed[key] = (last_date, state.to_payload())
+        if changed:
+            market_store.store_indicator_states(self.market_store_path, changed, self._today())
+        return factors, summary
+
+    def _ohlcv_prefetch_months(self, as_of: date, lookback: int) -> list[date]:
         anchor = date(as_of.year, as_of.month, 1)
-        max_months = max(6, (lookback // 18) + 6)
-        for i in range(max_months):
-            d = _shift_month(anchor, -i)
-            payload = self._get_json(
-                TWSE_STOCK_DAY_URL,
-                {"response": "json", "date": d.strftime("%Y%m01"), "stockNo": symbol},
+        month_count = min(self._ohlcv_max_months(lookback), (lookback // 20) + 2)
+        return [_shift_month(anchor, -i) for i in range(month_count)]
+
+    def _ohlcv_fetch_plan(self, pairs: list[tuple[str, str]], as_of: date, lookback: int) -> list[tuple[str, str, date]]:
+        months = self._ohlcv_prefetch_months(as_of, lookback)
+        pending = [(symbol, market) for symbol, market in pairs if self._cached_ohlcv(symbol, market, as_of, lookback) is None]
+        by_market: dict[str, list[tuple[str, str, date]]] = {}
+        for symbol, market in pending:
+            coverage = market_store.get_month_coverage(self.market_store_path, symbol, market)
+            by_market.setdefault(market, []).extend(
+                (symbol, market, month)
+                for month in months
+                if self._month_needs_fetch(market, coverage.get(market_store.month_key(month)), month, as_of)
             )
-            if not isinstance(payload, dict) or payload.get("stat") != "OK":
-                continue
-            for row in payload.get("data") or []:
-                if len(row) < 7:
-                    continue
-                trade_date = _parse_roc_slash(str(row[0]))
-                if trade_date > as_of:
-                    continue
-                o = safe_float(row[3])
-                h = safe_float(row[4])
-                l = safe_float(row[5])
-                c = safe_float(row[6])
-                v = safe_float(row[1])
-                if None in {o, h, l, c, v}:
-                    continue
-                collected.append(
-                    {
-                        "date": trade_date,
-                        "open": float(o),
-                        "high": float(h),
-                        "low": float(l),
-                        "close": float(c),
-                        "volume": float(v),
-                    }
-                )
-            if len(collected) >= lookback:
+        # 交錯排入不同主機的工作，避免整個 pool 卡在同一台主機的併發上限。
+        return [task for group in zip_longest(*by_market.values()) for task in group if task is not None]
+
+    def _prefetch_ohlcv_months(self, pairs: list[tuple[str, str]], as_of: date, lookback: int) -> None:
+        tasks = self._ohlcv_fetch_plan(pairs, as_of, lookback)
+        if not tasks:
+            return
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(self._refresh_ohlcv_month, symbol, market, month) for symbol, market, month in tasks]
+            wait(futures)
+
+    def _ohlcv_max_months(self, lookback: int) -> int:
+        return max(6, (lookback // 18) + 6)
+
+    def _today(self) -> date:
+        # 回放時以錄製當天為準，月份是否收盤、資料新鮮度等判斷才會與錄製時一致。
+        if self._bundle is not None:
+            return self._bundle.today
+        return date.today()
+
+    def _month_needs_fetch(self, market: str, coverage: dict[str, Any] | None, month: date, as_of: date) -> bool:
+        gap = self._month_gap(coverage, month, as_of)
+        if isinstance(gap, bool):
+            return gap
+        return bool(self._missing_market_days(market, *gap))
+
+    def _month_gap(self, coverage: dict[str, Any] | None, month: date, as_of: date) -> bool | tuple[date, date]:
+        """不必看交易日曆就能判斷時回傳 bool，否則回傳要比對全市場日報的 (after, through)。"""
+        if coverage is None:
+            return True
+        if coverage["complete"]:
+            return False
+        # 未收盤的月份：已涵蓋 as_of，或在 as_of 之後抓過，就不必再抓。
+        covered_through = coverage.get("covered_through") or ""
+        if covered_through >= as_of.isoformat() or coverage["fetched_on"] > as_of.isoformat():
+            return False
+        # 其後每個交易日都已由全市場日報補齊時，也不必再逐檔抓。
+        after = date.fromisoformat(covered_through) if covered_through else month - timedelta(days=1)
+        return after, min(as_of, _shift_month(month, 1) - timedelta(days=1))
+
+    def _day_not_before(self, day: date) -> float:
+        if self._today() > day:
+            next_day = day + timedelta(days=1)
+            return datetime(next_day.year, next_day.month, next_day.day).timestamp()
+        return time.time()
+
+    def _month_closed(self, month: date) -> bool:
+        return self._today() >= _shift_month(month, 1)
+
+    def _month_not_before(self, month: date) -> float:
+        next_month = _shift_month(month, 1)
+        if self._month_closed(month):
+            # 月份收盤後寫入的快取才算完整；收盤前的快取可能只有半個月。
+            return datetime(next_month.year, next_month.month, 1).timestamp()
+        return time.time()
+
+    def _ohlcv_month_request(self, symbol: str, market: str, month: date) -> Request:
+        if market == "TPEx":
+            return self._build_post_request(
+                TPEX_TRADING_STOCK_URL,
+                {"code": symbol, "date": month.strftime("%Y/%m/01"), "response": "json"},
+            )
+        return self._build_get_request(
+            TWSE_STOCK_DAY_URL,
+            {"response": "json", "date": month.strftime("%Y%m01"), "stockNo": symbol},
+        )
+
+    def _refresh_ohlcv_month(self, symbol: str, market: str, month: date) -> dict[str, Any]:
+        req = self._ohlcv_month_request(symbol, market, month)
+        payload = self._load_json(req, not_before=self._month_not_before(month), pin=self._month_closed(month))
+        return self._store_ohlcv_month(symbol, market, month, payload)
+
+    def _store_ohlcv_month(self, symbol: str, market: str, month: date, payload: Any) -> dict[str, Any]:
+        today = self._today()
+        candles = self._parse_tpex_month(payload) if market == "TPEx" else self._parse_twse_month(payload)
+        return market_store.store_month(
+            self.market_store_path,
+            symbol,
+            market,
+            month,
+            candles,
+            complete=today >= _shift_month(month, 1),
+            fetched_on=today,
+        )
+
+    def _load_ohlcv_series(self, symbol: str, market: str, as_of: date, lookback: int) -> CandleSeries:
+        coverage = market_store.get_month_coverage(self.market_store_path, symbol, market)
+        anchor = date(as_of.year, as_of.month, 1)
+        available = 0
+        for i in range(self._ohlcv_max_months(lookback)):
+            month = _shift_month(anchor, -i)
+            month_coverage = coverage.get(market_store.month_key(month))
+            if self._month_needs_fetch(market, month_coverage, month, as_of):
+                month_coverage = self._refresh_ohlcv_month(symbol, market, month)
+            if i == 0:
+                available += market_store.count_candles(self.market_store_path, symbol, market, anchor, as_of)
+            else:
+                available += month_coverage["row_count"]
+            if available >= lookback:
                 break
-        if not collected:
-            raise ValueError(f"TWSE 無法取得 {symbol} 日線")
-        dedup = {c["date"]: c for c in collected}
-        return sorted(dedup.values(), key=lambda x: x["date"])[-lookback:]
+        return self._stored_ohlcv(symbol, market, as_of, lookback)
 
-    def _get_tpex_ohlcv(self, symbol: str, as_of: date, lookback: int) -> list[dict[str, Any]]:
-        collected: list[dict[str, Any]] = []
+    def _stored_ohlcv(self, symbol: str, market: str, as_of: date, lookback: int) -> CandleSeries:
+        candles = market_store.load_candles(self.market_store_path, symbol, market, as_of, lookback)
+        if not candles:
+            raise ValueError(f"{'TPEx' if market == 'TPEx' else 'TWSE'} 無法取得 {symbol} 日線")
+        return candles
+
+    def _missing_market_days(self, market: str, after: date, through: date) -> list[date]:
+        span = self._market_day_span(after, through)
+        if span is None:
+            return []
+        return self._uningested_days(market, *span, self.trading_days(*span))
+
+    def _market_day_span(self, after: date, through: date) -> tuple[date, date] | None:
+        through = min(through, self._today())
+        if through <= after:
+            return None
+        return after + timedelta(days=1), through
+
+    def _uningested_days(self, market: str, start: date, through: date, calendar: list[date] | None) -> list[date]:
+        if calendar is None:
+            # 取不到交易日曆時退回平日；休市日拿不到資料，不會被記成已補齊。
+            calendar = [start + timedelta(days=i) for i in range((through - start).days + 1)]
+            calendar = [day for day in calendar if day.weekday() < 5]
+        # 舊版可能把抓失敗的交易日記成 closed，只有 trading 才算已補齊。
+        ingested = market_store.get_ingested_days(self.market_store_path, market, start, through)
+        return [day for day in calendar if ingested.get(day.isoformat()) != "trading"]
+
+    def ingest_daily_quotes(self, pairs: list[tuple[str, str]], as_of: date) -> list[dict[str, Any]]:
+        """以全市場日報補齊未收盤月份，取代逐檔重抓；只有比逐檔便宜時才執行。"""
         anchor = date(as_of.year, as_of.month, 1)
-        max_months = max(6, (lookback // 18) + 6)
-        for i in range(max_months):
-            d = _shift_month(anchor, -i)
-            payload = self._post_json(
-                TPEX_TRADING_STOCK_URL,
-                {"code": symbol, "date": d.strftime("%Y/%m/01"), "response": "json"},
+        key = market_store.month_key(anchor)
+        stale: dict[str, list[date]] = {}
+        for symbol, market in dict.fromkeys(pairs):
+            coverage = market_store.get_month_coverage(self.market_store_path, symbol, market).get(key)
+            if coverage is None or not self._month_needs_fetch(market, coverage, anchor, as_of):
+                continue
+            covered_through = coverage.get("covered_through")
+            stale.setdefault(market, []).append(
+                date.fromisoformat(covered_through) if covered_through else anchor - timedelta(days=1)
             )
-            if not isinstance(payload, dict) or payload.get("stat") != "ok":
+        results: list[dict[str, Any]] = []
+        for market, covered in stale.items():
+            days = self._missing_market_days(market, min(covered), as_of)
+            if not days or len(days) >= len(covered):
                 continue
-            tables = payload.get("tables")
-            rows = tables[0].get("data") if isinstance(tables, list) and tables and isinstance(tables[0], dict) else []
-            for row in rows or []:
-                if not isinstance(row, list) or len(row) < 7:
-                    continue
-                trade_date = _parse_roc_slash(str(row[0]))
-                if trade_date > as_of:
-                    continue
-                o = safe_float(row[3])
-                h = safe_float(row[4])
-                l = safe_float(row[5])
-                c = safe_float(row[6])
-                v = safe_float(row[1])
-                if None in {o, h, l, c, v}:
-                    continue
-                collected.append(
-                    {
-                        "date": trade_date,
-                        "open": float(o),
-                        "high": float(h),
-                        "low": float(l),
-                        "close": float(c),
-                        "volume": float(v),
-                    }
+            for trade_date in days:
+                result = self._ingest_market_day(market, trade_date)
+                if result is not None:
+                    results.append(result)
+        return results
+
+    def _daily_quote_request(self, market: str, trade_date: date) -> Request:
+        if market == "TPEx":
+            return self._build_get_request(
+                TPEX_DAILY_QUOTES_URL,
+                {"date": trade_date.strftime("%Y/%m/%d"), "type": "EW", "response": "json"},
+            )
+        return self._build_get_request(
+            TWSE_MI_INDEX_URL,
+            {"response": "json", "date": trade_date.strftime("%Y%m%d"), "type": "ALLBUT0999"},
+        )
+
+    def _ingest_market_day(self, market: str, trade_date: date) -> dict[str, Any] | None:
+        payload = self._load_json(self._daily_quote_request(market, trade_date), not_before=self._day_not_before(trade_date))
+        return self._store_market_day(market, trade_date, payload)
+
+    def _store_market_day(self, market: str, trade_date: date, payload: Any) -> dict[str, Any] | None:
+        candles = self._parse_tpex_daily_quotes(payload) if market == "TPEx" else self._parse_twse_daily_quotes(payload)
+        if not _stat_ok(payload) or not candles:
+            # 尚未公布、限流或暫時錯誤：不記成已補齊，逐檔月資料與之後的執行會再補。
+            return None
+        result = market_store.store_market_day(self.market_store_path, market, trade_date, candles, fetched_on=self._today())
+        with self._state_lock:
+            self._daily_quote_log.append(result)
+        return result
+
+    def _parse_twse_daily_quotes(self, payload: Any) -> dict[str, dict[str, Any]]:
+        if not isinstance(payload, dict) or payload.get("stat") != "OK":
+            return {}
+        tables = list(payload.get("tables") or [])
+        tables.extend(
+            {"fields": payload.get(key), "data": payload.get(f"data{key[6:]}")}
+            for key in payload
+            if key.startswith("fields")
+        )
+        for table in tables:
+            if not isinstance(table, dict):
+                continue
+            fields = [str(x).strip() for x in table.get("fields") or []]
+            if "證券代號" in fields and "收盤價" in fields:
+                return _parse_daily_quote_rows(
+                    table.get("data") or [],
+                    fields,
+                    {"symbol": "證券代號", "open": "開盤價", "high": "最高價", "low": "最低價", "close": "收盤價", "volume": "成交股數"},
+                    volume_divisor=1.0,
                 )
-            if len(collected) >= lookback:
-                break
-        if not collected:
-            raise ValueError(f"TPEx 無法取得 {symbol} 日線")
-        dedup = {c["date"]: c for c in collected}
-        return sorted(dedup.values(), key=lambda x: x["date"])[-lookback:]
+        return {}
+
+    def _parse_tpex_daily_quotes(self, payload: Any) -> dict[str, dict[str, Any]]:
+        if not isinstance(payload, dict):
+            return {}
+        for table in payload.get("tables") or []:
+            if not isinstance(table, dict):
+                continue
+            fields = [str(x).strip() for x in table.get("fields") or []]
+            if "代號" in fields and "收盤" in fields:
+                # tradingStock 的成交量單位是張，全市場日報是股，統一換成張。
+                return _parse_daily_quote_rows(
+                    table.get("data") or [],
+                    fields,
+                    {"symbol": "代號", "open": "開盤", "high": "最高", "low": "最低", "close": "收盤", "volume": "成交股數"},
+                    volume_divisor=1000.0,
+                )
+        return {}
+
+    def _parse_twse_month(self, payload: Any) -> list[dict[str, Any]]:
+        if not isinstance(payload, dict) or payload.get("stat") != "OK":
+            return []
+        return _parse_ohlcv_rows(payload.get("data") or [])
+
+    def _parse_tpex_month(self, payload: Any) -> list[dict[str, Any]]:
+        if not isinstance(payload, dict) or payload.get("stat") != "ok":
+            return []
+        tables = payload.get("tables")
+        rows = tables[0].get("data") if isinstance(tables, list) and tables and isinstance(tables[0], dict) else []
+        return _parse_ohlcv_rows(rows or [])
 
     def get_latest_valuation(self, symbol: str, market: str, as_of: date, max_backtrack_days: int = 20) -> dict[str, float] | None:
-        if market == "TPEx":
-            return self._get_tpex_latest_valuation(symbol, as_of, max_backtrack_days)
-        return self._get_twse_latest_valuation(symbol, as_of, max_backtrack_days)
+        for d in self._probe_days(as_of, max_backtrack_days):
+            table = self._get_valuation_table(market, d)
+            if symbol in table:
+                return table[symbol]
+        return None
+
+    def _probe_days(self, as_of: date, max_backtrack_days: int) -> list[date]:
+        calendar = self.trading_days(as_of - timedelta(days=max_backtrack_days), as_of)
+        return self._probe_order(as_of, max_backtrack_days, calendar)
 
-    def _get_twse_valuation_table(self, d: date) -> dict[str, dict[str, float]]:
+    def _probe_order(self, as_of: date, max_backtrack_days: int, calendar: list[date] | None) -> list[date]:
+        if calendar is None:
+            return [as_of - timedelta(days=i) for i in range(max_backtrack_days + 1)]
+        return list(reversed(calendar))
+
+    def _get_valuation_table(self, market: str, d: date) -> dict[str, dict[str, float]]:
+        cache = self._tpex_valuation_cache if market == "TPEx" else self._twse_valuation_cache
         key = d.isoformat()
-        if key in self._twse_valuation_cache:
-            return self._twse_valuation_cache[key]
-        payload = self._get_json(
+        with self._state_lock:
+            if key in cache:
+                return cache[key]
+        # 多檔股票回溯到同一天時只抓、只解析一次當日全市場估值表。
+        return self._flights.do(("valuation", market, key), lambda: self._load_valuation_table(market, d))
+
+    def _load_valuation_table(self, market: str, d: date) -> dict[str, dict[str, float]]:
+        cached = self._cached_valuation_table(market, d)
+        if cached is not None:
+            return cached
+        result = market_store.load_valuation_table(self.market_store_path, market, d)
+        if result is not None:
+            return self._remember_valuation_table(market, d, result)
+        payload = self._load_json(self._valuation_request(market, d), not_before=self._day_not_before(d))
+        return self._remember_valuation_table(market, d, self._parse_valuation_table(market, payload), fetched=True)
+
+    def _cached_valuation_table(self, market: str, d: date) -> dict[str, dict[str, float]] | None:
+        cache = self._tpex_valuation_cache if market == "TPEx" else self._twse_valuation_cache
+        with self._state_lock:
+            return cache.get(d.isoformat())
+
+    def _remember_valuation_table(
+        self,
+        market: str,
+        d: date,
+        result: dict[str, dict[str, float]],
+        fetched: bool = False,
+    ) -> dict[str, dict[str, float]]:
+        # 空表可能是尚未公布、stat 非 OK 或暫時錯誤，只有拿到資料才落地，之後的執行會再抓。
+        if fetched and result:
+            market_store.store_valuation_table(self.market_store_path, market, d, result, fetched_on=self._today())
+        cache = self._tpex_valuation_cache if market == "TPEx" else self._twse_valuation_cache
+        with self._state_lock:
+            cache[d.isoformat()] = result
+        return result
+
+    def _valuation_request(self, market: str, d: date) -> Request:
+        if market == "TPEx":
+            return self._build_post_request(TPEX_PE_QRY_DATE_URL, {"date": d.strftime("%Y/%m/%d"), "response": "json"})
+        return self._build_get_request(
             TWSE_BWIBBU_URL,
             {"response": "json", "date": d.strftime("%Y%m%d"), "selectType": "ALL"},
         )
-        result: dict[str, dict[str, float]] = {}
-        if isinstance(payload, dict) and payload.get("stat") == "OK":
-            fields = payload.get("fields") or []
-            rows = payload.get("data") or []
-            idx = {str(name).strip(): i for i, name in enumerate(fields)}
-            code_idx = idx.get("證券代號", 0)
-            pe_idx = idx.get("本益比")
-            pb_idx = idx.get("股價淨值比")
-            dy_idx = idx.get("殖利率(%)")
-            for row in rows:
-                if not isinstance(row, list) or code_idx >= len(row):
-                    continue
-                symbol = str(row[code_idx]).strip()
-                pe = safe_float(row[pe_idx] if pe_idx is not None and pe_idx < len(row) else None)
-                pb = safe_float(row[pb_idx] if pb_idx is not None and pb_idx < len(row) else None)
-                dy = safe_float(row[dy_idx] if dy_idx is not None and dy_idx < len(row) else None)
-                result[symbol] = {
-                    "pe": pe if pe and pe > 0 else 0.0,
-                    "pb": pb if pb and pb > 0 else 0.0,
-                    "dividend_yield": dy if dy and dy >= 0 else 0.0,
-                }
-        self._twse_valuation_cache[key] = result
-        return result
 
-    def _get_tpex_valuation_table(self, d: date) -> dict[str, dict[str, float]]:
-        key = d.isoformat()
-        if key in self._tpex_valuation_cache:
-            return self._tpex_valuation_cache[key]
-        payload = self._post_json(TPEX_PE_QRY_DATE_URL, {"date": d.strftime("%Y/%m/%d"), "response": "json"})
+    def _parse_valuation_table(self, market: str, payload: Any) -> dict[str, dict[str, float]]:
         result: dict[str, dict[str, float]] = {}
-        if isinstance(payload, dict) and payload.get("stat") == "ok":
+        if market == "TPEx":
+            if not isinstance(payload, dict) or payload.get("stat") != "ok":
+                return result
             tables = payload.get("tables")
             table0 = tables[0] if isinstance(tables, list) and tables and isinstance(tables[0], dict) else {}
             fields = table0.get("fields") or []
             rows = table0.get("data") or []
-            idx = {str(name).strip(): i for i, name in enumerate(fields)}
-            code_idx = idx.get("股票代號", 0)
-            pe_idx = idx.get("本益比")
-            pb_idx = idx.get("股價淨值比")
-            dy_idx = idx.get("殖利率(%)")
-            for row in rows:
-                if not isinstance(row, list) or code_idx >= len(row):
-                    continue
-                symbol = str(row[code_idx]).strip()
-                pe = safe_float(row[pe_idx] if pe_idx is not None and pe_idx < len(row) else None)
-                pb = safe_float(row[pb_idx] if pb_idx is not None and pb_idx < len(row) else None)
-                dy = safe_float(row[dy_idx] if dy_idx is not None and dy_idx < len(row) else None)
-                result[symbol] = {
-                    "pe": pe if pe and pe > 0 else 0.0,
-                    "pb": pb if pb and pb > 0 else 0.0,
-                    "dividend_yield": dy if dy and dy >= 0 else 0.0,
-                }
-        self._tpex_valuation_cache[key] = result
+            code_name = "股票代號"
+        else:
+            if not isinstance(payload, dict) or payload.get("stat") != "OK":
+                return result
+            fields = payload.get("fields") or []
+            rows = payload.get("data") or []
+            code_name = "證券代號"
+        idx = {str(name).strip(): i for i, name in enumerate(fields)}
+        code_idx = idx.get(code_name, 0)
+        pe_idx = idx.get("本益比")
+        pb_idx = idx.get("股價淨值比")
+        dy_idx = idx.get("殖利率(%)")
+        for row in rows:
+            if not isinstance(row, list) or code_idx >= len(row):
+                continue
+            symbol = str(row[code_idx]).strip()
+            pe = safe_float(row[pe_idx] if pe_idx is not None and pe_idx < len(row) else None)
+            pb = safe_float(row[pb_idx] if pb_idx is not None and pb_idx < len(row) else None)
+            dy = safe_float(row[dy_idx] if dy_idx is not None and dy_idx < len(row) else None)
+            result[symbol] = {
+                "pe": pe if pe and pe > 0 else 0.0,
+                "pb": pb if pb and pb > 0 else 0.0,
+                "dividend_yield": dy if dy and dy >= 0 else 0.0,
+            }
         return result
-
-    def _get_twse_latest_valuation(self, symbol: str, as_of: date, max_backtrack_days: int) -> dict[str, float] | None:
-        for i in range(max_backtrack_days + 1):
-            d = as_of - timedelta(days=i)
-            table = self._get_twse_valuation_table(d)
-            if symbol in table:
-                return table[symbol]
-        return None
-
-    def _get_tpex_latest_valuation(self, symbol: str, as_of: date, max_backtrack_days: int) -> dict[str, float] | None:
-        for i in range(max_backtrack_days + 1):
-            d = as_of - timedelta(days=i)
-            table = self._get_tpex_valuation_table(d)
-            if symbol in table:
-                return table[symbol]
-        return None
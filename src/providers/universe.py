@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from typing import Any
+
+from src.analysis.factors import safe_float
+from src.theme_matcher import library_matcher
+from src.themes import theme_rule
+
+
+class Universe:
+    """合併後的全市場股票池，依月營收由大到小排序，並建好代號 / 市場 / 產業索引。
+
+    每個 provider 每天只建一次；題材與產業切片只碰成員本身，不再重新合併基本資料與月營收。
+    """
+
+    def __init__(self, rows: list[dict[str, Any]]) -> None:
+        self.rows = sorted(rows, key=lambda x: x.get("monthly_revenue", 0.0), reverse=True)
+        self.position = {row["symbol"]: i for i, row in enumerate(self.rows)}
+        self.by_market: dict[str, list[int]] = {}
+        self.by_industry: dict[str, list[int]] = {}
+        self._by_industry_text: dict[str, list[int]] = {}
+        for i, row in enumerate(self.rows):
+            self.by_market.setdefault(str(row.get("market") or "TWSE"), []).append(i)
+            industry = str(row.get("industry") or "未分類").strip() or "未分類"
+            self.by_industry.setdefault(industry, []).append(i)
+            self._by_industry_text.setdefault(str(row.get("industry") or "").lower(), []).append(i)
+        # 營收取負值後為遞增序列，門檻切點用 bisect 找。
+        self._neg_revenue = [-float(row.get("monthly_revenue") or 0.0) for row in self.rows]
+        self._search_text = [f"{row.get('name', '')} {row.get('industry') or ''}".lower() for row in self.rows]
+        self._keyword_hits: dict[str, list[int]] = {}
+        self._theme_assignments: dict[str, dict[str, list[int]]] = {}
+
+    @classmethod
+    def build(cls, basics: dict[str, dict[str, Any]], revenue_map: dict[str, dict[str, Any]]) -> Universe:
+        rows: list[dict[str, Any]] = []
+        for symbol, item in basics.items():
+            rev = revenue_map.get(symbol, {})
+            industry = str(rev.get("industry") or item.get("industry") or "").strip()
+            rows.append(
+                {
+                    "symbol": symbol,
+                    "name": item.get("name", ""),
+                    "market": item.get("market", "TWSE"),
+                    "industry": industry or "未分類",
+                    "monthly_revenue": float(rev.get("monthly_revenue") or 0.0),
+                    "revenue_yoy": safe_float(rev.get("revenue_yoy")),
+                    "revenue_mom": safe_float(rev.get("revenue_mom")),
+                }
+            )
+        return cls(rows)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _cutoff(self, min_monthly_revenue: float) -> int:
+        return bisect_right(self._neg_revenue, -float(min_monthly_revenue))
+
+    def _rows_at(self, positions: Any, min_monthly_revenue: float) -> list[dict[str, Any]]:
+        cutoff = self._cutoff(min_monthly_revenue)
+        return [self.rows[i] for i in sorted(positions) if i < cutoff]
+
+    def above(self, min_monthly_revenue: float = 0.0) -> list[dict[str, Any]]:
+        return self.rows[: self._cutoff(min_monthly_revenue)]
+
+    def get(self, symbol: str) -> dict[str, Any] | None:
+        index = self.position.get(symbol)
+        return self.rows[index] if index is not None else None
+
+    def market_members(self, market: str, min_monthly_revenue: float = 0.0) -> list[dict[str, Any]]:
+        return self._rows_at(self.by_market.get(market) or [], min_monthly_revenue)
+
+    def industry_buckets(self, min_monthly_revenue: float = 0.0, min_count: int = 1) -> dict[str, list[dict[str, Any]]]:
+        cutoff = self._cutoff(min_monthly_revenue)
+        buckets: dict[str, list[dict[str, Any]]] = {}
+        for industry, positions in self.by_industry.items():
+            members = [self.rows[i] for i in positions if i < cutoff]
+            if members and len(members) >= min_count:
+                buckets[industry] = members
+        return dict(sorted(buckets.items(), key=lambda item: (-len(item[1]), item[0])))
+
+    def _keyword_positions(self, keyword: str) -> list[int]:
+        hits = self._keyword_hits.get(keyword)
+        if hits is None:
+            hits = [i for i, text in enumerate(self._search_text) if keyword in text]
+            self._keyword_hits[keyword] = hits
+        return hits
+
+    def theme_assignments(self, theme_mode: str = "strict") -> dict[str, list[int]]:
+        # 題材庫所有題材一次掃完；股票池每天一份，結果跟著快取。
+        assignments = self._theme_assignments.get(theme_mode)
+        if assignments is None:
+            assignments = library_matcher().assign(self.rows, theme_mode)
+            self._theme_assignments[theme_mode] = assignments
+        return assignments
+
+    def theme_members(self, rule: dict[str, Any], min_monthly_revenue: float = 0.0) -> list[dict[str, Any]]:
+        mode = rule.get("theme_mode") or "strict"
+        if rule.get("name") in library_matcher().themes and rule == theme_rule(rule["name"], theme_mode=mode):
+            return self._rows_at(self.theme_assignments(mode).get(rule["name"]) or [], min_monthly_revenue)
+        # 題材庫以外的自訂題材：與 ThemeMatcher 同一套規則，逐條關鍵字比對。
+        positions = {self.position[symbol] for symbol in rule.get("symbols") or [] if symbol in self.position}
+        if rule.get("theme_mode") == "broad":
+            for kw in rule.get("name_keywords") or []:
+                positions.update(self._keyword_positions(str(kw).lower()))
+            for kw in rule.get("industry_keywords") or []:
+                needle = str(kw).lower()
+                positions.update(i for industry, members in self._by_industry_text.items() if needle in industry for i in members)
+        return self._rows_at(positions, min_monthly_revenue)
@@ -5,14 +5,26 @@ import json
 from pathlib import Path
 from typing import Any
 
+from src.analysis.frame import FactorFrame, FrameRow
+
+
+def _json_default(value: Any) -> Any:
+    # FactorFrame 在輸出邊界才寫成 dict 列，內容與傳入 dict 列時相同。
+    if isinstance(value, FactorFrame):
+        return value.to_rows()
+    if isinstance(value, FrameRow):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
 
 def write_json_report(path: Path, payload: dict[str, Any]) -> Path:
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2, default=_json_default), encoding="utf-8")
     return path
 
 
-def write_candidate_csv(path: Path, picks: list[dict[str, Any]]) -> Path:
+def write_candidate_csv(path: Path, picks: list[dict[str, Any]] | FactorFrame) -> Path:
+    # FactorFrame 逐列以 FrameRow 視圖讀欄，不複製成 dict。
     path.parent.mkdir(parents=True, exist_ok=True)
     headers = [
         "rank",
@@ -61,11 +73,11 @@ def write_candidate_csv(path: Path, picks: list[dict[str, Any]]) -> Path:
 
 def write_audit_trail(path: Path, payload: dict[str, Any]) -> Path:
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2, default=_json_default), encoding="utf-8")
     return path
 
 
 def write_watchlist(path: Path, payload: dict[str, Any]) -> Path:
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2, default=_json_default), encoding="utf-8")
     return path
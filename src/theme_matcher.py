@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from collections import deque
+from functools import lru_cache
+from typing import Any, Iterable
+
+from src.themes import THEME_LIBRARY, theme_rule
+
+
+class KeywordAutomaton:
+    """Aho-Corasick 多關鍵字比對：一次掃過文字，就找出所有命中關鍵字對應的標籤。"""
+
+    def __init__(self, patterns: dict[str, set[str]]) -> None:
+        goto: list[dict[str, int]] = [{}]
+        fail = [0]
+        outputs: list[set[str]] = [set()]
+        # 空字串關鍵字在 `kw in text` 語意下永遠命中。
+        self.always: frozenset[str] = frozenset(patterns.get("", set()))
+        for pattern, labels in patterns.items():
+            if not pattern:
+                continue
+            node = 0
+            for ch in pattern:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    fail.append(0)
+                    outputs.append(set())
+                node = nxt
+            outputs[node].update(labels)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                target = goto[state].get(ch, 0)
+                fail[child] = target if target != child else 0
+                outputs[child] |= outputs[fail[child]]
+        self._goto = goto
+        self._fail = fail
+        self._outputs = [frozenset(labels) for labels in outputs]
+
+    def labels(self, text: str) -> set[str]:
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        found = set(self.always)
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if outputs[node]:
+                found |= outputs[node]
+        return found
+
+
+class ThemeMatcher:
+    """由題材庫預先編譯的比對器，是題材成員判定的唯一規則。
+
+    strict：只看題材代號清單；broad：另比對「名稱 + 產業」與產業文字中的關鍵字。
+    """
+
+    def __init__(self, rules: Iterable[dict[str, Any]]) -> None:
+        self.themes: set[str] = set()
+        self._symbols: dict[str, dict[str, set[str]]] = {"strict": {}, "broad": {}}
+        name_patterns: dict[str, set[str]] = {}
+        industry_patterns: dict[str, set[str]] = {}
+        for rule in rules:
+            name = rule["name"]
+            mode = rule["theme_mode"]
+            self.themes.add(name)
+            for symbol in rule.get("symbols") or []:
+                self._symbols[mode].setdefault(symbol, set()).add(name)
+            if mode != "broad":
+                continue
+            for kw in rule.get("name_keywords") or []:
+                name_patterns.setdefault(str(kw).lower(), set()).add(name)
+            for kw in rule.get("industry_keywords") or []:
+                industry_patterns.setdefault(str(kw).lower(), set()).add(name)
+        self._name_automaton = KeywordAutomaton(name_patterns)
+        self._industry_automaton = KeywordAutomaton(industry_patterns)
+
+    def match(self, symbol: str, name: str, industry: str, theme_mode: str = "strict") -> set[str]:
+        mode = "broad" if theme_mode == "broad" else "strict"
+        matched = set(self._symbols[mode].get(symbol) or ())
+        if mode == "broad":
+            matched |= self._name_automaton.labels(f"{name} {industry}".lower())
+            matched |= self._industry_automaton.labels(industry.lower())
+        return matched
+
+    def assign(self, rows: Iterable[dict[str, Any]], theme_mode: str = "strict") -> dict[str, list[int]]:
+        """一次掃過所有公司，回傳 題材 -> 命中列的位置（依輸入順序）。"""
+        assignments: dict[str, list[int]] = {}
+        for i, row in enumerate(rows):
+            for theme in self.match(row["symbol"], row.get("name") or "", row.get("industry") or "", theme_mode):
+                assignments.setdefault(theme, []).append(i)
+        return assignments
+
+
+@lru_cache(maxsize=1)
+def library_matcher() -> ThemeMatcher:
+    return ThemeMatcher(theme_rule(name, theme_mode=mode) for name in THEME_LIBRARY for mode in ("strict", "broad"))
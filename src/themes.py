@@ -105,6 +105,14 @@ def core_themes() -> list[str]:
     return [theme for theme in CORE_THEME_NAMES if theme in THEME_LIBRARY]
 
 
+def all_theme_symbols() -> list[str]:
+    symbols: set[str] = set()
+    for payload in THEME_LIBRARY.values():
+        symbols.update(payload.get("strict_symbols") or [])
+        symbols.update(payload.get("broad_symbols") or [])
+    return sorted(symbols)
+
+
 def normalize_theme(theme: str) -> str:
     key = theme.strip().lower()
     return _ALIAS_INDEX.get(key, theme.strip())
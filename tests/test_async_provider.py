@@ -0,0 +1,301 @@
+import asyncio
+import gzip
+import json
+import ssl
+import tempfile
+import threading
+import unittest
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+from urllib.error import URLError
+from urllib.parse import parse_qs, urlsplit
+from urllib.request import Request
+
+from src.providers.async_http import AsyncHttpTransport
+from src.providers.async_provider import AsyncTwMarketProvider, BlockingAsyncProvider
+from src.providers.tw_market_provider import TWSE_BALANCE_URLS, TWSE_EPS_URL, TWSE_INCOME_URLS, TwMarketProvider
+from tests.test_concurrent_fetch import _month_rows
+from tests.test_valuation_calendar import _ExchangeFake
+
+
+class _AsyncFakeNetwork:
+    def __init__(self, delay: float = 0.01) -> None:
+        self.delay = delay
+        self.active: dict[str, int] = {}
+        self.peak: dict[str, int] = {}
+        self.calls = 0
+
+    async def fetch(self, req, context=None):
+        host = urlsplit(req.full_url).hostname or ""
+        self.calls += 1
+        self.active[host] = self.active.get(host, 0) + 1
+        self.peak[host] = max(self.peak.get(host, 0), self.active[host])
+        try:
+            await asyncio.sleep(self.delay)
+            if req.data:
+                params = {k: v[0] for k, v in parse_qs(req.data.decode("utf-8")).items()}
+                year, month, _ = (int(x) for x in params["date"].split("/"))
+                return {"stat": "ok", "tables": [{"data": _month_rows(year, month, 50.0)}]}
+            params = {k: v[0] for k, v in parse_qs(urlsplit(req.full_url).query).items()}
+            if params.get("stockNo") == "9999":
+                return {"stat": "很抱歉，沒有符合條件的資料!"}
+            year, month = int(params["date"][:4]), int(params["date"][4:6])
+            return {"stat": "OK", "data": _month_rows(year, month, 100.0)}
+        finally:
+            self.active[host] -= 1
+
+
+class _ChunkedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        if self.path.startswith("/old"):
+            self.send_response(302)
+            self.send_header("Location", "/data?moved=1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        raw = gzip.compress(json.dumps({"path": self.path}).encode("utf-8"))
+        self.send_response(200)
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for start in range(0, len(raw), 7):
+            chunk = raw[start : start + 7]
+            self.wfile.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = json.dumps({"body": self.rfile.read(length).decode("utf-8")}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, format: str, *args) -> None:
+        return
+
+
+class AsyncProviderTests(unittest.TestCase):
+    def test_async_batch_matches_sync_and_shares_disk_cache(self) -> None:
+        as_of = date(2026, 3, 20)
+        pairs = [("2330", "TWSE"), ("2454", "TWSE"), ("6488", "TPEx"), ("9999", "TWSE")]
+        with tempfile.TemporaryDirectory() as tmp:
+            provider = AsyncTwMarketProvider(timeout=0.1, cache_dir=Path(tmp), per_host_concurrency=2)
+            network = _AsyncFakeNetwork()
+            errors: dict = {}
+            with patch.object(provider, "_open_json", side_effect=network.fetch):
+                result = asyncio.run(provider.get_ohlcv_batch(pairs, as_of=as_of, lookback=40, errors=errors))
+
+            sync_provider = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
+            with patch.object(sync_provider, "_open_json", side_effect=AssertionError("應命中共用快取")):
+                cached = sync_provider.get_ohlcv("6488", "TPEx", as_of=as_of, lookback=40)
+
+        self.assertEqual(sorted(result), [("2330", "TWSE"), ("2454", "TWSE"), ("6488", "TPEx")])
+        self.assertEqual(len(result[("2330", "TWSE")]), 40)
+        self.assertEqual(result[("2330", "TWSE")][-1]["date"], as_of)
+        self.assertIsInstance(errors[("9999", "TWSE")], ValueError)
+        self.assertEqual(network.peak["www.twse.com.tw"], 2)
+        self.assertEqual(cached, result[("6488", "TPEx")])
+
+    def test_concurrent_loads_share_one_flight_without_sync_network(self) -> None:
+        as_of = date(2026, 3, 20)
+        with tempfile.TemporaryDirectory() as tmp:
+            provider = AsyncTwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
+            network = _AsyncFakeNetwork()
+
+            async def _run():
+                try:
+                    return await asyncio.gather(
+                        *(provider.get_ohlcv("2330", "TWSE", as_of=as_of, lookback=40) for _ in range(3))
+                    )
+                finally:
+                    await provider.aclose()
+
+            with patch.object(provider, "_open_json", side_effect=network.fetch), patch.object(
+                provider.sync, "_load_json", side_effect=AssertionError("不應走同步網路")
+            ):
+                results = asyncio.run(_run())
+
+        self.assertEqual(len(results[0]), 40)
+        self.assertTrue(all(item is results[0] for item in results))
+        # 三個 coroutine 共用一次載入：每月 20 根，兩個月份各只送一次。
+        self.assertEqual(network.calls, 2)
+        self.assertEqual(provider.fetch_stats()["single_flight"]["shared"], 2)
+
+    def test_valuation_and_taiex_match_sync_on_the_loop(self) -> None:
+        as_of = date(2026, 3, 15)
+        sync_network = _ExchangeFake(listed_on={"20260312", "2026/03/12"})
+        async_network = _ExchangeFake(listed_on={"20260312", "2026/03/12"})
+
+        async def _fetch(req, context=None):
+            return async_network(req, context)
+
+        with tempfile.TemporaryDirectory() as sync_tmp, tempfile.TemporaryDirectory() as async_tmp:
+            sync_provider = TwMarketProvider(timeout=0.1, cache_dir=Path(sync_tmp))
+            with patch.object(sync_provider, "_open_json", side_effect=sync_network):
+                expected = (
+                    sync_provider.get_latest_valuation("2330", "TWSE", as_of=as_of),
+                    sync_provider.get_latest_valuation("6488", "TPEx", as_of=as_of),
+                    sync_provider.get_taiex_series(as_of=as_of, lookback=4),
+                )
+
+            provider = AsyncTwMarketProvider(timeout=0.1, cache_dir=Path(async_tmp))
+
+            async def _run():
+                try:
+                    return (
+                        await provider.get_latest_valuation("2330", "TWSE", as_of=as_of),
+                        await provider.get_latest_valuation("6488", "TPEx", as_of=as_of),
+                        await provider.get_taiex_series(as_of=as_of, lookback=4),
+                    )
+                finally:
+                    await provider.aclose()
+
+            with patch.object(provider, "_open_json", side_effect=_fetch), patch.object(
+                provider.sync, "_load_json", side_effect=AssertionError("不應走同步網路")
+            ):
+                actual = asyncio.run(_run())
+
+        self.assertEqual(actual, expected)
+        self.assertEqual(async_network.requests, sync_network.requests)
+
+    def test_quarterly_fundamentals_match_sync_on_the_loop(self) -> None:
+        as_of = date(2026, 3, 15)
+        datasets = {
+            TWSE_EPS_URL: [{"公司代號": "2330", "年度": "114", "季別": "4", "基本每股盈餘(元)": "19.50", "稅後淨利": "500"}],
+            TWSE_INCOME_URLS["ci"]: [{"公司代號": "2330", "營業收入": "1000", "營業毛利（毛損）淨額": "600"}],
+            TWSE_BALANCE_URLS["ci"]: [{"公司代號": "2330", "權益總計": "4000"}],
+        }
+
+        def _serve(req, context=None):
+            return datasets.get(req.full_url, [])
+
+        async def _fetch(req, context=None):
+            return _serve(req, context)
+
+        with tempfile.TemporaryDirectory() as sync_tmp, tempfile.TemporaryDirectory() as async_tmp:
+            sync_provider = TwMarketProvider(timeout=0.1, cache_dir=Path(sync_tmp))
+            with patch.object(sync_provider, "_open_json", side_effect=_serve):
+                expected = sync_provider.get_quarterly_fundamentals("2330", "TWSE", as_of)
+                expected_missing = sync_provider.get_quarterly_fundamentals("2454", "TWSE", as_of)
+
+            provider = AsyncTwMarketProvider(timeout=0.1, cache_dir=Path(async_tmp))
+
+            async def _run():
+                try:
+                    return await asyncio.gather(
+                        provider.get_quarterly_fundamentals("2330", "TWSE", as_of),
+                        provider.get_quarterly_fundamentals("2454", "TWSE", as_of),
+                    )
+                finally:
+                    await provider.aclose()
+
+            with patch.object(provider, "_open_json", side_effect=_fetch), patch.object(
+                provider.sync, "_load_json", side_effect=AssertionError("不應走同步網路")
+            ):
+                actual, actual_missing = asyncio.run(_run())
+
+        self.assertEqual(actual, expected)
+        self.assertEqual(actual_missing, expected_missing)
+        self.assertEqual(actual["eps_latest"], 19.5)
+        self.assertEqual(actual_missing["quality_fetch_status"], "unavailable")
+
+    def test_certificate_failure_wrapped_in_reason_retries_unverified(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            provider = AsyncTwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
+            contexts = []
+
+            async def _fetch(req, context=None):
+                contexts.append(context)
+                if context is None:
+                    raise URLError(ssl.SSLCertVerificationError("certificate verify failed"))
+                return [{"公司代號": "2330"}]
+
+            async def _run():
+                try:
+                    return await provider._get_json("https://openapi.twse.com.tw/v1/opendata/t187ap03_L")
+                finally:
+                    await provider.aclose()
+
+            with patch.object(provider, "_open_json", side_effect=_fetch):
+                payload = asyncio.run(_run())
+
+        self.assertEqual(payload, [{"公司代號": "2330"}])
+        self.assertEqual(len(contexts), 2)
+        self.assertIsNotNone(contexts[1])
+
+    def test_failed_fetch_follows_sync_error_handling(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            provider = AsyncTwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
+
+            async def _offline(req, context=None):
+                raise OSError("offline")
+
+            with patch.object(provider, "_open_json", side_effect=_offline), patch.object(
+                provider.sync, "_retry_delay", return_value=0.0
+            ):
+                universe = asyncio.run(provider.load_theme_universe("AI"))
+
+        self.assertEqual(universe, [])
+
+    def test_blocking_wrapper_delegates_to_async_backend(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            provider = BlockingAsyncProvider(timeout=0.1, cache_dir=Path(tmp))
+            network = _AsyncFakeNetwork()
+            try:
+                with patch.object(provider.async_provider, "_open_json", side_effect=network.fetch):
+                    candles = provider.get_ohlcv("2330", "TWSE", as_of=date(2026, 3, 20), lookback=30)
+                self.assertEqual(len(candles), 30)
+                self.assertEqual(provider.cache_dir, Path(tmp))
+                self.assertIn("async_http_pool", provider.fetch_stats())
+            finally:
+                provider.close()
+
+    def test_blocking_wrapper_rejects_methods_without_async_port(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            provider = BlockingAsyncProvider(timeout=0.1, cache_dir=Path(tmp))
+            try:
+                with self.assertRaises(AttributeError):
+                    provider.backfill_quarterly_history
+                self.assertIsNone(getattr(provider, "prewarm_shared_cache", None))
+            finally:
+                provider.close()
+
+
+class AsyncHttpTransportTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _ChunkedHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_keep_alive_chunked_gzip_and_redirect(self) -> None:
+        transport = AsyncHttpTransport(timeout=2.0)
+
+        async def _run():
+            first = await transport.request(Request(f"{self.base_url}/data?x=1"))
+            second = await transport.request(Request(f"{self.base_url}/old"))
+            third = await transport.request(Request(f"{self.base_url}/table", data=b"code=6488"))
+            await transport.close()
+            return first, second, third
+
+        first, second, third = asyncio.run(_run())
+        stats = transport.stats()["127.0.0.1"]
+
+        self.assertEqual(json.loads(first.body)["path"], "/data?x=1")
+        self.assertEqual(json.loads(second.body)["path"], "/data?moved=1")
+        self.assertEqual(json.loads(third.body)["body"], "code=6488")
+        self.assertEqual(stats["connections_opened"], 1)
+        self.assertEqual(stats["requests"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
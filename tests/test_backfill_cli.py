@@ -12,6 +12,9 @@ class _FakeBackfillProvider:
         self.timeout = timeout
         self.quarterly_store_path = Path("C:/tmp/quarterly_fundamentals.sqlite")
 
+    def close(self) -> None:
+        pass
+
     def backfill_quarterly_history(
         self,
         as_of,
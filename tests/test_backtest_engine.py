@@ -2,6 +2,7 @@ import unittest
 from datetime import date
 
 from src.analysis.backtest import run_cross_sectional_backtest
+from src.analysis.frame import FactorFrame, SymbolTable
 
 
 class BacktestEngineTests(unittest.TestCase):
@@ -64,6 +65,26 @@ class BacktestEngineTests(unittest.TestCase):
         self.assertIn("price", result["factor_sleeves"])
         self.assertIn("factor_attribution", result)
 
+        # 同一批快照改成 FactorFrame（共用代號表時以整數 id 比對持股；各自建表時退回代號字串），結果不變。
+        table = SymbolTable()
+        shared = [{**snapshot, "rows": FactorFrame.from_rows(snapshot["rows"][::-1], table)} for snapshot in snapshots]
+        separate = [{**snapshot, "rows": FactorFrame.from_rows(snapshot["rows"])} for snapshot in snapshots]
+        for framed in (shared, separate):
+            self.assertEqual(
+                run_cross_sectional_backtest(
+                    snapshots=framed,
+                    benchmark_series=benchmark_series,
+                    top_n=1,
+                    cost_bps=10,
+                    factor_groups={
+                        "price": ["price_factor_score"],
+                        "fundamental": ["fundamental_factor_score"],
+                        "quality": ["quality_factor_score"],
+                    },
+                ),
+                result,
+            )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -6,6 +6,8 @@ from pathlib import Path
 from unittest.mock import patch
 
 from scripts import tw_sector_screener as cli
+from src.analysis.candles import CandleSeries
+from src.analysis.factors import sma
 
 
 class _FakeProvider:
@@ -77,6 +79,9 @@ class _FakeProvider:
             )
         return series[-lookback:]
 
+    def get_ohlcv_batch(self, pairs, as_of: date, lookback: int = 252, errors=None):
+        return {(symbol, market): self.get_ohlcv(symbol, market, as_of=as_of, lookback=lookback) for symbol, market in pairs}
+
     def get_latest_valuation(self, symbol: str, market: str, as_of: date, max_backtrack_days: int = 20):
         if symbol == "2330":
             return {"pe": 20.0, "pb": 5.0, "dividend_yield": 1.5}
@@ -253,5 +258,60 @@ class CliOutputTests(unittest.TestCase):
             self.assertFalse(audit["backfill_enqueued"])
 
 
+    def test_validation_snapshots_match_full_prefix_signals(self) -> None:
+        raw_rows = []
+        row_candles = []
+        for offset, length in [(0.0, 400), (35.0, 330)]:
+            candles = CandleSeries()
+            for i in range(length):
+                close = 50.0 + offset + ((i * 7) % 23) * 0.37 - (i % 11) * 0.21
+                candles.append(date(2024, 1, 1) + timedelta(days=i), close, close, close, close, 1000.0)
+            raw_rows.append({"symbol": f"S{length}", "revenue_yoy": 12.5, "eps_trend": 0.4})
+            row_candles.append(candles)
+
+        cache: dict = {}
+        snapshots = cli._build_validation_snapshots(raw_rows, row_candles, "1y", "weekly", cache)
+        # 第二次建快照全部命中訊號快取，不再重算價格訊號。
+        with patch.object(cli, "_price_signal", side_effect=AssertionError("signal cache miss")):
+            again = cli._build_validation_snapshots(raw_rows, row_candles, "1y", "weekly", cache)
+
+        common_len = min(len(candles) for candles in row_candles)
+        self.assertEqual(len(snapshots), len(range(common_len - 252, common_len, 5)))
+        for snapshot, index in zip(snapshots, range(common_len - 252, common_len, 5)):
+            for candles, item in zip(row_candles, snapshot["rows"]):
+                closes = list(candles.closes[: index + 1])
+                expected = cli._price_signal(closes, closes[-1], sma(closes, 20), sma(closes, 60), sma(closes, 120))
+                self.assertEqual(item["price_factor_score"], expected)
+        self.assertIs(snapshots[0]["rows"].table, snapshots[-1]["rows"].table)
+        self.assertEqual(list(snapshots[-1]["rows"].symbol_ids), [0, 1])
+        self.assertEqual(again[-1]["rows"].to_rows(), snapshots[-1]["rows"].to_rows())
+
+    def test_stale_cache_flags_only_rows_fed_by_stale_entries(self) -> None:
+        rows = [
+            {"symbol": "2330", "name": "台積電", "market": "TWSE"},
+            {"symbol": "2382", "name": "廣達", "market": "TWSE"},
+            {"symbol": "6488", "name": "環球晶", "market": "TPEx"},
+        ]
+        per_symbol = [{"endpoint": "www.twse.com.tw/exchangeReport/STOCK_DAY", "market": "TWSE", "symbol": "2330"}]
+        market_wide = [{"endpoint": "www.tpex.org.tw/openapi/v1/mopsfin_t187ap05_O", "market": "TPEx", "symbol": None}]
+        benchmark = [{"endpoint": "www.twse.com.tw/exchangeReport/FMTQIK", "market": None, "symbol": None}]
+
+        self.assertEqual(cli._stale_symbols(per_symbol, rows), {"2330"})
+        self.assertEqual(cli._stale_symbols(market_wide, rows), {"6488"})
+        self.assertEqual(cli._stale_symbols(benchmark, rows), {"2330", "2382", "6488"})
+        self.assertEqual(cli._stale_symbols([], rows), set())
+
+        raw_rows = [{**row, "data_quality_flags": []} for row in rows]
+        before = [dict(row) for row in raw_rows]
+        ranked, picks = cli._rank_rows(raw_rows, {"trend": 1.0}, 1, stale_symbols={"2330"})
+        flagged = {row["symbol"] for row in ranked if "data:stale_cache" in row["data_quality_flags"]}
+        self.assertEqual(flagged, {"2330"})
+        # 分數直接加在原列上、不複製；評分前的因子欄位保持原值給驗證回測使用。
+        self.assertEqual({id(row) for row in ranked}, {id(row) for row in raw_rows})
+        for row, original in zip(raw_rows, before):
+            self.assertEqual({k: row[k] for k in original if k != "data_quality_flags"}, {k: v for k, v in original.items() if k != "data_quality_flags"})
+        self.assertIs(picks[0], ranked[0])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,93 @@
+import tempfile
+import threading
+import time
+import unittest
+from datetime import date
+from pathlib import Path
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlsplit
+
+from src.providers.tw_market_provider import TwMarketProvider
+
+
+def _month_rows(year: int, month: int, base: float) -> list[list[str]]:
+    rows = []
+    for day in range(1, 21):
+        close = base + day
+        rows.append(
+            [
+                f"{year - 1911}/{month:02d}/{day:02d}",
+                "1,000",
+                "0",
+                f"{close - 1:.2f}",
+                f"{close + 1:.2f}",
+                f"{close - 2:.2f}",
+                f"{close:.2f}",
+            ]
+        )
+    return rows
+
+
+class _FakeNetwork:
+    def __init__(self, delay: float = 0.02) -> None:
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active: dict[str, int] = {}
+        self.peak: dict[str, int] = {}
+        self.calls = 0
+
+    def __call__(self, req, context=None):
+        host = urlsplit(req.full_url).hostname or ""
+        with self.lock:
+            self.calls += 1
+            self.active[host] = self.active.get(host, 0) + 1
+            self.peak[host] = max(self.peak.get(host, 0), self.active[host])
+        try:
+            time.sleep(self.delay)
+            if req.data:
+                params = {k: v[0] for k, v in parse_qs(req.data.decode("utf-8")).items()}
+                year, month, _ = (int(x) for x in params["date"].split("/"))
+                return {"stat": "ok", "tables": [{"data": _month_rows(year, month, 50.0)}]}
+            params = {k: v[0] for k, v in parse_qs(urlsplit(req.full_url).query).items()}
+            year, month = int(params["date"][:4]), int(params["date"][4:6])
+            return {"stat": "OK", "data": _month_rows(year, month, 100.0)}
+        finally:
+            with self.lock:
+                self.active[host] -= 1
+
+
+class ConcurrentFetchTests(unittest.TestCase):
+    def test_batch_fetch_returns_all_series_within_host_limits(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            provider = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp), max_workers=8, per_host_concurrency=3)
+            network = _FakeNetwork()
+            pairs = [("2330", "TWSE"), ("2454", "TWSE"), ("6488", "TPEx"), ("8299", "TPEx"), ("2330", "TWSE")]
+            with patch.object(provider, "_open_json", side_effect=network):
+                result = provider.get_ohlcv_batch(pairs, as_of=date(2026, 3, 20), lookback=40)
+                calls_after_batch = network.calls
+                again = provider.get_ohlcv("6488", "TPEx", as_of=date(2026, 3, 20), lookback=40)
+
+        self.assertEqual(sorted(result), [("2330", "TWSE"), ("2454", "TWSE"), ("6488", "TPEx"), ("8299", "TPEx")])
+        for candles in result.values():
+            self.assertEqual(len(candles), 40)
+            self.assertEqual(candles[-1]["date"], date(2026, 3, 20))
+        self.assertLessEqual(network.peak["www.twse.com.tw"], 3)
+        self.assertLessEqual(network.peak["www.tpex.org.tw"], 3)
+        self.assertGreater(network.peak["www.twse.com.tw"], 1)
+        self.assertEqual(network.calls, calls_after_batch)
+        self.assertIs(again, result[("6488", "TPEx")])
+
+    def test_batch_fetch_reports_failed_symbols(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            provider = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
+            errors: dict = {}
+            with patch.object(provider, "_open_json", return_value={"stat": "很抱歉，沒有符合條件的資料!"}):
+                result = provider.get_ohlcv_batch([("9999", "TWSE")], as_of=date(2026, 3, 20), lookback=40, errors=errors)
+
+        self.assertEqual(result, {})
+        self.assertIn(("9999", "TWSE"), errors)
+        self.assertIsInstance(errors[("9999", "TWSE")], ValueError)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+import json
+import tempfile
+import threading
+import unittest
+from calendar import monthrange
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlsplit
+
+from src.providers import market_store
+from src.providers.tw_market_provider import TwMarketProvider
+from tests.test_concurrent_fetch import _month_rows
+
+
+FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures" / "daily_quotes"
+TWSE_SYMBOLS = ["2330", "2454", "2317"]
+TPEX_SYMBOLS = ["6488", "8299", "5483"]
+HOLIDAYS = {date(2026, 3, 17)}
+
+
+class _ExchangeStandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    published = date(2026, 3, 12)
+    requests: list[str] = []
+
+    def do_GET(self) -> None:
+        parts = urlsplit(self.path)
+        params = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        type(self).requests.append(parts.path)
+        if parts.path.endswith("/STOCK_DAY"):
+            year, month = int(params["date"][:4]), int(params["date"][4:6])
+            self._reply({"stat": "OK", "data": self._rows(year, month, 100.0)})
+        elif parts.path.endswith("/FMTQIK"):
+            year, month = int(params["date"][:4]), int(params["date"][4:6])
+            self._reply(
+                {
+                    "stat": "OK",
+                    "fields": ["日期", "成交股數", "成交金額", "成交筆數", "發行量加權股價指數", "漲跌點數"],
+                    "data": [[day, "1", "1", "1", "23000.00", "0.00"] for day in self._calendar(year, month)],
+                }
+            )
+        elif parts.path.endswith("/MI_INDEX"):
+            self._reply_fixture(f"twse_mi_index_{params['date']}.json", {"stat": "很抱歉，沒有符合條件的資料!"})
+        elif parts.path.endswith("/otc"):
+            day = params["date"].replace("/", "")
+            self._reply_fixture(f"tpex_otc_{day}.json", {"stat": "ok", "tables": [{"fields": ["代號", "收盤"], "data": []}]})
+        else:
+            self._reply({}, status=404)
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        params = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+        type(self).requests.append(urlsplit(self.path).path)
+        year, month, _ = (int(x) for x in params["date"].split("/"))
+        self._reply({"stat": "ok", "tables": [{"data": self._rows(year, month, 50.0)}]})
+
+    def _rows(self, year: int, month: int, base: float) -> list[list[str]]:
+        cutoff = type(self).published
+        if (year, month) > (cutoff.year, cutoff.month):
+            return []
+        rows = _month_rows(year, month, base)
+        if (year, month) == (cutoff.year, cutoff.month):
+            rows = [row for row in rows if int(row[0].split("/")[2]) <= cutoff.day]
+        return rows
+
+    def _calendar(self, year: int, month: int) -> list[str]:
+        days = [date(year, month, day) for day in range(1, monthrange(year, month)[1] + 1)]
+        return [f"{d.year - 1911}/{d.month:02d}/{d.day:02d}" for d in days if d.weekday() < 5 and d not in HOLIDAYS]
+
+    def _reply_fixture(self, name: str, fallback: dict) -> None:
+        path = FIXTURE_DIR / name
+        self._reply(json.loads(path.read_text(encoding="utf-8")) if path.exists() else fallback)
+
+    def _reply(self, payload: dict, status: int = 200) -> None:
+        raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, format: str, *args) -> None:
+        return
+
+
+class DailyQuoteIngestionTests(unittest.TestCase):
+    def setUp(self) -> None:
+        _ExchangeStandIn.requests = []
+        _ExchangeStandIn.published = date(2026, 3, 12)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _ExchangeStandIn)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        module = "src.providers.tw_market_provider"
+        self.patches = [
+            patch(f"{module}.TWSE_STOCK_DAY_URL", f"{base}/exchangeReport/STOCK_DAY"),
+            patch(f"{module}.TWSE_MI_INDEX_URL", f"{base}/exchangeReport/MI_INDEX"),
+            patch(f"{module}.TWSE_FMTQIK_URL", f"{base}/exchangeReport/FMTQIK"),
+            patch(f"{module}.TPEX_TRADING_STOCK_URL", f"{base}/afterTrading/tradingStock"),
+            patch(f"{module}.TPEX_DAILY_QUOTES_URL", f"{base}/afterTrading/otc"),
+        ]
+        for item in self.patches:
+            item.start()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pairs = [(symbol, "TWSE") for symbol in TWSE_SYMBOLS] + [(symbol, "TPEx") for symbol in TPEX_SYMBOLS]
+
+    def tearDown(self) -> None:
+        for item in self.patches:
+            item.stop()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def _run_day(self, today: date, as_of: date | None = None) -> tuple[TwMarketProvider, dict, list[str]]:
+        before = len(_ExchangeStandIn.requests)
+        provider = TwMarketProvider(timeout=2.0, cache_dir=Path(self.tmp.name))
+        with patch.object(provider, "_today", return_value=today):
+            result = provider.get_ohlcv_batch(self.pairs, as_of=as_of or today, lookback=30)
+        provider._http.close()
+        return provider, result, _ExchangeStandIn.requests[before:]
+
+    def test_daily_refresh_uses_one_market_table_per_exchange(self) -> None:
+        _, cold, cold_requests = self._run_day(date(2026, 3, 12))
+        self.assertEqual(len(cold), 6)
+        self.assertNotIn("/exchangeReport/MI_INDEX", cold_requests)
+
+        provider, result, requests = self._run_day(date(2026, 3, 13))
+        self.assertEqual(sorted(requests), ["/afterTrading/otc", "/exchangeReport/FMTQIK", "/exchangeReport/MI_INDEX"])
+        self.assertEqual(result[("2330", "TWSE")][-1], {
+            "date": date(2026, 3, 13),
+            "open": 1010.0,
+            "high": 1020.0,
+            "low": 1005.0,
+            "close": 1015.0,
+            "volume": 25123456.0,
+        })
+        self.assertEqual(result[("2330", "TWSE")][-2]["date"], date(2026, 3, 12))
+        self.assertEqual(result[("6488", "TPEx")][-1]["close"], 420.5)
+        self.assertAlmostEqual(result[("6488", "TPEx")][-1]["volume"], 1234.567)
+        self.assertEqual(len(result[("8299", "TPEx")]), 30)
+        ingested = provider.fetch_stats()["daily_quotes_ingested"]
+        self.assertEqual({item["market"] for item in ingested}, {"TWSE", "TPEx"})
+
+        _, monday, monday_requests = self._run_day(date(2026, 3, 16))
+        self.assertEqual(sorted(monday_requests), ["/afterTrading/otc", "/exchangeReport/FMTQIK", "/exchangeReport/MI_INDEX"])
+        self.assertEqual(monday[("2454", "TWSE")][-1]["close"], 1318.0)
+
+    def test_holiday_from_calendar_is_not_requested(self) -> None:
+        for today in [date(2026, 3, 12), date(2026, 3, 13), date(2026, 3, 16)]:
+            self._run_day(today)
+        provider, result, requests = self._run_day(date(2026, 3, 18), as_of=date(2026, 3, 17))
+        days = market_store.get_ingested_days(provider.market_store_path, "TWSE", date(2026, 3, 13), date(2026, 3, 17))
+
+        self.assertEqual(days, {"2026-03-13": "trading", "2026-03-16": "trading"})
+        self.assertNotIn("/exchangeReport/MI_INDEX", requests)
+        self.assertNotIn("/exchangeReport/STOCK_DAY", requests)
+        self.assertEqual(result[("2317", "TWSE")][-1]["date"], date(2026, 3, 16))
+
+    def test_failed_trading_day_is_not_recorded(self) -> None:
+        for today in [date(2026, 3, 12), date(2026, 3, 13), date(2026, 3, 16)]:
+            self._run_day(today)
+        # 3/18 沒有 fixture：MI_INDEX 回 stat 非 OK、TPEx 日報是空表，等同限流或暫時錯誤。
+        provider, _, requests = self._run_day(date(2026, 3, 19), as_of=date(2026, 3, 18))
+
+        for market in ("TWSE", "TPEx"):
+            days = market_store.get_ingested_days(provider.market_store_path, market, date(2026, 3, 18), date(2026, 3, 18))
+            self.assertEqual(days, {}, market)
+        self.assertEqual(requests.count("/exchangeReport/MI_INDEX"), 1)
+        self.assertEqual(requests.count("/exchangeReport/STOCK_DAY"), 3)
+        self.assertEqual(requests.count("/afterTrading/tradingStock"), 3)
+
+    def test_unpublished_today_is_not_marked_closed(self) -> None:
+        self._run_day(date(2026, 3, 12))
+        _ExchangeStandIn.published = date(2026, 3, 13)
+        with patch.object(TwMarketProvider, "_parse_twse_daily_quotes", return_value={}):
+            provider, _, requests = self._run_day(date(2026, 3, 13))
+        days = market_store.get_ingested_days(provider.market_store_path, "TWSE", date(2026, 3, 13), date(2026, 3, 13))
+
+        self.assertEqual(days, {})
+        self.assertEqual(requests.count("/exchangeReport/STOCK_DAY"), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,12 @@
+import random
 import unittest
+from datetime import date, timedelta
 
-from src.analysis.factors import percentile_rank, position_plan
+from src.analysis import factor_kernel
+from src.analysis.candles import CandleSeries
+from src.analysis.factor_kernel import compute_factor_table, reference_factors
+from src.analysis.factors import atr_wilder, percentile_rank, position_plan
+from src.analysis.ranking import PercentileColumn, percentile_column
 
 
 class FactorTests(unittest.TestCase):
@@ -9,6 +15,19 @@ class FactorTests(unittest.TestCase):
         self.assertAlmostEqual(percentile_rank(30.0, values), 75.0)
         self.assertAlmostEqual(percentile_rank(10.0, values), 25.0)
 
+    def test_percentile_column_matches_percentile_rank(self) -> None:
+        rng = random.Random(11)
+        values = [round(rng.uniform(-5.0, 5.0), 1) for _ in range(200)] + [float("nan"), 0.0, -0.0]
+        column = PercentileColumn(values)
+        for current in [*values, None, -99.0, 99.0, 0.05]:
+            self.assertEqual(repr(column.rank(current)), repr(percentile_rank(current, values)))
+        self.assertIsNone(PercentileColumn([]).rank(1.0))
+
+        rows = [{"pe": rng.choice([None, -3.0, rng.uniform(5.0, 40.0)])} for _ in range(60)]
+        pe_col = percentile_column(rows, "pe", include=lambda v: v > 0)
+        pe_list = [row["pe"] for row in rows if isinstance(row["pe"], float) and row["pe"] > 0]
+        self.assertEqual([pe_col.rank(row["pe"]) for row in rows], [percentile_rank(row["pe"], pe_list) for row in rows])
+
     def test_position_plan_contains_risk_formula(self) -> None:
         plan = position_plan(score=78.0, close=120.0, atr14=4.0, volatility20=28.0)
         self.assertIn("max_position_pct", plan)
@@ -16,6 +35,46 @@ class FactorTests(unittest.TestCase):
         self.assertIn("share_formula", plan)
         self.assertGreater(plan["max_position_pct"], 0.0)
 
+    def test_candle_series_matches_dict_rows(self) -> None:
+        rows = [
+            {"date": date(2026, 1, 1) + timedelta(days=i), "open": 10.0 + i, "high": 11.5 + i, "low": 9.0 + i, "close": 10.5 + i * 1.1, "volume": 1000.0 * i}
+            for i in range(30)
+        ]
+        series = CandleSeries.from_rows(rows)
+
+        self.assertEqual(len(series), 30)
+        self.assertEqual(series, rows)
+        self.assertEqual(series[-5:], rows[-5:])
+        self.assertIsInstance(series[-5:], CandleSeries)
+        self.assertEqual(series[3], rows[3])
+        self.assertEqual(list(series.closes), [row["close"] for row in rows])
+        self.assertEqual(atr_wilder(series, 14), atr_wilder(rows, 14))
+        with self.assertRaises(AttributeError):
+            series.extra = 1
+
+    @unittest.skipIf(factor_kernel.np is None, "numpy 未安裝")
+    def test_factor_kernel_matches_reference_bitwise(self) -> None:
+        rng = random.Random(7)
+        columns = [[rng.uniform(-1.0, 1.0) * 10 ** rng.randint(-8, 8) for _ in range(40)] for _ in range(50)]
+        summed = factor_kernel._builtin_sum(factor_kernel.np.array(columns).T)
+        self.assertEqual(summed.tolist(), [sum(column) for column in columns])
+
+        series_map = {}
+        for idx, length in enumerate([0, 5, 15, 21, 64, 130, 292, 292, *([292] * 40)]):
+            series = CandleSeries()
+            price = rng.uniform(10.0, 900.0)
+            for i in range(length):
+                price = round(max(0.01, price * (1.0 + rng.gauss(0.0, 0.03))), 2)
+                close = 0.0 if idx == 7 and i == length // 2 else price
+                series.append(date(2025, 1, 1) + timedelta(days=i), price, price * 1.02, price * 0.98, close, 1000.0)
+            series_map[(str(idx), "TWSE")] = series
+
+        table = compute_factor_table(series_map)
+
+        for key, series in series_map.items():
+            self.assertEqual(table[key], reference_factors(series), key)
+        self.assertIsNone(table[("3", "TWSE")]["sma60"])
+        self.assertIsNotNone(table[("7", "TWSE")]["volatility20"])
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,281 @@
+import asyncio
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from contextlib import closing, redirect_stdout
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+from scripts import cache_maintenance
+from src.providers import http_cache
+from src.providers.async_provider import AsyncTwMarketProvider
+from src.providers.tw_market_provider import TwMarketProvider
+
+
+class _ValidatingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    seen: list[tuple[str, str | None]] = []
+
+    def do_GET(self) -> None:
+        type(self).seen.append((self.path, self.headers.get("If-None-Match")))
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.send_header("ETag", '"v1"')
+            self.end_headers()
+            return
+        raw = json.dumps([{"公司代號": "2330", "公司簡稱": "台積電"}], ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", '"v1"')
+        self.send_header("Last-Modified", "Thu, 12 Mar 2026 08:00:00 GMT")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, format: str, *args) -> None:
+        return
+
+
+class HttpCacheTests(unittest.TestCase):
+    def test_legacy_json_files_are_imported_once_with_mtime(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_dir = Path(tmp)
+            probe = TwMarketProvider(timeout=0.1, cache_dir=cache_dir)
+            req = probe._build_get_request("https://www.twse.com.tw/exchangeReport/STOCK_DAY", {"stockNo": "2330", "date": "20260201"})
+            key = probe._cache_key(req)
+            legacy = cache_dir / f"{key}.json"
+            legacy.write_text(json.dumps({"stat": "OK", "data": [["115/02/02"]]}, ensure_ascii=False), encoding="utf-8")
+            fetched_at = time.time() - 3600
+            os.utime(legacy, (fetched_at, fetched_at))
+            (probe._legacy_quarterly_snapshot_dir() / "twse_ci-114Q3.json").write_text("{}", encoding="utf-8")
+            broken = cache_dir / f"{'f' * 64}.json"
+            broken.write_text("{not json", encoding="utf-8")
+
+            provider = TwMarketProvider(timeout=0.1, cache_dir=cache_dir)
+            with patch.object(provider, "_open_json", side_effect=AssertionError("應命中匯入的快取")):
+                payload = provider._load_json(req)
+            entry = http_cache.get_entry(provider.http_cache_path, key, include_payload=False)
+            with patch.object(provider, "_open_json", return_value={"stat": "OK", "data": [["115/02/03"]]}) as refetch:
+                refreshed = provider._load_json(req, not_before=fetched_at + 1)
+
+            self.assertEqual(payload["data"], [["115/02/02"]])
+            self.assertFalse(legacy.exists())
+            self.assertTrue(broken.exists())
+            self.assertTrue((cache_dir / "quarterly" / "twse_ci-114Q3.json").exists())
+            self.assertAlmostEqual(entry["fetched_at"], fetched_at, places=3)
+            self.assertIsNone(entry["ttl_seconds"])
+            self.assertEqual(refetch.call_count, 1)
+            self.assertEqual(refreshed["data"], [["115/02/03"]])
+            self.assertEqual(http_cache.import_file_cache(provider.http_cache_path, cache_dir), 0)
+
+    def test_concurrent_writers_and_readers_see_whole_entries(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = Path(tmp) / "http_cache.sqlite"
+            http_cache.init_db(db_path)
+            errors: list[BaseException] = []
+
+            def writer(n: int) -> None:
+                try:
+                    for i in range(30):
+                        http_cache.put_entry(db_path, "k", "https://x", {"writer": n, "rows": [n] * 500}, time.time(), 60)
+                except BaseException as exc:
+                    errors.append(exc)
+
+            def reader() -> None:
+                try:
+                    for _ in range(60):
+                        entry = http_cache.get_entry(db_path, "k")
+                        if entry is not None:
+                            self.assertEqual(entry["payload"]["rows"], [entry["payload"]["writer"]] * 500)
+                except BaseException as exc:
+                    errors.append(exc)
+
+            threads = [threading.Thread(target=writer, args=(n,)) for n in range(3)] + [threading.Thread(target=reader) for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(errors, [])
+            self.assertEqual(http_cache.cache_report(db_path, time.time())["entries"], 1)
+            self.assertEqual(http_cache.get_entry(db_path, "k")["ttl_seconds"], 60)
+
+    def test_budget_evicts_least_recently_used_and_keeps_pinned_months(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_dir = Path(tmp)
+            provider = TwMarketProvider(timeout=0.1, cache_dir=cache_dir, cache_max_bytes=None)
+            closed = provider._ohlcv_month_request("2330", "TWSE", date(2026, 1, 1))
+            with patch.object(provider, "_open_json", return_value={"stat": "OK", "data": [["x" * 400]]}), patch.object(
+                provider, "_today", return_value=date(2026, 3, 12)
+            ):
+                provider._load_json(closed, pin=provider._month_closed(date(2026, 1, 1)))
+            provider.close()
+            db_path = provider.http_cache_path
+            base = time.time() - 1000
+            for i, name in enumerate(["old", "mid", "new"]):
+                http_cache.put_entry(db_path, name, f"https://www.twse.com.tw/exchangeReport/BWIBBU_d?date={i}", {"rows": "y" * 400}, base + i, 3600)
+            http_cache.record_stats(
+                db_path,
+                {"www.twse.com.tw/exchangeReport/BWIBBU_d": (1, 0, 0, 0)},
+                {"old": (base + 10, "https://www.twse.com.tw/exchangeReport/BWIBBU_d?date=0")},
+            )
+
+            reopened = TwMarketProvider(timeout=0.1, cache_dir=cache_dir, cache_max_bytes=1000)
+            eviction = reopened.fetch_stats()["http_cache"]["startup_eviction"]
+            report = http_cache.cache_report(db_path, time.time())
+
+            self.assertEqual(eviction["evicted"], 2)
+            self.assertIsNotNone(http_cache.get_entry(db_path, reopened._cache_key(closed)))
+            self.assertIsNotNone(http_cache.get_entry(db_path, "old"))
+            self.assertIsNone(http_cache.get_entry(db_path, "mid"))
+            self.assertIsNone(http_cache.get_entry(db_path, "new"))
+            self.assertEqual(report["pinned"], 1)
+            by_endpoint = {item["endpoint"]: item for item in report["endpoints"]}
+            self.assertEqual(by_endpoint["www.twse.com.tw/exchangeReport/BWIBBU_d"]["hits"], 1)
+            self.assertEqual(by_endpoint["www.twse.com.tw/exchangeReport/STOCK_DAY"]["misses"], 1)
+
+    def test_large_payloads_are_compressed_and_plain_entries_stay_readable(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = Path(tmp) / "http_cache.sqlite"
+            with closing(sqlite3.connect(db_path)) as conn, conn:
+                conn.execute(
+                    "CREATE TABLE http_cache (key TEXT PRIMARY KEY, url TEXT, payload BLOB NOT NULL, "
+                    "fetched_at REAL NOT NULL, ttl_seconds INTEGER) WITHOUT ROWID"
+                )
+                conn.execute(
+                    "INSERT INTO http_cache VALUES(?, ?, ?, ?, ?)",
+                    ("plain", "https://x/plain", json.dumps({"stat": "OK"}).encode("utf-8"), time.time(), 60),
+                )
+            http_cache.init_db(db_path)
+            table = [{"公司代號": f"{1000 + i}", "營業收入": str(i * 1000)} for i in range(2000)]
+            http_cache.put_entry(db_path, "bulk", "https://x/t187ap06_L_ci", table, time.time(), 60)
+            http_cache.put_entry(db_path, "tiny", "https://x/tiny", {"stat": "OK"}, time.time(), 60)
+            bulk = http_cache.get_entry(db_path, "bulk")
+            with closing(sqlite3.connect(db_path)) as conn:
+                stored = conn.execute("SELECT length(payload) FROM http_cache WHERE key = 'bulk'").fetchone()[0]
+
+            self.assertEqual(http_cache.get_entry(db_path, "plain")["payload"], {"stat": "OK"})
+            self.assertEqual(http_cache.get_entry(db_path, "plain")["encoding"], "identity")
+            self.assertEqual(http_cache.get_entry(db_path, "tiny")["encoding"], "identity")
+            self.assertEqual(bulk["encoding"], "zlib")
+            self.assertEqual(bulk["payload"], table)
+            self.assertLess(stored * 4, len(json.dumps(table, ensure_ascii=False).encode("utf-8")))
+
+    def test_maintenance_cli_reports_and_prunes_by_endpoint_and_age(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = Path(tmp) / "cache" / "market" / "http_cache.sqlite"
+            http_cache.init_db(db_path)
+            now = time.time()
+            http_cache.put_entry(db_path, "a", "https://www.twse.com.tw/exchangeReport/BWIBBU_d?date=1", {}, now - 40 * 86400, 3600)
+            http_cache.put_entry(db_path, "b", "https://www.twse.com.tw/exchangeReport/BWIBBU_d?date=2", {}, now, 3600)
+            http_cache.put_entry(db_path, "c", "https://www.tpex.org.tw/www/zh-tw/afterTrading/otc?date=1", {}, now - 40 * 86400, 3600)
+            http_cache.put_entry(db_path, "d", "https://www.twse.com.tw/exchangeReport/STOCK_DAY?date=1", {}, now - 40 * 86400, 3600, pinned=True)
+
+            output = io.StringIO()
+            with redirect_stdout(output):
+                cache_maintenance.main(["--output-root", tmp, "report", "--json"])
+                cache_maintenance.main(
+                    ["--output-root", tmp, "prune", "--endpoint", "www.twse.com.tw/exchangeReport/BWIBBU_d", "--older-than-days", "30"]
+                )
+                cache_maintenance.main(["--output-root", tmp, "prune", "--older-than-days", "30", "--vacuum"])
+            report = json.loads(output.getvalue().split("[cache] pruned")[0])
+
+            self.assertEqual(report["entries"], 4)
+            self.assertEqual(report["age_distribution"]["<1d"], 1)
+            self.assertEqual(report["age_distribution"]["30-365d"], 3)
+            self.assertEqual(sorted(k for k in "abcd" if http_cache.get_entry(db_path, k)), ["b", "d"])
+
+    def test_expired_dataset_is_revalidated_with_etag(self) -> None:
+        _ValidatingHandler.seen = []
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _ValidatingHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/v1/opendata/t187ap03_L"
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                provider = TwMarketProvider(timeout=2.0, cache_dir=Path(tmp))
+                first = provider._get_json(url)
+                key = provider._cache_key(provider._build_get_request(url))
+                expired = time.time() - 13 * 3600
+                with closing(sqlite3.connect(provider.http_cache_path)) as conn, conn:
+                    conn.execute("UPDATE http_cache SET fetched_at = ? WHERE key = ?", (expired, key))
+                second = provider._get_json(url)
+                third = provider._get_json(url)
+                entry = http_cache.get_entry(provider.http_cache_path, key, include_payload=False)
+                stats = provider.fetch_stats()["http_cache"]
+                provider.close()
+                report = http_cache.cache_report(provider.http_cache_path, time.time())
+
+                with closing(sqlite3.connect(provider.http_cache_path)) as conn, conn:
+                    conn.execute("UPDATE http_cache SET fetched_at = ? WHERE key = ?", (expired, key))
+                async_provider = AsyncTwMarketProvider(timeout=2.0, cache_dir=Path(tmp))
+
+                async def _run():
+                    try:
+                        return await async_provider._get_json(url)
+                    finally:
+                        await async_provider.aclose()
+
+                via_async = asyncio.run(_run())
+                async_stats = async_provider.fetch_stats()["http_cache"]
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(first, second)
+        self.assertEqual(third, first)
+        self.assertEqual(via_async, first)
+        self.assertEqual([etag for _, etag in _ValidatingHandler.seen], [None, '"v1"', '"v1"'])
+        self.assertEqual(entry["etag"], '"v1"')
+        self.assertEqual(entry["last_modified"], "Thu, 12 Mar 2026 08:00:00 GMT")
+        self.assertGreater(entry["fetched_at"], expired)
+        self.assertEqual((stats["full_fetches"], stats["revalidated"]), (1, 1))
+        self.assertEqual((async_stats["full_fetches"], async_stats["revalidated"]), (0, 1))
+        self.assertEqual((report["full_fetches"], report["revalidations"]), (1, 1))
+
+    def test_stale_while_revalidate_serves_old_payload_and_refreshes(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            provider = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp), stale_while_revalidate=True, max_stale_seconds=3600)
+            url = "https://openapi.twse.com.tw/v1/opendata/t187ap03_L"
+            req = provider._build_get_request(url)
+            key = provider._cache_key(req)
+            http_cache.put_entry(provider.http_cache_path, key, url, ["old"], time.time() - 12.5 * 3600, 12 * 3600)
+            release = threading.Event()
+
+            def slow_network(req, context=None):
+                release.wait(2.0)
+                return ["new"]
+
+            with patch.object(provider, "_open_json", side_effect=slow_network):
+                started = time.monotonic()
+                served = provider._get_json(url)
+                elapsed = time.monotonic() - started
+                release.set()
+                provider.wait_for_background_refresh()
+            refreshed = provider._get_json(url)
+
+            http_cache.put_entry(provider.http_cache_path, key, url, ["ancient"], time.time() - 14 * 3600, 12 * 3600)
+            too_old = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp), stale_while_revalidate=True, max_stale_seconds=3600)
+            with patch.object(too_old, "_open_json", return_value=["blocking"]):
+                blocking = too_old._get_json(url)
+
+        self.assertEqual(served, ["old"])
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(refreshed, ["new"])
+        self.assertEqual(blocking, ["blocking"])
+        self.assertEqual(
+            [(item["endpoint"], item["market"], item["symbol"]) for item in provider.stale_cache_entries()],
+            [("openapi.twse.com.tw/v1/opendata/t187ap03_L", "TWSE", None)],
+        )
+        self.assertEqual(too_old.stale_cache_entries(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import gzip
+import json
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from src.providers.tw_market_provider import TwMarketProvider
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    seen_encodings: list[str] = []
+
+    def do_GET(self) -> None:
+        if self.path.startswith("/old"):
+            self.send_response(302)
+            self.send_header("Location", "/data?moved=1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._reply({"path": self.path, "method": "GET"})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode("utf-8")
+        self._reply({"path": self.path, "method": "POST", "body": body})
+
+    def _reply(self, payload: dict) -> None:
+        encoding = self.headers.get("Accept-Encoding") or ""
+        type(self).seen_encodings.append(encoding)
+        raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in encoding:
+            raw = gzip.compress(raw)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, format: str, *args) -> None:
+        return
+
+
+class HttpPoolTests(unittest.TestCase):
+    def setUp(self) -> None:
+        _KeepAliveHandler.seen_encodings = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_get_and_post_share_one_keep_alive_connection(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            provider = TwMarketProvider(timeout=2.0, cache_dir=Path(tmp))
+            first = provider._get_json(f"{self.base_url}/data", {"date": "20260312"})
+            second = provider._post_json(f"{self.base_url}/table", {"code": "6488"})
+            third = provider._get_json(f"{self.base_url}/old")
+            stats = provider.fetch_stats()["http_pool"]["127.0.0.1"]
+            provider._http.close()
+
+        self.assertEqual(first["path"], "/data?date=20260312")
+        self.assertEqual(second["method"], "POST")
+        self.assertEqual(second["body"], "code=6488")
+        self.assertEqual(third["path"], "/data?moved=1")
+        self.assertTrue(all("gzip" in item for item in _KeepAliveHandler.seen_encodings))
+        self.assertEqual(stats["connections_opened"], 1)
+        self.assertEqual(stats["requests"], 4)
+        self.assertEqual(stats["connections_reused"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
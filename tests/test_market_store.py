@@ -0,0 +1,150 @@
+import sqlite3
+import tempfile
+import unittest
+from contextlib import closing
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlsplit
+
+from src.analysis.candles import CandleSeries
+from src.analysis.factors import atr_wilder, rsi_wilder, sma, volatility_annualized
+from src.analysis.indicator_state import IndicatorState
+from src.providers import market_store
+from src.providers.tw_market_provider import TwMarketProvider
+from tests.test_concurrent_fetch import _month_rows
+
+
+class _PublishedUpTo:
+    def __init__(self, published: date) -> None:
+        self.published = published
+        self.requests: list[str] = []
+
+    def __call__(self, req, context=None):
+        params = {k: v[0] for k, v in parse_qs(urlsplit(req.full_url).query).items()}
+        year, month = int(params["date"][:4]), int(params["date"][4:6])
+        self.requests.append(f"{params['stockNo']}:{year}-{month:02d}")
+        rows = _month_rows(year, month, 100.0)
+        if (year, month) == (self.published.year, self.published.month):
+            rows = [row for row in rows if int(row[0].split("/")[2]) <= self.published.day]
+        elif (year, month) > (self.published.year, self.published.month):
+            rows = []
+        return {"stat": "OK", "data": rows}
+
+
+class MarketStoreTests(unittest.TestCase):
+    def test_closed_months_are_served_from_store_for_any_lookback(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            network = _PublishedUpTo(date(2026, 4, 30))
+            first = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
+            with patch.object(first, "_open_json", side_effect=network):
+                base = first.get_ohlcv("2330", "TWSE", as_of=date(2026, 3, 20), lookback=60)
+            calls = len(network.requests)
+
+            second = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
+            with patch.object(second, "_open_json", side_effect=network):
+                shorter = second.get_ohlcv("2330", "TWSE", as_of=date(2026, 3, 10), lookback=25)
+            coverage = market_store.get_month_coverage(second.market_store_path, "2330", "TWSE")
+
+        self.assertEqual(calls, 3)
+        self.assertEqual(len(network.requests), calls)
+        self.assertEqual(len(base), 60)
+        self.assertEqual(shorter[-1]["date"], date(2026, 3, 10))
+        self.assertEqual(shorter, [c for c in base if c["date"] <= date(2026, 3, 10)][-25:])
+        self.assertTrue(all(item["complete"] for item in coverage.values()))
+
+    def test_daily_run_refetches_only_the_open_month(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            network = _PublishedUpTo(date(2026, 3, 12))
+            provider = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
+            with patch.object(provider, "_open_json", side_effect=network), patch.object(
+                provider, "_today", return_value=date(2026, 3, 12)
+            ):
+                provider.get_ohlcv("2330", "TWSE", as_of=date(2026, 3, 12), lookback=40)
+                provider.get_ohlcv("2330", "TWSE", as_of=date(2026, 3, 12), lookback=30)
+            before = len(network.requests)
+
+            network.published = date(2026, 3, 13)
+            next_day = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
+            with patch.object(next_day, "_open_json", side_effect=network), patch.object(
+                next_day, "_today", return_value=date(2026, 3, 13)
+            ):
+                candles = next_day.get_ohlcv("2330", "TWSE", as_of=date(2026, 3, 13), lookback=40)
+            coverage = market_store.get_month_coverage(next_day.market_store_path, "2330", "TWSE")
+
+        self.assertEqual(network.requests[before:], ["2330:2026-03"])
+        self.assertEqual(candles[-1]["date"], date(2026, 3, 13))
+        self.assertFalse(coverage["2026-03"]["complete"])
+        self.assertEqual(coverage["2026-03"]["covered_through"], "2026-03-13")
+        self.assertTrue(coverage["2026-02"]["complete"])
+
+    def test_month_closed_after_partial_fetch_is_refetched_once(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            network = _PublishedUpTo(date(2026, 3, 12))
+            provider = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
+            with patch.object(provider, "_open_json", side_effect=network), patch.object(
+                provider, "_today", return_value=date(2026, 3, 12)
+            ):
+                provider.get_ohlcv("2330", "TWSE", as_of=date(2026, 3, 12), lookback=20)
+            fetched_at = datetime(2026, 3, 12, 20, 0).timestamp()
+            with closing(sqlite3.connect(provider.http_cache_path)) as conn, conn:
+                conn.execute("UPDATE http_cache SET fetched_at = ?", (fetched_at,))
+
+            network.published = date(2026, 4, 30)
+            later = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
+            with patch.object(later, "_open_json", side_effect=network):
+                candles = later.get_ohlcv("2330", "TWSE", as_of=date(2026, 3, 31), lookback=20)
+                again = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
+                with patch.object(again, "_open_json", side_effect=network):
+                    again.get_ohlcv("2330", "TWSE", as_of=date(2026, 3, 31), lookback=20)
+
+        self.assertEqual(network.requests.count("2330:2026-03"), 2)
+        self.assertEqual(candles[-1]["date"], date(2026, 3, 20))
+
+    def test_indicator_state_advances_only_new_candles(self) -> None:
+        history = CandleSeries()
+        for i in range(200):
+            close = 100.0 + (i % 17) * 1.5 - (i % 5) * 2.0
+            history.append(date(2025, 6, 1) + timedelta(days=i), close, close + 1.0, close - 1.5, close, 1000.0)
+        key = ("2330", "TWSE")
+        with tempfile.TemporaryDirectory() as tmp:
+            provider = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
+            first, first_summary = provider.update_indicator_states({key: history[:150]})
+            later = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
+            with patch.object(IndicatorState, "update") as update:
+                _, noop_summary = later.update_indicator_states({key: history[50:150]})
+            nxt, next_summary = later.update_indicator_states({key: history[52:152]})
+            revised = history[52:152]
+            revised.closes[-5] += 3.0
+            _, revised_summary = later.update_indicator_states({key: revised})
+
+        self.assertEqual(first_summary, {"full": 1, "incremental": 0, "unchanged": 0})
+        self.assertEqual(first[key]["rsi14"], rsi_wilder(history.closes[:150], 14))
+        self.assertEqual(first[key]["atr14"], atr_wilder(history[:150], 14))
+        self.assertEqual(noop_summary, {"full": 0, "incremental": 0, "unchanged": 1})
+        self.assertEqual(update.call_count, 0)
+        self.assertEqual(next_summary, {"full": 0, "incremental": 1, "unchanged": 0})
+        self.assertAlmostEqual(nxt[key]["rsi14"], rsi_wilder(history.closes[:152], 14), places=9)
+        self.assertAlmostEqual(nxt[key]["atr14"], atr_wilder(history[:152], 14), places=9)
+        # SMA 與波動度直接由保留的收盤 / 報酬重算，與逐檔實作逐位元相同。
+        self.assertEqual(nxt[key]["sma120"], sma(history.closes[:152], 120))
+        self.assertEqual(nxt[key]["volatility20"], volatility_annualized(history.closes[:152], 20))
+        self.assertEqual(revised_summary, {"full": 1, "incremental": 0, "unchanged": 0})
+
+    def test_load_indicator_states_reads_only_requested_pairs_in_chunks(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = Path(tmp) / "market_store.sqlite"
+            market_store.init_db(db_path)
+            stored = {(f"{1000 + i}", "TWSE" if i % 2 else "TPEx"): (date(2026, 3, 12), {"i": i}) for i in range(2500)}
+            market_store.store_indicator_states(db_path, stored, date(2026, 3, 12))
+            wanted = [key for key in stored if int(key[0]) % 4] + [("9999", "TWSE"), ("1001", "TPEx")]
+
+            loaded = market_store.load_indicator_states(db_path, wanted)
+
+        expected = {key: {"i": int(key[0]) - 1000} for key in wanted if key in stored}
+        self.assertEqual(loaded, expected)
+        self.assertGreater(sum(1 for _, market in expected if market == "TWSE"), market_store.SQLITE_MAX_PARAMS)
+
+
+if __name__ == "__main__":
+    unittest.main()
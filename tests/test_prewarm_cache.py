@@ -0,0 +1,86 @@
+import io
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+from datetime import date
+from pathlib import Path
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlsplit
+
+from scripts import prewarm_cache
+from src.providers.tw_market_provider import TWSE_EPS_URL, TwMarketProvider
+from tests.test_concurrent_fetch import _month_rows
+
+
+class _MorningExchange:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.requests: list[str] = []
+
+    def __call__(self, req, context=None):
+        parts = urlsplit(req.full_url)
+        params = {k: v[0] for k, v in parse_qs(req.data.decode("utf-8") if req.data else parts.query).items()}
+        with self.lock:
+            self.requests.append(f"{req.full_url} {req.data or b''}")
+        name = parts.path.rsplit("/", 1)[-1]
+        if name == "t187ap03_L":
+            return [{"公司代號": "2330", "公司簡稱": "台積電", "產業別": "24"}]
+        if name == "mopsfin_t187ap03_O":
+            return [{"SecuritiesCompanyCode": "6488", "CompanyAbbreviation": "環球晶", "SecuritiesIndustryCode": "24"}]
+        if "opendata" in parts.path or "openapi" in parts.path:
+            return []
+        if name == "FMTQIK":
+            year, month = int(params["date"][:4]), int(params["date"][4:6])
+            rows = [[row[0], "1", "1", "1", row[6], "1.00"] for row in _month_rows(year, month, 23000.0)]
+            return {"stat": "OK", "fields": ["日期", "成交股數", "成交金額", "成交筆數", "發行量加權股價指數", "漲跌點數"], "data": rows}
+        if name == "STOCK_DAY":
+            return {"stat": "OK", "data": _month_rows(int(params["date"][:4]), int(params["date"][4:6]), 100.0)}
+        if name == "tradingStock":
+            year, month, _ = (int(x) for x in params["date"].split("/"))
+            return {"stat": "ok", "tables": [{"data": _month_rows(year, month, 50.0)}]}
+        if name == "BWIBBU_d":
+            return {
+                "stat": "OK",
+                "fields": ["證券代號", "證券名稱", "殖利率(%)", "股利年度", "本益比", "股價淨值比", "財報年/季"],
+                "data": [["2330", "台積電", "2.10", "112", "25.40", "6.80", "114/4Q"]],
+            }
+        if name == "peQryDate":
+            return {
+                "stat": "ok",
+                "tables": [{"fields": ["股票代號", "名稱", "本益比", "殖利率(%)", "股價淨值比"], "data": [["6488", "環球晶", "18.20", "3.10", "2.50"]]}],
+            }
+        return {"stat": "很抱歉，沒有符合條件的資料!"}
+
+
+class PrewarmCacheTests(unittest.TestCase):
+    def test_prewarm_makes_following_runs_cache_only(self) -> None:
+        network = _MorningExchange()
+        output = io.StringIO()
+        with tempfile.TemporaryDirectory() as tmp:
+            argv = ["--output-root", tmp, "--as-of", "2026-03-13", "--symbols", "2330,6488", "--lookback", "40", "--valuation-days", "2"]
+            with patch.object(TwMarketProvider, "_open_json", side_effect=network), redirect_stdout(output):
+                code = prewarm_cache.main(argv)
+
+            provider = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp) / "cache" / "market")
+            with patch.object(provider, "_open_json", side_effect=AssertionError("預熱後不應再連網")):
+                taiex = provider.get_taiex_series(as_of=date(2026, 3, 13), lookback=40)
+                twse = provider.get_latest_valuation("2330", "TWSE", as_of=date(2026, 3, 13))
+                tpex = provider.get_latest_valuation("6488", "TPEx", as_of=date(2026, 3, 13))
+                candles = provider.get_ohlcv("6488", "TPEx", as_of=date(2026, 3, 13), lookback=40)
+                provider._load_dataset(TWSE_EPS_URL)
+            audit_exists = (Path(tmp) / "audit" / "20260313" / "cache-prewarm-20260313.json").exists()
+
+        self.assertEqual(code, 0)
+        self.assertTrue(audit_exists)
+        self.assertIn("[prewarm] datasets 26", output.getvalue())
+        self.assertNotIn("[prewarm] failed", output.getvalue())
+        self.assertEqual(len(taiex), 40)
+        self.assertEqual(twse["pe"], 25.4)
+        self.assertEqual(tpex["pe"], 18.2)
+        self.assertEqual(len(candles), 40)
+        self.assertEqual(len(network.requests), len(set(network.requests)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,11 +6,19 @@ from unittest.mock import patch
 
 from src.providers.quarterly_store import init_db, insert_fundamental_snapshot
 from src.providers.tw_market_provider import TwMarketProvider
+from src.providers.universe import Universe
+from src.theme_matcher import library_matcher
+from src.themes import theme_rule
 
 
 class ProviderUniverseHelpersTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_dir = Path(tmp.name)
+
     def test_load_all_universe_filters_and_sorts(self) -> None:
-        provider = TwMarketProvider(timeout=0.1)
+        provider = TwMarketProvider(timeout=0.1, cache_dir=self.cache_dir)
         basics = {
             "1111": {"symbol": "1111", "name": "甲公司", "industry": "水泥", "market": "TWSE"},
             "2222": {"symbol": "2222", "name": "乙公司", "industry": "食品", "market": "TPEx"},
@@ -31,13 +39,13 @@ class ProviderUniverseHelpersTests(unittest.TestCase):
         self.assertEqual(rows[1]["industry"], "水泥工業")
 
     def test_load_industry_universes_groups_by_industry(self) -> None:
-        provider = TwMarketProvider(timeout=0.1)
+        provider = TwMarketProvider(timeout=0.1, cache_dir=self.cache_dir)
         mocked = [
             {"symbol": "1111", "name": "甲", "market": "TWSE", "industry": "A", "monthly_revenue": 10},
             {"symbol": "2222", "name": "乙", "market": "TWSE", "industry": "A", "monthly_revenue": 9},
             {"symbol": "3333", "name": "丙", "market": "TWSE", "industry": "B", "monthly_revenue": 8},
         ]
-        with patch.object(provider, "load_all_universe", return_value=mocked):
+        with patch.object(provider, "_universe", return_value=Universe(mocked)):
             buckets = provider.load_industry_universes(min_count=2)
 
         self.assertIn("A", buckets)
@@ -45,7 +53,7 @@ class ProviderUniverseHelpersTests(unittest.TestCase):
         self.assertEqual(len(buckets["A"]), 2)
 
     def test_load_theme_universe_uses_shared_universe(self) -> None:
-        provider = TwMarketProvider(timeout=0.1)
+        provider = TwMarketProvider(timeout=0.1, cache_dir=self.cache_dir)
         mocked = [
             {
                 "symbol": "2408",
@@ -66,10 +74,44 @@ class ProviderUniverseHelpersTests(unittest.TestCase):
                 "revenue_mom": 3.0,
             },
         ]
-        with patch.object(provider, "load_all_universe", return_value=mocked):
+        with patch.object(provider, "_universe", return_value=Universe(mocked)):
             rows = provider.load_theme_universe("記憶體")
         self.assertEqual([x["symbol"] for x in rows], ["2408"])
 
+    def test_universe_is_built_once_and_slices_match_full_scan(self) -> None:
+        provider = TwMarketProvider(timeout=0.1, cache_dir=self.cache_dir)
+        basics = {
+            symbol: {"symbol": symbol, "name": name, "industry": industry, "market": market}
+            for symbol, name, industry, market in [
+                ("2330", "台積電", "半導體業", "TWSE"),
+                ("2408", "南亞科", "半導體業", "TWSE"),
+                ("2344", "華邦電", "半導體業", "TWSE"),
+                ("6488", "環球晶", "半導體業", "TPEx"),
+                ("2603", "長榮", "航運業", "TWSE"),
+            ]
+        }
+        revenue = {symbol: {"monthly_revenue": float(i * 100)} for i, symbol in enumerate(basics, start=1)}
+        with patch.object(provider, "_load_basics", return_value=basics) as load_basics, patch.object(
+            provider, "_load_latest_revenue_map", return_value=revenue
+        ):
+            memory = provider.load_theme_universe("memory", theme_mode="broad", min_monthly_revenue=250)
+            semis = provider.load_theme_universe("半導體", theme_mode="broad")
+            industries = provider.load_industry_universes(min_monthly_revenue=300)
+            everything = provider.load_all_universe()
+
+        rule = theme_rule("memory", theme_mode="broad")
+        expected = [
+            row["symbol"]
+            for row in everything
+            if row["monthly_revenue"] >= 250
+            and rule["name"] in library_matcher().match(row["symbol"], row["name"], row["industry"], rule["theme_mode"])
+        ]
+        self.assertEqual(load_basics.call_count, 1)
+        self.assertEqual([row["symbol"] for row in memory], expected)
+        self.assertEqual([row["symbol"] for row in everything], ["2603", "6488", "2344", "2408", "2330"])
+        self.assertEqual([row["symbol"] for row in semis], ["6488", "2344", "2408", "2330"])
+        self.assertEqual({k: [r["symbol"] for r in v] for k, v in industries.items()}, {"半導體業": ["6488", "2344"], "航運業": ["2603"]})
+
     def test_summarize_quality_coverage_counts_current_and_previous(self) -> None:
         with tempfile.TemporaryDirectory() as tmp:
             provider = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
@@ -1,3 +1,4 @@
+import json
 import tempfile
 import unittest
 from datetime import date
@@ -68,6 +69,57 @@ class QuarterlyFundamentalsTests(unittest.TestCase):
         self.assertEqual(result["quality_missing_reason"], "fetch_failed")
         self.assertIn("quality:fetch_failed", result["data_quality_flags"])
 
+    def test_bulk_datasets_are_parsed_once_per_run(self) -> None:
+        symbols = [f"{2300 + i}" for i in range(20)]
+        with tempfile.TemporaryDirectory() as tmp:
+            provider = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
+            legacy = provider._legacy_quarterly_snapshot_dir() / "twse_ci-114Q3.json"
+            legacy.write_text(
+                json.dumps(
+                    {
+                        "period": "114Q3",
+                        "income": [{"公司代號": s, "營業收入": "1000", "營業毛利（毛損）淨額": "380"} for s in symbols],
+                        "balance": [{"公司代號": s, "歸屬於母公司業主之權益合計": "1900"} for s in symbols],
+                        "eps": [{"公司代號": s, "基本每股盈餘(元)": "4.20", "稅後淨利": "80"} for s in symbols],
+                    },
+                    ensure_ascii=False,
+                ),
+                encoding="utf-8",
+            )
+            calls: list[str] = []
+
+            def fake_get_json(url: str, params=None):
+                calls.append(url)
+                if "t187ap06_L_ci" in url:
+                    return [{"公司代號": s, "營業收入": "1000", "營業毛利（毛損）淨額": "400"} for s in symbols]
+                if "t187ap07_L_ci" in url:
+                    return [{"公司代號": s, "歸屬於母公司業主之權益合計": "2000"} for s in symbols]
+                if "t187ap14_L" in url:
+                    rows = [{"公司代號": s, "基本每股盈餘(元)": "5.00", "稅後淨利": "100", "年度": "114", "季別": "4"} for s in symbols]
+                    return rows + [{"公司代號": "2300", "基本每股盈餘(元)": "9.99", "年度": "114", "季別": "4"}]
+                return []
+
+            real_read = Path.read_text
+            reads: list[Path] = []
+
+            def counting_read(path: Path, *args, **kwargs):
+                reads.append(path)
+                return real_read(path, *args, **kwargs)
+
+            with patch.object(provider, "_get_json", side_effect=fake_get_json), patch.object(Path, "read_text", counting_read):
+                backfilled = [
+                    provider._backfill_single_period(s, "TWSE", "114Q3", date(2026, 3, 12), "2026-03-12T09:00:00")
+                    for s in symbols
+                ]
+                results = [provider.get_quarterly_fundamentals(s, "TWSE", date(2026, 3, 12)) for s in symbols]
+
+        self.assertEqual({item["status"] for item in backfilled}, {"done"})
+        self.assertTrue(all(r["quality_fetch_status"] == "ok" for r in results))
+        self.assertAlmostEqual(results[0]["eps_latest"], 5.0)
+        self.assertAlmostEqual(results[0]["gross_margin_prev"], 38.0)
+        self.assertEqual(len(calls), len(set(calls)))
+        self.assertEqual(reads.count(legacy), 1)
+
 
 if __name__ == "__main__":
     unittest.main()
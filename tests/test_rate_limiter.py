@@ -0,0 +1,65 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from urllib.error import HTTPError
+
+from src.providers.rate_limiter import HostRateLimiter
+from src.providers.tw_market_provider import TwMarketProvider
+
+
+class RateLimiterTests(unittest.TestCase):
+    def test_token_bucket_paces_after_burst(self) -> None:
+        limiter = HostRateLimiter(rates={"example.test": 2.0}, burst=2.0)
+        with patch("src.providers.rate_limiter.time.monotonic", return_value=100.0):
+            waits = [limiter.reserve("example.test") for _ in range(4)]
+        self.assertEqual(waits[:2], [0.0, 0.0])
+        self.assertAlmostEqual(waits[2], 0.5)
+        self.assertAlmostEqual(waits[3], 1.0)
+
+    def test_throttle_halves_rate_and_success_recovers(self) -> None:
+        limiter = HostRateLimiter(rates={"www.twse.com.tw": 4.0})
+        limiter.record_failure("www.twse.com.tw", HTTPError("u", 429, "Too Many Requests", {"retry-after": "3"}, None))
+        stats = limiter.stats()
+        self.assertEqual(stats["hosts"]["www.twse.com.tw"]["rate_per_sec"], 2.0)
+        self.assertEqual(stats["hosts"]["www.twse.com.tw"]["throttle_events"], 1)
+        self.assertEqual(stats["events"][0]["kind"], "throttled")
+        for _ in range(30):
+            limiter.record_success("www.twse.com.tw")
+        self.assertEqual(limiter.stats()["hosts"]["www.twse.com.tw"]["rate_per_sec"], 4.0)
+
+    def test_backoff_is_jittered_exponential_and_honours_retry_after(self) -> None:
+        limiter = HostRateLimiter(backoff_base=0.5, backoff_cap=8.0)
+        for attempt in range(6):
+            ceiling = min(8.0, 0.5 * 2**attempt)
+            delay = limiter.backoff(attempt)
+            self.assertGreaterEqual(delay, ceiling / 2)
+            self.assertLessEqual(delay, ceiling)
+        throttled = HTTPError("u", 503, "busy", {"retry-after": "2"}, None)
+        self.assertEqual(limiter.backoff(0, throttled), 2.0)
+
+    def test_provider_retries_with_backoff_and_reports_events(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            provider = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
+            responses = [HTTPError("u", 503, "busy", {}, None), {"ok": True}]
+
+            def _open(req, context=None):
+                item = responses.pop(0)
+                if isinstance(item, Exception):
+                    raise item
+                return item
+
+            with patch.object(provider, "_open_json", side_effect=_open), patch(
+                "src.providers.tw_market_provider.time.sleep"
+            ) as sleep:
+                payload = provider._get_json("https://www.tpex.org.tw/x")
+
+        self.assertEqual(payload, {"ok": True})
+        self.assertEqual(sleep.call_count, 1)
+        stats = provider.fetch_stats()["rate_limiter"]
+        self.assertEqual(stats["hosts"]["www.tpex.org.tw"]["throttle_events"], 1)
+        self.assertEqual(stats["events"][0]["status"], 503)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlsplit
+
+from src.providers.quarterly_store import get_latest_refresh_run, upsert_refresh_run
+from src.providers.replay_bundle import ReplayedFetchError, ReplayMiss
+from src.providers.tw_market_provider import TwMarketProvider
+
+
+class _RecordingNetwork:
+    def __init__(self) -> None:
+        self.requests: list[str] = []
+
+    def __call__(self, req, context=None):
+        parts = urlsplit(req.full_url)
+        params = {k: v[0] for k, v in parse_qs(req.data.decode("utf-8") if req.data else parts.query).items()}
+        self.requests.append(f"{parts.path.rsplit('/', 1)[-1]}:{params.get('date')}")
+        if parts.path.endswith("FMTQIK"):
+            days = [2, 3, 4, 5, 6, 9, 10, 11, 12, 13] if params["date"].startswith("202603") else []
+            rows = [[f"115/03/{day:02d}", "1", "1", "1", "23000.00", "1.00"] for day in days]
+            return {"stat": "OK", "fields": ["日期", "成交股數", "成交金額", "成交筆數", "發行量加權股價指數", "漲跌點數"], "data": rows}
+        if parts.path.endswith("STOCK_DAY"):
+            month = params["date"][4:6]
+            rows = [[f"115/{month}/{day:02d}", "1,000", "1", f"{600 + day}", f"{610 + day}", f"{590 + day}", f"{605 + day}"] for day in (2, 3, 4)]
+            return {"stat": "OK", "data": rows}
+        if params["date"] == "20260312":
+            raise OSError("連線中斷")
+        return {
+            "stat": "OK",
+            "fields": ["證券代號", "證券名稱", "殖利率(%)", "股利年度", "本益比", "股價淨值比", "財報年/季"],
+            "data": [["2330", "台積電", "2.10", "112", "25.40", "6.80", "114/4Q"]],
+        }
+
+
+class ReplayBundleTests(unittest.TestCase):
+    def test_recorded_bundle_replays_offline_with_identical_results(self) -> None:
+        network = _RecordingNetwork()
+        with tempfile.TemporaryDirectory() as tmp:
+            source_dir = Path(tmp) / "cache"
+            source_dir.mkdir()
+            upsert_refresh_run(
+                source_dir / "quarterly_fundamentals.sqlite",
+                {
+                    "run_id": "r1",
+                    "as_of_date": "2026-03-14",
+                    "theme_mode": "strict",
+                    "themes_json": '["AI"]',
+                    "symbol_count": 1,
+                    "current_complete_pct": 100.0,
+                    "previous_complete_pct": 100.0,
+                    "created_at": "2026-03-14T18:00:00",
+                },
+            )
+            bundle_path = Path(tmp) / "run.bundle.json.gz"
+            recorder = TwMarketProvider(timeout=0.1, cache_dir=source_dir, record_bundle=bundle_path)
+            with patch.object(recorder, "_open_json", side_effect=network), patch.object(recorder, "_retry_delay", return_value=0.0):
+                recorded = (
+                    recorder.get_latest_valuation("2330", "TWSE", as_of=date(2026, 3, 15)),
+                    recorder.get_ohlcv("2330", "TWSE", as_of=date(2026, 3, 15), lookback=5),
+                )
+                with self.assertRaises(OSError):
+                    recorder.get_latest_valuation("2330", "TWSE", as_of=date(2026, 3, 12))
+            recorder.finish_recording()
+
+            replayer = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp) / "empty", replay_bundle=bundle_path)
+            with patch.object(replayer, "_open_json", side_effect=AssertionError("回放不應連網")):
+                replayed = (
+                    replayer.get_latest_valuation("2330", "TWSE", as_of=date(2026, 3, 15)),
+                    replayer.get_ohlcv("2330", "TWSE", as_of=date(2026, 3, 15), lookback=5),
+                )
+                refresh_run = get_latest_refresh_run(replayer.quarterly_store_path, theme="AI", theme_mode="strict")
+                with self.assertRaises(ReplayedFetchError):
+                    replayer.get_latest_valuation("2330", "TWSE", as_of=date(2026, 3, 12))
+                with self.assertRaises(ReplayMiss):
+                    replayer.get_ohlcv("2317", "TWSE", as_of=date(2026, 3, 15), lookback=5)
+            stats = replayer.fetch_stats()["bundle"]
+
+        self.assertEqual(replayed, recorded)
+        self.assertEqual(recorded[0]["pe"], 25.4)
+        self.assertEqual(len(recorded[1]), 5)
+        self.assertEqual(refresh_run["run_id"], "r1")
+        self.assertNotEqual(replayer.cache_dir, Path(tmp) / "empty")
+        self.assertEqual(stats["mode"], "replay")
+        self.assertGreater(stats["replayed"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,12 @@
+import json
+import random
+import tempfile
 import unittest
+from pathlib import Path
 
-from src.analysis.scoring import score_candidates
+from src.analysis.frame import FactorFrame, FrameRow
+from src.analysis.scoring import WEIGHTS, score_candidates
+from src.report.export_structured import write_candidate_csv, write_json_report
 
 
 class ScoringTests(unittest.TestCase):
@@ -27,6 +33,108 @@ class ScoringTests(unittest.TestCase):
         self.assertEqual(ranked[0]["symbol"], "A")
         self.assertGreater(ranked[0]["total_score"], ranked[1]["total_score"])
 
+    def test_score_candidates_in_place_reuses_row_objects(self) -> None:
+        rows = [
+            {"symbol": "A", "trend_score": 40.0, "momentum_score": 45.0, "data_quality_flags": ["data:stale_cache"]},
+            {"symbol": "B", "trend_score": 80.0, "momentum_score": 75.0},
+        ]
+        expected = score_candidates([dict(row) for row in rows])
+        ranked = score_candidates(rows, in_place=True)
+        self.assertEqual([row["symbol"] for row in ranked], ["B", "A"])
+        self.assertIs(ranked[0], rows[1])
+        self.assertIs(ranked[1], rows[0])
+        self.assertEqual(ranked, expected)
+
+    def test_stale_cache_flag_lowers_freshness_confidence(self) -> None:
+        base = {
+            "trend_score": 70.0,
+            "momentum_score": 70.0,
+            "value_score": 70.0,
+            "fundamental_score": 70.0,
+            "risk_control_score": 70.0,
+        }
+        fresh, stale = score_candidates(
+            [{**base, "symbol": "A"}, {**base, "symbol": "B", "data_quality_flags": ["data:stale_cache"]}]
+        )
+        self.assertEqual(fresh["data_freshness_confidence"] - stale["data_freshness_confidence"], 10.0)
+        self.assertIn("data:stale_cache", stale["data_quality_flags"])
+
+    def test_factor_frame_typed_columns_and_dict_adapters(self) -> None:
+        rows = [
+            {"symbol": "A", "name": "甲", "trend_score": 85.0, "momentum_score": None, "rank": 1, "mixed": 1, "flags": []},
+            {"symbol": "B", "name": "乙", "trend_score": 55.0, "rank": 2, "mixed": 2.5, "flags": ["x"]},
+            {"symbol": "A", "name": "甲", "trend_score": None, "momentum_score": 40.0, "rank": 3, "mixed": None, "flags": []},
+        ]
+        frame = FactorFrame.from_rows(rows)
+
+        self.assertEqual(frame.to_rows(), rows)
+        self.assertEqual(list(frame.symbol_ids), [0, 1, 0])
+        self.assertEqual(frame.table.names, ["A", "B"])
+        trend, nulls = frame.numeric("trend_score")
+        self.assertEqual(trend.typecode, "d")
+        self.assertEqual(nulls[0], 0b100)
+        self.assertEqual(frame.numeric("rank")[0].typecode, "q")
+        with self.assertRaises(TypeError):
+            frame.numeric("mixed")
+        self.assertEqual(frame.column("mixed"), [1, 2.5, None])
+        self.assertEqual(frame.present("momentum_score"), [True, False, True])
+        self.assertIsNone(frame.present("trend_score"))
+        self.assertEqual(frame.column("missing"), [None, None, None])
+        self.assertIsInstance(frame[1], FrameRow)
+        self.assertNotIn("momentum_score", frame[1])
+        self.assertIsNone(frame[0]["momentum_score"])
+        self.assertEqual(frame[::-1].to_rows(), rows[::-1])
+
+    def test_frame_scoring_matches_dict_rows(self) -> None:
+        rng = random.Random(11)
+        rows = []
+        for i in range(200):
+            row = {"symbol": f"S{i % 150}", "name": f"N{i}", "quality_fetch_status": rng.choice([None, "partial", "fetch_failed"])}
+            for key in WEIGHTS:
+                draw = rng.random()
+                if draw < 0.1:
+                    continue
+                row[key] = None if draw < 0.2 else rng.uniform(0.0, 100.0)
+            row["volatility20"] = rng.choice([None, rng.uniform(10.0, 120.0)])
+            row["data_quality_flags"] = rng.choice([[], ["data:stale_cache"]])
+            rows.append(row)
+        frame = FactorFrame.from_rows(rows)
+
+        ranked = score_candidates(frame)
+
+        self.assertIsInstance(ranked, FactorFrame)
+        self.assertIs(ranked.table, frame.table)
+        self.assertEqual(ranked.numeric("rank_score")[0].typecode, "d")
+        self.assertEqual(ranked.to_rows(), score_candidates([dict(row) for row in rows]))
+        self.assertEqual(frame.to_rows(), rows)
+
+    def test_exporters_read_frames_directly(self) -> None:
+        rows = [
+            {
+                "symbol": "2330",
+                "name": "台積電",
+                "rank": 1,
+                "idea_score": 71.25,
+                "rank_score": 60.5,
+                "confidence_score": 84.9,
+                "action_view": {"action": "Overweight"},
+                "catalyst_notes": ["營收加速"],
+                "data_quality_flags": [],
+                "trend": {"ret_20d": 4.2},
+                "benchmark_view": {"rel_to_taiex_20d": 1.5},
+            },
+            {"symbol": "2382", "name": "廣達", "rank": 2, "idea_score": 50.0, "rank_score": 40.0, "confidence_score": 80.0},
+        ]
+        frame = FactorFrame.from_rows(rows)
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            write_candidate_csv(root / "frame.csv", frame)
+            write_candidate_csv(root / "rows.csv", rows)
+            self.assertEqual((root / "frame.csv").read_bytes(), (root / "rows.csv").read_bytes())
+            write_json_report(root / "frame.json", {"picks": frame, "top": frame[0]})
+            payload = json.loads((root / "frame.json").read_text(encoding="utf-8"))
+            self.assertEqual(payload, {"picks": rows, "top": rows[0]})
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,74 @@
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlsplit
+
+from src.providers import market_store
+from src.providers.tw_market_provider import TwMarketProvider
+
+
+class _SlowExchange:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.requests: list[str] = []
+
+    def __call__(self, req, context=None):
+        parts = urlsplit(req.full_url)
+        params = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        with self.lock:
+            self.requests.append(f"{parts.path.rsplit('/', 1)[-1]}:{params.get('date')}")
+        time.sleep(0.05)
+        if parts.path.endswith("FMTQIK"):
+            rows = [[f"115/03/{day:02d}", "1", "1", "1", "23000.00", "1.00"] for day in (11, 12, 13)]
+            return {"stat": "OK", "fields": ["日期", "成交股數", "成交金額", "成交筆數", "發行量加權股價指數", "漲跌點數"], "data": rows}
+        rows = [[symbol, "名稱", "2.10", "112", "25.40", "6.80", "114/4Q"] for symbol in ("2330", "2317", "2454")]
+        return {"stat": "OK", "fields": ["證券代號", "證券名稱", "殖利率(%)", "股利年度", "本益比", "股價淨值比", "財報年/季"], "data": rows}
+
+
+class SingleFlightTests(unittest.TestCase):
+    def test_concurrent_callers_share_one_fetch_per_request(self) -> None:
+        network = _SlowExchange()
+        with tempfile.TemporaryDirectory() as tmp:
+            provider = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
+            with patch.object(provider, "_open_json", side_effect=network):
+                with ThreadPoolExecutor(max_workers=6) as pool:
+                    results = list(
+                        pool.map(
+                            lambda symbol: provider.get_latest_valuation(symbol, "TWSE", as_of=date(2026, 3, 13)),
+                            ["2330", "2317", "2454"] * 2,
+                        )
+                    )
+            stats = provider.fetch_stats()["single_flight"]
+
+        self.assertTrue(all(result == {"pe": 25.4, "pb": 6.8, "dividend_yield": 2.1} for result in results))
+        self.assertEqual(sorted(network.requests), sorted(set(network.requests)))
+        self.assertIn("BWIBBU_d:20260313", network.requests)
+        self.assertGreater(stats["shared"], 0)
+        self.assertEqual(stats["in_flight"], 0)
+
+    def test_shorter_lookback_is_sliced_from_loaded_series(self) -> None:
+        candles = [
+            {"date": date(2026, 3, day), "open": 1.0, "high": 1.0, "low": 1.0, "close": float(day), "volume": 1.0}
+            for day in range(2, 14)
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            provider = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
+            with patch.object(provider, "_today", return_value=date(2026, 3, 13)):
+                market_store.store_month(
+                    provider.market_store_path, "2330", "TWSE", date(2026, 3, 1), candles, complete=False, fetched_on=date(2026, 3, 14)
+                )
+                long_series = provider.get_ohlcv("2330", "TWSE", as_of=date(2026, 3, 13), lookback=10)
+                with patch.object(provider, "_load_ohlcv_series", side_effect=AssertionError("不應重新載入")):
+                    short_series = provider.get_ohlcv("2330", "TWSE", as_of=date(2026, 3, 13), lookback=4)
+
+        self.assertEqual(short_series, long_series[-4:])
+        self.assertEqual([c["close"] for c in short_series], [10.0, 11.0, 12.0, 13.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
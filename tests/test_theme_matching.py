@@ -1,20 +1,51 @@
 import unittest
 
-from src.providers.tw_market_provider import TwMarketProvider
-from src.themes import theme_rule
+from src.providers.universe import Universe
+from src.theme_matcher import KeywordAutomaton, library_matcher
+from src.themes import THEME_LIBRARY, theme_rule
 
 
 class ThemeMatchingTests(unittest.TestCase):
     def test_memory_theme_excludes_tsmc(self) -> None:
-        provider = TwMarketProvider()
         rule = theme_rule("記憶體")
-        self.assertFalse(provider._theme_match("2330", "台積電", "半導體業", rule))
+        self.assertNotIn(rule["name"], library_matcher().match("2330", "台積電", "半導體業", rule["theme_mode"]))
 
     def test_memory_theme_includes_memory_names(self) -> None:
-        provider = TwMarketProvider()
         rule = theme_rule("記憶體")
-        self.assertTrue(provider._theme_match("2408", "南亞科", "半導體業", rule))
-        self.assertTrue(provider._theme_match("2344", "華邦電", "半導體業", rule))
+        matcher = library_matcher()
+        self.assertIn(rule["name"], matcher.match("2408", "南亞科", "半導體業", rule["theme_mode"]))
+        self.assertIn(rule["name"], matcher.match("2344", "華邦電", "半導體業", rule["theme_mode"]))
+
+    def test_library_matcher_agrees_with_universe_keyword_scan(self) -> None:
+        automaton = KeywordAutomaton({"he": {"a"}, "she": {"b"}, "hers": {"c"}, "xyz": {"d"}})
+        self.assertEqual(automaton.labels("ushers"), {"a", "b", "c"})
+
+        companies = [
+            ("2330", "台積電", "半導體業"),
+            ("2408", "南亞科", "半導體業"),
+            ("2344", "華邦電", "半導體業"),
+            ("3017", "奇鋐", "電腦及週邊設備業"),
+            ("2382", "廣達", "電腦及週邊設備業"),
+            ("1101", "台泥", "水泥工業"),
+            ("6669", "緯穎", "電腦及週邊設備業"),
+            ("3443", "創意", "半導體業"),
+            ("2345", "智邦", "通信網路業"),
+            ("9999", "測試光電", "光電業"),
+        ]
+        universe = Universe(
+            [{"symbol": s, "name": n, "industry": i, "monthly_revenue": 100.0 - k} for k, (s, n, i) in enumerate(companies)]
+        )
+        matcher = library_matcher()
+        for mode in ("strict", "broad"):
+            for theme in THEME_LIBRARY:
+                rule = theme_rule(theme, theme_mode=mode)
+                # 改名後不在題材庫內，Universe 走逐條關鍵字比對，當作 automaton 的對照組。
+                custom = {**rule, "name": f"custom-{rule['name']}"}
+                expected = {row["symbol"] for row in universe.theme_members(custom)}
+                matched = {s for s, n, i in companies if rule["name"] in matcher.match(s, n, i, mode)}
+                self.assertEqual(matched, expected, (theme, mode))
+                self.assertEqual({row["symbol"] for row in universe.theme_members(rule)}, expected, (theme, mode))
+        self.assertIs(universe.theme_assignments("broad"), universe.theme_assignments("broad"))
 
 
 if __name__ == "__main__":
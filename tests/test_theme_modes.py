@@ -1,11 +1,19 @@
+import tempfile
 import unittest
+from pathlib import Path
 from unittest.mock import patch
 
 from src.providers.tw_market_provider import TwMarketProvider
+from src.providers.universe import Universe
 from src.themes import available_themes
 
 
 class ThemeModeTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_dir = Path(tmp.name)
+
     def test_available_themes_include_curated_subthemes(self) -> None:
         themes = available_themes()
         self.assertIn("AI infra", themes)
@@ -15,7 +23,7 @@ class ThemeModeTests(unittest.TestCase):
         self.assertIn("IC design", themes)
 
     def test_ai_strict_excludes_proxy_names_but_broad_keeps_them(self) -> None:
-        provider = TwMarketProvider(timeout=0.1)
+        provider = TwMarketProvider(timeout=0.1, cache_dir=self.cache_dir)
         mocked = [
             {
                 "symbol": "2412",
@@ -36,7 +44,7 @@ class ThemeModeTests(unittest.TestCase):
                 "revenue_mom": 1.0,
             },
         ]
-        with patch.object(provider, "load_all_universe", return_value=mocked):
+        with patch.object(provider, "_universe", return_value=Universe(mocked)):
             strict_rows = provider.load_theme_universe("AI", theme_mode="strict")
             broad_rows = provider.load_theme_universe("AI", theme_mode="broad")
 
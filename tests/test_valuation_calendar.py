@@ -0,0 +1,120 @@
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlsplit
+
+from src.providers import market_store
+from src.providers.tw_market_provider import TwMarketProvider
+
+
+TRADING_DAYS = {
+    "202602": [23, 24, 25, 26],
+    "202603": [2, 3, 4, 5, 6, 9, 10, 11, 12, 13, 16],
+}
+
+
+class _ExchangeFake:
+    def __init__(self, listed_on: set[str]) -> None:
+        self.listed_on = listed_on
+        self.requests: list[str] = []
+
+    def __call__(self, req, context=None):
+        parts = urlsplit(req.full_url)
+        if req.data:
+            params = {k: v[0] for k, v in parse_qs(req.data.decode("utf-8")).items()}
+            day = params["date"].replace("/", "")
+            self.requests.append(f"peQryDate:{day}")
+            rows = [["6488", "環球晶", "18.20", "3.10", "2.50"]] if day in self.listed_on else []
+            return {"stat": "ok", "tables": [{"fields": ["股票代號", "名稱", "本益比", "殖利率(%)", "股價淨值比"], "data": rows}]}
+        params = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        if parts.path.endswith("FMTQIK"):
+            month = params["date"][:6]
+            self.requests.append(f"FMTQIK:{month}")
+            rows = [
+                [f"{int(month[:4]) - 1911}/{month[4:]}/{day:02d}", "1", "1", "1", f"{23000 + day:,.2f}", "10.00"]
+                for day in TRADING_DAYS.get(month, [])
+            ]
+            return {"stat": "OK", "fields": ["日期", "成交股數", "成交金額", "成交筆數", "發行量加權股價指數", "漲跌點數"], "data": rows}
+        day = params["date"]
+        self.requests.append(f"BWIBBU:{day}")
+        rows = [["2330", "台積電", "2.10", "112", "25.40", "6.80", "114/4Q"]] if day in self.listed_on else []
+        return {"stat": "OK", "fields": ["證券代號", "證券名稱", "殖利率(%)", "股利年度", "本益比", "股價淨值比", "財報年/季"], "data": rows}
+
+
+class ValuationCalendarTests(unittest.TestCase):
+    def test_only_trading_days_are_probed_and_tables_persist(self) -> None:
+        network = _ExchangeFake(listed_on={"20260312", "2026/03/12"})
+        with tempfile.TemporaryDirectory() as tmp:
+            provider = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
+            with patch.object(provider, "_open_json", side_effect=network):
+                twse = provider.get_latest_valuation("2330", "TWSE", as_of=date(2026, 3, 15))
+                tpex = provider.get_latest_valuation("6488", "TPEx", as_of=date(2026, 3, 15))
+
+            rerun = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
+            with patch.object(rerun, "_open_json", side_effect=AssertionError("不應重新下載")):
+                again = rerun.get_latest_valuation("2330", "TWSE", as_of=date(2026, 3, 15))
+                stored = market_store.load_valuation_table(rerun.market_store_path, "TPEx", date(2026, 3, 13))
+
+        self.assertEqual(twse, {"pe": 25.4, "pb": 6.8, "dividend_yield": 2.1})
+        self.assertEqual(tpex, {"pe": 18.2, "pb": 2.5, "dividend_yield": 3.1})
+        self.assertEqual(again, twse)
+        self.assertIsNone(stored)
+        self.assertEqual(
+            network.requests,
+            ["FMTQIK:202603", "FMTQIK:202602", "BWIBBU:20260313", "BWIBBU:20260312", "peQryDate:20260313", "peQryDate:20260312"],
+        )
+
+    def test_failed_trading_day_is_not_persisted_and_refetched(self) -> None:
+        network = _ExchangeFake(listed_on={"20260313"})
+        throttled = {"stat": "查詢過於頻繁，請稍後再試"}
+
+        def flaky(req, context=None):
+            payload = network(req, context)
+            return throttled if network.requests[-1] == "BWIBBU:20260313" and network.requests.count("BWIBBU:20260313") == 1 else payload
+
+        with tempfile.TemporaryDirectory() as tmp:
+            provider = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
+            with patch.object(provider, "_open_json", side_effect=flaky):
+                first = provider.get_latest_valuation("2330", "TWSE", as_of=date(2026, 3, 13), max_backtrack_days=0)
+            stored = market_store.load_valuation_table(provider.market_store_path, "TWSE", date(2026, 3, 13))
+
+            rerun = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
+            with patch.object(rerun, "_open_json", side_effect=flaky):
+                second = rerun.get_latest_valuation("2330", "TWSE", as_of=date(2026, 3, 13), max_backtrack_days=0)
+
+        self.assertIsNone(first)
+        self.assertIsNone(stored)
+        self.assertEqual(second["pe"], 25.4)
+        self.assertEqual(network.requests.count("BWIBBU:20260313"), 2)
+
+    def test_unpublished_same_day_table_is_not_persisted(self) -> None:
+        network = _ExchangeFake(listed_on={"20260313"})
+        with tempfile.TemporaryDirectory() as tmp:
+            provider = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
+            with patch.object(provider, "_open_json", side_effect=network), patch.object(
+                provider, "_today", return_value=date(2026, 3, 16)
+            ):
+                result = provider.get_latest_valuation("2330", "TWSE", as_of=date(2026, 3, 16))
+            today_table = market_store.load_valuation_table(provider.market_store_path, "TWSE", date(2026, 3, 16))
+
+        self.assertEqual(result["pe"], 25.4)
+        self.assertIsNone(today_table)
+        self.assertIn("BWIBBU:20260316", network.requests)
+
+    def test_falls_back_to_calendar_days_without_calendar(self) -> None:
+        network = _ExchangeFake(listed_on={"20260314"})
+        with tempfile.TemporaryDirectory() as tmp:
+            provider = TwMarketProvider(timeout=0.1, cache_dir=Path(tmp))
+            with patch.object(provider, "_open_json", side_effect=network), patch.object(
+                provider, "trading_days", return_value=None
+            ):
+                result = provider.get_latest_valuation("2330", "TWSE", as_of=date(2026, 3, 15), max_backtrack_days=3)
+
+        self.assertEqual(result["pb"], 6.8)
+        self.assertEqual(network.requests, ["BWIBBU:20260315", "BWIBBU:20260314"])
+
+
+if __name__ == "__main__":
+    unittest.main()